@@ -4,14 +4,147 @@ Custom tools for Bharat AI Buddy using smolagents capabilities
 from smolagents import tool, Tool
 import requests
 import wikipedia
+import wiki_cache
 from markdownify import markdownify
 import json
 from typing import Optional, List, Dict, Any
 import re
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from config import config
+from http_client import UnsupportedContentTypeError
+import async_runner
+from syllabus_store import get_syllabus_store
+from local_index import get_local_index
+from deadline import bind as bind_deadline, cap as cap_to_budget, current as current_deadline
+from metrics import instrument_tool
+from tracing import trace_tool
 
 logger = logging.getLogger("bharat_buddy")
 
+# Shared, bounded pool for the independent lookups inside the context-gathering tools
+_fan_out_executor = ThreadPoolExecutor(max_workers=config.TOOL_FANOUT_WORKERS, thread_name_prefix="tool-fan-out")
+
+def _fan_out(tasks: Dict[str, Any]) -> Dict[str, Any]:
+    """Runs independent lookups concurrently and merges whatever finishes in time.
+    
+    Args:
+        tasks: Mapping of source name to a (callable, deadline in seconds) pair.
+            Deadlines are capped to the request's remaining latency budget.
+    
+    Returns:
+        Mapping of source name to result for every source that succeeded before its
+        deadline. Failed or late sources are logged and left out; a late lookup keeps
+        running in the background and still warms the caches for the next request.
+    """
+    start = time.monotonic()
+    futures = {}
+    for name, (fn, deadline) in tasks.items():
+        deadline = cap_to_budget(deadline)
+        if deadline <= 0 and current_deadline() is not None:
+            current_deadline().drop(f"{name} lookup", "skipped: request budget spent")
+            continue
+        futures[name] = (_fan_out_executor.submit(bind_deadline(fn)), deadline)
+    results = {}
+    for name, (future, deadline) in sorted(futures.items(), key=lambda item: item[1][1]):
+        remaining = max(0.0, start + deadline - time.monotonic())
+        try:
+            results[name] = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            future.cancel()
+            logger.warning(f"{name} lookup missed its {deadline:.1f}s deadline; continuing without it")
+            if current_deadline() is not None:
+                current_deadline().drop(f"{name} lookup", f"cut short after {deadline:.1f}s")
+        except Exception as e:
+            logger.error(f"Error in {name} lookup: {e}")
+    logger.info(f"Fan-out of {list(tasks)} finished in {time.monotonic() - start:.2f}s")
+    return results
+
+# Tools whose lookups go over the network are implemented once, as the async_tools
+# coroutines of the same name; their @tool versions below run those for the agents
+_ASYNC_TOOLS = ("visit_webpage", "search_wikipedia", "solve_math_problem", "exam_question_generator",
+                "analyze_code", "explain_cultural_concept")
+
+def _run_async_tool(name: str, *args):
+    """Runs async_tools.<name>(*args) to completion on async_runner's background loop"""
+    import async_tools  # async_tools imports this module's helpers
+    return async_runner.run(getattr(async_tools, name)(*args))
+
+# Page types visit_webpage can turn into text; binary documents are rejected from the headers
+_VISIT_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+_BOILERPLATE_TAGS = ["script", "style", "noscript", "template", "svg", "iframe", "form", "button", "nav", "aside"]
+_BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search"}
+_BOILERPLATE_MARKERS = re.compile(
+    r"(^|[\s_-])(nav|navbar|menu|breadcrumbs?|sidebar|footer|header|cookies?|banner|advert|ads?|promo|"
+    r"share|social|related|comments?|subscribe|newsletter|popup|modal)([\s_-]|$)", re.IGNORECASE)
+
+def _extract_main_content(html) -> str:
+    """Drops navigation, scripts and boilerplate and returns the main content as markdown"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    for element in soup(_BOILERPLATE_TAGS):
+        element.decompose()
+    # Site-wide headers and footers go; an article's own header (title, byline) stays
+    for element in soup(["header", "footer"]):
+        if not element.decomposed and element.find_parent(["article", "main"]) is None:
+            element.decompose()
+    for element in soup.find_all(["div", "section", "ul", "table", "p", "span"]):
+        if element.decomposed:
+            continue
+        role = (element.get("role") or "").lower()
+        markers = " ".join(element.get("class") or []) + " " + (element.get("id") or "")
+        if role in _BOILERPLATE_ROLES or _BOILERPLATE_MARKERS.search(markers):
+            element.decompose()
+    
+    main = soup.find("main") or soup.find("article") or soup.find(attrs={"role": "main"})
+    if main is None:
+        # Fall back to the block holding the most paragraph text
+        candidates = soup.find_all(["div", "section", "td"])
+        scored = [(sum(len(p.get_text(strip=True)) for p in c.find_all("p", recursive=False)), c) for c in candidates]
+        best_score, best = max(scored, key=lambda item: item[0], default=(0, None))
+        main = best if best_score > 0 else (soup.body or soup)
+    content = markdownify(str(main), strip=["img"])
+    return re.sub(r"\n{3,}", "\n\n", content).strip()
+
+def _truncate_text(text: str, max_chars: int) -> str:
+    """Cuts text to max_chars, preferring a paragraph or sentence boundary"""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundary = max(cut.rfind("\n\n"), cut.rfind(". "), cut.rfind("\u0964"))
+    if boundary > max_chars // 2:
+        cut = cut[:boundary + 1]
+    return cut.rstrip() + "\n\n[Content truncated]"
+
+def _page_to_text(response) -> str:
+    """Turns a fetched page into capped markdown (or plain text for text/plain pages)"""
+    if response.content_type.lower().startswith("text/plain"):
+        content = response.text
+    else:
+        content = _extract_main_content(response.content if response.encoding is None else response.text)
+    content = _truncate_text(content, config.VISIT_WEBPAGE_MAX_CHARS)
+    logger.info(f"Fetched webpage content from {response.url} "
+                f"({len(response.content)} bytes{', truncated' if response.truncated else ''} -> {len(content)} chars)")
+    return content
+
+def _visit_error(url: str, error: Exception) -> str:
+    """Error message returned by visit_webpage when a page could not be read"""
+    if isinstance(error, UnsupportedContentTypeError):
+        logger.error(f"Skipping {url}: {error}")
+        return f"Error: {url} is not a web page that can be read as text ({error})."
+    if isinstance(error, requests.exceptions.Timeout):
+        logger.error(f"Timeout while accessing {url}")
+        return f"Error: Request to {url} timed out. Please try again later or check if the website is accessible."
+    if isinstance(error, requests.exceptions.HTTPError):
+        logger.error(f"HTTP error while accessing {url}: {error}")
+        return f"Error: HTTP error ({error}) while accessing {url}. The page may not exist or require authentication."
+    if isinstance(error, requests.exceptions.ConnectionError):
+        logger.error(f"Connection error while accessing {url}")
+        return f"Error: Could not connect to {url}. Please check that the URL is correct and the website is accessible."
+    logger.error(f"Error in visit_webpage: {error}")
+    return f"Error: Failed to retrieve content from {url}: {error}"
+
 @tool
 def visit_webpage(url: str) -> str:
     """Gets the content from a webpage.
@@ -22,25 +155,10 @@ def visit_webpage(url: str) -> str:
     Returns:
         The content of the webpage in markdown format.
     """
-    logger.info(f"visit_webpage called with url: {url}")
-    try:
-        response = requests.get(url, timeout=10)  # Add timeout for better error handling
-        response.raise_for_status()  # This will raise an exception for HTTP errors
-        content = markdownify(response.text)
-        logger.info(f"Successfully fetched webpage content from {url}")
-        return content
-    except requests.exceptions.Timeout:
-        logger.error(f"Timeout while accessing {url}")
-        return f"Error: Request to {url} timed out. Please try again later or check if the website is accessible."
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error while accessing {url}: {http_err}")
-        return f"Error: HTTP error ({http_err}) while accessing {url}. The page may not exist or require authentication."
-    except requests.exceptions.ConnectionError:
-        logger.error(f"Connection error while accessing {url}")
-        return f"Error: Could not connect to {url}. Please check that the URL is correct and the website is accessible."
-    except Exception as e:
-        logger.error(f"Error in visit_webpage: {e}")
-        return f"Error: Failed to retrieve content from {url}: {e}"
+    return _run_async_tool("visit_webpage", url)
+
+def _format_wiki_page(title: str, summary: str, url: str) -> str:
+    return f"## {title}\n\n{summary}\n\nSource: {url}"
 
 @tool
 def search_wikipedia(query: str, language: str = "en") -> str:
@@ -53,100 +171,71 @@ def search_wikipedia(query: str, language: str = "en") -> str:
     Returns:
         A summary of the information found.
     """
-    logger.info(f"search_wikipedia called with query: {query}, language: {language}")
-    try:
-        # Set the language
-        wikipedia.set_lang(language)
-        
-        # Search for pages
-        search_results = wikipedia.search(query, results=5)
-        logger.info(f"Wikipedia search results: {search_results}")
-        
-        if not search_results:
-            return f"No Wikipedia articles found for '{query}'."
-        
-        # Try to get a summary for the first result
-        try:
-            page = wikipedia.page(search_results[0], auto_suggest=False)
-            summary = page.summary
-            url = page.url
-            logger.info(f"Found Wikipedia page: {page.title}")
-            return f"## {page.title}\n\n{summary}\n\nSource: {url}"
-        except wikipedia.DisambiguationError as e:
-            # If disambiguation page, pick the first option
-            if not hasattr(e, 'options') or not e.options:
-                return f"Multiple Wikipedia articles found for '{query}', but no specific options were provided."
-                
-            try:
-                page = wikipedia.page(e.options[0], auto_suggest=False)
-                summary = page.summary
-                url = page.url
-                logger.info(f"Disambiguation resolved to: {page.title}")
-                return f"## {page.title}\n\n{summary}\n\nSource: {url}"
-            except Exception as de:
-                logger.error(f"Error resolving disambiguation: {de}")
-                return f"Multiple Wikipedia articles found for '{query}'. Options include: {', '.join(e.options[:5])}."
-        except wikipedia.PageError as pe:
-            logger.error(f"Wikipedia page not found: {pe}")
-            return f"Wikipedia page not found for '{query}'. Please try a different search term."
-        except Exception as e:
-            logger.error(f"Error retrieving Wikipedia page: {e}")
-            return f"Error retrieving Wikipedia page for '{query}': {e}"
-    except Exception as e:
-        logger.error(f"Error searching Wikipedia: {e}")
-        return f"Error searching Wikipedia: {e}"
+    return _run_async_tool("search_wikipedia", query, language)
+
+def local_knowledge_context(query: str, top_k: Optional[int] = None) -> str:
+    """Formats the best offline-index passages for a query, or returns "" when there are none.
+    Passages scoring below LOCAL_SEARCH_MIN_SCORE are treated as no match.
+    """
+    index = get_local_index()
+    if index is None:
+        return ""
+    hits = [h for h in index.search(query, k=top_k or config.LOCAL_SEARCH_TOP_K) if h.score >= config.LOCAL_SEARCH_MIN_SCORE]
+    logger.info(f"Local index returned {len(hits)} passages for: {query}")
+    return "\n\n".join(f"## {hit.title}\n\n{hit.text}\n\nSource: {hit.source}" for hit in hits)
 
 @tool
-def solve_math_problem(problem: str) -> str:
-    """Provides computational assistance for math problems to augment LLM explanations.
-    This tool performs basic calculations without replacing the LLM's conceptual understanding.
+def search_local_knowledge(query: str, top_k: int = 5) -> str:
+    """Searches the offline knowledge index for passages relevant to a query, without any network access.
+    Works for queries in English and in Indian languages.
     
     Args:
-        problem: The mathematical problem to solve.
+        query: The search query.
+        top_k: The number of passages to return (default: 5)
     
     Returns:
-        Computational results to supplement the LLM's mathematical explanation.
+        The most relevant passages with their titles and sources.
     """
-    logger.info(f"solve_math_problem called with problem: {problem}")
-    search_results = ""
-    calculation = ""
-    
-    # Step 1: Try to find relevant online information about the math problem
+    logger.info(f"search_local_knowledge called with query: {query}, top_k: {top_k}")
+    if get_local_index() is None:
+        return "The offline knowledge index is not available. Use another search tool."
     try:
-        from smolagents import WebSearchTool
-        search_tool = WebSearchTool()
-        
-        # Extract key math terms from the problem
-        math_terms = re.findall(r'(equation|solve|integrate|derivative|calculus|algebra|geometry|trigonometry|differentiate|simplify|factor)', problem.lower())
-        logger.info(f"Extracted math terms: {math_terms}")
-        
-        if math_terms:
-            search_query = f"{problem} solution method mathematical"
-            search_results = search_tool(search_query)
-            logger.info(f"Search results for math problem: {search_results}")
-            
-            # Extract the most relevant part of the search results
-            if search_results and len(search_results) > 100:
-                # Find sentences that contain mathematical notation or terms
-                sentences = re.split(r'[.!?]', search_results)
-                relevant_sentences = []
-                
-                for sentence in sentences:
-                    # Look for mathematical notation, numbers, or key terms
-                    if (re.search(r'[+\-*/^=]|\d+', sentence) and 
-                        any(term in sentence.lower() for term in ['formula', 'equation', 'solution', 'calculate', 'solve'])):
-                        relevant_sentences.append(sentence.strip())
-                
-                if relevant_sentences:
-                    search_results = "Relevant mathematical approaches:\n- " + "\n- ".join(relevant_sentences[:3])
-                    logger.info(f"Relevant mathematical approaches found: {relevant_sentences[:3]}")
-                else:
-                    search_results = ""
-    except Exception as se:
-        logger.error(f"Error in math problem search: {se}")
-        search_results = ""
-    
-    # Step 2: Try basic computation for simple arithmetic expressions
+        context = local_knowledge_context(query, top_k)
+        return context or f"No passages found in the offline knowledge index for '{query}'."
+    except Exception as e:
+        logger.error(f"Error searching the local index: {e}")
+        return f"Error searching the offline knowledge index: {e}"
+
+_MATH_TERMS = re.compile(r'(equation|solve|integrate|derivative|calculus|algebra|geometry|trigonometry|differentiate|simplify|factor)')
+
+def _math_search_query(problem: str) -> Optional[str]:
+    """Web search query for a math problem, or None if it has no key math terms"""
+    math_terms = _MATH_TERMS.findall(problem.lower())
+    logger.info(f"Extracted math terms: {math_terms}")
+    return f"{problem} solution method mathematical" if math_terms else None
+
+def _math_approaches(search_results: str) -> str:
+    """Keeps the search result sentences that describe a mathematical approach"""
+    logger.info(f"Search results for math problem: {search_results}")
+    if not search_results or len(search_results) <= 100:
+        return search_results or ""
+    # Find sentences that contain mathematical notation or terms
+    sentences = re.split(r'[.!?]', search_results)
+    relevant_sentences = []
+    
+    for sentence in sentences:
+        # Look for mathematical notation, numbers, or key terms
+        if (re.search(r'[+\-*/^=]|\d+', sentence) and 
+            any(term in sentence.lower() for term in ['formula', 'equation', 'solution', 'calculate', 'solve'])):
+            relevant_sentences.append(sentence.strip())
+    
+    if relevant_sentences:
+        logger.info(f"Relevant mathematical approaches found: {relevant_sentences[:3]}")
+        return "Relevant mathematical approaches:\n- " + "\n- ".join(relevant_sentences[:3])
+    return ""
+
+def _math_calculation(problem: str) -> str:
+    """Evaluates a plain arithmetic expression in the problem, if there is one"""
     try:
         # Check if problem contains a clear arithmetic expression
         arithmetic_match = re.search(r'(\d+\s*[\+\-\*/]\s*\d+(?:\s*[\+\-\*/]\s*\d+)*)', problem)
@@ -156,11 +245,13 @@ def solve_math_problem(problem: str) -> str:
             result = eval(expression)
             calculation = f"Arithmetic calculation: {expression} = {result}"
             logger.info(f"Performed arithmetic calculation: {calculation}")
+            return calculation
     except Exception as ae:
         logger.error(f"Error in arithmetic calculation: {ae}")
-        calculation = ""
-    
-    # Step 3: Determine what to return based on what we found
+    return ""
+
+def _math_assistance(search_results: str, calculation: str) -> str:
+    """Combines the search and calculation steps of solve_math_problem"""
     if calculation and search_results:
         return f"{search_results}\n\n{calculation}"
     elif calculation:
@@ -171,86 +262,56 @@ def solve_math_problem(problem: str) -> str:
         return "Unable to find specific computational assistance for this math problem. The LLM can solve this based on its mathematical knowledge."
 
 @tool
-def exam_question_generator(exam_type: str, subject: str, difficulty: str = "medium") -> str:
-    """Generates relevant context to help the LLM create an exam question.
+def solve_math_problem(problem: str) -> str:
+    """Provides computational assistance for math problems to augment LLM explanations.
+    This tool performs basic calculations without replacing the LLM's conceptual understanding.
     
     Args:
-        exam_type: The type of exam (e.g., "UPSC", "JEE", "NEET").
-        subject: The subject of the question.
-        difficulty: The difficulty level (easy, medium, hard).
+        problem: The mathematical problem to solve.
     
     Returns:
-        Contextual information to help generate a relevant exam question.
+        Computational results to supplement the LLM's mathematical explanation.
     """
-    logger.info(f"exam_question_generator called with exam_type: {exam_type}, subject: {subject}, difficulty: {difficulty}")
-    
-    # Build a rich context for the LLM to use when generating questions
-    context_sections = []
-    
-    # Step 1: Try to get exam and subject information from Wikipedia
-    try:
-        wikipedia.set_lang("en")
-        
-        # Search for exam-related information
-        search_results = wikipedia.search(f"{exam_type} {subject}", results=3)
-        logger.info(f"Wikipedia search results for exam question generation: {search_results}")
-        
-        if search_results:
-            # Try to get exam-related information
-            exam_page = None
-            for result in search_results:
-                if exam_type.lower() in result.lower():
-                    try:
-                        exam_page = wikipedia.page(result, auto_suggest=False)
-                        break
-                    except (wikipedia.DisambiguationError, wikipedia.PageError, Exception) as e:
-                        logger.error(f"Error accessing Wikipedia page for {result}: {e}")
-                        continue
-            
-            # Extract exam format information if available
-            if exam_page:
-                format_info = ""
-                content = exam_page.content.lower()
-                
-                # Try to extract question format information
-                if "question" in content and "format" in content:
-                    sections = exam_page.content.split('\n== ')
-                    for section in sections:
-                        if "question" in section.lower() or "format" in section.lower() or "pattern" in section.lower():
-                            format_info = section[:300] + "..."
-                            break
-                
-                if format_info:
-                    context_sections.append(f"Exam format information:\n{format_info}")
-                    logger.info(f"Extracted exam format information: {format_info}")
-            
-            # Try to get subject-related information
-            subject_page = None
-            try:
-                subject_results = wikipedia.search(f"{subject} {exam_type}", results=3)
-                if subject_results:
-                    subject_page = wikipedia.page(subject_results[0], auto_suggest=False)
-                    
-                    # Extract a short summary about the subject
-                    if subject_page:
-                        subject_info = subject_page.summary[:300] + "..."
-                        context_sections.append(f"Subject information:\n{subject_info}")
-                        logger.info(f"Extracted subject information: {subject_info}")
-                        
-                        # Try to extract key topics in the subject
-                        key_topics = []
-                        content = subject_page.content
-                        topic_matches = re.findall(r'\n== ([^=]+) ==', content)
-                        if topic_matches:
-                            key_topics = topic_matches[:5]
-                            context_sections.append(f"Key topics in {subject}:\n- " + "\n- ".join(key_topics))
-                            logger.info(f"Extracted key topics: {key_topics}")
-            except (wikipedia.DisambiguationError, wikipedia.PageError, Exception) as e:
-                logger.error(f"Error accessing subject Wikipedia page: {e}")
-    except Exception as wiki_error:
-        logger.error(f"Error in Wikipedia information extraction: {wiki_error}")
+    return _run_async_tool("solve_math_problem", problem)
+
+def _exam_format_from_content(page_content: str) -> List[str]:
+    """Extracts the question format section of an exam's Wikipedia page"""
+    format_info = ""
+    content = page_content.lower()
+    
+    # Try to extract question format information
+    if "question" in content and "format" in content:
+        for section in page_content.split('\n== '):
+            if "question" in section.lower() or "format" in section.lower() or "pattern" in section.lower():
+                format_info = section[:300] + "..."
+                break
+    
+    if format_info:
+        logger.info(f"Extracted exam format information: {format_info}")
+        return [f"Exam format information:\n{format_info}"]
+    return []
+
+def _subject_page_sections(subject: str, summary: str, content: str) -> List[str]:
+    """Extracts a short summary and the key topics from a subject's Wikipedia page"""
+    sections = []
+    # Extract a short summary about the subject
+    subject_info = summary[:300] + "..."
+    sections.append(f"Subject information:\n{subject_info}")
+    logger.info(f"Extracted subject information: {subject_info}")
+    
+    # Try to extract key topics in the subject
+    topic_matches = re.findall(r'\n== ([^=]+) ==', content)
+    if topic_matches:
+        key_topics = topic_matches[:5]
+        sections.append(f"Key topics in {subject}:\n- " + "\n- ".join(key_topics))
+        logger.info(f"Extracted key topics: {key_topics}")
+    return sections
+
+def _question_context(exam_type: str, subject: str, difficulty: str, context_sections: List[str]) -> str:
+    """Adds general and difficulty guidance to the looked-up sections and formats the context"""
+    context_sections = list(context_sections)
     
-    # Step 2: If we couldn't get specific information, provide general guidance
+    # If we couldn't get specific information, provide general guidance
     if not context_sections:
         if exam_type.lower() == "upsc":
             context_sections.append(f"UPSC questions in {subject} typically test conceptual understanding and application of knowledge.")
@@ -259,7 +320,7 @@ def exam_question_generator(exam_type: str, subject: str, difficulty: str = "med
         elif exam_type.lower() == "neet":
             context_sections.append(f"NEET questions in {subject} focus on testing understanding of fundamental concepts in life sciences.")
     
-    # Step 3: Add difficulty-specific guidance
+    # Add difficulty-specific guidance
     if difficulty.lower() == "easy":
         context_sections.append(f"For an easy {subject} question, focus on basic definitions, straightforward applications, or simple calculations.")
     elif difficulty.lower() == "medium":
@@ -267,26 +328,28 @@ def exam_question_generator(exam_type: str, subject: str, difficulty: str = "med
     elif difficulty.lower() == "hard":
         context_sections.append(f"For a difficult {subject} question, combine multiple concepts, require deeper analysis, or use uncommon scenarios.")
     
-    # Step 4: Combine all the context sections
+    # Combine all the context sections
     full_context = "\n\n".join(context_sections)
     logger.info(f"Generated context for exam question: {full_context}")
     
     return f"Context for generating a {difficulty}-level {subject} question for {exam_type}:\n\n{full_context}"
 
 @tool
-def analyze_code(code: str, language: str = "python") -> Dict[str, Any]:
-    """Searches for code quality resources to augment LLM code analysis.
-    This tool provides relevant online resources about code best practices rather than
-    performing detailed analysis that the LLM can handle.
+def exam_question_generator(exam_type: str, subject: str, difficulty: str = "medium") -> str:
+    """Generates relevant context to help the LLM create an exam question.
     
     Args:
-        code: The code to analyze.
-        language: The programming language of the code.
+        exam_type: The type of exam (e.g., "UPSC", "JEE", "NEET").
+        subject: The subject of the question.
+        difficulty: The difficulty level (easy, medium, hard).
     
     Returns:
-        Basic information and relevant resources to help the LLM analyze the code.
+        Contextual information to help generate a relevant exam question.
     """
-    logger.info(f"analyze_code called for {language} code analysis")
+    return _run_async_tool("exam_question_generator", exam_type, subject, difficulty)
+
+def _static_code_analysis(code: str, language: str) -> Dict[str, Any]:
+    """Collects size, dependency and unsafe-pattern notes without any network access"""
     result = {
         "language": language,
         "code_length": len(code),
@@ -346,143 +409,121 @@ def analyze_code(code: str, language: str = "python") -> Dict[str, Any]:
         logger.error(f"Error checking security patterns: {e}")
         result["notes"].append("Could not analyze security patterns due to an error.")
     
-    # Step 3: Search for best practices resources online
-    try:
-        from smolagents import WebSearchTool
-        search_tool = WebSearchTool()
-        
-        search_query = f"{language} programming best practices code quality standards"
-        search_results = search_tool(search_query)
-        logger.info(f"Search results for code analysis: {search_results}")
-        
-        # Extract useful resources from search results
-        if search_results:
-            # Look for links to documentation or guides
-            url_pattern = re.compile(r'(https?://[^\s]+(?:\.org|\.com|\.io|\.dev)/[^\s]+)')
-            urls = url_pattern.findall(search_results)
-            
-            if urls:
-                # Add only relevant URLs that contain keywords related to code quality
-                relevant_urls = []
-                quality_terms = ['best practices', 'style guide', 'lint', 'quality', 'standards', 'convention']
-                
-                for url in urls[:5]:  # Limit to first 5 URLs
-                    if any(term in url.lower() for term in quality_terms):
-                        relevant_urls.append(url)
-                
-                if relevant_urls:
-                    result["resources"] = relevant_urls
-                    logger.info(f"Found relevant resources for code quality: {relevant_urls}")
-    except Exception as se:
-        logger.error(f"Error searching for code quality resources: {se}")
-        # If search fails, don't worry about it - the LLM can analyze the code
-    
-    # Let the LLM handle the detailed analysis
-    result["notes"].append("The LLM can perform detailed code analysis based on its knowledge of programming best practices.")
-    
     return result
 
+def _code_quality_query(language: str) -> str:
+    return f"{language} programming best practices code quality standards"
+
+def _quality_resources(search_results: str) -> List[str]:
+    """Picks code quality and style guide links out of web search results"""
+    logger.info(f"Search results for code analysis: {search_results}")
+    if not search_results:
+        return []
+    # Look for links to documentation or guides
+    url_pattern = re.compile(r'(https?://[^\s]+(?:\.org|\.com|\.io|\.dev)/[^\s]+)')
+    urls = url_pattern.findall(search_results)
+    
+    # Add only relevant URLs that contain keywords related to code quality
+    relevant_urls = []
+    quality_terms = ['best practices', 'style guide', 'lint', 'quality', 'standards', 'convention']
+    
+    for url in urls[:5]:  # Limit to first 5 URLs
+        if any(term in url.lower() for term in quality_terms):
+            relevant_urls.append(url)
+    
+    if relevant_urls:
+        logger.info(f"Found relevant resources for code quality: {relevant_urls}")
+    return relevant_urls
+
 @tool
-def explain_cultural_concept(concept: str, region: Optional[str] = None) -> str:
-    """Retrieves factual information about an Indian cultural concept or tradition to augment the LLM's knowledge.
-    Rather than providing a complete response, this tool enriches LLM responses with verified facts and context.
+def analyze_code(code: str, language: str = "python") -> Dict[str, Any]:
+    """Searches for code quality resources to augment LLM code analysis.
+    This tool provides relevant online resources about code best practices rather than
+    performing detailed analysis that the LLM can handle.
     
     Args:
-        concept: The cultural concept, tradition, or practice to explain.
-        region: Optional specific Indian region or state for regional context.
+        code: The code to analyze.
+        language: The programming language of the code.
     
     Returns:
-        Factual context about the cultural concept to supplement the LLM's knowledge.
+        Basic information and relevant resources to help the LLM analyze the code.
     """
-    logger.info(f"explain_cultural_concept called for concept: {concept}, region: {region}")
-    search_query = f"{concept} {region if region else 'India'} culture tradition"
-    
+    return _run_async_tool("analyze_code", code, language)
+
+def _cultural_page_facts(region: Optional[str], summary: str, url: str, content: str = ""):
+    """Extracts key facts from a cultural concept's Wikipedia summary, returning (facts, sources).
+    content is the full page text, only needed for regional context.
+    """
+    facts_and_context = []
+    sources = [f"Wikipedia: {url}"]
+    
+    # Keep the first 2 paragraphs which usually contain the most important information
+    paragraphs = summary.split('\n')
+    if paragraphs:
+        facts_and_context.append("\n".join(paragraphs[:min(2, len(paragraphs))]))
+    
+    # Extract dates and historical context
+    dates = re.findall(r'\b\d{3,4}(?:s|\b)', summary)
+    if dates:
+        facts_and_context.append(f"Historical timeframe: {', '.join(dates[:5])}")
+    
+    # Extract key people or places
+    key_entities = re.findall(r'\b[A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*', summary)
+    if key_entities and len(key_entities) > 1:
+        # Filter out common words
+        common_words = ["India", "Indian", "Hindu", "Muslim", "Sikh", "Buddhist", "Jain", "The", "These", "Those", "This", "That"]
+        filtered_entities = [e for e in key_entities if e not in common_words]
+        if filtered_entities:
+            facts_and_context.append(f"Key associated entities: {', '.join(filtered_entities[:5])}")
+    
+    # Add regional context if specified, from the full content
+    if region and region.lower() in content.lower():
+        for p in content.split('\n\n'):
+            if region.lower() in p.lower():
+                facts_and_context.append(f"Regional context for {region}: {p}")
+                logger.info(f"Extracted regional context for {region}")
+                break
+    return facts_and_context, sources
+
+def _cultural_disambiguation_facts(concept: str, error: wikipedia.DisambiguationError):
+    """Notes the ambiguity of a cultural concept as a fact, returning (facts, sources)"""
+    if hasattr(error, 'options'):
+        logger.info(f"Disambiguation noted for concept: {concept}")
+        return [f"The term '{concept}' has multiple meanings in Indian culture: {', '.join(error.options[:5])}"], []
+    return [], []
+
+def _cultural_search_facts(concept: str, search_results: str):
+    """Keeps web search sentences that mention a cultural concept, returning (facts, sources)"""
+    logger.info(f"Web search results for cultural concept: {search_results}")
     facts_and_context = []
     sources = []
-    
-    # Step 1: Try to get information from Wikipedia
-    try:
-        wikipedia.set_lang("en")  # Default to English for most comprehensive results
-        search_results = wikipedia.search(search_query, results=3)
-        logger.info(f"Wikipedia search results for cultural concept: {search_results}")
+    if search_results and len(search_results) > 100:
+        # Extract a reasonable portion of the web search results
+        excerpt = search_results[:1000]
+        sources.append("Web search")
         
-        if search_results:
-            try:
-                # Get the most relevant page
-                page = wikipedia.page(search_results[0], auto_suggest=False)
-                content = page.summary
-                url = page.url
-                sources.append(f"Wikipedia: {url}")
-                
-                # Extract key facts from the content
-                paragraphs = content.split('\n')
-                significant_paragraphs = []
-                
-                # Keep the first 2 paragraphs which usually contain the most important information
-                if paragraphs:
-                    significant_paragraphs = paragraphs[:min(2, len(paragraphs))]
-                    facts_and_context.append("\n".join(significant_paragraphs))
-                
-                # Extract dates and historical context
-                dates = re.findall(r'\b\d{3,4}(?:s|\b)', content)
-                if dates:
-                    facts_and_context.append(f"Historical timeframe: {', '.join(dates[:5])}")
-                
-                # Extract key people or places
-                key_entities = re.findall(r'\b[A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*', content)
-                if key_entities and len(key_entities) > 1:
-                    # Filter out common words
-                    common_words = ["India", "Indian", "Hindu", "Muslim", "Sikh", "Buddhist", "Jain", "The", "These", "Those", "This", "That"]
-                    filtered_entities = [e for e in key_entities if e not in common_words]
-                    if filtered_entities:
-                        facts_and_context.append(f"Key associated entities: {', '.join(filtered_entities[:5])}")
-                
-                # Add regional context if specified
-                if region:
-                    # Try to extract region-specific information from the full content
-                    if region.lower() in page.content.lower():
-                        full_paragraphs = page.content.split('\n\n')
-                        for p in full_paragraphs:
-                            if region.lower() in p.lower():
-                                facts_and_context.append(f"Regional context for {region}: {p}")
-                                logger.info(f"Extracted regional context for {region}")
-                                break
-                
-            except wikipedia.DisambiguationError as e:
-                # If we hit disambiguation, just note the ambiguity as a fact
-                if hasattr(e, 'options'):
-                    facts_and_context.append(f"The term '{concept}' has multiple meanings in Indian culture: {', '.join(e.options[:5])}")
-                    logger.info(f"Disambiguation noted for concept: {concept}")
-            except wikipedia.PageError as pe:
-                logger.error(f"Wikipedia page not found: {pe}")
-            except Exception as e:
-                logger.error(f"Error extracting information from Wikipedia: {e}")
-    except Exception as e:
-        logger.error(f"Error searching Wikipedia: {e}")
-    
-    # Step 2: Try web search for additional factual context
-    try:
-        from smolagents import WebSearchTool
-        web_search = WebSearchTool()
-        search_results = web_search(search_query)
-        logger.info(f"Web search results for cultural concept: {search_results}")
+        # Extract the most relevant sentences that contain the concept name
+        sentences = re.split(r'[.!?]', excerpt)
+        relevant_sentences = [s.strip() for s in sentences if concept.lower() in s.lower()][:3]
         
-        if search_results and len(search_results) > 100:
-            # Extract a reasonable portion of the web search results
-            excerpt = search_results[:1000]
-            sources.append("Web search")
-            
-            # Extract the most relevant sentences that contain the concept name
-            sentences = re.split(r'[.!?]', excerpt)
-            relevant_sentences = [s.strip() for s in sentences if concept.lower() in s.lower()][:3]
-            
-            if relevant_sentences:
-                facts_and_context.append("Additional context from search results: " + " ".join(relevant_sentences))
-                logger.info(f"Relevant sentences from web search: {relevant_sentences}")
-    except Exception as we:
-        logger.error(f"Error in web search for cultural concept: {we}")
+        if relevant_sentences:
+            facts_and_context.append("Additional context from search results: " + " ".join(relevant_sentences))
+            logger.info(f"Relevant sentences from web search: {relevant_sentences}")
+    return facts_and_context, sources
+
+def _cultural_search_query(concept: str, region: Optional[str]) -> str:
+    return f"{concept} {region if region else 'India'} culture tradition"
+
+def _cultural_context(concept: str, lookups: Dict[str, Any]) -> str:
+    """Merges the Wikipedia and web search (facts, sources) lookups into the tool's answer"""
+    facts_and_context = []
+    sources = []
+    for name in ("Wikipedia", "web search"):
+        facts, found_sources = lookups.get(name, ([], []))
+        facts_and_context.extend(facts)
+        sources.extend(found_sources)
     
-    # Step 3: Return the gathered information or a fallback message
+    # Return the gathered information or a fallback message
     if facts_and_context:
         formatted_facts = "\n\n".join(facts_and_context)
         formatted_sources = ", ".join(sources)
@@ -492,36 +533,30 @@ def explain_cultural_concept(concept: str, region: Optional[str] = None) -> str:
         return f"No definitive factual sources found for '{concept}'. The LLM can rely on its knowledge of Indian cultural concepts."
 
 @tool
-def check_exam_syllabus(exam: str, subject: Optional[str] = None) -> str:
-    """Retrieves key sections of the syllabus for Indian competitive exams to augment LLM responses.
-    This tool provides factual syllabus information from reliable sources to supplement the LLM's knowledge.
+def explain_cultural_concept(concept: str, region: Optional[str] = None) -> str:
+    """Retrieves factual information about an Indian cultural concept or tradition to augment the LLM's knowledge.
+    Rather than providing a complete response, this tool enriches LLM responses with verified facts and context.
     
     Args:
-        exam: The competitive exam code (e.g., "UPSC", "JEE", "NEET").
-        subject: Optional specific subject within the exam syllabus.
+        concept: The cultural concept, tradition, or practice to explain.
+        region: Optional specific Indian region or state for regional context.
     
     Returns:
-        Key sections or topics from the syllabus for the specified exam.
+        Factual context about the cultural concept to supplement the LLM's knowledge.
     """
-    logger.info(f"check_exam_syllabus called for exam: {exam}, subject: {subject}")
-    
-    # Define search query based on exam and optional subject
-    search_query = f"{exam} {'official' if 'upsc' in exam.lower() else ''} syllabus"
-    if subject:
-        search_query += f" {subject}"
-    
+    return _run_async_tool("explain_cultural_concept", concept, region)
+
+def _syllabus_from_wikipedia(exam: str, subject: Optional[str], search_query: str):
+    """Extracts syllabus topics from the exam's Wikipedia page, returning (content, source)"""
     syllabus_content = []
     source = ""
-    
-    # Step 1: Try to get syllabus information from Wikipedia
     try:
-        wikipedia.set_lang("en")
-        wiki_results = wikipedia.search(search_query, results=2)
+        wiki_results = wiki_cache.search(search_query, results=2)
         logger.info(f"Wikipedia search results for syllabus: {wiki_results}")
         
         if wiki_results:
             try:
-                page = wikipedia.page(wiki_results[0], auto_suggest=False)
+                page = wiki_cache.page(wiki_results[0])
                 if page and (exam.lower() in page.title.lower() or 'syllabus' in page.title.lower()):
                     # Extract only the most relevant parts
                     content = page.content
@@ -578,8 +613,12 @@ def check_exam_syllabus(exam: str, subject: Optional[str] = None) -> str:
                 logger.error(f"Error in Wikipedia syllabus extraction: {wiki_error}")
     except Exception as wiki_error:
         logger.error(f"Error searching Wikipedia for syllabus: {wiki_error}")
-    
-    # Step 2: Try web search as a backup for more current information
+    return syllabus_content, source
+
+def _syllabus_from_web(search_query: str):
+    """Extracts exam pattern and marks distribution from web search, returning (content, source)"""
+    syllabus_content = []
+    source = ""
     try:
         from smolagents import WebSearchTool
         web_search = WebSearchTool()
@@ -600,16 +639,81 @@ def check_exam_syllabus(exam: str, subject: Optional[str] = None) -> str:
                 syllabus_content.append(f"Marks distribution: {weightage_match.group(1).strip()}")
                 logger.info(f"Extracted marks distribution information")
             
-            # If web search provided substantial information and we didn't have anything from Wikipedia
-            if (pattern_match or weightage_match) and not source:
+            if pattern_match or weightage_match:
                 source = "Web search results"
-                logger.info(f"Using web search as the source of syllabus information")
     except Exception as we:
         logger.error(f"Error in web search for syllabus: {we}")
+    return syllabus_content, source
+
+def scrape_exam_syllabus(exam: str, subject: Optional[str] = None):
+    """Scrapes syllabus information live from Wikipedia and web search.
+    Only the syllabus_store build/refresh commands (and SYLLABUS_LIVE_FALLBACK) call this.
+    
+    Args:
+        exam: The competitive exam code (e.g., "UPSC", "JEE", "NEET").
+        subject: Optional specific subject within the exam syllabus.
+    
+    Returns:
+        A (syllabus_content, source) tuple; syllabus_content is a list of sections.
+    """
+    # Define search query based on exam and optional subject
+    search_query = f"{exam} {'official' if 'upsc' in exam.lower() else ''} syllabus"
+    if subject:
+        search_query += f" {subject}"
+    
+    # Query Wikipedia and the web (for more current information) concurrently
+    lookups = _fan_out({
+        "Wikipedia": (lambda: _syllabus_from_wikipedia(exam, subject, search_query), config.TOOL_WIKIPEDIA_DEADLINE_S),
+        "web search": (lambda: _syllabus_from_web(search_query), config.TOOL_WEB_SEARCH_DEADLINE_S),
+    })
+    syllabus_content, source = lookups.get("Wikipedia", ([], ""))
+    web_content, web_source = lookups.get("web search", ([], ""))
+    syllabus_content = syllabus_content + web_content
+    
+    # If web search provided substantial information and we didn't have anything from Wikipedia
+    if web_source and not source:
+        source = web_source
+        logger.info(f"Using web search as the source of syllabus information")
+    return syllabus_content, source
+
+@tool
+def check_exam_syllabus(exam: str, subject: Optional[str] = None) -> str:
+    """Retrieves key sections of the syllabus for Indian competitive exams to augment LLM responses.
+    This tool provides factual syllabus information from reliable sources to supplement the LLM's knowledge.
+    
+    Args:
+        exam: The competitive exam code (e.g., "UPSC", "JEE", "NEET").
+        subject: Optional specific subject within the exam syllabus.
+    
+    Returns:
+        Key sections or topics from the syllabus for the specified exam.
+    """
+    return _syllabus_answer(exam, subject)
+
+def _syllabus_answer(exam: str, subject: Optional[str] = None) -> str:
+    """The text check_exam_syllabus returns; also called by the async pipeline"""
+    logger.info(f"check_exam_syllabus called for exam: {exam}, subject: {subject}")
     
-    # Step 3: Return the gathered information or a fallback message
+    # Step 1: Serve from the prebuilt offline store (see syllabus_store.py)
+    store = get_syllabus_store()
+    record = store.lookup(exam, subject)
+    if record is not None:
+        syllabus_content, source = record["content"], record["source"]
+    elif store.scrapes_live():
+        logger.info(f"No stored syllabus for {exam} / {subject}; scraping live")
+        syllabus_content, source = scrape_exam_syllabus(exam, subject)
+    else:
+        logger.info(f"No stored syllabus for {exam} / {subject}")
+        syllabus_content, source = [], ""
+    
+    # Step 2: Return the gathered information or a fallback message
     if syllabus_content:
         formatted_content = "\n\n".join(syllabus_content)
         return f"## {exam} {'- ' + subject if subject else ''} Syllabus Information\n\n{formatted_content}\n\nSource: {source}"
     else:
         return f"Specific syllabus information for {exam} {f'({subject})' if subject else ''} couldn't be retrieved. The LLM can proceed with its knowledge of this examination."
+
+# Latency and error metrics and a span for every tool above, whether called by an agent or directly;
+# the async_tools coroutines record them for the network-backed tools
+for _tool in [value for value in list(globals().values()) if isinstance(value, Tool) and value.name not in _ASYNC_TOOLS]:
+    instrument_tool(trace_tool(_tool))
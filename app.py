@@ -4,8 +4,12 @@ Main application entry point for Bharat AI Buddy
 import os
 import sys
 import logging
-from ui import build_ui
-from config import config
+from startup import startup_report, start_warm_up
+
+with startup_report.phase("import config"):
+    from config import config
+with startup_report.phase("import ui"):
+    from ui import build_ui, configure_queue
 
 # Configure logging
 def setup_logging():
@@ -36,9 +40,11 @@ def initialize_app():
     
     # Import standard modules
     try:
-        # Import standard modules directly
-        import app_logic
-        import agent_tools
+        # Import standard modules directly (cheap: the model and agents are built lazily)
+        with startup_report.phase("import app_logic"):
+            import app_logic
+        with startup_report.phase("import agent_tools"):
+            import agent_tools
         
         logger.info("Successfully loaded standard modules")
     except ImportError as e:
@@ -51,6 +57,16 @@ def initialize_app():
         logger.debug(f"Code execution enabled: {config.ENABLE_CODE_EXECUTION}")
         logger.debug(f"Sandbox execution enabled: {config.SANDBOX_CODE_EXECUTION}")
     
+    # Serve /metrics on its own local port, next to the Gradio app
+    if config.ENABLE_METRICS:
+        from metrics import start_metrics_server
+        start_metrics_server()
+    
+    # Load the model and build agents in the background so the UI can bind its port first
+    if config.WARM_UP_ON_START:
+        start_warm_up()
+        logger.info("Started background warm-up of the model and agents.")
+    
     logger.info("Initialization complete.")
     return logger
 
@@ -60,9 +76,12 @@ def main():
     logger.info("Starting main application flow.")
     try:
         # Build and launch the UI
-        demo = build_ui()
+        with startup_report.phase("build ui"):
+            demo = build_ui()
         logger.info("UI built successfully. Launching app...")
-        demo.launch(share=True, debug=config.DEBUG)
+        logger.info("Startup timing report:\n" + startup_report.summary())
+        # Queueing is required for the streaming (generator) handlers
+        configure_queue(demo).launch(share=True, debug=config.DEBUG, max_threads=config.GRADIO_MAX_THREADS)
         logger.info("App launched.")
     except Exception as e:
         logger.error(f"Failed to start application: {e}", exc_info=True)
@@ -3,12 +3,28 @@
 """
 App logic and event handlers for Bharat AI Buddy
 """
+import asyncio
 import logging
-from model_utils import engine, generate_response
+import re
+import threading
+from model_utils import (
+    get_agent_model, register_prompt_prefix, agenerate_response, astream_response
+)
+import async_runner
+import async_tools
+from startup import startup_report
 from quiz import generate_quiz_question, check_quiz_answer, quiz_state
 from smolagents import ToolCallingAgent, WebSearchTool, CodeAgent, tool
 from markdownify import markdownify
-from constants import SUBJECTS
+from intent_router import route_prompt
+from config import config
+from deadline import request_deadline, allows as budget_allows, current as current_deadline
+from smolagents import ActionStep, FinalAnswerStep
+from metrics import REQUESTS, AGENT_RUN_STEPS, agent_step_callback, instrument_tool
+import tracing
+from tracing import traced, trace_tool
+from history import history_key, load_history, remember, with_history
+from context_packer import pack_context
 
 # Import our enhanced custom tools
 from agent_tools import (
@@ -18,53 +34,107 @@ from agent_tools import (
     exam_question_generator, 
     analyze_code,
     explain_cultural_concept,
-    check_exam_syllabus
+    check_exam_syllabus,
+    search_local_knowledge,
+    local_knowledge_context
 )
 
-sarvam_agent_model = engine
+_agents = {}
+_agents_lock = threading.Lock()
+_web_search_tool = None
 
-# Create specialized agents for different tasks
-web_agent = ToolCallingAgent(
-    tools=[WebSearchTool(), visit_webpage, search_wikipedia],
-    model=sarvam_agent_model,
-    max_steps=10,
-    name="web_search_agent",
-    description="Runs web searches and visits web pages for gathering information.",
-)
 
-math_agent = ToolCallingAgent(
-    tools=[solve_math_problem, search_wikipedia],
-    model=sarvam_agent_model,
-    max_steps=8,
-    name="math_logic_agent",
-    description="Solves and explains mathematical and logical problems.",
-)
+def get_web_search_tool():
+    """Returns a single WebSearchTool instance shared by all agents and helpers"""
+    global _web_search_tool
+    if _web_search_tool is None:
+        _web_search_tool = instrument_tool(trace_tool(WebSearchTool()))
+    return _web_search_tool
 
-code_agent = CodeAgent(
-    tools=[analyze_code, WebSearchTool()],
-    model=sarvam_agent_model,
-    max_steps=12,
-    name="coding_agent",
-    description="Generates, analyzes and explains code.",
-    stream_outputs=True,
-    additional_authorized_imports=["math", "datetime", "random", "json", "re", "collections"]
-)
 
-exam_agent = ToolCallingAgent(
-    tools=[exam_question_generator, check_exam_syllabus, search_wikipedia],
-    model=sarvam_agent_model,
-    max_steps=8,
-    name="exam_agent",
-    description="Helps with exam preparation and provides syllabus information.",
-)
+def _build_agent(name):
+    """Create one of the specialized agents; their model calls go through the shared scheduler"""
+    sarvam_agent_model = get_agent_model()
+    if name == "web":
+        return ToolCallingAgent(
+            tools=[search_local_knowledge, get_web_search_tool(), visit_webpage, search_wikipedia],
+            model=sarvam_agent_model,
+            step_callbacks=[agent_step_callback(name), tracing.agent_step_callback(name)],
+            max_steps=10,
+            name="web_search_agent",
+            description="Runs web searches and visits web pages for gathering information.",
+        )
+    if name == "math":
+        return ToolCallingAgent(
+            tools=[solve_math_problem, search_wikipedia],
+            model=sarvam_agent_model,
+            step_callbacks=[agent_step_callback(name), tracing.agent_step_callback(name)],
+            max_steps=8,
+            name="math_logic_agent",
+            description="Solves and explains mathematical and logical problems.",
+        )
+    if name == "code":
+        return CodeAgent(
+            tools=[analyze_code, get_web_search_tool()],
+            model=sarvam_agent_model,
+            step_callbacks=[agent_step_callback(name), tracing.agent_step_callback(name)],
+            max_steps=12,
+            name="coding_agent",
+            description="Generates, analyzes and explains code.",
+            stream_outputs=True,
+            additional_authorized_imports=["math", "datetime", "random", "json", "re", "collections"]
+        )
+    if name == "exam":
+        return ToolCallingAgent(
+            tools=[exam_question_generator, check_exam_syllabus, search_local_knowledge, search_wikipedia],
+            model=sarvam_agent_model,
+            step_callbacks=[agent_step_callback(name), tracing.agent_step_callback(name)],
+            max_steps=8,
+            name="exam_agent",
+            description="Helps with exam preparation and provides syllabus information.",
+        )
+    if name == "culture":
+        return ToolCallingAgent(
+            tools=[search_local_knowledge, get_web_search_tool(), visit_webpage, search_wikipedia, explain_cultural_concept],
+            model=sarvam_agent_model,
+            step_callbacks=[agent_step_callback(name), tracing.agent_step_callback(name)],
+            max_steps=10,
+            name="culture_agent",
+            description="Provides information about Indian culture, history, and current affairs.",
+        )
+    raise ValueError(f"Unknown agent: {name}")
+
+
+AGENT_NAMES = ["web", "math", "code", "exam", "culture"]
+
+
+def get_agent(name):
+    """
+    Returns the specialized agent with the given name ("web", "math", "code",
+    "exam" or "culture"), building it on first use.
+    """
+    agent = _agents.get(name)
+    if agent is None:
+        with _agents_lock:
+            agent = _agents.get(name)
+            if agent is None:
+                with startup_report.phase(f"build {name} agent"):
+                    agent = _build_agent(name)
+                _agents[name] = agent
+    return agent
+
+
+def build_all_agents():
+    """Eagerly builds every agent; used by the background warm-up"""
+    for name in AGENT_NAMES:
+        get_agent(name)
 
-culture_agent = ToolCallingAgent(
-    tools=[WebSearchTool(), visit_webpage, search_wikipedia, explain_cultural_concept],
-    model=sarvam_agent_model,
-    max_steps=10,
-    name="culture_agent",
-    description="Provides information about Indian culture, history, and current affairs.",
-)
+
+def __getattr__(name):
+    # Keeps the old module-level names (web_agent, math_agent, ...) working lazily
+    if name.endswith("_agent") and name[:-len("_agent")] in AGENT_NAMES:
+        return get_agent(name[:-len("_agent")])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Prompt templates for different types of questions
 PROMPT_TEMPLATES = {
@@ -141,6 +211,10 @@ PROMPT_TEMPLATES = {
     )
 }
 
+# The text before {prompt} is identical for every request on a tab, so its KV state is cached
+for _template in PROMPT_TEMPLATES.values():
+    register_prompt_prefix(_template.split("{prompt}")[0])
+
 def get_prompt(tab, prompt):
     """
     Create a prompt template for the given tab and user query
@@ -158,271 +232,364 @@ def get_prompt(tab, prompt):
     # Language parameter is optional and doesn't affect Sarvam-M's ability to respond in native languages
     return template.format(prompt=prompt)
 
-def app_fn(tab, prompt, mode, use_agents=True):
-    logger = logging.getLogger("bharat_buddy")
-    logger.info(f"app_fn called with tab={tab}, mode={mode}, use_agents={use_agents}")
+def _run_agent(name, task, stage):
+    """
+    Runs an agent inside the request's latency budget. The step limit is lowered to
+    what the remaining budget fits, and the run is cut short once the budget is
+    spent, keeping the last observation as a partial result.
     
+    Returns:
+        The agent's answer, a partial result, or None if the stage was skipped
+    """
+    agent = get_agent(name)
+    budget = current_deadline()
+    steps = agent.max_steps
+    if budget is not None:
+        steps = min(steps, int(budget.augmentation_remaining() // config.AGENT_STEP_ESTIMATE_S))
+        if steps < 1:
+            budget.drop(stage, f"skipped: {budget.augmentation_remaining():.1f}s left, ~{config.AGENT_STEP_ESTIMATE_S}s per step")
+            return None
+    partial, taken = None, 0
+    with tracing.span("agent run", agent=name, max_steps=steps) as run_span:
+        try:
+            for event in agent.run(task, stream=True, max_steps=steps):
+                if isinstance(event, FinalAnswerStep):
+                    return event.output
+                if isinstance(event, ActionStep):
+                    taken += 1
+                    partial = event.observations or partial
+                    if budget is not None and budget.augmentation_remaining() <= 0:
+                        budget.drop(stage, f"cut short after {event.step_number} of {steps} steps")
+                        run_span.set(cut_short=True)
+                        return partial
+            return partial
+        finally:
+            run_span.set(steps=taken)
+            AGENT_RUN_STEPS.labels(agent=name).observe(taken)
+
+def _code_block(prompt):
+    """Returns (code, language) for the first fenced code block in the prompt, or None"""
+    code_block_match = re.search(r'```(?:\w+)?\s*\n([\s\S]+?)\n```', prompt)
+    if not code_block_match:
+        return None
+    # Determine language if possible
+    lang_match = re.search(r'```(\w+)', prompt)
+    return code_block_match.group(1), (lang_match.group(1) if lang_match else "python")
+
+def _code_resources_text(analysis_resources):
+    """Creates a readable summary of an analyze_code result"""
+    if not analysis_resources or not isinstance(analysis_resources, dict):
+        return ""
+    resources_text = ""
+    
+    if "dependencies" in analysis_resources:
+        resources_text += f"Dependencies detected: {', '.join(analysis_resources['dependencies'])}\n\n"
+    
+    if "notes" in analysis_resources:
+        resources_text += f"Notes: {' '.join(analysis_resources['notes'])}\n\n"
+        
+    if "resources" in analysis_resources:
+        resources_text += f"Relevant best practices resources:\n- " + "\n- ".join(analysis_resources["resources"])
+    return resources_text
+
+def _reference_mentions(search_results):
+    """Keeps the first few search result sentences that mention books or references"""
+    if not search_results or len(search_results) <= 100:
+        return ""
+    # Extract only the most relevant portions mentioning books or references
+    resource_mentions = re.findall(r'([^.!?]*(?:book|reference|material|resource)[^.!?]*[.!?])', search_results, re.IGNORECASE)
+    return " ".join(resource_mentions[:5])  # Limit to first 5 mentions
+
+def _finish_budget(budget, metadata):
+    """Reports what the latency budget dropped for the request, in metadata and the log"""
+    summary = budget.summary()
+    if metadata is not None:
+        metadata.update(summary)
+    if summary["dropped_stages"]:
+        logger = logging.getLogger("bharat_buddy")
+        stages = ", ".join(d["stage"] for d in summary["dropped_stages"])
+        logger.info(f"Augmentation took {summary['elapsed_s']}s of a {summary['budget_s']}s budget; dropped: {stages}")
+
+def _syllabus_prompt(exam, subject, syllabus_info):
+    prompt = f"Provide a comprehensive overview of the syllabus for {subject} in {exam} examination. Include important topics, recommended approach to studying each topic, and focus areas."
+    
+    if syllabus_info and len(syllabus_info) > 50:
+        prompt += f"\n\nIncorporate this factual syllabus information in your response:\n{syllabus_info}"
+    return prompt
+
+def _study_tips_prompt(exam, subject, syllabus_info):
+    prompt = f"Provide effective study strategies and tips for preparing {subject} for the {exam} examination. Include time management advice, important focus areas, and common mistakes to avoid."
+    
+    if syllabus_info and len(syllabus_info) > 50:
+        prompt += f"\n\nIncorporate this exam information in your response:\n{syllabus_info}"
+    return prompt
+
+def _asks_about_syllabus(question):
+    return any(word in question.lower() for word in ["syllabus", "curriculum", "topics", "pattern"])
+
+def _exam_qa_prompt(exam, subject, question, context, history=""):
+    """Creates the augmented exam Q&A prompt"""
+    full_prompt = f"As an expert in {exam} preparation, specifically for the subject {subject}, answer the following question: {question}"
+    
+    if context:
+        full_prompt += f"\n\nIncorporate this factual information in your response:{context}"
+    if history:
+        full_prompt = f"{history}\n\n{full_prompt}"
+    return full_prompt
+
+def _regional_prompt(state, topic, prompt, context):
+    """Generates a prompt that showcases Sarvam's regional expertise"""
+    query = prompt if prompt else f"Explain {topic.lower()} of {state}"
+    multilingual_prompt = (
+        f"You are Sarvam, an AI assistant with deep expertise in Indian regional cultures and languages. "
+        f"Provide a rich, detailed explanation about the {topic.lower()} of {state}. "
+        f"Incorporate authentic local terms, traditions, and contexts. "
+        f"If responding in an Indian language other than English, incorporate some authentic local terms "
+        f"from that region while keeping the overall text understandable. "
+        f"\n\nQuery: {query}"
+    )
+    
+    # Add the factual context if we have it
+    if context:
+        multilingual_prompt += f"\n\nIncorporate these facts in your response:{context}"
+    return multilingual_prompt
+
+def _format_regional_response(state, topic, reasoning, answer):
+    response = ""
+    if reasoning:
+        response += f"🧠 Sarvam is analyzing regional information about {state}:\n{reasoning}\n\n"
+        
+    response += f"✅ **{state} {topic}**\n\n{answer}"
+    
+    # Include a note about Sarvam's capabilities
+    note = f"\n\n---\n*This response showcases Sarvam's understanding of Indian regional contexts and multilingual capabilities.*"
+    
+    return response + note
+
+# Request pipeline
+#
+# Tool lookups go through async_tools and generation through astream_response, so
+# a request waiting on the network or the model holds no thread. smolagents agents
+# only have a blocking run(), so agent steps run on a worker thread via
+# asyncio.to_thread. The sync handlers at the end run these same coroutines
+# through async_runner.
+
+async def _astream_answer(prompt, mode, metadata=None, profile=None):
+    """
+    Streams the model's answer for a prompt as (reasoning, answer) pairs.
+    Reasoning is only surfaced in "think" mode. profile picks the generation
+    profile (token limit and stop criteria), usually the tab.
+    """
+    async for reasoning, answer in astream_response(prompt, mode, metadata, profile=profile):
+        yield (reasoning if mode == "think" else ""), answer
+
+async def _aremembered(stream, key, prompt):
+    """Passes a (reasoning, answer) stream through and records the final answer in the history"""
+    answer = ""
+    async for reasoning, answer in stream:
+        yield reasoning, answer
+    remember(key, prompt, answer)
+
+def _with_error(result, error):
+    """Appends an error message to the last (reasoning, answer) of a stream that failed part way"""
+    reasoning, answer = result
+    return reasoning, f"{answer}\n\n{error}" if answer else error
+
+async def _run_agent_async(name, task, stage):
+    # to_thread copies the context, so the agent run sees the request's deadline
+    return await asyncio.to_thread(_run_agent, name, task, stage)
+
+# Augmentation steps, one per app_fn branch. Each gathers context within the
+# request's latency budget and returns (prompt to generate from, direct answer);
+# the direct answer is None unless the branch already has the final response.
+
+async def _culture_context(prompt, full_prompt, route):
+    """Culture tab - augment LLM with cultural facts and context"""
+    # For cultural topics, augment with factual information but let LLM generate the response
+    sections = []
+    try:
+        # Try to get factual context about the cultural concept, offline index first
+        cultural_search = prompt.replace("?", "").strip()
+        context_result = local_knowledge_context(cultural_search)
+        if not context_result and budget_allows("cultural facts"):
+            context_result = await async_tools.explain_cultural_concept(cultural_search)
+        if context_result and isinstance(context_result, str) and len(context_result) > 50:
+            sections.append(("Factual context to incorporate into your response", context_result))
+    except Exception:
+        pass
+    
+    # For time-sensitive cultural queries, use web search to get current information
+    if route.has("recent"):
+        try:
+            web_results = await _run_agent_async("web", f"Find the most recent and factual information about: {prompt}", "web agent")
+            if web_results and len(web_results) > 100:
+                sections.append(("Recent information to incorporate", web_results))
+        except Exception:
+            pass
+    
+    # Let the LLM generate the answer with the most relevant, deduplicated facts
+    return full_prompt + pack_context(prompt, sections, "Culture"), None
+
+async def _math_context(prompt, full_prompt, route):
+    """Math/Logic tab - augment LLM with computational search results"""
+    # For specific math problems, see if we can find additional resources
+    if route.has("compute") and budget_allows("math search"):
+        try:
+            math_info = await async_tools.solve_math_problem(prompt)
+            if math_info and len(math_info) > 20:
+                # Add the information to the LLM's prompt
+                return f"{full_prompt}\n\nRelevant mathematical information:\n{math_info}", None
+        except Exception:
+            # If math search fails, let the LLM handle it
+            pass
+    
+    # Let the LLM handle the math question (either initially or as fallback)
+    return full_prompt, None
+
+async def _code_context(prompt, full_prompt, route):
+    """Code tab - let LLM handle code analysis with augmentation from resources"""
+    # If the request specifically involves code analysis
+    if route.has("review"):
+        try:
+            # Extract code block from the prompt if it exists
+            code_block = _code_block(prompt)
+            if code_block and budget_allows("code analysis"):
+                # Get best practices resources
+                resources_text = _code_resources_text(await async_tools.analyze_code(*code_block))
+                if resources_text:
+                    # Augment the LLM prompt with these resources
+                    return f"{full_prompt}\n\nCode information and resources:\n{resources_text}", None
+        except Exception:
+            # If analysis fails, let the LLM handle it
+            pass
+    
+    # For code generation, still use the CodeAgent as it's particularly valuable
+    try:
+        code_response = await _run_agent_async("code", full_prompt, "code agent")
+        if code_response and isinstance(code_response, str):
+            return full_prompt, code_response.strip()
+    except Exception:
+        # Fallback to LLM if the agent fails
+        pass
+    
+    # Fallback to standard LLM
+    return full_prompt, None
+
+async def _exam_context(prompt, full_prompt, route):
+    """Exam tab - augment LLM with syllabus information"""
+    # For syllabus-related queries, augment with syllabus information
+    async def syllabus():
+        if route.has("syllabus") and route.exam:
+            syllabus_info = await async_tools.check_exam_syllabus(route.exam, route.subject)
+            if syllabus_info and len(syllabus_info) > 50:
+                return "Syllabus reference information", syllabus_info
+        return None
+    
+    # For exam preparation questions, get study materials information
+    async def materials():
+        if route.has("materials") and budget_allows("reference materials"):
+            resources_text = _reference_mentions(
+                await async_tools.web_search(f"recommended books reference materials for {prompt}")
+            )
+            if resources_text:
+                return "Reference materials", resources_text
+        return None
+    
+    # For question generation, augment with contextual information
+    async def question_context():
+        if route.has("generate") and route.has("question") and route.exam and route.subject and budget_allows("question context"):
+            context = await async_tools.exam_question_generator(route.exam, route.subject)
+            if context and len(context) > 50:
+                return "Question generation context", context
+        return None
+    
+    # The three lookups are independent, so they run concurrently
+    parts = await asyncio.gather(syllabus(), materials(), question_context(), return_exceptions=True)
+    sections = [part for part in parts if isinstance(part, tuple)]
+    # Let the LLM generate a response with the additional context (if any)
+    return full_prompt + pack_context(prompt, sections, "Exam"), None
+
+_BRANCHES = {
+    "culture": _culture_context,
+    "math": _math_context,
+    "code": _code_context,
+    "exam": _exam_context,
+}
+
+@traced("app_fn", args=("tab", "mode", "use_agents"))
+async def app_fn_async(tab, prompt, mode, use_agents=True, metadata=None, session_id=None):
     """
     Main function to process user prompts based on tab context and user preferences.
     Uses specialized agents to augment the LLM's responses with additional context and capabilities.
     Leverages Sarvam-M's native support for Indian languages without requiring explicit language detection.
     
+    Augmentation runs inside a per-request latency budget (see deadline.py); stages
+    that would not fit are skipped or cut short before generation starts.
+    
     Args:
         tab: The active tab (Math/Logic, Code, Culture, Exam)
         prompt: The user's question or request
         mode: "think" or "non-think" mode for response generation
         use_agents: Whether to use specialized agents to augment responses
+        metadata: Optional dict that is filled with the budget outcome
+            (budget_s, elapsed_s, dropped_stages), the history usage
+            (history_tokens, history_budget, history_turns, summary_tokens) and the
+            generation metadata
+        session_id: UI session; with one, earlier turns on this tab are included
+            within the history token budget and this turn is recorded
+
+    Yields:
+        Tuples of (reasoning, answer) as the response is generated
     """
+    logger = logging.getLogger("bharat_buddy")
+    logger.info(f"app_fn called with tab={tab}, mode={mode}, use_agents={use_agents}")
+    REQUESTS.labels(tab=tab).inc()
+    # Follow-ups carry the conversation so far, within the history token budget
+    key = history_key(session_id, tab) if session_id else None
     # Use detailed prompt templates for each tab/type
-    full_prompt = get_prompt(tab, prompt)
+    full_prompt = get_prompt(tab, with_history(load_history(key, metadata), prompt))
     
     # If agents are disabled, use standard text generation
     if not use_agents:
-        reasoning, answer = generate_response(full_prompt, mode)
-        if mode == "think" and reasoning:
-            return f"🧠 Reasoning:\n{reasoning}\n\n✅ Answer:\n{answer}"
-        else:
-            return answer
+        async for result in _aremembered(_astream_answer(full_prompt, mode, metadata, tab), key, prompt):
+            yield result
+        return
     
     # Use agents to augment LLM responses when beneficial
+    last = None
     try:
-        # Culture tab - augment LLM with cultural facts and context
-        if tab == "Culture" or any(word in prompt.lower() for word in ["festival", "tradition", "history", "culture", "heritage"]):
-            # For cultural topics, augment with factual information but let LLM generate the response
-            factual_context = ""
-            try:
-                # Try to get factual context about the cultural concept
-                cultural_search = prompt.replace("?", "").strip()
-                context_result = explain_cultural_concept(cultural_search)
-                
-                if context_result and isinstance(context_result, str) and len(context_result) > 50:
-                    factual_context = f"\n\nFactual context to incorporate into your response:\n{context_result}"
-            except Exception as cultural_error:
-                pass
-            
-            # For time-sensitive cultural queries, use web search to get current information
-            if any(word in prompt.lower() for word in ["latest", "current", "news", "today", "recently", "trending"]):
-                try:
-                    web_results = web_agent.run(
-                        f"Find the most recent and factual information about: {prompt}"
-                    )
-                    if web_results and len(web_results) > 100:
-                        factual_context += f"\n\nRecent information to incorporate:\n{web_results[:1500]}"
-                except:
-                    pass
-            
-            # Let the LLM generate the answer with the additional factual context
-            augmented_prompt = full_prompt + factual_context
-            reasoning, answer = generate_response(augmented_prompt, mode)
-            
-            if mode == "think" and reasoning:
-                return f"🧠 Reasoning:\n{reasoning}\n\n✅ Answer:\n{answer}"
-            else:
-                return answer
-            
-        # Math/Logic tab - augment LLM with computational search results
-        elif tab == "Math/Logic" or any(word in prompt.lower() for word in ["solve", "equation", "calculate", "math", "problem", "formula"]):
-            # For specific math problems, see if we can find additional resources
-            if any(word in prompt.lower() for word in ["solve", "calculate", "find", "compute", "evaluate", "simplify"]):
-                try:
-                    # Try to get relevant math information
-                    math_info = solve_math_problem(prompt)
-                    
-                    if math_info and len(math_info) > 20:
-                        # Add the information to the LLM's prompt
-                        augmented_prompt = f"{full_prompt}\n\nRelevant mathematical information:\n{math_info}"
-                        reasoning, answer = generate_response(augmented_prompt, mode)
-                        
-                        if mode == "think" and reasoning:
-                            return f"🧠 Reasoning:\n{reasoning}\n\n✅ Answer:\n{answer}"
-                        else:
-                            return answer
-                except Exception as math_error:
-                    # If math search fails, let the LLM handle it
-                    pass
-            
-            # Let the LLM handle the math question (either initially or as fallback)
-            reasoning, answer = generate_response(full_prompt, mode)
-            if mode == "think" and reasoning:
-                return f"🧠 Reasoning:\n{reasoning}\n\n✅ Answer:\n{answer}"
-            else:
-                return answer
-            
-        # Code tab - let LLM handle code analysis with augmentation from resources
-        elif tab == "Code" or any(word in prompt.lower() for word in ["code", "function", "program", "algorithm", "class", "implement"]):
-            # If the request specifically involves code analysis
-            if "analyze" in prompt.lower() or "review" in prompt.lower() or "improve" in prompt.lower():
-                try:
-                    # Extract code block from the prompt if it exists
-                    import re
-                    code_block_match = re.search(r'```(?:\w+)?\s*\n([\s\S]+?)\n```', prompt)
-                    
-                    if code_block_match:
-                        code_to_analyze = code_block_match.group(1)
-                        # Determine language if possible
-                        lang_match = re.search(r'```(\w+)', prompt)
-                        language = lang_match.group(1) if lang_match else "python"
-                        
-                        # Get best practices resources
-                        analysis_resources = analyze_code(code_to_analyze, language)
-                        
-                        if analysis_resources and isinstance(analysis_resources, dict):
-                            # Create a readable summary of the resources
-                            resources_text = ""
-                            
-                            if "dependencies" in analysis_resources:
-                                resources_text += f"Dependencies detected: {', '.join(analysis_resources['dependencies'])}\n\n"
-                            
-                            if "notes" in analysis_resources:
-                                resources_text += f"Notes: {' '.join(analysis_resources['notes'])}\n\n"
-                                
-                            if "resources" in analysis_resources:
-                                resources_text += f"Relevant best practices resources:\n- " + "\n- ".join(analysis_resources["resources"])
-                            
-                            if resources_text:
-                                # Augment the LLM prompt with these resources
-                                augmented_prompt = f"{full_prompt}\n\nCode information and resources:\n{resources_text}"
-                                reasoning, answer = generate_response(augmented_prompt, mode)
-                                
-                                if mode == "think" and reasoning:
-                                    return f"🧠 Reasoning:\n{reasoning}\n\n✅ Answer:\n{answer}"
-                                else:
-                                    return answer
-                except Exception as analysis_error:
-                    # If analysis fails, let the LLM handle it
-                    pass
-            
-            # For code generation, still use the CodeAgent as it's particularly valuable
-            try:
-                code_response = code_agent.run(full_prompt)
-                if code_response and isinstance(code_response, str):
-                    return code_response.strip()
-            except Exception as code_error:
-                # Fallback to LLM if the agent fails
-                pass
-                
-            # Fallback to standard LLM
-            reasoning, answer = generate_response(full_prompt, mode)
-            if mode == "think" and reasoning:
-                return f"🧠 Reasoning:\n{reasoning}\n\n✅ Answer:\n{answer}"
-            else:
-                return answer
-            
-        # Exam tab - augment LLM with syllabus information
-        elif tab == "Exam":
-            extra_context = ""
-            
-            # For syllabus-related queries, augment with syllabus information
-            if any(word in prompt.lower() for word in ["syllabus", "curriculum", "topics", "pattern", "preparation"]):
-                try:
-                    # Extract the exam type from the prompt if possible
-                    from constants import EXAMS
-                    exam_type = None
-                    for exam in EXAMS:
-                        if exam.lower() in prompt.lower():
-                            exam_type = exam
-                            break
-                    
-                    if exam_type:
-                        # Get syllabus information to augment the response
-                        subject = None
-                        for subject_candidate in SUBJECTS.get(exam_type, []):
-                            if subject_candidate.lower() in prompt.lower():
-                                subject = subject_candidate
-                                break
-                        
-                        syllabus_info = check_exam_syllabus(exam_type, subject)
-                        if syllabus_info and len(syllabus_info) > 50:
-                            extra_context += f"\n\nSyllabus reference information:\n{syllabus_info}"
-                except:
-                    pass
-            
-            # For exam preparation questions, get study materials information
-            if any(word in prompt.lower() for word in ["books", "reference", "material", "resources", "study"]):
-                try:
-                    # Get recommended study resources
-                    from smolagents import WebSearchTool
-                    web_tool = WebSearchTool()
-                    search_query = f"recommended books reference materials for {prompt}"
-                    search_results = web_tool(search_query)
-                    
-                    if search_results and len(search_results) > 100:
-                        # Extract only the most relevant portions mentioning books or references
-                        import re
-                        resource_mentions = re.findall(r'([^.!?]*(?:book|reference|material|resource)[^.!?]*[.!?])', search_results, re.IGNORECASE)
-                        if resource_mentions:
-                            resources_text = " ".join(resource_mentions[:5])  # Limit to first 5 mentions
-                            extra_context += f"\n\nReference materials:\n{resources_text}"
-                except:
-                    pass
-            
-            # For question generation, augment with contextual information
-            if "generate" in prompt.lower() and ("question" in prompt.lower() or "mock" in prompt.lower()):
-                try:
-                    # Extract the exam type and subject from the prompt
-                    from constants import EXAMS
-                    exam_type = None
-                    subject = None
-                    
-                    for exam in EXAMS:
-                        if exam.lower() in prompt.lower():
-                            exam_type = exam
-                            break
-                    
-                    if exam_type:
-                        for subject_candidate in SUBJECTS.get(exam_type, []):
-                            if subject_candidate.lower() in prompt.lower():
-                                subject = subject_candidate
-                                break
-                        
-                        if subject:
-                            # Get contextual information for generating questions
-                            question_context = exam_question_generator(exam_type, subject)
-                            if question_context and len(question_context) > 50:
-                                extra_context += f"\n\nQuestion generation context:\n{question_context}"
-                except:
-                    pass
-            
-            # Let the LLM generate a response with the additional context
-            if extra_context:
-                augmented_prompt = full_prompt + extra_context
-                reasoning, answer = generate_response(augmented_prompt, mode)
-                
-                if mode == "think" and reasoning:
-                    return f"🧠 Reasoning:\n{reasoning}\n\n✅ Answer:\n{answer}"
-                else:
-                    return answer
-            else:
-                # If no extra context, use standard generation
-                reasoning, answer = generate_response(full_prompt, mode)
-                if mode == "think" and reasoning:
-                    return f"🧠 Reasoning:\n{reasoning}\n\n✅ Answer:\n{answer}"
-                else:
-                    return answer
-            
+        # One pass over the prompt picks the branch and finds any exam and subject
+        route = route_prompt(tab, prompt)
+        logger.info(f"Routed prompt: {route}")
+        augment = _BRANCHES.get(route.intent)
         # Default: use standard text generation for anything else
-        else:
-            reasoning, answer = generate_response(full_prompt, mode)
-            if mode == "think" and reasoning:
-                return f"🧠 Reasoning:\n{reasoning}\n\n✅ Answer:\n{answer}"
-            else:
-                return answer
-                
+        augmented_prompt, answer = full_prompt, None
+        if augment is not None:
+            with request_deadline() as budget:
+                augmented_prompt, answer = await augment(prompt, full_prompt, route)
+            _finish_budget(budget, metadata)
+        if answer is not None:
+            remember(key, prompt, answer)
+            yield "", answer
+            return
+        async for last in _aremembered(_astream_answer(augmented_prompt, mode, metadata, tab), key, prompt):
+            yield last
     except Exception as e:
         logger.error(f"Error in app_fn: {e}", exc_info=True)
+        error = f"Sorry, I encountered an error while processing your request: {str(e)}"
+        # Once part of the answer is on screen, regenerating would replace it
+        if last is not None:
+            yield _with_error(last, error)
+            return
         # Fallback to standard generation on agent errors
         try:
-            reasoning, answer = generate_response(full_prompt, mode)
-            if mode == "think" and reasoning:
-                return f"🧠 Reasoning:\n{reasoning}\n\n✅ Answer:\n{answer}"
-            else:
-                return answer
-        except:
-            return f"Sorry, I encountered an error while processing your request: {str(e)}"
-
-def get_syllabus_info(exam, subject):
-    logger = logging.getLogger("bharat_buddy")
-    logger.info(f"get_syllabus_info called with exam={exam}, subject={subject}")
+            async for last in _aremembered(_astream_answer(full_prompt, mode, metadata, tab), key, prompt):
+                yield last
+        except Exception:
+            yield _with_error(last, error) if last is not None else ("", error)
+
+@traced("get_syllabus_info", args=("exam", "subject"), tab="Syllabus Guide")
+async def get_syllabus_info_async(exam, subject, metadata=None):
     """
     Get detailed syllabus information for a specific exam and subject.
     Uses check_exam_syllabus to retrieve factual information that augments the LLM's knowledge.
@@ -430,60 +597,85 @@ def get_syllabus_info(exam, subject):
     Args:
         exam: The competitive exam name
         subject: The specific subject
+        metadata: Optional dict that is filled with the latency budget summary
         
     Returns:
         Detailed syllabus information with the LLM's interpretation
     """
+    logger = logging.getLogger("bharat_buddy")
+    logger.info(f"get_syllabus_info called with exam={exam}, subject={subject}")
+    REQUESTS.labels(tab="Syllabus Guide").inc()
     try:
-        # First, get the factual syllabus information 
-        syllabus_info = check_exam_syllabus(exam, subject)
+        # First, get the factual syllabus information, then build a prompt that incorporates it
+        with request_deadline() as budget:
+            prompt = _syllabus_prompt(exam, subject, await async_tools.check_exam_syllabus(exam, subject))
+        _finish_budget(budget, metadata)
         
-        # Build a prompt that incorporates this information
-        prompt = f"Provide a comprehensive overview of the syllabus for {subject} in {exam} examination. Include important topics, recommended approach to studying each topic, and focus areas."
-        
-        if syllabus_info and len(syllabus_info) > 50:
-            prompt += f"\n\nIncorporate this factual syllabus information in your response:\n{syllabus_info}"
-            
         # Have the LLM generate a response that incorporates the factual data
-        reasoning, answer = generate_response(prompt, "non-think")
+        reasoning, answer = await agenerate_response(prompt, "non-think", profile="Syllabus")
         return answer
     except Exception as e:
         logger.error(f"Error in get_syllabus_info: {e}", exc_info=True)
         return f"Error retrieving syllabus: {str(e)}"
 
-def get_study_tips(exam, subject):
-    logger = logging.getLogger("bharat_buddy")
-    logger.info(f"get_study_tips called with exam={exam}, subject={subject}")
+@traced("get_study_tips", args=("exam", "subject"), tab="Syllabus Guide")
+async def get_study_tips_async(exam, subject, metadata=None):
     """
     Get study tips for a specific exam and subject
     
     Args:
         exam: The competitive exam name
         subject: The specific subject
+        metadata: Optional dict that is filled with the latency budget summary
         
     Returns:
         Study tips and strategies
     """
+    logger = logging.getLogger("bharat_buddy")
+    logger.info(f"get_study_tips called with exam={exam}, subject={subject}")
+    REQUESTS.labels(tab="Syllabus Guide").inc()
     try:
         # First, try to get some factual information about the exam pattern
-        syllabus_info = check_exam_syllabus(exam, subject)
-        
-        # Build a prompt that incorporates this information
-        prompt = f"Provide effective study strategies and tips for preparing {subject} for the {exam} examination. Include time management advice, important focus areas, and common mistakes to avoid."
+        with request_deadline() as budget:
+            prompt = _study_tips_prompt(exam, subject, await async_tools.check_exam_syllabus(exam, subject))
+        _finish_budget(budget, metadata)
         
-        if syllabus_info and len(syllabus_info) > 50:
-            prompt += f"\n\nIncorporate this exam information in your response:\n{syllabus_info}"
-            
         # Have the LLM generate a response that incorporates the factual data
-        reasoning, answer = generate_response(prompt, "non-think")
+        reasoning, answer = await agenerate_response(prompt, "non-think", profile="Study Tips")
         return answer
     except Exception as e:
         logger.error(f"Error in get_study_tips: {e}", exc_info=True)
         return f"Error generating study tips: {str(e)}"
 
-def exam_qa(exam, subject, question):
-    logger = logging.getLogger("bharat_buddy")
-    logger.info(f"exam_qa called with exam={exam}, subject={subject}, question={question}")
+async def _build_exam_qa_prompt(exam, subject, question, history=""):
+    """Gathers factual context for an exam question and builds the augmented prompt"""
+    # Get contextual information first
+    sections = []
+    
+    # Try to get syllabus context if applicable
+    if _asks_about_syllabus(question):
+        syllabus_info = await async_tools.check_exam_syllabus(exam, subject)
+        if syllabus_info and len(syllabus_info) > 50:
+            sections.append(("Syllabus information", syllabus_info))
+    
+    # For subject content questions, try to get factual information
+    if not sections:
+        try:
+            search_term = f"{exam} {subject} {question}"
+            # The offline index answers without network; Wikipedia is the fallback
+            wiki_info = local_knowledge_context(search_term)
+            if not wiki_info and budget_allows("Wikipedia lookup"):
+                wiki_info = await async_tools.search_wikipedia(search_term)
+            if wiki_info and len(wiki_info) > 100:
+                sections.append(("Factual information", wiki_info))
+        except Exception:
+            pass
+    
+    context = pack_context(f"{subject} {question}", sections, "Exam Q&A")
+    return _exam_qa_prompt(exam, subject, question, context, history)
+
+@traced("exam_qa", args=("exam", "subject"), tab="Exam Q&A")
+async def exam_qa_async(exam, subject, question, session_id=None, metadata=None):
     """
     Answer exam-related questions with factual augmentation
     
@@ -491,46 +683,86 @@ def exam_qa(exam, subject, question):
         exam: The competitive exam name
         subject: The specific subject
         question: The user's question
+        session_id: UI session; with one, earlier questions on this exam and
+            subject are included within the history token budget
+        metadata: Optional dict that is filled with the history usage and the
+            latency budget summary
         
     Returns:
         Detailed answer to the question
     """
+    logger = logging.getLogger("bharat_buddy")
+    logger.info(f"exam_qa called with exam={exam}, subject={subject}, question={question}")
+    REQUESTS.labels(tab="Exam Q&A").inc()
     try:
-        # Get contextual information first
-        context = ""
-        
-        # Try to get syllabus context if applicable
-        if any(word in question.lower() for word in ["syllabus", "curriculum", "topics", "pattern"]):
-            syllabus_info = check_exam_syllabus(exam, subject)
-            if syllabus_info and len(syllabus_info) > 50:
-                context += f"\n\nSyllabus information:\n{syllabus_info}"
-        
-        # For subject content questions, try to get factual information
-        if not context:
-            try:
-                search_term = f"{exam} {subject} {question}"
-                wiki_info = search_wikipedia(search_term)
-                if wiki_info and len(wiki_info) > 100:
-                    context += f"\n\nFactual information:\n{wiki_info}"
-            except:
-                pass
-                
-        # Create augmented prompt
-        full_prompt = f"As an expert in {exam} preparation, specifically for the subject {subject}, answer the following question: {question}"
-        
-        if context:
-            full_prompt += f"\n\nIncorporate this factual information in your response:{context}"
+        key = history_key(session_id, "Exam Q&A", exam, subject) if session_id else None
+        history = load_history(key, metadata)
+        with request_deadline() as budget:
+            full_prompt = await _build_exam_qa_prompt(exam, subject, question, history)
+        _finish_budget(budget, metadata)
         
         # Generate response
-        reasoning, answer = generate_response(full_prompt, "non-think")
+        reasoning, answer = await agenerate_response(full_prompt, "non-think", profile="Exam Q&A")
+        remember(key, question, answer)
         return answer
     except Exception as e:
         logger.error(f"Error in exam_qa: {e}", exc_info=True)
         return f"Error processing your question: {str(e)}"
 
-def generate_regional_query(region: str, state: str, topic: str, prompt: str = "") -> str:
+@traced("exam_qa_stream", args=("exam", "subject"), tab="Exam Q&A")
+async def exam_qa_stream_async(exam, subject, question, session_id=None, metadata=None):
+    """
+    Streaming variant of exam_qa for the Exam Q&A tab
+    
+    Yields:
+        The answer text decoded so far
+    """
     logger = logging.getLogger("bharat_buddy")
-    logger.info(f"generate_regional_query called with region={region}, state={state}, topic={topic}, prompt={prompt}")
+    logger.info(f"exam_qa_stream called with exam={exam}, subject={subject}, question={question}")
+    REQUESTS.labels(tab="Exam Q&A").inc()
+    answer = None
+    try:
+        key = history_key(session_id, "Exam Q&A", exam, subject) if session_id else None
+        history = load_history(key, metadata)
+        with request_deadline() as budget:
+            full_prompt = await _build_exam_qa_prompt(exam, subject, question, history)
+        _finish_budget(budget, metadata)
+        async for _, answer in _aremembered(astream_response(full_prompt, "non-think", profile="Exam Q&A"), key, question):
+            yield answer
+    except Exception as e:
+        logger.error(f"Error in exam_qa_stream: {e}", exc_info=True)
+        error = f"Error processing your question: {str(e)}"
+        # Keep the part of the answer that was already streamed
+        yield f"{answer}\n\n{error}" if answer else error
+
+async def _regional_context(state, topic, prompt=""):
+    """Gathers factual context about a regional topic within the request's latency budget"""
+    # First, search for regional information
+    search_query = f"{state} {topic.lower()}"
+    sections = []
+    
+    try:
+        # Try the offline index, then Wikipedia, for factual information
+        wiki_info = local_knowledge_context(search_query)
+        if not wiki_info and budget_allows("Wikipedia lookup"):
+            wiki_info = await async_tools.search_wikipedia(search_query)
+        if wiki_info and len(wiki_info) > 100:
+            sections.append((f"Factual information about {state} {topic.lower()}", wiki_info))
+    except Exception:
+        pass
+    
+    # If Wikipedia didn't return much or any information, try web search
+    if sum(len(text) for _, text in sections) < 150 and budget_allows("web search"):
+        try:
+            web_results = await async_tools.web_search(f"{state} {topic.lower()} India authentic traditional")
+            if web_results and len(web_results) > 100:
+                sections.append(("Additional information from web search", web_results))
+        except Exception:
+            pass
+    return pack_context(f"{search_query} {prompt}", sections, "Regional")
+
+@traced("generate_regional_query", args=("state", "topic"), tab="Regional")
+async def generate_regional_query_async(region: str, state: str, topic: str, prompt: str = "", metadata=None) -> str:
     """
     Generates a response for a query about a specific Indian state and regional topic,
     showcasing Sarvam's deep understanding of regional nuances.
@@ -540,64 +772,49 @@ def generate_regional_query(region: str, state: str, topic: str, prompt: str = "
         state: The specific state within the region
         topic: The topic of interest (cuisine, festivals, etc.)
         prompt: Optional additional query details
+        metadata: Optional dict that is filled with the latency budget summary
         
     Returns:
         A detailed response about the regional topic
     """
+    logger = logging.getLogger("bharat_buddy")
+    logger.info(f"generate_regional_query called with region={region}, state={state}, topic={topic}, prompt={prompt}")
+    REQUESTS.labels(tab="Regional").inc()
     try:
-        # First, search for regional information
-        search_query = f"{state} {topic.lower()}"
-        context = ""
-        
-        try:
-            # Try Wikipedia for factual information
-            wiki_info = search_wikipedia(search_query)
-            if wiki_info and len(wiki_info) > 100:
-                context += f"\n\nFactual information about {state} {topic.lower()}:\n{wiki_info}"
-        except:
-            pass
-            
-        # If Wikipedia didn't return much or any information, try web search
-        if not context or len(context) < 200:
-            try:
-                from smolagents import WebSearchTool
-                web_tool = WebSearchTool()
-                web_results = web_tool(f"{state} {topic.lower()} India authentic traditional")
-                
-                if web_results and len(web_results) > 100:
-                    context += f"\n\nAdditional information from web search:\n{web_results[:1500]}"
-            except:
-                pass
+        with request_deadline() as budget:
+            context = await _regional_context(state, topic, prompt)
+        _finish_budget(budget, metadata)
         
-        # Generate a prompt that showcases Sarvam's regional expertise
-        query = prompt if prompt else f"Explain {topic.lower()} of {state}"
-        multilingual_prompt = (
-            f"You are Sarvam, an AI assistant with deep expertise in Indian regional cultures and languages. "
-            f"Provide a rich, detailed explanation about the {topic.lower()} of {state}. "
-            f"Incorporate authentic local terms, traditions, and contexts. "
-            f"If responding in an Indian language other than English, incorporate some authentic local terms "
-            f"from that region while keeping the overall text understandable. "
-            f"\n\nQuery: {query}"
-        )
-        
-        # Add the factual context if we have it
-        if context:
-            multilingual_prompt += f"\n\nIncorporate these facts in your response:{context}"
-            
         # Generate response - we'll show both thinking and final answer for transparency
-        reasoning, answer = generate_response(multilingual_prompt, "think")
-        
-        response = ""
-        if reasoning:
-            response += f"🧠 Sarvam is analyzing regional information about {state}:\n{reasoning}\n\n"
-            
-        response += f"✅ **{state} {topic}**\n\n{answer}"
-        
-        # Include a note about Sarvam's capabilities
-        note = f"\n\n---\n*This response showcases Sarvam's understanding of Indian regional contexts and multilingual capabilities.*"
-        
-        return response + note
-        
+        reasoning, answer = await agenerate_response(_regional_prompt(state, topic, prompt, context), "think", profile="Regional")
+        return _format_regional_response(state, topic, reasoning, answer)
     except Exception as e:
         logger.error(f"Error in generate_regional_query: {e}", exc_info=True)
         return f"Error generating regional information: {str(e)}"
+
+# Sync handlers, for the thread-based Gradio queue and other blocking callers.
+# Each runs its async counterpart above on async_runner's background loop.
+
+def app_fn(tab, prompt, mode, use_agents=True, metadata=None, session_id=None):
+    """Blocking app_fn_async; yields the same (reasoning, answer) tuples"""
+    yield from async_runner.iterate(app_fn_async(tab, prompt, mode, use_agents, metadata, session_id))
+
+def get_syllabus_info(exam, subject, metadata=None):
+    """Blocking get_syllabus_info_async"""
+    return async_runner.run(get_syllabus_info_async(exam, subject, metadata))
+
+def get_study_tips(exam, subject, metadata=None):
+    """Blocking get_study_tips_async"""
+    return async_runner.run(get_study_tips_async(exam, subject, metadata))
+
+def exam_qa(exam, subject, question, session_id=None, metadata=None):
+    """Blocking exam_qa_async"""
+    return async_runner.run(exam_qa_async(exam, subject, question, session_id, metadata))
+
+def exam_qa_stream(exam, subject, question, session_id=None, metadata=None):
+    """Blocking exam_qa_stream_async; yields the answer text decoded so far"""
+    yield from async_runner.iterate(exam_qa_stream_async(exam, subject, question, session_id, metadata))
+
+def generate_regional_query(region: str, state: str, topic: str, prompt: str = "", metadata=None) -> str:
+    """Blocking generate_regional_query_async"""
+    return async_runner.run(generate_regional_query_async(region, state, topic, prompt, metadata))
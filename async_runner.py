@@ -0,0 +1,125 @@
+"""
+Runs the async request pipeline for synchronous callers
+
+The handlers in app_logic and the network-backed tools in agent_tools have one
+implementation each: the coroutines of the async pipeline. run() and iterate()
+execute them on a single background event loop shared by every sync caller (the
+sync Gradio handlers, smolagents tool calls), so a sync request only costs the
+thread that waits for it. The caller's context, and with it the request deadline
+and the current span, is carried onto the loop.
+"""
+import asyncio
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger("bharat_buddy")
+
+_loop = None
+_loop_lock = threading.Lock()
+# How many items an async generator may run ahead of its sync consumer
+_MAX_AHEAD = 16
+
+
+def _get_loop():
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="async-runner", daemon=True).start()
+                logger.info("Started the background event loop for sync callers")
+                _loop = loop
+    return _loop
+
+
+def _check_not_on_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    raise RuntimeError("async_runner blocks until the coroutine finishes; await it directly inside an event loop")
+
+
+def run(coroutine):
+    """
+    Runs a coroutine on the background loop and waits for its result.
+
+    Args:
+        coroutine: The coroutine to run
+
+    Returns:
+        Whatever the coroutine returns; its exceptions are raised here
+    """
+    try:
+        _check_not_on_loop()
+    except RuntimeError:
+        coroutine.close()
+        raise
+    # run_coroutine_threadsafe creates the task in a copy of this thread's context
+    future = asyncio.run_coroutine_threadsafe(coroutine, _get_loop())
+    try:
+        return future.result()
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def iterate(async_generator):
+    """
+    Iterates an async generator on the background loop from sync code.
+
+    Items are handed over in batches: the consumer takes everything the generator
+    has produced since its last read, so a burst of tokens costs one thread
+    handoff rather than one per token. The generator runs at most _MAX_AHEAD items
+    ahead of the consumer. Closing the returned generator (a client disconnecting
+    from a stream) cancels the async one.
+
+    Args:
+        async_generator: The async generator to drain
+
+    Yields:
+        The items of async_generator; its exceptions are raised here
+    """
+    _check_not_on_loop()
+    loop = _get_loop()
+    ready = deque()
+    changed = threading.Condition()
+    room = asyncio.Event()
+
+    async def pump():
+        try:
+            async for item in async_generator:
+                with changed:
+                    ready.append(item)
+                    full = len(ready) >= _MAX_AHEAD
+                    if full:
+                        room.clear()
+                    changed.notify()
+                if full:
+                    await room.wait()
+        finally:
+            await async_generator.aclose()
+
+    def wake(_):
+        with changed:
+            changed.notify()
+
+    future = asyncio.run_coroutine_threadsafe(pump(), loop)
+    future.add_done_callback(wake)
+    try:
+        while True:
+            with changed:
+                while not ready and not future.done():
+                    changed.wait()
+                batch = list(ready)
+                ready.clear()
+            if not batch:
+                future.result()
+                return
+            yield from batch
+            if len(batch) >= _MAX_AHEAD:
+                # The pump stopped at a full buffer and waits for room
+                loop.call_soon_threadsafe(room.set)
+    finally:
+        future.cancel()
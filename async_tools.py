@@ -0,0 +1,326 @@
+"""
+Network-backed tool lookups for the request pipeline
+
+These coroutines are the only implementation of the agent_tools tools that go
+over the network: they wait on the shared AsyncHttpClient and wiki_cache's async
+API instead of holding a thread, and the @tool versions the smolagents agents
+call run them through async_runner. Parsing and formatting helpers live in
+agent_tools.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+import requests
+import wikipedia
+
+import agent_tools
+import wiki_cache
+from agent_tools import (
+    _VISIT_CONTENT_TYPES,
+    _code_quality_query,
+    _cultural_context,
+    _cultural_disambiguation_facts,
+    _cultural_page_facts,
+    _cultural_search_facts,
+    _cultural_search_query,
+    _exam_format_from_content,
+    _format_wiki_page,
+    _math_assistance,
+    _math_approaches,
+    _math_calculation,
+    _math_search_query,
+    _page_to_text,
+    _quality_resources,
+    _question_context,
+    _static_code_analysis,
+    _subject_page_sections,
+    _visit_error,
+)
+from config import config
+from deadline import cap as cap_to_budget, current as current_deadline
+from http_client import get_async_http_client
+from metrics import timed_tool
+from tracing import traced
+from syllabus_store import get_syllabus_store
+
+logger = logging.getLogger("bharat_buddy")
+
+_DUCKDUCKGO_LITE_URL = "https://lite.duckduckgo.com/lite/"
+_search_tool = None
+# Late fan-out lookups keep running to warm the caches; this holds a reference to them
+_late_lookups = set()
+
+
+def _get_search_tool():
+    # Only used for its result parser and formatter, so one instance serves every loop
+    global _search_tool
+    if _search_tool is None:
+        from smolagents import WebSearchTool
+        _search_tool = WebSearchTool()
+    return _search_tool
+
+
+def _finish_late_lookup(task):
+    _late_lookups.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug(f"Late lookup failed: {task.exception()}")
+
+
+async def _fan_out(tasks: Dict[str, Any]) -> Dict[str, Any]:
+    """Async counterpart of agent_tools._fan_out.
+
+    Args:
+        tasks: Mapping of source name to an (awaitable, deadline in seconds) pair.
+            Deadlines are capped to the request's remaining latency budget.
+
+    Returns:
+        Mapping of source name to result for every source that succeeded before its
+        deadline. Failed or late sources are logged and left out.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    running = {}
+    for name, (awaitable, deadline) in tasks.items():
+        deadline = cap_to_budget(deadline)
+        if deadline <= 0 and current_deadline() is not None:
+            awaitable.close()
+            current_deadline().drop(f"{name} lookup", "skipped: request budget spent")
+            continue
+        running[name] = (asyncio.ensure_future(awaitable), deadline)
+    results = {}
+    for name, (task, deadline) in sorted(running.items(), key=lambda item: item[1][1]):
+        remaining = max(0.0, start + deadline - loop.time())
+        done, _ = await asyncio.wait({task}, timeout=remaining)
+        if not done:
+            logger.warning(f"{name} lookup missed its {deadline:.1f}s deadline; continuing without it")
+            if current_deadline() is not None:
+                current_deadline().drop(f"{name} lookup", f"cut short after {deadline:.1f}s")
+            _late_lookups.add(task)
+            task.add_done_callback(_finish_late_lookup)
+        elif task.exception() is not None:
+            logger.error(f"Error in {name} lookup: {task.exception()}")
+        else:
+            results[name] = task.result()
+    logger.info(f"Async fan-out of {list(tasks)} finished in {loop.time() - start:.2f}s")
+    return results
+
+
+def _duckduckgo_results(html: str) -> List[Dict[str, str]]:
+    """Parses a DuckDuckGo lite result page into WebSearchTool's result dicts.
+
+    smolagents only exposes its parser through the private _create_duckduckgo_parser,
+    so this is the one place that depends on it.
+    """
+    create_parser = getattr(_get_search_tool(), "_create_duckduckgo_parser", None)
+    if create_parser is None:
+        raise RuntimeError("This smolagents version has no DuckDuckGo result parser; async web search is unavailable")
+    parser = create_parser()
+    parser.feed(html)
+    return parser.results
+
+
+@timed_tool("web_search")
+@traced("tool web_search", tool="web_search")
+async def web_search(query: str) -> str:
+    """Non-blocking WebSearchTool()(query) on the DuckDuckGo lite endpoint.
+
+    Raises:
+        requests.exceptions.HTTPError: If DuckDuckGo does not answer with a result
+            page (it rate limits with a 202 challenge page)
+        Exception: If there are no results, as WebSearchTool does
+    """
+    response = await get_async_http_client().get(
+        _DUCKDUCKGO_LITE_URL, params={"q": query}, headers={"User-Agent": "Mozilla/5.0"}
+    )
+    if response.status_code != 200:
+        raise requests.exceptions.HTTPError(
+            f"DuckDuckGo answered {response.status_code} instead of a result page (rate limited?)"
+        )
+    results = _duckduckgo_results(response.text)
+    if not results:
+        raise Exception("No results found! Try a less restrictive/shorter query.")
+    return _get_search_tool().parse_results(results)
+
+
+@timed_tool("visit_webpage")
+@traced("tool visit_webpage", tool="visit_webpage")
+async def visit_webpage(url: str) -> str:
+    """Implements the agent_tools.visit_webpage tool"""
+    logger.info(f"visit_webpage called with url: {url}")
+    try:
+        # Pooled keep-alive client; the body is streamed and capped, and non-text pages
+        # are rejected before download
+        response = await get_async_http_client().get(
+            url, max_bytes=config.VISIT_WEBPAGE_MAX_BYTES, accept_types=_VISIT_CONTENT_TYPES
+        )
+        # HTML extraction is CPU work on up to VISIT_WEBPAGE_MAX_BYTES; keep it off the loop
+        return await asyncio.to_thread(_page_to_text, response)
+    except Exception as e:
+        return _visit_error(url, e)
+
+
+@timed_tool("search_wikipedia")
+@traced("tool search_wikipedia", tool="search_wikipedia")
+async def search_wikipedia(query: str, language: str = "en") -> str:
+    """Implements the agent_tools.search_wikipedia tool"""
+    logger.info(f"search_wikipedia called with query: {query}, language: {language}")
+    try:
+        # Search for pages (served from the shared Wikipedia cache when possible)
+        search_results = await wiki_cache.asearch(query, results=5, lang=language)
+        logger.info(f"Wikipedia search results: {search_results}")
+        if not search_results:
+            return f"No Wikipedia articles found for '{query}'."
+        try:
+            page = await wiki_cache.apage(search_results[0], lang=language)
+            return _format_wiki_page(page.title, await page.asummary(), page.url)
+        except wikipedia.DisambiguationError as e:
+            # If disambiguation page, pick the first option
+            if not getattr(e, "options", None):
+                return f"Multiple Wikipedia articles found for '{query}', but no specific options were provided."
+            try:
+                page = await wiki_cache.apage(e.options[0], lang=language)
+                logger.info(f"Disambiguation resolved to: {page.title}")
+                return _format_wiki_page(page.title, await page.asummary(), page.url)
+            except Exception as de:
+                logger.error(f"Error resolving disambiguation: {de}")
+                return f"Multiple Wikipedia articles found for '{query}'. Options include: {', '.join(e.options[:5])}."
+        except wikipedia.PageError as pe:
+            logger.error(f"Wikipedia page not found: {pe}")
+            return f"Wikipedia page not found for '{query}'. Please try a different search term."
+        except Exception as e:
+            logger.error(f"Error retrieving Wikipedia page: {e}")
+            return f"Error retrieving Wikipedia page for '{query}': {e}"
+    except Exception as e:
+        logger.error(f"Error searching Wikipedia: {e}")
+        return f"Error searching Wikipedia: {e}"
+
+
+@timed_tool("solve_math_problem")
+@traced("tool solve_math_problem", tool="solve_math_problem")
+async def solve_math_problem(problem: str) -> str:
+    """Implements the agent_tools.solve_math_problem tool"""
+    logger.info(f"solve_math_problem called with problem: {problem}")
+    search_results = ""
+    # Step 1: Try to find relevant online information about the math problem
+    try:
+        search_query = _math_search_query(problem)
+        if search_query:
+            search_results = _math_approaches(await web_search(search_query))
+    except Exception as se:
+        logger.error(f"Error in math problem search: {se}")
+    # Steps 2 and 3: basic arithmetic, then combine what was found
+    return _math_assistance(search_results, _math_calculation(problem))
+
+
+@timed_tool("analyze_code")
+@traced("tool analyze_code", tool="analyze_code")
+async def analyze_code(code: str, language: str = "python") -> Dict[str, Any]:
+    """Implements the agent_tools.analyze_code tool"""
+    logger.info(f"analyze_code called for {language} code analysis")
+    result = _static_code_analysis(code, language)
+    # Step 3: Search for best practices resources online
+    try:
+        relevant_urls = _quality_resources(await web_search(_code_quality_query(language)))
+        if relevant_urls:
+            result["resources"] = relevant_urls
+    except Exception as se:
+        logger.error(f"Error searching for code quality resources: {se}")
+        # If search fails, don't worry about it - the LLM can analyze the code
+    # Let the LLM handle the detailed analysis
+    result["notes"].append("The LLM can perform detailed code analysis based on its knowledge of programming best practices.")
+    return result
+
+
+async def _exam_format_sections(exam_type: str, subject: str) -> List[str]:
+    """Finds the exam's Wikipedia page and extracts question format information"""
+    search_results = await wiki_cache.asearch(f"{exam_type} {subject}", results=3)
+    for result in search_results:
+        if exam_type.lower() in result.lower():
+            try:
+                exam_page = await wiki_cache.apage(result)
+            except Exception as e:
+                logger.error(f"Error accessing Wikipedia page for {result}: {e}")
+                continue
+            return _exam_format_from_content(await exam_page.acontent())
+    return []
+
+
+async def _subject_sections(exam_type: str, subject: str) -> List[str]:
+    """Extracts a subject summary and its key topics from Wikipedia"""
+    subject_results = await wiki_cache.asearch(f"{subject} {exam_type}", results=3)
+    if not subject_results:
+        return []
+    subject_page = await wiki_cache.apage(subject_results[0])
+    summary, content = await asyncio.gather(subject_page.asummary(), subject_page.acontent())
+    return _subject_page_sections(subject, summary, content)
+
+
+@timed_tool("exam_question_generator")
+@traced("tool exam_question_generator", tool="exam_question_generator")
+async def exam_question_generator(exam_type: str, subject: str, difficulty: str = "medium") -> str:
+    """Implements the agent_tools.exam_question_generator tool"""
+    logger.info(f"exam_question_generator called with exam_type: {exam_type}, subject: {subject}")
+    # Step 1: Look up exam format and subject information on Wikipedia concurrently
+    lookups = await _fan_out({
+        "exam format": (_exam_format_sections(exam_type, subject), config.TOOL_WIKIPEDIA_DEADLINE_S),
+        "subject information": (_subject_sections(exam_type, subject), config.TOOL_WIKIPEDIA_DEADLINE_S),
+    })
+    sections = lookups.get("exam format", []) + lookups.get("subject information", [])
+    # Step 2: Add general and difficulty-specific guidance
+    return _question_context(exam_type, subject, difficulty, sections)
+
+
+async def _cultural_wiki_facts(concept: str, region: Optional[str], search_query: str):
+    """Collects facts about a cultural concept from Wikipedia, returning (facts, sources)"""
+    try:
+        # Default to English for most comprehensive results
+        search_results = await wiki_cache.asearch(search_query, results=3, lang="en")
+        if search_results:
+            try:
+                page = await wiki_cache.apage(search_results[0])
+                summary = await page.asummary()
+                content = await page.acontent() if region else ""
+                return _cultural_page_facts(region, summary, page.url, content)
+            except wikipedia.DisambiguationError as e:
+                # If we hit disambiguation, just note the ambiguity as a fact
+                return _cultural_disambiguation_facts(concept, e)
+            except Exception as e:
+                logger.error(f"Error extracting information from Wikipedia: {e}")
+    except Exception as e:
+        logger.error(f"Error searching Wikipedia: {e}")
+    return [], []
+
+
+async def _cultural_web_facts(concept: str, search_query: str):
+    """Collects sentences mentioning a cultural concept from web search, returning (facts, sources)"""
+    try:
+        return _cultural_search_facts(concept, await web_search(search_query))
+    except Exception as we:
+        logger.error(f"Error in web search for cultural concept: {we}")
+    return [], []
+
+
+@timed_tool("explain_cultural_concept")
+@traced("tool explain_cultural_concept", tool="explain_cultural_concept")
+async def explain_cultural_concept(concept: str, region: Optional[str] = None) -> str:
+    """Implements the agent_tools.explain_cultural_concept tool"""
+    logger.info(f"explain_cultural_concept called for concept: {concept}, region: {region}")
+    search_query = _cultural_search_query(concept, region)
+    # Step 1: Query Wikipedia and the web concurrently for factual context
+    lookups = await _fan_out({
+        "Wikipedia": (_cultural_wiki_facts(concept, region, search_query), config.TOOL_WIKIPEDIA_DEADLINE_S),
+        "web search": (_cultural_web_facts(concept, search_query), config.TOOL_WEB_SEARCH_DEADLINE_S),
+    })
+    # Step 2: Return the gathered information or a fallback message
+    return _cultural_context(concept, lookups)
+
+
+@timed_tool("check_exam_syllabus")
+@traced("tool check_exam_syllabus", tool="check_exam_syllabus")
+async def check_exam_syllabus(exam: str, subject: Optional[str] = None) -> str:
+    """agent_tools.check_exam_syllabus; store lookups are local, only a live scrape goes to a thread"""
+    store = get_syllabus_store()
+    if store.lookup(exam, subject) is None and store.scrapes_live():
+        return await asyncio.to_thread(agent_tools._syllabus_answer, exam, subject)
+    return agent_tools._syllabus_answer(exam, subject)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Compares the fp32 CPU backend with the int8 dynamically quantized CPU backend.
+
+Each backend runs in its own subprocess so peak memory is measured in isolation.
+Reported per backend: load time, peak RSS, serialized weight size and decode
+throughput (tokens/sec) over prompts taken from constants.EXAMPLES.
+
+Usage:
+    python benchmarks/cpu_backend_benchmark.py [--max-new-tokens 64] [--prompts 4]
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+BACKENDS = ["cpu", "cpu-int8"]
+
+
+def _peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _weights_mb(model):
+    import torch
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024.0 * 1024.0)
+
+
+def run_backend(backend, max_new_tokens, prompt_count):
+    """Loads one backend and measures it; runs inside the child process"""
+    import torch
+    from constants import EXAMPLES
+    from model_utils import create_engine
+
+    torch.manual_seed(0)
+    start = time.perf_counter()
+    engine = create_engine(backend)
+    load_s = time.perf_counter() - start
+
+    prompts = [p for examples in EXAMPLES.values() for p in examples][:prompt_count]
+    generated_tokens = 0
+    decode_s = 0.0
+    for prompt in prompts:
+        inputs = engine.tokenizer.apply_chat_template(
+            [{"role": "user", "content": prompt}],
+            add_generation_prompt=True,
+            return_tensors="pt",
+            return_dict=True,
+        )
+        start = time.perf_counter()
+        with torch.inference_mode():
+            output = engine.model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                min_new_tokens=max_new_tokens,
+                do_sample=False,
+                pad_token_id=engine.tokenizer.eos_token_id,
+            )
+        decode_s += time.perf_counter() - start
+        generated_tokens += output.shape[1] - inputs["input_ids"].shape[1]
+
+    return {
+        "backend": backend,
+        "load_s": round(load_s, 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "weights_mb": round(_weights_mb(engine.model), 1),
+        "generated_tokens": int(generated_tokens),
+        "tokens_per_s": round(generated_tokens / decode_s, 2) if decode_s else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--prompts", type=int, default=4)
+    parser.add_argument("--backend", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(run_backend(args.backend, args.max_new_tokens, args.prompts)))
+        return
+
+    results = []
+    for backend in BACKENDS:
+        completed = subprocess.run(
+            [sys.executable, __file__, "--backend", backend,
+             "--max-new-tokens", str(args.max_new_tokens), "--prompts", str(args.prompts)],
+            capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            print(f"{backend} failed:\n{completed.stderr}", file=sys.stderr)
+            sys.exit(1)
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    columns = ["backend", "load_s", "peak_rss_mb", "weights_mb", "generated_tokens", "tokens_per_s"]
+    print("  ".join(c.rjust(16) for c in columns))
+    for row in results:
+        print("  ".join(str(row[c]).rjust(16) for c in columns))
+    fp32, int8 = results
+    if fp32["tokens_per_s"] and fp32["peak_rss_mb"]:
+        print(f"\nint8 speed-up: {int8['tokens_per_s'] / fp32['tokens_per_s']:.2f}x, "
+              f"peak memory: {int8['peak_rss_mb'] / fp32['peak_rss_mb']:.2f}x of fp32")
+
+
+if __name__ == "__main__":
+    main()
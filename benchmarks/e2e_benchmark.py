@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark over the bundled example prompts.
+
+Replays constants.EXAMPLES, constants.TRENDING and the enhanced_examples prompts
+through app_fn (one scenario per tab), the Exam Prep functions and
+generate_regional_query, with deterministic local stand-ins for everything that
+would leave the process:
+
+- the engine: model_utils._stream_text / _astream_text emit a fixed, prompt-seeded
+  token stream (with a <think> block) instead of decoding
+- the network: wiki_cache lookups, WebSearchTool and async_tools.web_search return
+  canned, query-seeded text; any other requests/httpx call raises
+- the agents: get_agent returns an agent that answers in one step
+
+Everything between those edges (routing, the latency budget, augmentation, tool
+text processing, think parsing, metrics and tracing) runs for real. Per scenario
+it reports request latency (p50/p95), throughput, per-stage latency from the
+trace spans, the mean prompt length sent to generation, and allocations
+(tracemalloc peak and retained bytes, measured in a separate pass so they do
+not skew the timings).
+
+Usage:
+    python benchmarks/e2e_benchmark.py [--repeat 5] [--async]
+    python benchmarks/e2e_benchmark.py --save-baseline
+    python benchmarks/e2e_benchmark.py --check      # exit 1 on regressions
+
+The baseline (benchmarks/e2e_baseline.json) is machine-specific; regenerate it
+with --save-baseline on the machine that runs --check.
+"""
+import argparse
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import ExitStack
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "e2e_baseline.json")
+# A metric regresses when it exceeds the baseline by both the relative tolerance and the floor
+LATENCY_FLOOR_MS = 1.0
+MEMORY_FLOOR_KB = 64.0
+
+_VOCABULARY = [
+    "भारत", "परंपरा", "उत्सव", "பண்டிகை", "வரலாறு", "ইতিহাস", "সংস্কৃতি", "ગુજરાત", "పండుగ",
+    "the", "festival", "equation", "syllabus", "function", "history", "reference", "book", "step",
+    "therefore", "answer", "=", "42", "def", "return", "is", "of", "and", "in",
+]
+
+
+def _seed(text):
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def _words(seed, count):
+    return [_VOCABULARY[(seed + i * 7) % len(_VOCABULARY)] for i in range(count)]
+
+
+# Engine stand-in
+
+def _fake_tokens(prompt):
+    seed = _seed(prompt)
+    thinking = _words(seed, 16 + seed % 16)
+    answer = _words(seed // 3, 48 + seed % 48)
+    return ["<think>"] + [f"{w} " for w in thinking] + ["</think>"] + [f"{w} " for w in answer]
+
+
+def _make_stream_text(token_delay_s):
+    def stream_text(prompt, usage=None, **generation_kwargs):
+        tokens = _fake_tokens(prompt)
+        for token in tokens:
+            if token_delay_s:
+                time.sleep(token_delay_s)
+            yield token
+        if usage is not None:
+            usage["prompt_tokens"] = len(prompt.split())
+            usage["output_tokens"] = len(tokens)
+    return stream_text
+
+
+def _make_astream_text(token_delay_s):
+    async def astream_text(prompt, usage=None, **generation_kwargs):
+        tokens = _fake_tokens(prompt)
+        for token in tokens:
+            if token_delay_s:
+                await asyncio.sleep(token_delay_s)
+            yield token
+        if usage is not None:
+            usage["prompt_tokens"] = len(prompt.split())
+            usage["output_tokens"] = len(tokens)
+    return astream_text
+
+
+# Network stand-ins
+
+class FakePage:
+    """Canned Wikipedia page with the CachedPage interface"""
+
+    def __init__(self, title):
+        self.title = title
+        self.url = f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}"
+        seed = _seed(title)
+        self.summary = f"{title} is " + " ".join(_words(seed, 60)) + "."
+        sections = []
+        for heading in ["History", "Syllabus", "Exam pattern", "Significance", "Celebrations"]:
+            sections.append(f"== {heading} ==\n" + ". ".join(" ".join(_words(seed + len(heading), 12)) for _ in range(6)) + ".")
+        self.content = self.summary + "\n\n" + "\n\n".join(sections)
+
+    async def asummary(self):
+        return self.summary
+
+    async def acontent(self):
+        return self.content
+
+
+def _fake_search(query, results=10, lang="en"):
+    return [f"{query.title()}"] + [f"{query.title()} ({i})" for i in range(1, results)]
+
+
+def _fake_page(title, lang="en"):
+    return FakePage(title)
+
+
+async def _fake_asearch(query, results=10, lang="en"):
+    return _fake_search(query, results, lang)
+
+
+async def _fake_apage(title, lang="en"):
+    return FakePage(title)
+
+
+def _fake_web_results(query):
+    seed = _seed(query)
+    lines = ["## Search Results"]
+    for i in range(5):
+        lines.append(
+            f"[{query} result {i}](https://example.org/{seed % 997}/{i})\n"
+            f"Recommended book and reference material: {' '.join(_words(seed + i, 20))}."
+        )
+    return "\n\n".join(lines)
+
+
+def _fake_web_search_forward(self, query):
+    return _fake_web_results(query)
+
+
+def _network_disabled(*args, **kwargs):
+    raise RuntimeError("Network access is disabled in the offline benchmark")
+
+
+# Agent stand-in
+
+class FakeAgent:
+    """Answers in one step, like an agent whose first tool call sufficed"""
+    max_steps = 8
+
+    def run(self, task, stream=False, max_steps=None):
+        from smolagents import FinalAnswerStep
+
+        output = "```python\n" + "\n".join(f"# {w}" for w in _words(_seed(task), 12)) + "\n```"
+        if not stream:
+            return output
+        return iter([FinalAnswerStep(output=output)])
+
+
+def offline_stand_ins(stack, token_delay_s=0.0):
+    """Enters the engine, network and agent stand-ins on an ExitStack and points
+    the on-disk stores at empty paths, so runs do not depend on local data."""
+    import smolagents
+    import async_tools
+    from config import config
+    from metrics import timed_tool
+    from tracing import traced
+
+    scratch = stack.enter_context(tempfile.TemporaryDirectory())
+    for name, value in {
+        "ENABLE_RESPONSE_CACHE": False,
+        "SYLLABUS_LIVE_FALLBACK": False,
+        "SYLLABUS_STORE_PATH": os.path.join(scratch, "syllabus.bin"),
+        "LOCAL_INDEX_PATH": os.path.join(scratch, "knowledge.idx"),
+        "WIKI_CACHE_PATH": os.path.join(scratch, "wiki.sqlite3"),
+    }.items():
+        stack.enter_context(mock.patch.object(config, name, value, create=True))
+
+    @timed_tool("web_search")
+    @traced("tool web_search", tool="web_search")
+    async def fake_async_web_search(query):
+        return _fake_web_results(query)
+
+    patches = [
+        mock.patch("model_utils._stream_text", _make_stream_text(token_delay_s)),
+        mock.patch("model_utils._astream_text", _make_astream_text(token_delay_s)),
+        mock.patch("wiki_cache.search", _fake_search),
+        mock.patch("wiki_cache.page", _fake_page),
+        mock.patch("wiki_cache.asearch", _fake_asearch),
+        mock.patch("wiki_cache.apage", _fake_apage),
+        mock.patch.object(smolagents.WebSearchTool, "forward", _fake_web_search_forward),
+        mock.patch.object(async_tools, "web_search", fake_async_web_search),
+        mock.patch("app_logic.get_agent", lambda name: FakeAgent()),
+        mock.patch("app_logic._web_search_tool", None),
+        mock.patch("requests.sessions.Session.request", _network_disabled),
+        mock.patch("httpx.AsyncClient.send", _network_disabled),
+    ]
+    for patch in patches:
+        stack.enter_context(patch)
+
+
+# Scenarios
+
+def build_scenarios(use_async=False):
+    """
+    Returns {scenario name: [(function, args), ...]} covering every bundled prompt.
+    """
+    import app_logic
+    from constants import EXAMPLES, EXAMS, REGIONAL_TOPICS, REGIONS, SUBJECTS, TRENDING
+    from enhanced_examples import EXAMPLES_UPDATED, REGIONAL_PROMPTS
+
+    suffix = "_async" if use_async else ""
+    app_fn = getattr(app_logic, f"app_fn{suffix}")
+    scenarios = defaultdict(list)
+
+    tab_prompts = defaultdict(list)
+    for examples in (EXAMPLES, EXAMPLES_UPDATED):
+        for tab, prompts in examples.items():
+            tab_prompts["Exam" if tab == "Education" else tab].extend(prompts)
+    tab_prompts["Trending"].extend(TRENDING)
+    for tab, prompts in tab_prompts.items():
+        for i, prompt in enumerate(dict.fromkeys(prompts)):
+            mode = "think" if i % 2 == 0 else "non-think"
+            scenarios[f"app_fn/{tab}"].append((app_fn, (tab, prompt, mode, True)))
+
+    syllabus = getattr(app_logic, f"get_syllabus_info{suffix}")
+    tips = getattr(app_logic, f"get_study_tips{suffix}")
+    exam_qa = getattr(app_logic, f"exam_qa{suffix}")
+    questions = EXAMPLES_UPDATED["Education"]
+    for i, exam in enumerate(EXAMS):
+        subject = SUBJECTS[exam][0]
+        scenarios["exam/syllabus"].append((syllabus, (exam, subject)))
+        scenarios["exam/study_tips"].append((tips, (exam, subject)))
+        scenarios["exam/qa"].append((exam_qa, (exam, subject, questions[i % len(questions)])))
+
+    regional = getattr(app_logic, f"generate_regional_query{suffix}")
+    states = [(region, state) for region, names in REGIONS.items() for state in names]
+    topics = list(REGIONAL_TOPICS)
+    for i, prompt in enumerate(REGIONAL_PROMPTS):
+        region, state = states[i % len(states)]
+        scenarios["regional"].append((regional, (region, state, topics[i % len(topics)], prompt)))
+    return dict(scenarios)
+
+
+def _drain(loop, result):
+    """Consumes whatever a handler returned: a value, a generator, a coroutine or an async generator"""
+    if inspect.isasyncgen(result):
+        async def consume():
+            async for _ in result:
+                pass
+        return loop.run_until_complete(consume())
+    if inspect.iscoroutine(result):
+        return loop.run_until_complete(result)
+    if inspect.isgenerator(result):
+        for _ in result:
+            pass
+    return result
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_benchmark(repeat=5, use_async=False, token_delay_ms=0.0, warmup=1):
+    """
+    Runs every scenario under the offline stand-ins.
+
+    Returns:
+        {scenario: {requests, p50_ms, p95_ms, mean_ms, requests_per_s, peak_kb,
+        retained_kb, prompt_tokens, stages: {span name: {p50_ms, calls_per_request}}}}
+        where prompt_tokens is the mean prompt length (in words) sent to generation
+    """
+    spans = []
+    results = {}
+    loop = asyncio.new_event_loop()
+    with ExitStack() as stack:
+        offline_stand_ins(stack, token_delay_ms / 1000.0)
+        stack.enter_context(mock.patch("tracing._export", spans.append))
+        scenarios = build_scenarios(use_async)
+
+        for name, calls in scenarios.items():
+            for _ in range(warmup):
+                for fn, args in calls:
+                    _drain(loop, fn(*args))
+
+            latencies = []
+            prompt_tokens = []
+            stage_durations = defaultdict(list)
+            start_all = time.perf_counter()
+            for _ in range(repeat):
+                for fn, args in calls:
+                    spans.clear()
+                    start = time.perf_counter()
+                    _drain(loop, fn(*args))
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    for record in spans:
+                        stage_durations[record["name"]].append(record["duration_ms"])
+                        if record["name"] == "generate" and "prompt_tokens" in record["attributes"]:
+                            prompt_tokens.append(record["attributes"]["prompt_tokens"])
+            wall_s = time.perf_counter() - start_all
+
+            tracemalloc.start()
+            peaks, retained = [], 0
+            for fn, args in calls:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                _drain(loop, fn(*args))
+                current, peak = tracemalloc.get_traced_memory()
+                peaks.append(peak - before)
+                retained += max(0, current - before)
+            tracemalloc.stop()
+
+            count = len(latencies)
+            results[name] = {
+                "requests": count,
+                "p50_ms": round(statistics.median(latencies), 3),
+                "p95_ms": round(_percentile(latencies, 0.95), 3),
+                "mean_ms": round(statistics.fmean(latencies), 3),
+                "requests_per_s": round(count / wall_s, 1) if wall_s else 0.0,
+                "peak_kb": round(max(peaks) / 1024, 1),
+                "retained_kb": round(retained / 1024, 1),
+                "prompt_tokens": round(statistics.fmean(prompt_tokens), 1) if prompt_tokens else None,
+                "stages": {
+                    stage: {
+                        "p50_ms": round(statistics.median(durations), 3),
+                        "calls_per_request": round(len(durations) / count, 2),
+                    }
+                    for stage, durations in sorted(stage_durations.items())
+                },
+            }
+    loop.close()
+    return results
+
+
+def compare(current, baseline, tolerance):
+    """
+    Lists regressions of current results against a baseline.
+
+    Returns:
+        List of human-readable regression lines; empty when nothing regressed
+    """
+    regressions = []
+
+    def check(label, now, before, floor, unit):
+        if before is None or now is None:
+            return
+        if now > before * (1 + tolerance) and now - before > floor:
+            regressions.append(f"{label}: {before:.3f}{unit} -> {now:.3f}{unit} (+{(now / before - 1) * 100 if before else float('inf'):.0f}%)")
+
+    for name, old in baseline.get("scenarios", {}).items():
+        new = current.get(name)
+        if new is None:
+            continue
+        check(f"{name} p50", new["p50_ms"], old.get("p50_ms"), LATENCY_FLOOR_MS, "ms")
+        check(f"{name} p95", new["p95_ms"], old.get("p95_ms"), LATENCY_FLOOR_MS, "ms")
+        check(f"{name} peak memory", new["peak_kb"], old.get("peak_kb"), MEMORY_FLOOR_KB, "KB")
+        check(f"{name} prompt tokens", new.get("prompt_tokens"), old.get("prompt_tokens"), 1.0, "")
+        for stage, old_stage in old.get("stages", {}).items():
+            new_stage = new["stages"].get(stage)
+            if new_stage is not None:
+                check(f"{name} stage '{stage}' p50", new_stage["p50_ms"], old_stage.get("p50_ms"), LATENCY_FLOOR_MS, "ms")
+    return regressions
+
+
+def _environment(args):
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor_count": os.cpu_count(),
+        "repeat": args.repeat,
+        "async": args.use_async,
+        "token_delay_ms": args.token_delay_ms,
+    }
+
+
+def print_report(results):
+    columns = ["scenario", "requests", "p50_ms", "p95_ms", "requests_per_s", "peak_kb", "retained_kb", "prompt_tokens"]
+    print("  ".join(c.rjust(14) if i else c.ljust(18) for i, c in enumerate(columns)))
+    for name, row in results.items():
+        print("  ".join([name.ljust(18)] + [str(row[c]).rjust(14) for c in columns[1:]]))
+    print("\nPer-stage p50 latency (ms) and calls per request:")
+    for name, row in results.items():
+        stages = ", ".join(f"{stage} {s['p50_ms']:.2f} x{s['calls_per_request']:g}" for stage, s in row["stages"].items())
+        print(f"  {name}: {stages}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes over each scenario's prompts")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Replay through the async handlers")
+    parser.add_argument("--token-delay-ms", type=float, default=0.0, help="Simulated decode time per token")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if any metric regressed against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown before a check fails")
+    parser.add_argument("--json", action="store_true", help="Print the raw results as JSON")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.repeat, args.use_async, args.token_delay_ms)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        print_report(results)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"environment": _environment(args), "scenarios": results}, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"\nNo baseline at {args.baseline}; run with --save-baseline first", file=sys.stderr)
+            sys.exit(2)
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("environment", {}) != _environment(args):
+            print(f"\nNote: baseline environment {baseline.get('environment')} differs from this run", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
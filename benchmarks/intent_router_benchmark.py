@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the app_fn keyword router.
+
+Compares the original routing style (repeated prompt.lower() plus any(word in ...)
+per keyword list, then loops over EXAMS and SUBJECTS) with the single-pass
+Aho-Corasick IntentRouter, while the keyword sets grow with synthetic keywords.
+The naive cost grows with the number of keywords; the automaton's stays flat.
+
+Usage:
+    python benchmarks/intent_router_benchmark.py [--iterations 2000]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from constants import EXAMS, SUBJECTS
+from intent_router import ROUTING_KEYWORDS, IntentRouter
+
+PROMPTS = [
+    "What is the latest news about the Onam festival in Kerala?",
+    "Generate a mock question for JEE Physics on rotational motion",
+    "यूपीएससी इतिहास का पाठ्यक्रम और तैयारी की किताबें बताइए",
+    "Please review this code and improve the algorithm for sorting",
+    "திருவிழாவில் என்ன நடக்கும்? பாரம்பரிய உணவுகள் எவை?",
+    "Solve the equation 3x + 5 = 20 and explain each step",
+]
+
+
+def _grow(keywords, extra):
+    """Copies the keyword groups and adds `extra` random words to each"""
+    rng = random.Random(0)
+    grown = {}
+    for group, lists in keywords.items():
+        words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10))) for _ in range(extra)]
+        grown[group] = {"en": lists["en"] + words, "indic": lists["indic"]}
+    return grown
+
+
+def naive_route(tab, prompt, keywords):
+    """The original app_fn routing: one lower() and one any() per keyword list"""
+    flat = {group: lists["en"] + lists["indic"] for group, lists in keywords.items()}
+    if tab == "Culture" or any(word in prompt.lower() for word in flat["culture"]):
+        intent = "culture"
+    elif tab == "Math/Logic" or any(word in prompt.lower() for word in flat["math"]):
+        intent = "math"
+    elif tab == "Code" or any(word in prompt.lower() for word in flat["code"]):
+        intent = "code"
+    elif tab == "Exam":
+        intent = "exam"
+    else:
+        intent = "default"
+    for group in ("recent", "compute", "review", "syllabus", "materials", "generate", "question"):
+        any(word in prompt.lower() for word in flat[group])
+    exam = next((e for e in EXAMS if e.lower() in prompt.lower()), None)
+    subject = None
+    if exam:
+        subject = next((s for s in SUBJECTS.get(exam, []) if s.lower() in prompt.lower()), None)
+    return intent, exam, subject
+
+
+def _time_per_call_us(fn, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(PROMPTS[i % len(PROMPTS)])
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'keywords':>10}  {'naive us/call':>14}  {'router us/call':>15}  {'build ms':>9}")
+    for extra in [0, 10, 100, 1000]:
+        keywords = _grow(ROUTING_KEYWORDS, extra)
+        total = sum(len(l["en"]) + len(l["indic"]) for l in keywords.values())
+        start = time.perf_counter()
+        router = IntentRouter(keywords=keywords)
+        build_ms = (time.perf_counter() - start) * 1000
+        naive = _time_per_call_us(lambda p: naive_route("Default", p, keywords), args.iterations)
+        fast = _time_per_call_us(lambda p: router.route("Default", p), args.iterations)
+        print(f"{total:>10}  {naive:>14.1f}  {fast:>15.1f}  {build_ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
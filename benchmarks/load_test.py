@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test of the Gradio app against a stub model.
+
+Launches the ui.build_ui() app in-process, with the real Gradio queue and handler
+wiring, and drives its API endpoints with many simulated users through
+gradio_client. The model and the external sources are replaced with local
+stand-ins, so the results reflect thread pools, queue settings and engine
+serialization rather than model quality:
+
+- the engine streams prompt-seeded tokens at --token-delay-ms each, after a
+  --prefill-ms delay, and decodes at most --engine-slots requests at a time
+  (the scheduler's batch size, or 1 for unbatched generate())
+- Wikipedia and web search answer after --tool-delay-ms (jittered +/-50%) and
+  fail with probability --tool-fault-rate; agents take one tool delay per run
+
+Users either send back to back (closed loop, with --think-time-s between
+requests) or take requests from a Poisson arrival process at --rate requests/s
+(open loop). Latency is measured from the arrival time, so requests waiting for
+a free user count against it. Each concurrency level reports throughput, latency
+and time-to-first-output percentiles, the Gradio queueing delay (submit until
+the handler starts), the wait for an engine slot and the most requests one
+endpoint had running at once.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 1,4,8,16 --duration 30
+    python benchmarks/load_test.py --concurrency 8 --rate 2 --mix chat_culture=3,exam_qa=1
+    python benchmarks/load_test.py --concurrency 4,8,16,32 --target-p99-s 20 \\
+        --gradio-concurrency 8 --token-delay-ms 30 --tool-delay-ms 400 --tool-fault-rate 0.05
+
+Requires gradio (and its gradio_client). --url points the load at an already
+running app instead; the stand-ins then do not apply.
+"""
+import argparse
+import asyncio
+import os
+import queue
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from e2e_benchmark import FakeAgent, _fake_page, _fake_search, _fake_tokens, _fake_web_results, offline_stand_ins
+
+# Job status codes after which the handler is running
+_STARTED = {"PROCESSING", "ITERATING", "PROGRESS", "FINISHED"}
+_POLL_S = 0.005
+
+
+class InjectedFault(ConnectionError):
+    """Failure raised by the stand-in tool backends"""
+
+
+class FakeEngine:
+    """
+    Token streamer with a fixed number of decode slots. Requests beyond the slots
+    wait, like requests queued behind a full batch or a busy generate() call.
+    """
+
+    def __init__(self, slots, token_delay_s, prefill_s):
+        self._slots = threading.BoundedSemaphore(max(1, slots))
+        self.token_delay_s = token_delay_s
+        self.prefill_s = prefill_s
+        self.waits = []  # (acquired at, seconds waited)
+
+    def _acquired(self, start):
+        now = time.perf_counter()
+        self.waits.append((now, now - start))
+
+    def stream_text(self, prompt, usage=None, **generation_kwargs):
+        start = time.perf_counter()
+        self._slots.acquire()
+        self._acquired(start)
+        tokens = _fake_tokens(prompt)
+        try:
+            time.sleep(self.prefill_s)
+            for token in tokens:
+                time.sleep(self.token_delay_s)
+                yield token
+        finally:
+            self._slots.release()
+        if usage is not None:
+            usage["prompt_tokens"] = len(prompt.split())
+            usage["output_tokens"] = len(tokens)
+
+    async def astream_text(self, prompt, usage=None, **generation_kwargs):
+        start = time.perf_counter()
+        # Polling keeps waiting requests off the thread pool
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(0.001)
+        self._acquired(start)
+        tokens = _fake_tokens(prompt)
+        try:
+            await asyncio.sleep(self.prefill_s)
+            for token in tokens:
+                await asyncio.sleep(self.token_delay_s)
+                yield token
+        finally:
+            self._slots.release()
+        if usage is not None:
+            usage["prompt_tokens"] = len(prompt.split())
+            usage["output_tokens"] = len(tokens)
+
+
+class FaultyBackend:
+    """Wraps the canned tool backends with jittered delays and random failures"""
+
+    def __init__(self, delay_s, fault_rate, seed=0):
+        self.delay_s = delay_s
+        self.fault_rate = fault_rate
+        self._random = random.Random(seed)
+        self.faults = 0
+
+    def _delay(self):
+        return self.delay_s * self._random.uniform(0.5, 1.5)
+
+    def _maybe_fail(self, name):
+        if self._random.random() < self.fault_rate:
+            self.faults += 1
+            raise InjectedFault(f"Injected {name} failure")
+
+    def wrap(self, name, function):
+        def call(*args, **kwargs):
+            time.sleep(self._delay())
+            self._maybe_fail(name)
+            return function(*args, **kwargs)
+        return call
+
+    def wrap_async(self, name, function):
+        async def call(*args, **kwargs):
+            await asyncio.sleep(self._delay())
+            self._maybe_fail(name)
+            return function(*args, **kwargs)
+        return call
+
+
+class SlowAgent(FakeAgent):
+    """Stand-in agent spending one tool call per run"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def run(self, task, stream=False, max_steps=None):
+        self.backend.wrap("agent tool", lambda: None)()
+        return super().run(task, stream=stream, max_steps=max_steps)
+
+
+def load_stand_ins(stack, args):
+    """
+    Enters the e2e benchmark's offline stand-ins, then replaces the engine, tool
+    backends and agents with the slower, fault-injecting versions above.
+
+    Returns:
+        (FakeEngine, FaultyBackend)
+    """
+    import smolagents
+    import async_tools
+    from config import config
+    from metrics import timed_tool
+    from tracing import traced
+
+    offline_stand_ins(stack)
+    engine = FakeEngine(args.engine_slots, args.token_delay_ms / 1000.0, args.prefill_ms / 1000.0)
+    backend = FaultyBackend(args.tool_delay_ms / 1000.0, args.tool_fault_rate, seed=args.seed)
+    scratch = stack.enter_context(tempfile.TemporaryDirectory())
+
+    @timed_tool("web_search")
+    @traced("tool web_search", tool="web_search")
+    async def web_search(query):
+        return await backend.wrap_async("web search", _fake_web_results)(query)
+
+    web_forward = backend.wrap("web search", _fake_web_results)
+    patches = [
+        mock.patch("model_utils._stream_text", engine.stream_text),
+        mock.patch("model_utils._astream_text", engine.astream_text),
+        mock.patch("wiki_cache.search", backend.wrap("wikipedia search", _fake_search)),
+        mock.patch("wiki_cache.page", backend.wrap("wikipedia page", _fake_page)),
+        mock.patch("wiki_cache.asearch", backend.wrap_async("wikipedia search", _fake_search)),
+        mock.patch("wiki_cache.apage", backend.wrap_async("wikipedia page", _fake_page)),
+        mock.patch.object(smolagents.WebSearchTool, "forward", lambda self, query: web_forward(query)),
+        mock.patch.object(async_tools, "web_search", web_search),
+        mock.patch("app_logic.get_agent", lambda name: SlowAgent(backend)),
+        mock.patch.object(config, "ENABLE_ASYNC_HANDLERS", not args.sync_handlers),
+        mock.patch.object(config, "TRACE_FILE", os.path.join(scratch, "traces.jsonl")),
+    ]
+    for patch in patches:
+        stack.enter_context(patch)
+    return engine, backend
+
+
+def launch_app(args):
+    """
+    Builds and launches the UI in-process on a free local port.
+
+    Returns:
+        (launched Blocks app, local URL)
+    """
+    from ui import build_ui, configure_queue
+
+    demo = configure_queue(build_ui(), args.gradio_concurrency, args.gradio_queue_size)
+    demo.launch(server_name="127.0.0.1", prevent_thread_lock=True, quiet=True, max_threads=args.gradio_threads)
+    return demo, demo.local_url
+
+
+def build_workload(mix):
+    """
+    Returns [(api name, weight, [argument tuples])] for the endpoints in mix,
+    using the bundled examples as prompts.
+    """
+    from constants import EXAMPLES, EXAMS, SUBJECTS
+    from enhanced_examples import EXAMPLES_UPDATED
+    from ui import chat_api_name
+
+    endpoints = {}
+    for tab, prompts in EXAMPLES.items():
+        endpoints[chat_api_name(tab)] = [(prompt, mode, True) for prompt in prompts for mode in ("think", "non-think")]
+    exam_pairs = [(exam, SUBJECTS[exam][0]) for exam in EXAMS]
+    questions = EXAMPLES_UPDATED["Education"]
+    endpoints["exam_qa"] = [(exam, subject, questions[i % len(questions)]) for i, (exam, subject) in enumerate(exam_pairs)]
+    endpoints["syllabus"] = exam_pairs
+    endpoints["study_tips"] = exam_pairs
+
+    weights = {name: 1.0 for name in endpoints}
+    if mix:
+        weights = {}
+        for item in mix.split(","):
+            name, _, weight = item.partition("=")
+            name = name.strip()
+            if name not in endpoints:
+                raise SystemExit(f"Unknown endpoint '{name}' in --mix; choose from {', '.join(endpoints)}")
+            weights[name] = float(weight or 1)
+    return [(name, weight, endpoints[name]) for name, weight in weights.items() if weight > 0]
+
+
+def _run_job(client, api_name, arguments, arrival):
+    """Submits one request and follows its status until it finishes"""
+    record = {"endpoint": api_name, "arrival": arrival, "submitted": time.perf_counter(),
+              "started": None, "first_output": None, "finished": None, "error": None}
+    job = client.submit(*arguments, api_name=f"/{api_name}")
+    status_name = None
+    while not job.done():
+        now = time.perf_counter()
+        status_name = job.status().code.name
+        if record["started"] is None and status_name in _STARTED:
+            record["started"] = now
+        if record["first_output"] is None and job.outputs():
+            record["first_output"] = now
+        time.sleep(_POLL_S)
+    try:
+        job.result()
+    except Exception as e:
+        full = status_name == "QUEUE_FULL" or "queue is full" in str(e).lower()
+        record["error"] = "queue_full" if full else type(e).__name__
+    record["finished"] = time.perf_counter()
+    record["started"] = record["started"] or record["first_output"] or record["finished"]
+    record["first_output"] = record["first_output"] or record["finished"]
+    return record
+
+
+def run_level(client, workload, users, args):
+    """
+    Runs one concurrency level for warmup + duration seconds.
+
+    Returns:
+        (records of requests that arrived after the warmup, window start, window end)
+    """
+    rng = random.Random(args.seed + users)
+    names, weights, arguments = zip(*workload)
+    records = []
+    start = time.perf_counter()
+    window_start = start + args.warmup
+    stop_at = window_start + args.duration
+
+    def pick():
+        i = rng.choices(range(len(names)), weights=weights)[0]
+        return names[i], rng.choice(arguments[i])
+
+    arrivals = queue.Queue()
+
+    def produce():
+        # Poisson arrivals, handed to whichever user is free
+        arrival = time.perf_counter()
+        while arrival < stop_at:
+            arrivals.put((arrival, *pick()))
+            arrival += rng.expovariate(args.rate)
+        for _ in range(users):
+            arrivals.put(None)
+
+    def open_loop_user():
+        while True:
+            item = arrivals.get()
+            if item is None:
+                return
+            arrival, name, call_args = item
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            records.append(_run_job(client, name, call_args, arrival))
+
+    def closed_loop_user():
+        while time.perf_counter() < stop_at:
+            name, call_args = pick()
+            records.append(_run_job(client, name, call_args, time.perf_counter()))
+            if args.think_time_s:
+                time.sleep(args.think_time_s)
+
+    threads = [threading.Thread(target=open_loop_user if args.rate else closed_loop_user, daemon=True)
+               for _ in range(users)]
+    if args.rate:
+        threads.append(threading.Thread(target=produce, daemon=True))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [r for r in records if r["arrival"] >= window_start], window_start, stop_at
+
+
+def _percentile(values, fraction):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _peak_in_flight(records):
+    """Most requests of one endpoint whose handlers were running at the same time"""
+    peak = 0
+    for endpoint in {r["endpoint"] for r in records}:
+        # Ends sort before starts at the same instant
+        events = sorted((t, delta) for r in records if r["endpoint"] == endpoint
+                        for t, delta in ((r["started"], 1), (r["finished"], -1)))
+        running = 0
+        for _, delta in events:
+            running += delta
+            peak = max(peak, running)
+    return peak
+
+
+def summarize(records, engine_waits, duration):
+    """
+    Returns the report row of one level: counts, throughput and percentiles in seconds
+    """
+    ok = [r for r in records if r["error"] is None]
+    latency = [r["finished"] - r["arrival"] for r in ok]
+    first_output = [r["first_output"] - r["arrival"] for r in ok]
+    gradio_queue = [r["started"] - r["submitted"] for r in ok]
+    user_wait = [r["submitted"] - r["arrival"] for r in ok]
+    return {
+        "requests": len(records),
+        "errors": dict(Counter(r["error"] for r in records if r["error"])),
+        "throughput": len(ok) / duration if duration else 0.0,
+        "latency_p50": _percentile(latency, 0.50),
+        "latency_p90": _percentile(latency, 0.90),
+        "latency_p99": _percentile(latency, 0.99),
+        "first_output_p50": _percentile(first_output, 0.50),
+        "first_output_p99": _percentile(first_output, 0.99),
+        "queue_p50": _percentile(gradio_queue, 0.50),
+        "queue_p99": _percentile(gradio_queue, 0.99),
+        "user_wait_p99": _percentile(user_wait, 0.99),
+        "engine_wait_p99": _percentile(engine_waits, 0.99),
+        "peak_in_flight": _peak_in_flight(ok),
+        "mean_latency": statistics.fmean(latency) if latency else float("nan"),
+    }
+
+
+def print_row(users, row, header=False):
+    columns = [("users", "{}"), ("requests", "{}"), ("ok/s", "{:.2f}"), ("p50_s", "{:.2f}"), ("p90_s", "{:.2f}"),
+               ("p99_s", "{:.2f}"), ("ttfo_p50", "{:.2f}"), ("ttfo_p99", "{:.2f}"), ("queue_p50", "{:.2f}"),
+               ("queue_p99", "{:.2f}"), ("engine_p99", "{:.2f}"), ("in_flight", "{}"), ("errors", "{}")]
+    if header:
+        print("  ".join(name.rjust(10) for name, _ in columns))
+    values = [users, row["requests"], row["throughput"], row["latency_p50"], row["latency_p90"], row["latency_p99"],
+              row["first_output_p50"], row["first_output_p99"], row["queue_p50"], row["queue_p99"],
+              row["engine_wait_p99"], row["peak_in_flight"], sum(row["errors"].values())]
+    print("  ".join(fmt.format(value).rjust(10) for (_, fmt), value in zip(columns, values)))
+
+
+def main():
+    from config import config
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,4,8,16", help="Comma-separated numbers of simulated users")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds per concurrency level")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before each level")
+    parser.add_argument("--rate", type=float, default=0.0, help="Poisson arrivals per second (0 = closed loop)")
+    parser.add_argument("--think-time-s", type=float, default=0.0, help="Pause between a user's requests (closed loop)")
+    parser.add_argument("--mix", default="", help="Endpoint weights, e.g. chat_culture=3,chat_code=1,exam_qa=1")
+    parser.add_argument("--target-p99-s", type=float, default=None, help="Report the highest level within this p99")
+    parser.add_argument("--url", default=None, help="Load an already running app instead (no stand-ins)")
+    parser.add_argument("--gradio-concurrency", type=int, default=config.GRADIO_CONCURRENCY_LIMIT,
+                        help="Concurrent runs per event (0 = sized to the handlers)")
+    parser.add_argument("--gradio-queue-size", type=int, default=config.GRADIO_MAX_QUEUE_SIZE)
+    parser.add_argument("--gradio-threads", type=int, default=config.GRADIO_MAX_THREADS)
+    parser.add_argument("--sync-handlers", action="store_true", help="Wire the sync handlers instead of the async ones")
+    default_slots = config.SCHEDULER_MAX_BATCH_SIZE if config.ENABLE_CONTINUOUS_BATCHING else 1
+    parser.add_argument("--engine-slots", type=int, default=default_slots, help="Concurrent generations")
+    parser.add_argument("--token-delay-ms", type=float, default=25.0)
+    parser.add_argument("--prefill-ms", type=float, default=150.0)
+    parser.add_argument("--tool-delay-ms", type=float, default=300.0)
+    parser.add_argument("--tool-fault-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from gradio_client import Client
+    from ui import queue_concurrency_limit
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    workload = build_workload(args.mix)
+    with ExitStack() as stack:
+        engine, backend = None, None
+        url = args.url
+        if url is None:
+            engine, backend = load_stand_ins(stack, args)
+            demo, url = launch_app(args)
+            stack.callback(demo.close)
+        concurrency = queue_concurrency_limit(args.gradio_concurrency)
+        print(f"Target {url}: gradio concurrency {concurrency or 'unbounded'}, queue size {args.gradio_queue_size or 'unbounded'}, "
+              f"{'sync' if args.sync_handlers else 'async'} handlers, {args.engine_slots} engine slot(s)")
+
+        results = {}
+        for i, users in enumerate(levels):
+            # gradio_client runs each job's result, cancellation watch and status updates on
+            # this pool, next to the app's event stream; a starved pool stalls status and outputs
+            client = Client(url, verbose=False, max_workers=max(40, 4 * users + 1))
+            faults = backend.faults if backend else 0
+            records, window_start, window_end = run_level(client, workload, users, args)
+            engine_waits = [wait for at, wait in (engine.waits if engine else []) if window_start <= at < window_end]
+            results[users] = summarize(records, engine_waits, window_end - window_start)
+            print_row(users, results[users], header=i == 0)
+            if backend and backend.faults > faults:
+                print(f"{'':>10}  {backend.faults - faults} tool fault(s) injected")
+
+        for users, row in results.items():
+            if row["errors"]:
+                print(f"Errors at {users} users: {row['errors']}")
+        if args.target_p99_s is not None:
+            passing = [users for users, row in results.items() if row["latency_p99"] <= args.target_p99_s]
+            if passing:
+                print(f"\nHighest level within p99 {args.target_p99_s:g}s: {max(passing)} users")
+            else:
+                print(f"\nNo level kept p99 within {args.target_p99_s:g}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,128 @@ class Config:
     DEBUG = os.getenv('DEBUG', 'false').lower() == 'true'
     MAX_HISTORY_LENGTH = int(os.getenv('MAX_HISTORY_LENGTH', 10))
     
+    # Build the model and agents on a background thread at startup instead of on first request
+    WARM_UP_ON_START = os.getenv('WARM_UP_ON_START', 'true').lower() == 'true'
+    
+    # Wire the async handlers (non-blocking tool I/O and generation) into the UI
+    ENABLE_ASYNC_HANDLERS = os.getenv('ENABLE_ASYNC_HANDLERS', 'true').lower() == 'true'
+    
+    # Gradio request queue: concurrent runs per event, waiting requests (0 = unbounded) and sync worker threads.
+    # A concurrency limit of 0 picks one to suit the handlers: unbounded for the async handlers, and
+    # SCHEDULER_MAX_BATCH_SIZE for the sync ones, so the scheduler can fill a batch from one tab
+    GRADIO_CONCURRENCY_LIMIT = int(os.getenv('GRADIO_CONCURRENCY_LIMIT', 0))
+    GRADIO_MAX_QUEUE_SIZE = int(os.getenv('GRADIO_MAX_QUEUE_SIZE', 0))
+    GRADIO_MAX_THREADS = int(os.getenv('GRADIO_MAX_THREADS', 40))
+    
+    # Inference backend: "cuda", "cpu" (fp32) or "cpu-int8" (dynamic int8 quantization)
+    INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'cuda').lower()
+    QUANTIZED_MODEL_DIR = os.getenv('QUANTIZED_MODEL_DIR', 'cache/quantized')
+    
+    # Greedy decoding instead of sampling; makes cached answers reproducible
+    DETERMINISTIC_DECODING = os.getenv('DETERMINISTIC_DECODING', 'false').lower() == 'true'
+    
+    # Response cache (in-memory LRU + SQLite on disk, with TTL and in-flight deduplication)
+    ENABLE_RESPONSE_CACHE = os.getenv('ENABLE_RESPONSE_CACHE', 'true').lower() == 'true'
+    RESPONSE_CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH', 'cache/responses.sqlite3')
+    RESPONSE_CACHE_MEMORY_ENTRIES = int(os.getenv('RESPONSE_CACHE_MEMORY_ENTRIES', 256))
+    RESPONSE_CACHE_DISK_ENTRIES = int(os.getenv('RESPONSE_CACHE_DISK_ENTRIES', 5000))
+    RESPONSE_CACHE_TTL_S = int(os.getenv('RESPONSE_CACHE_TTL_S', 86400))
+    RESPONSE_CACHE_WAIT_S = int(os.getenv('RESPONSE_CACHE_WAIT_S', 300))
+    
+    # Shared Wikipedia cache used by all agent tools
+    WIKI_CACHE_PATH = os.getenv('WIKI_CACHE_PATH', 'cache/wikipedia.sqlite3')
+    WIKI_CACHE_MAX_BYTES = int(os.getenv('WIKI_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+    WIKI_CACHE_TTL_S = int(os.getenv('WIKI_CACHE_TTL_S', 7 * 86400))
+    WIKI_SEARCH_TTL_S = int(os.getenv('WIKI_SEARCH_TTL_S', 86400))
+    
+    # Concurrent lookups inside the context-gathering tools
+    TOOL_FANOUT_WORKERS = int(os.getenv('TOOL_FANOUT_WORKERS', 16))
+    TOOL_WIKIPEDIA_DEADLINE_S = float(os.getenv('TOOL_WIKIPEDIA_DEADLINE_S', 8))
+    TOOL_WEB_SEARCH_DEADLINE_S = float(os.getenv('TOOL_WEB_SEARCH_DEADLINE_S', 8))
+    
+    # Per-request latency budget; augmentation only spends what the generation reserve leaves
+    REQUEST_BUDGET_S = float(os.getenv('REQUEST_BUDGET_S', 30))
+    GENERATION_RESERVE_S = float(os.getenv('GENERATION_RESERVE_S', 15))
+    STAGE_MIN_BUDGET_S = float(os.getenv('STAGE_MIN_BUDGET_S', 1.0))
+    AGENT_STEP_ESTIMATE_S = float(os.getenv('AGENT_STEP_ESTIMATE_S', 4))
+    
+    # Shared keep-alive HTTP client used by visit_webpage and the async tools
+    HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 16))
+    HTTP_VALIDATOR_CACHE_BYTES = int(os.getenv('HTTP_VALIDATOR_CACHE_BYTES', 32 * 1024 * 1024))
+    HTTP_TIMEOUT_S = float(os.getenv('HTTP_TIMEOUT_S', 10))
+    HTTP_ASYNC_MAX_CONNECTIONS = int(os.getenv('HTTP_ASYNC_MAX_CONNECTIONS', 200))
+    
+    # Bounds on what visit_webpage downloads and returns to the agents
+    VISIT_WEBPAGE_MAX_BYTES = int(os.getenv('VISIT_WEBPAGE_MAX_BYTES', 2 * 1024 * 1024))
+    VISIT_WEBPAGE_MAX_CHARS = int(os.getenv('VISIT_WEBPAGE_MAX_CHARS', 8000))
+    
+    # Prebuilt syllabus store (python syllabus_store.py build); the live fallback scrapes entries missing
+    # from the store, and lookups always scrape while no store file exists
+    SYLLABUS_STORE_PATH = os.getenv('SYLLABUS_STORE_PATH', 'data/syllabus.bin')
+    SYLLABUS_LIVE_FALLBACK = os.getenv('SYLLABUS_LIVE_FALLBACK', 'false').lower() == 'true'
+    
+    # Offline BM25 knowledge index (python local_index.py ingest <corpus>)
+    LOCAL_INDEX_PATH = os.getenv('LOCAL_INDEX_PATH', 'data/knowledge.idx')
+    LOCAL_SEARCH_TOP_K = int(os.getenv('LOCAL_SEARCH_TOP_K', 5))
+    LOCAL_SEARCH_MIN_SCORE = float(os.getenv('LOCAL_SEARCH_MIN_SCORE', 2.0))
+    
+    # Generation length: engine-wide token ceiling, per-profile limits ("Profile[:mode]=tokens,...")
+    # and stopping as soon as the answer is complete (stop sequences, repeated lines)
+    GENERATION_MAX_NEW_TOKENS = int(os.getenv('GENERATION_MAX_NEW_TOKENS', 4096))
+    GENERATION_TOKEN_LIMITS = os.getenv('GENERATION_TOKEN_LIMITS', '')
+    ENABLE_EARLY_STOP = os.getenv('ENABLE_EARLY_STOP', 'true').lower() == 'true'
+    # Reasoning tokens allowed inside a <think> block before </think> is forced (0 = no cap; at most half the token limit)
+    THINK_TOKEN_BUDGET = int(os.getenv('THINK_TOKEN_BUDGET', 1024))
+    
+    # Augmentation context packing: deduplicated, query-ranked sentences within a token budget per tab
+    ENABLE_CONTEXT_PACKING = os.getenv('ENABLE_CONTEXT_PACKING', 'true').lower() == 'true'
+    CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', 512))
+    CONTEXT_TAB_BUDGETS = os.getenv('CONTEXT_TAB_BUDGETS', 'Regional=640,Exam Q&A=640')
+    CONTEXT_DEDUP_THRESHOLD = float(os.getenv('CONTEXT_DEDUP_THRESHOLD', 0.8))
+    
+    # Conversation history per session and tab; MAX_HISTORY_LENGTH caps the turns kept verbatim
+    ENABLE_HISTORY = os.getenv('ENABLE_HISTORY', 'true').lower() == 'true'
+    HISTORY_TOKEN_BUDGET = int(os.getenv('HISTORY_TOKEN_BUDGET', 1024))
+    HISTORY_SUMMARY_TOKENS = int(os.getenv('HISTORY_SUMMARY_TOKENS', 256))
+    HISTORY_LLM_SUMMARY = os.getenv('HISTORY_LLM_SUMMARY', 'true').lower() == 'true'
+    HISTORY_MAX_SESSIONS = int(os.getenv('HISTORY_MAX_SESSIONS', 10000))
+    HISTORY_SESSION_TTL_S = int(os.getenv('HISTORY_SESSION_TTL_S', 3600))
+    
+    # Pre-generated quiz question pool (python question_pool.py fill)
+    QUIZ_POOL_PATH = os.getenv('QUIZ_POOL_PATH', 'data/quiz_pool.sqlite3')
+    QUIZ_POOL_LOW_WATER = int(os.getenv('QUIZ_POOL_LOW_WATER', 5))
+    QUIZ_POOL_BATCH_SIZE = int(os.getenv('QUIZ_POOL_BATCH_SIZE', 10))
+    # Seconds a quiz request may wait for the first refill of an empty pool (it goes ahead
+    # of priming; 0 never puts the model on the request path), and whether warm-up queues
+    # a refill for every exam and subject pool, which competes with chat for the engine
+    QUIZ_POOL_WAIT_S = float(os.getenv('QUIZ_POOL_WAIT_S', 0))
+    QUIZ_POOL_PRIME_ON_START = os.getenv('QUIZ_POOL_PRIME_ON_START', 'false').lower() == 'true'
+    # Per-session quiz state: most sessions kept, and seconds before an idle session is dropped
+    QUIZ_MAX_SESSIONS = int(os.getenv('QUIZ_MAX_SESSIONS', 10000))
+    QUIZ_SESSION_TTL_S = int(os.getenv('QUIZ_SESSION_TTL_S', 1800))
+    
+    # Prometheus-format metrics endpoint, served locally next to the UI
+    ENABLE_METRICS = os.getenv('ENABLE_METRICS', 'true').lower() == 'true'
+    METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', 9464))
+    
+    # Span tracing, appended as JSONL (python tracing.py summary)
+    ENABLE_TRACING = os.getenv('ENABLE_TRACING', 'true').lower() == 'true'
+    TRACE_FILE = os.getenv('TRACE_FILE', 'logs/traces.jsonl')
+    TRACE_MAX_BYTES = int(os.getenv('TRACE_MAX_BYTES', 20 * 1024 * 1024))
+    TRACE_BACKUP_COUNT = int(os.getenv('TRACE_BACKUP_COUNT', 5))
+    
+    # Generation scheduler settings
+    ENABLE_CONTINUOUS_BATCHING = os.getenv('ENABLE_CONTINUOUS_BATCHING', 'true').lower() == 'true'
+    SCHEDULER_MAX_BATCH_SIZE = int(os.getenv('SCHEDULER_MAX_BATCH_SIZE', 8))
+    SCHEDULER_MAX_WAIT_MS = int(os.getenv('SCHEDULER_MAX_WAIT_MS', 20))
+    SCHEDULER_MAX_QUEUE_DEPTH = int(os.getenv('SCHEDULER_MAX_QUEUE_DEPTH', 64))
+    
+    # Reuse the KV state of fixed prompt-template prefixes across requests
+    ENABLE_PREFIX_CACHE = os.getenv('ENABLE_PREFIX_CACHE', 'true').lower() == 'true'
+    PREFIX_CACHE_MAX_ENTRIES = int(os.getenv('PREFIX_CACHE_MAX_ENTRIES', 16))
+    PREFIX_CACHE_MIN_TOKENS = int(os.getenv('PREFIX_CACHE_MIN_TOKENS', 32))
+    
 # Global config instance
 config = Config()
 
@@ -0,0 +1,164 @@
+"""
+Token-aware packing of augmentation context for Bharat AI Buddy
+
+Context gathered for a prompt (offline passages, Wikipedia summaries, web
+results, syllabus text) often repeats itself, and every repeated sentence is
+paid for again at prefill. The packer splits each source into sentences, at
+Latin and Indic (danda) sentence ends and at line breaks, scores them against
+the query with BM25 and adds them in rank order until the tab's context token
+budget is full. A sentence that is a near-duplicate of one already kept is
+dropped. The kept sentences are rendered in their original order under their
+section labels, so the prompt reads as before, only shorter.
+"""
+import logging
+import math
+import re
+from collections import Counter, namedtuple
+
+from config import config
+from history import estimate_tokens
+from local_index import tokenize
+from metrics import CONTEXT_TOKENS
+from tracing import set_attributes
+
+logger = logging.getLogger("bharat_buddy")
+
+# One sentence of a context section; line_end marks the last sentence on its line
+Sentence = namedtuple("Sentence", ["section", "position", "text", "terms", "line_end"])
+
+_SENTENCE_END = re.compile(r"(?<=[.!?।॥])\s+")
+# Sentences longer than this (e.g. unpunctuated search snippets) are cut into pieces
+MAX_SENTENCE_WORDS = 60
+# Terms a sentence needs before containment counts as duplication; shorter ones must match exactly
+_MIN_DEDUP_TERMS = 4
+_K1 = 1.2
+_B = 0.75
+
+
+def split_sentences(text):
+    """
+    Splits text into sentences at ., !, ?, । and ॥ and at line breaks.
+
+    Returns:
+        List of (sentence, line_end) pairs in text order
+    """
+    sentences = []
+    for line in (text or "").splitlines():
+        pieces = [p for p in _SENTENCE_END.split(" ".join(line.split())) if p]
+        for number, piece in enumerate(pieces):
+            words = piece.split(" ")
+            chunks = [" ".join(words[i:i + MAX_SENTENCE_WORDS]) for i in range(0, len(words), MAX_SENTENCE_WORDS)]
+            for chunk_number, chunk in enumerate(chunks):
+                sentences.append((chunk, number == len(pieces) - 1 and chunk_number == len(chunks) - 1))
+    return sentences
+
+
+def _is_duplicate(terms, kept_terms, threshold):
+    """True if terms are (nearly) contained in, or contain, an already kept sentence"""
+    for other in kept_terms:
+        if len(terms) < _MIN_DEDUP_TERMS or len(other) < _MIN_DEDUP_TERMS:
+            if terms == other:
+                return True
+            continue
+        if len(terms & other) / min(len(terms), len(other)) >= threshold:
+            return True
+    return False
+
+
+def _bm25_scores(query_terms, sentences):
+    document_frequency = Counter()
+    for sentence in sentences:
+        document_frequency.update(set(sentence.terms))
+    count = len(sentences)
+    average_length = sum(len(s.terms) for s in sentences) / count or 1
+    weights = {term: math.log(1 + (count - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+               for term in set(query_terms) if document_frequency[term]}
+    scores = []
+    for sentence in sentences:
+        frequencies = Counter(sentence.terms)
+        length_norm = _K1 * (1 - _B + _B * len(sentence.terms) / average_length)
+        scores.append(sum(weight * frequencies[term] * (_K1 + 1) / (frequencies[term] + length_norm)
+                          for term, weight in weights.items() if frequencies[term]))
+    return scores
+
+
+def tab_budget(tab):
+    """Context token budget of a tab: its CONTEXT_TAB_BUDGETS entry, else CONTEXT_TOKEN_BUDGET"""
+    for entry in config.CONTEXT_TAB_BUDGETS.split(","):
+        name, _, value = entry.rpartition("=")
+        if name.strip() == tab and value.strip().isdigit():
+            return int(value)
+    return config.CONTEXT_TOKEN_BUDGET
+
+
+def _render(sections, chosen):
+    parts = []
+    for index, (label, _) in enumerate(sections):
+        kept = sorted((s for s in chosen if s.section == index), key=lambda s: s.position)
+        if not kept:
+            continue
+        body = kept[0].text
+        for previous, sentence in zip(kept, kept[1:]):
+            body += ("\n" if previous.line_end else " ") + sentence.text
+        parts.append(f"\n\n{label}:\n{body}")
+    return "".join(parts)
+
+
+def pack_context(query, sections, tab, budget=None, count_tokens=estimate_tokens):
+    """
+    Packs context sections into the tab's token budget, most relevant sentences first.
+
+    Args:
+        query: The user's question; sentences are ranked by relevance to it
+        sections: List of (label, text) pairs in prompt order; empty texts are skipped
+        tab: UI tab the prompt is for, which picks the budget
+        budget: Token budget overriding the tab's
+        count_tokens: Token counter for sentences and labels
+
+    Returns:
+        Context to append to the prompt, "\\n\\n<label>:\\n<sentences>" per section
+        that kept anything, or "" if there is none
+    """
+    sections = [(label, text) for label, text in sections if text and text.strip()]
+    if not sections:
+        return ""
+    if not config.ENABLE_CONTEXT_PACKING:
+        return "".join(f"\n\n{label}:\n{text}" for label, text in sections)
+
+    budget = tab_budget(tab) if budget is None else budget
+    sentences = [
+        Sentence(index, position, text, tokenize(text), line_end)
+        for index, (_, section_text) in enumerate(sections)
+        for position, (text, line_end) in enumerate(split_sentences(section_text))
+    ]
+    if not sentences:
+        return ""
+    scores = _bm25_scores(tokenize(query), sentences)
+    # Ties (including sentences that share no term with the query) keep source order
+    ranked = sorted(range(len(sentences)), key=lambda i: (-scores[i], sentences[i].section, sentences[i].position))
+
+    chosen, kept_terms = [], []
+    labelled = set()
+    used = raw = duplicates = 0
+    for i in ranked:
+        sentence = sentences[i]
+        tokens = count_tokens(sentence.text)
+        raw += tokens
+        terms = set(sentence.terms) or {sentence.text}
+        if _is_duplicate(terms, kept_terms, config.CONTEXT_DEDUP_THRESHOLD):
+            duplicates += 1
+            continue
+        if sentence.section not in labelled:
+            tokens += count_tokens(sections[sentence.section][0])
+        if used + tokens > budget:
+            continue
+        chosen.append(sentence)
+        kept_terms.append(terms)
+        labelled.add(sentence.section)
+        used += tokens
+
+    CONTEXT_TOKENS.observe(used)
+    set_attributes(context_tokens=used, context_raw_tokens=raw, context_duplicates=duplicates)
+    logger.info(f"Packed {tab} context: {len(chosen)} of {len(sentences)} sentences, {used} of {raw} tokens "
+                f"(budget {budget}, {duplicates} duplicates dropped)")
+    return _render(sections, chosen)
@@ -0,0 +1,121 @@
+"""
+Per-request latency budget for Bharat AI Buddy
+
+Each UI handler opens a Deadline when a request arrives. It lives in a context
+variable, so the tools, the HTTP clients and the agent runner below the handler see
+it without extra parameters; asyncio tasks and asyncio.to_thread copy it
+automatically, and agent_tools._fan_out hands it to its worker threads.
+
+Augmentation stages (tool lookups, agent runs) only spend what is left after
+setting aside a reserve for generation: a stage that would not fit is skipped, and
+network timeouts are capped to the remaining budget. Every dropped or cut stage is
+recorded on the Deadline, so the handler can report it with the response.
+"""
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+from config import config
+
+logger = logging.getLogger("bharat_buddy")
+
+_current = contextvars.ContextVar("request_deadline", default=None)
+
+
+class Deadline:
+    """
+    Time budget of one request.
+
+    Args:
+        budget_s: Total seconds from request entry to the end of the response
+        reserve_s: Seconds kept back for generation; augmentation may only use the rest
+        clock: Time source, overridable for tests
+    """
+
+    def __init__(self, budget_s, reserve_s=0.0, clock=time.monotonic):
+        self.budget_s = budget_s
+        self.reserve_s = reserve_s
+        self._clock = clock
+        self.started_at = clock()
+        self.expires_at = self.started_at + budget_s
+        self.dropped = []
+
+    def elapsed(self):
+        return self._clock() - self.started_at
+
+    def remaining(self):
+        """Seconds left in the whole budget"""
+        return max(0.0, self.expires_at - self._clock())
+
+    def augmentation_remaining(self):
+        """Seconds left for augmentation once the generation reserve is set aside"""
+        return max(0.0, self.remaining() - self.reserve_s)
+
+    def allows(self, stage, estimate_s=None):
+        """
+        True if a stage needing about estimate_s seconds still fits; otherwise the
+        stage is recorded as skipped.
+        """
+        estimate_s = config.STAGE_MIN_BUDGET_S if estimate_s is None else estimate_s
+        left = self.augmentation_remaining()
+        if left >= estimate_s:
+            return True
+        self.drop(stage, f"skipped: needs ~{estimate_s:.1f}s, {left:.1f}s left")
+        return False
+
+    def cap(self, timeout_s):
+        """Limits a timeout to the augmentation time that is left"""
+        return min(timeout_s, self.augmentation_remaining())
+
+    def drop(self, stage, reason):
+        """Records a stage that was skipped or cut short"""
+        self.dropped.append({"stage": stage, "reason": reason})
+        logger.info(f"Latency budget: {stage} {reason}")
+
+    def summary(self):
+        return {
+            "budget_s": self.budget_s,
+            "elapsed_s": round(self.elapsed(), 3),
+            "dropped_stages": list(self.dropped),
+        }
+
+
+def current():
+    """The Deadline of the request being handled, or None outside a request"""
+    return _current.get()
+
+
+@contextmanager
+def request_deadline(budget_s=None, reserve_s=None):
+    """
+    Binds a new Deadline for the duration of the block. Do not yield from a
+    generator inside the block; bind it around the augmentation work instead.
+    """
+    deadline = Deadline(
+        config.REQUEST_BUDGET_S if budget_s is None else budget_s,
+        config.GENERATION_RESERVE_S if reserve_s is None else reserve_s,
+    )
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def allows(stage, estimate_s=None):
+    """Deadline.allows for the current request; always True outside a request"""
+    deadline = current()
+    return True if deadline is None else deadline.allows(stage, estimate_s)
+
+
+def cap(timeout_s):
+    """Deadline.cap for the current request; timeout_s unchanged outside a request"""
+    deadline = current()
+    return timeout_s if deadline is None else deadline.cap(timeout_s)
+
+
+def bind(fn):
+    """Wraps fn to run in a copy of the caller's context, for handing work to plain threads"""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
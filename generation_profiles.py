@@ -0,0 +1,251 @@
+"""
+Generation profiles per tab and mode for Bharat AI Buddy
+
+A profile bounds one kind of generation: how many tokens it may decode, which
+text marks the end of its answer (the model starting a new "User:" turn, or a
+second quiz question) and how often a line may repeat before decoding is treated
+as a loop. The engine-wide GENERATION_MAX_NEW_TOKENS stays the ceiling (it also
+bounds agent steps); GENERATION_TOKEN_LIMITS overrides single profiles.
+
+AnswerStop watches the streamed reasoning and answer and tells the generation
+loop to stop as soon as the answer is complete, so the engine slot is released
+instead of running to the token limit. In think mode, ThinkBudget caps the
+reasoning: once THINK_TOKEN_BUDGET tokens are spent inside a <think> block
+without the model closing it, the engine writes the closing tag itself and
+decodes the answer. Output without a <think> block is never cut.
+"""
+from collections import Counter, deque, namedtuple
+
+from config import config
+
+# stop: line starts that end the answer where they appear; second_stop: line
+# starts that end it where they appear for the second time; think_budget:
+# reasoning tokens allowed in think mode (None when there is no cap)
+GenerationProfile = namedtuple("GenerationProfile",
+                               ["name", "mode", "max_new_tokens", "stop", "second_stop", "max_repeats", "think_budget"])
+
+# The model continuing the conversation on its own; history prompts use these labels
+_TURN_MARKERS = ("\nUser:", "\nCurrent question:")
+# One question per quiz prompt; the model starting another is never used
+_QUIZ_MARKERS = ("\nQ:", "\nQuestion")
+
+# name: (think max_new_tokens, non-think max_new_tokens, stop, second_stop, max_repeats)
+# max_repeats is how many times a line may recur; 0 turns the loop check off
+_PROFILES = {
+    "default": (2048, 1024, _TURN_MARKERS, (), 2),
+    "Culture": (2048, 1024, _TURN_MARKERS, (), 2),
+    "Regional": (2048, 1280, _TURN_MARKERS, (), 2),
+    "Trending": (2048, 1024, _TURN_MARKERS, (), 2),
+    "Exam": (2048, 1024, _TURN_MARKERS, (), 2),
+    "Math/Logic": (2048, 512, _TURN_MARKERS, (), 2),
+    # Code legitimately repeats lines, so only the token limit applies
+    "Code": (3072, 2048, _TURN_MARKERS, (), 0),
+    "Exam Q&A": (1536, 1024, _TURN_MARKERS, (), 2),
+    "Syllabus": (1536, 768, _TURN_MARKERS, (), 2),
+    "Study Tips": (1536, 768, _TURN_MARKERS, (), 2),
+    "Quiz": (1536, 384, (), _QUIZ_MARKERS, 1),
+    "Summary": (768, 384, _TURN_MARKERS + ("\nNew exchanges:",), (), 1),
+}
+
+# Lines shorter than this (list markers, braces, "Answer: B") may repeat freely
+MIN_REPEAT_CHARS = 24
+# Tokens a think-mode output may take to open its reasoning block (leading whitespace, the tag's pieces)
+OPEN_TAG_TOKENS = 8
+
+
+def _overrides():
+    limits = {}
+    for entry in config.GENERATION_TOKEN_LIMITS.split(","):
+        name, _, value = entry.rpartition("=")
+        if name.strip() and value.strip().isdigit():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+def get_profile(name, mode):
+    """
+    Returns the GenerationProfile for a tab or task name and mode.
+
+    Args:
+        name: Profile name (a tab such as "Math/Logic", or "Syllabus", "Quiz", ...);
+            None or an unknown name gets the default profile
+        mode: "think" or "non-think"
+    """
+    name = name if name in _PROFILES else "default"
+    think_tokens, non_think_tokens, stop, second_stop, max_repeats = _PROFILES[name]
+    limits = _overrides()
+    max_new_tokens = limits.get(f"{name}:{mode}", limits.get(name, think_tokens if mode == "think" else non_think_tokens))
+    max_new_tokens = min(max_new_tokens, config.GENERATION_MAX_NEW_TOKENS)
+    think_budget = None
+    if mode == "think" and config.THINK_TOKEN_BUDGET > 0:
+        # At least half of the limit stays for the answer
+        think_budget = max(1, min(config.THINK_TOKEN_BUDGET, max_new_tokens // 2))
+    return GenerationProfile(name, mode, max_new_tokens, stop, second_stop, max_repeats, think_budget)
+
+
+class _RepeatTracker:
+    """Counts the completed lines of a growing text and finds the first one repeated too often"""
+
+    def __init__(self, max_repeats):
+        self.max_repeats = max_repeats
+        self._scanned = 0
+        self._lines = Counter()
+
+    def check(self, text):
+        """Returns the offset of the first line over the repeat limit, or None"""
+        if not self.max_repeats:
+            return None
+        end = text.rfind("\n", self._scanned)
+        while self._scanned <= end:
+            line_end = text.index("\n", self._scanned)
+            start, self._scanned = self._scanned, line_end + 1
+            line = " ".join(text[start:line_end].split()).casefold()
+            if len(line) < MIN_REPEAT_CHARS:
+                continue
+            self._lines[line] += 1
+            if self._lines[line] > self.max_repeats:
+                return start
+        return None
+
+
+class AnswerStop:
+    """
+    Decides when a streamed generation is complete before the model ends it.
+
+    Stop sequences are looked for in the answer only, since reasoning may quote
+    them; the repeat check covers the answer, and the reasoning when it has no
+    think budget. After feed() returns True, trim() cuts the final (reasoning,
+    answer) at the stop point and reason says why: "stop_sequence" or "repetition".
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.reason = None
+        self._cut = None
+        self._searched = 0
+        self._longest_stop = max((len(s) for s in profile.stop + profile.second_stop), default=0)
+        self._first_seen = {}
+        # With a reasoning budget, a looping reasoning is cut by the forced answer instead
+        self._reasoning_repeats = _RepeatTracker(0 if profile.think_budget else profile.max_repeats)
+        self._answer_repeats = _RepeatTracker(profile.max_repeats)
+
+    def feed(self, reasoning, answer):
+        """Checks the text decoded so far; returns True once the answer is complete"""
+        if self.reason is not None:
+            return True
+        # Markers are line starts, so they are looked for in "\n" + answer, where a match
+        # at i means answer[:i] ends right before the marker. Only the new tail (plus a
+        # marker's length of overlap) is searched.
+        start = max(0, self._searched - self._longest_stop)
+        window = "\n" + answer if start == 0 else answer[start - 1:]
+        self._searched = len(answer) + 1
+        # Every marker starts with a newline and the repeat check needs a finished line,
+        # so chunks that bring no newline are skipped quickly
+        if "\n" in window:
+            stops = [start + i for i in (window.find(s) for s in self.profile.stop) if i != -1]
+            for marker in self.profile.second_stop:
+                i = window.find(marker)
+                while i != -1:
+                    first = self._first_seen.setdefault(marker, start + i)
+                    if start + i > first:
+                        stops.append(start + i)
+                        break
+                    i = window.find(marker, i + 1)
+            if stops:
+                self.reason, self._cut = "stop_sequence", ("answer", min(stops))
+                return True
+            offset = self._answer_repeats.check(answer)
+            if offset is not None:
+                self.reason, self._cut = "repetition", ("answer", offset)
+                return True
+        offset = self._reasoning_repeats.check(reasoning)
+        if offset is not None:
+            self.reason, self._cut = "repetition", ("reasoning", offset)
+            return True
+        return False
+
+    def trim(self, reasoning, answer):
+        """Cuts the final (reasoning, answer) at the stop point, if there was one"""
+        if self._cut is None:
+            return reasoning, answer
+        part, offset = self._cut
+        # Think-mode output that never closed its reasoning ends up entirely as the answer
+        if part == "answer" or not reasoning:
+            return reasoning, answer[:offset].rstrip()
+        return reasoning[:offset].rstrip(), answer
+
+
+class ThinkBudget:
+    """
+    Caps the reasoning of one think-mode generation at the token level.
+
+    The engine calls next_forced() before each token and observe() with the token
+    it emitted. Reasoning starts at start_tag, either already open at the end of
+    the prompt or emitted within the first OPEN_TAG_TOKENS tokens; output that
+    does not open with it is an answer and is never cut. While the model is
+    reasoning, observe() counts tokens and watches the decoded tail for end_tag.
+    When budget tokens have been spent without it, next_forced() returns the
+    tokens of end_text one by one, so the sequence continues as an answer to the
+    reasoning so far.
+
+    Args:
+        budget: Reasoning tokens allowed
+        end_ids: Token ids of end_text, written when the budget runs out
+        decode: Callable turning token ids into text, for spotting the tags
+        end_tag: The tag that closes the reasoning (e.g. "</think>")
+        start_tag: The tag that opens it (e.g. "<think>")
+        opened: True if the prompt already ends inside an open start_tag
+    """
+
+    def __init__(self, budget, end_ids, decode, end_tag, start_tag="<think>", opened=False):
+        self.budget = budget
+        self.end_ids = list(end_ids)
+        self.end_tag = end_tag
+        self.start_tag = start_tag
+        self.reasoning_tokens = None
+        self.exhausted = False
+        self._decode = decode
+        self._opened = opened
+        self._count = 0
+        self._pending = []
+        # Enough recent tokens to hold either tag however it was tokenized
+        self._tail = deque(maxlen=len(self.end_ids) + OPEN_TAG_TOKENS)
+
+    def next_forced(self):
+        """Token id that has to come next, or None to let the model choose"""
+        if (self._opened and self.reasoning_tokens is None and not self.exhausted
+                and self._count >= self.budget and self.end_ids):
+            self.exhausted = True
+            self._pending = list(self.end_ids)
+        return self._pending[0] if self._pending else None
+
+    def observe(self, token_id):
+        """Records the token that was emitted"""
+        if self._pending:
+            self._pending.pop(0)
+            if not self._pending:
+                self.reasoning_tokens = self._count
+            return
+        if self.reasoning_tokens is not None:
+            return
+        self._tail.append(token_id)
+        if not self._opened:
+            self._count += 1
+            if self.start_tag in self._decode(list(self._tail)):
+                self._opened, self._count = True, 0
+                self._tail.clear()
+            elif self._count >= OPEN_TAG_TOKENS:
+                # No reasoning block: everything is the answer
+                self.reasoning_tokens, self._count = 0, 0
+            return
+        self._count += 1
+        if self.end_tag in self._decode(list(self._tail)):
+            self.reasoning_tokens = self._count
+
+    def report(self):
+        """Metadata fields describing how the budget was used"""
+        return {
+            "think_budget": self.budget,
+            "reasoning_tokens": self.reasoning_tokens if self.reasoning_tokens is not None else self._count,
+            "think_budget_exhausted": self.exhausted,
+        }
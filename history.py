@@ -0,0 +1,318 @@
+"""
+Token-budgeted conversation history for Bharat AI Buddy
+
+Each (session, tab) conversation keeps its latest turns verbatim and folds older
+ones into a running summary, so follow-up questions carry context while the
+history part of the prompt stays under HISTORY_TOKEN_BUDGET tokens. Token counts
+are taken once per turn when it is recorded. Folding is incremental: the
+summarizer sees the previous summary and only the turns being folded, never the
+whole conversation, and it runs on a background thread after the answer has
+been delivered. Sessions are capped and expire when idle.
+"""
+import logging
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+
+from config import config
+from metrics import HISTORY_TOKENS
+from tracing import set_attributes
+
+logger = logging.getLogger("bharat_buddy")
+
+# One exchange and the tokens its rendered text takes in the prompt
+Turn = namedtuple("Turn", ["user", "assistant", "tokens"])
+
+_NON_ASCII = re.compile(r"[^\x00-\x7f]")
+
+
+def estimate_tokens(text):
+    """
+    Counts tokens with the model's tokenizer once it is loaded; before that,
+    estimates about 4 ASCII characters or 1.5 Indic characters per token.
+    """
+    import model_utils
+
+    if model_utils.is_ready():
+        return len(model_utils.get_engine().tokenizer.encode(text, add_special_tokens=False))
+    non_ascii = len(_NON_ASCII.findall(text))
+    return int((len(text) - non_ascii) / 4 + non_ascii / 1.5) + 1
+
+
+def _render_turn(user, assistant):
+    return f"User: {user}\nAssistant: {assistant}"
+
+
+def _first_sentence(text, limit=200):
+    sentence = re.split(r"(?<=[.!?।])\s", " ".join(text.split()), maxsplit=1)[0]
+    return sentence[:limit]
+
+
+def truncate_to_tokens(text, max_tokens, count_tokens=estimate_tokens):
+    """Keeps the end of text (the most recent content) within max_tokens"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    low, high = 0, len(words)
+    # Smallest number of dropped leading words that fits
+    while low < high:
+        middle = (low + high) // 2
+        if count_tokens(" ".join(words[middle:])) <= max_tokens:
+            high = middle
+        else:
+            low = middle + 1
+    return " ".join(words[low:])
+
+
+def extractive_summary(summary, turns):
+    """Model-free summary update: the first sentence of each folded question and answer"""
+    points = [f"Asked: {_first_sentence(t.user)} Answered: {_first_sentence(t.assistant)}" for t in turns]
+    return " ".join(([summary] if summary else []) + points)
+
+
+def llm_summary(summary, turns, max_tokens):
+    """Asks the model to update the running summary with the folded turns"""
+    from model_utils import generate_response
+
+    exchanges = "\n\n".join(_render_turn(t.user, t.assistant) for t in turns)
+    prompt = (
+        "Update the running summary of a conversation with the new exchanges below. Keep names, numbers, "
+        "the user's goals and any open questions; drop pleasantries. Write in the conversation's language, "
+        f"in at most {max(20, max_tokens * 2 // 3)} words, as plain prose.\n\n"
+        f"Current summary:\n{summary or '(empty)'}\n\nNew exchanges:\n{exchanges}\n\nUpdated summary:"
+    )
+    _, answer = generate_response(prompt, "non-think", profile="Summary")
+    if not answer.strip() or answer.startswith("[ERROR]"):
+        raise RuntimeError(answer or "empty summary")
+    return answer.strip()
+
+
+class Conversation:
+    """Verbatim recent turns plus the running summary of everything older"""
+    __slots__ = ("turns", "summary", "summary_tokens", "folding")
+
+    def __init__(self):
+        self.turns = deque()
+        self.summary = ""
+        self.summary_tokens = 0
+        self.folding = False
+
+
+class HistoryStore:
+    """
+    Per-session conversations kept within a token budget.
+
+    Args:
+        token_budget: Most tokens the history may add to a prompt
+        max_turns: Most turns kept verbatim; older ones are folded into the summary
+        summary_tokens: Most tokens the running summary may take
+        max_sessions: Conversations kept; the least recently used is evicted beyond this
+        idle_ttl_s: Seconds a conversation may go unused before it is dropped
+        summarize: Callable (summary, turns, max_tokens) -> new summary; the
+            extractive summary is used when it is None or fails
+        count_tokens: Token counter for turn and summary text
+        clock: Time source, overridable for tests
+    """
+
+    def __init__(self, token_budget=1024, max_turns=10, summary_tokens=256, max_sessions=10000,
+                 idle_ttl_s=3600, summarize=None, count_tokens=estimate_tokens, clock=time.monotonic):
+        self.token_budget = token_budget
+        self.max_turns = max_turns
+        self.summary_tokens = min(summary_tokens, token_budget)
+        self.max_sessions = max_sessions
+        self.idle_ttl_s = idle_ttl_s
+        self._summarize = summarize
+        self._count_tokens = count_tokens
+        self._clock = clock
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+        self._folds = queue.Queue()
+        self._worker = None
+
+    def _touch(self, key, create=False):
+        # Called with the lock held
+        now = self._clock()
+        while self._conversations:
+            oldest, (_, last_used) = next(iter(self._conversations.items()))
+            if now - last_used <= self.idle_ttl_s:
+                break
+            del self._conversations[oldest]
+        entry = self._conversations.get(key)
+        if entry is None:
+            if not create:
+                return None
+            entry = (Conversation(), now)
+        self._conversations[key] = (entry[0], now)
+        self._conversations.move_to_end(key)
+        while len(self._conversations) > self.max_sessions:
+            self._conversations.popitem(last=False)
+        return entry[0]
+
+    def context(self, key):
+        """
+        Renders the summary and the newest turns that fit in the token budget.
+
+        Returns:
+            Tuple of (history text, or "" if there is none, and usage dict with
+            history_tokens, history_budget, history_turns and summary_tokens)
+        """
+        with self._lock:
+            conversation = self._touch(key)
+            summary, summary_tokens = (conversation.summary, conversation.summary_tokens) if conversation else ("", 0)
+            turns = list(conversation.turns) if conversation else []
+        used = summary_tokens
+        kept = []
+        # Newest first; turns still waiting to be folded drop out rather than overrun the budget
+        for turn in reversed(turns):
+            if used + turn.tokens > self.token_budget:
+                break
+            kept.append(turn)
+            used += turn.tokens
+        kept.reverse()
+        parts = []
+        if summary:
+            parts.append(f"Summary of the earlier conversation: {summary}")
+        parts.extend(_render_turn(t.user, t.assistant) for t in kept)
+        usage = {"history_tokens": used, "history_budget": self.token_budget,
+                 "history_turns": len(kept), "summary_tokens": summary_tokens}
+        if not parts:
+            return "", usage
+        return "Earlier in this conversation:\n" + "\n\n".join(parts), usage
+
+    def record(self, key, user, assistant):
+        """Adds a finished exchange and folds older turns in the background when over budget"""
+        turn = Turn(user, assistant, self._count_tokens(_render_turn(user, assistant)))
+        with self._lock:
+            conversation = self._touch(key, create=True)
+            conversation.turns.append(turn)
+            if self._fold_count(conversation) and not conversation.folding:
+                conversation.folding = True
+                self._folds.put(key)
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="history-summary", daemon=True)
+                    self._worker.start()
+
+    def clear(self, key):
+        with self._lock:
+            self._conversations.pop(key, None)
+
+    def _fold_count(self, conversation):
+        """Number of oldest turns to fold so the rest fit the turn cap and the budget"""
+        room = self.token_budget - self.summary_tokens
+        total = sum(t.tokens for t in conversation.turns)
+        count = 0
+        for turn in conversation.turns:
+            if len(conversation.turns) - count <= self.max_turns and total <= room:
+                break
+            total -= turn.tokens
+            count += 1
+        return count
+
+    def _run(self):
+        while True:
+            key = self._folds.get()
+            try:
+                self.fold(key)
+            except Exception as e:
+                logger.error(f"History fold failed for {key}: {e}", exc_info=True)
+
+    def fold(self, key):
+        """Folds the turns over the cap or budget into the summary of one conversation"""
+        with self._lock:
+            entry = self._conversations.get(key)
+            if entry is None:
+                return
+            conversation = entry[0]
+            folded = list(conversation.turns)[:self._fold_count(conversation)]
+            summary = conversation.summary
+        try:
+            if folded:
+                start = time.perf_counter()
+                new_summary = None
+                if self._summarize is not None:
+                    try:
+                        new_summary = self._summarize(summary, folded, self.summary_tokens)
+                    except Exception as e:
+                        logger.warning(f"History summarizer failed, using the extractive summary: {e}")
+                if new_summary is None:
+                    new_summary = extractive_summary(summary, folded)
+                new_summary = truncate_to_tokens(new_summary, self.summary_tokens, self._count_tokens)
+                summary_tokens = self._count_tokens(new_summary)
+                with self._lock:
+                    # Only the folded turns are removed; turns recorded meanwhile stay
+                    for turn in folded:
+                        if conversation.turns and conversation.turns[0] is turn:
+                            conversation.turns.popleft()
+                    conversation.summary, conversation.summary_tokens = new_summary, summary_tokens
+                logger.info(f"Folded {len(folded)} turns into a {summary_tokens}-token summary "
+                            f"in {time.perf_counter() - start:.2f}s")
+        finally:
+            with self._lock:
+                conversation.folding = False
+                if self._fold_count(conversation) and key in self._conversations:
+                    conversation.folding = True
+                    self._folds.put(key)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._conversations)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    """Returns the shared HistoryStore"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore(
+                    token_budget=config.HISTORY_TOKEN_BUDGET,
+                    max_turns=config.MAX_HISTORY_LENGTH,
+                    summary_tokens=config.HISTORY_SUMMARY_TOKENS,
+                    max_sessions=config.HISTORY_MAX_SESSIONS,
+                    idle_ttl_s=config.HISTORY_SESSION_TTL_S,
+                    summarize=llm_summary if config.HISTORY_LLM_SUMMARY else None,
+                )
+    return _store
+
+
+def history_key(session_id, *scope):
+    """Key of one conversation: the UI session plus the tab (and exam/subject) it happens in"""
+    return "|".join([session_id, *scope])
+
+
+def load_history(key, metadata=None):
+    """
+    Returns the history text for a conversation and reports its share of the budget
+    in metadata, the log and the request's latency metrics. No key means no history.
+    """
+    if key is None or not config.ENABLE_HISTORY:
+        return ""
+    text, usage = get_history_store().context(key)
+    if metadata is not None:
+        metadata.update(usage)
+    HISTORY_TOKENS.observe(usage["history_tokens"])
+    set_attributes(history_tokens=usage["history_tokens"], history_turns=usage["history_turns"])
+    if text:
+        logger.info(f"History used {usage['history_tokens']} of {usage['history_budget']} tokens "
+                    f"({usage['history_turns']} turns, {usage['summary_tokens']}-token summary)")
+    return text
+
+
+def remember(key, user, assistant):
+    """Records a finished exchange; errors and empty answers are not kept"""
+    if key is None or not config.ENABLE_HISTORY or not assistant or assistant.startswith(("[ERROR]", "Error")):
+        return
+    get_history_store().record(key, user, assistant)
+
+
+def with_history(history, prompt):
+    """Puts the history ahead of the current question"""
+    if not history:
+        return prompt
+    return f"{history}\n\nCurrent question: {prompt}"
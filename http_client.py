@@ -0,0 +1,242 @@
+"""
+Shared HTTP client for the agent tools
+
+One httpx.AsyncClient per event loop keeps TCP/TLS connections alive between
+page visits, so repeat requests to the same host skip the DNS lookup, connect and
+handshake. Responses that carry an ETag or Last-Modified validator are kept in a
+bounded in-memory cache; the next visit to the same URL sends a conditional
+request and reuses the stored body when the server answers 304. Bodies are
+streamed and can be capped at a byte limit, and unwanted content types are
+rejected from the headers alone.
+"""
+import asyncio
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+
+import requests
+
+from config import config
+from deadline import cap as cap_to_budget
+
+logger = logging.getLogger("bharat_buddy")
+
+
+class UnsupportedContentTypeError(requests.exceptions.RequestException):
+    """Raised when a response's Content-Type is not one the caller accepts"""
+
+
+class FetchResult:
+    """Body and metadata of a fetched URL, whether fresh or revalidated from the cache"""
+
+    def __init__(self, url, status_code, content, encoding, content_type, from_cache=False, truncated=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding
+        self.content_type = content_type
+        self.from_cache = from_cache
+        self.truncated = truncated
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+
+class _ValidatorCache:
+    """Byte-bounded LRU of response bodies keyed by URL, with their ETag/Last-Modified"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def remember(self, url, headers, result):
+        """Keeps a complete body that carries a validator; truncated bodies cannot stand in on a 304"""
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        size = len(result.content)
+        if not (etag or last_modified) or result.truncated or size > self.max_bytes:
+            return
+        entry = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "content": result.content,
+            "encoding": result.encoding,
+            "content_type": result.content_type,
+        }
+        with self._lock:
+            old = self._entries.pop(url, None)
+            if old is not None:
+                self._bytes -= len(old["content"])
+            self._entries[url] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted["content"])
+
+    def stats(self):
+        with self._lock:
+            return {"cached_urls": len(self._entries), "cached_bytes": self._bytes}
+
+
+def _explicit_encoding(content_type, encoding):
+    # Only an explicit charset; otherwise the body's own declaration is trusted
+    return encoding if "charset=" in content_type.lower() else None
+
+
+def _check_content_type(url, content_type, accept_types):
+    if accept_types and not content_type.lower().startswith(tuple(accept_types)):
+        raise UnsupportedContentTypeError(f"Unsupported content type '{content_type}' at {url}")
+
+
+def _budgeted_timeout(url, timeout):
+    """Caps a timeout to the current request's latency budget (see deadline.py)"""
+    timeout = cap_to_budget(timeout)
+    if timeout <= 0:
+        raise requests.exceptions.Timeout(f"Request budget spent before fetching {url}")
+    return timeout
+
+
+class AsyncHttpClient:
+    """
+    Pooled HTTP client on httpx.AsyncClient with ETag/Last-Modified revalidation.
+    One coroutine per lookup instead of one thread, so hundreds of slow external
+    requests can be in flight at once.
+
+    httpx clients are bound to the event loop they were created on, so use
+    get_async_http_client() rather than sharing an instance across loops.
+
+    Args:
+        max_connections: Upper bound on open connections across all hosts
+        max_keepalive: Idle connections kept alive for reuse
+        timeout: Default request timeout in seconds
+        validators: Optional _ValidatorCache shared between clients
+    """
+
+    def __init__(self, max_connections=200, max_keepalive=32, timeout=10, validators=None):
+        import httpx
+
+        self._httpx = httpx
+        self.timeout = timeout
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+            follow_redirects=True,
+        )
+        self._validators = validators or _ValidatorCache(32 * 1024 * 1024)
+        self.requests = 0
+        self.revalidated = 0
+
+    async def get(self, url, timeout=None, max_bytes=None, accept_types=None, params=None, headers=None):
+        """
+        Fetches a URL, revalidating a cached copy when one exists.
+
+        Args:
+            url: URL to fetch
+            timeout: Request timeout in seconds, defaults to the client's; either is
+                capped to the remaining request budget
+            max_bytes: Stop reading the body after this many bytes (None reads all)
+            accept_types: Content-Type prefixes to accept; anything else is rejected
+                from the headers, before the body is downloaded
+            params: Optional query parameters
+            headers: Optional extra request headers
+
+        Returns:
+            FetchResult for a 2xx response or a 304 served from the cache
+
+        Raises:
+            UnsupportedContentTypeError: If the Content-Type is not in accept_types
+            requests.exceptions.Timeout, requests.exceptions.ConnectionError,
+            requests.exceptions.HTTPError: httpx errors are mapped onto the requests
+                exception types the tools already handle
+        """
+        httpx = self._httpx
+        timeout = _budgeted_timeout(url, timeout or self.timeout)
+        cached = self._validators.get(url) if params is None else None
+        request_headers = {**(headers or {}), **self._validators.conditional_headers(cached)}
+        try:
+            async with self._client.stream("GET", url, params=params, headers=request_headers,
+                                           timeout=timeout) as response:
+                self.requests += 1
+                if response.status_code == 304 and cached is not None:
+                    self.revalidated += 1
+                    logger.info(f"{url} not modified; reusing cached body")
+                    return FetchResult(url, 200, cached["content"], cached["encoding"], cached["content_type"],
+                                       from_cache=True)
+                if response.status_code >= 400:
+                    raise requests.exceptions.HTTPError(f"{response.status_code} Error for url: {url}")
+
+                content_type = response.headers.get("Content-Type", "")
+                _check_content_type(url, content_type, accept_types)
+                chunks = []
+                received = 0
+                truncated = False
+                async for chunk in response.aiter_bytes():
+                    chunks.append(chunk)
+                    received += len(chunk)
+                    if max_bytes is not None and received >= max_bytes:
+                        truncated = True
+                        break
+                content = b"".join(chunks)
+                if truncated:
+                    content = content[:max_bytes]
+                result = FetchResult(
+                    str(response.url),
+                    response.status_code,
+                    content,
+                    _explicit_encoding(content_type, response.charset_encoding),
+                    content_type,
+                    truncated=truncated,
+                )
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+
+        if params is None:
+            self._validators.remember(url, response.headers, result)
+        return result
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+_validators = _ValidatorCache(config.HTTP_VALIDATOR_CACHE_BYTES)
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client():
+    """
+    Returns the AsyncHttpClient for the running event loop, creating it on first use.
+    Clients on different loops share one validator cache.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncHttpClient(
+            max_connections=config.HTTP_ASYNC_MAX_CONNECTIONS,
+            max_keepalive=config.HTTP_POOL_MAXSIZE,
+            timeout=config.HTTP_TIMEOUT_S,
+            validators=_validators,
+        )
+        _async_clients[loop] = client
+    return client
@@ -0,0 +1,299 @@
+"""
+Single-pass keyword router for app_fn
+
+Every routing keyword, exam name and subject name, including Hindi and Tamil
+synonyms, is compiled once into an Aho-Corasick automaton. One linear scan of the
+case-folded prompt then yields the matched keyword groups and the exam and subject
+mentioned, whatever the number of keywords.
+"""
+import threading
+import unicodedata
+from collections import deque
+
+from constants import EXAMS, SUBJECTS
+
+# Keyword groups used by app_fn. English keywords match anywhere in the prompt (as the
+# original substring checks did); Indic synonyms must start a word but may carry
+# inflectional suffixes (त्योहारों, திருவிழாவில்). Indic words of SHORT_INDIC_CHARS or
+# fewer must also end a word, so their inflected forms are listed explicitly (खबरें).
+ROUTING_KEYWORDS = {
+    "culture": {
+        "en": ["festival", "tradition", "history", "culture", "heritage"],
+        "indic": ["त्योहार", "त्यौहार", "उत्सव", "परंपरा", "परम्परा", "इतिहास", "संस्कृति", "विरासत",
+                  "திருவிழா", "பண்டிகை", "பாரம்பரிய", "வரலாறு", "வரலாற்", "கலாச்சார", "பண்பாடு"],
+    },
+    "recent": {
+        "en": ["latest", "current", "news", "today", "recently", "trending"],
+        "indic": ["नवीनतम", "ताज़ा", "ताजा", "समाचार", "खबर", "खबरें", "ख़बर", "आज", "हाल ही",
+                  "சமீபத்திய", "செய்தி", "இன்று", "தற்போதைய"],
+    },
+    "math": {
+        "en": ["solve", "equation", "calculate", "math", "problem", "formula"],
+        "indic": ["समीकरण", "गणना", "गणित", "सूत्र", "हल करें", "हल कीजिए",
+                  "சமன்பாடு", "கணக்கிடு", "கணிதம்", "சூத்திர", "தீர்வு காண"],
+    },
+    "compute": {
+        "en": ["solve", "calculate", "find", "compute", "evaluate", "simplify"],
+        "indic": ["हल करें", "हल कीजिए", "गणना", "ज्ञात", "निकालें", "सरल करें",
+                  "கணக்கிடு", "கண்டுபிடி", "தீர்வு காண", "சுருக்கு"],
+    },
+    "code": {
+        "en": ["code", "function", "program", "algorithm", "class", "implement"],
+        "indic": ["कोड", "कोडिंग", "फ़ंक्शन", "फंक्शन", "प्रोग्राम", "एल्गोरिदम", "एल्गोरिथम",
+                  "நிரல்", "குறியீடு", "செயல்பாடு", "அல்காரிதம்"],
+    },
+    "review": {
+        "en": ["analyze", "review", "improve"],
+        "indic": ["विश्लेषण", "समीक्षा", "सुधार", "பகுப்பாய்", "மதிப்பாய்", "மேம்படுத்து"],
+    },
+    "syllabus": {
+        "en": ["syllabus", "curriculum", "topics", "pattern", "preparation"],
+        "indic": ["पाठ्यक्रम", "सिलेबस", "पैटर्न", "तैयारी", "பாடத்திட்ட", "தயாரிப்பு", "சிலபஸ்"],
+    },
+    "materials": {
+        "en": ["books", "reference", "material", "resources", "study"],
+        "indic": ["किताब", "पुस्तक", "संदर्भ", "सामग्री", "अध्ययन", "पढ़ाई",
+                  "புத்தக", "குறிப்பு", "படிப்பு", "படிக்க"],
+    },
+    "generate": {
+        "en": ["generate"],
+        "indic": ["बनाएं", "बनाएँ", "बनाओ", "तैयार करें", "உருவாக்கு"],
+    },
+    "question": {
+        "en": ["question", "mock"],
+        "indic": ["प्रश्न", "सवाल", "मॉक", "கேள்வி", "மாதிரி தேர்வு"],
+    },
+}
+
+EXAM_SYNONYMS = {
+    "UPSC": ["यूपीएससी", "யுபிஎஸ்சி"],
+    "JEE": ["जेईई", "ஜேஇஇ"],
+    "NEET": ["नीट", "நீட்"],
+    "SSC": ["एसएससी", "எஸ்எஸ்சி"],
+    "Bank PO": ["बैंक पीओ", "வங்கி பிஓ"],
+    # "गेट" and "கேட்" alone are everyday words (a gate; "ask"), so only the exam phrases count
+    "GATE": ["गेट परीक्षा", "गेट एग्जाम", "கேட் தேர்வு"],
+}
+
+SUBJECT_SYNONYMS = {
+    "History": ["इतिहास", "வரலாறு"],
+    "Geography": ["भूगोल", "புவியியல்"],
+    "Politics": ["राजनीति", "அரசியல்"],
+    "Economics": ["अर्थशास्त्र", "பொருளாதார"],
+    "Indian Culture": ["भारतीय संस्कृति", "இந்திய கலாச்சார"],
+    "Current Affairs": ["करंट अफेयर्स", "समसामयिकी", "நடப்பு நிகழ்வு"],
+    "Environment & Ecology": ["पर्यावरण", "சுற்றுச்சூழல்"],
+    "Maths": ["गणित", "கணிதம்", "math"],
+    "Physics": ["भौतिकी", "भौतिक विज्ञान", "இயற்பியல்"],
+    "Chemistry": ["रसायन", "வேதியியல்"],
+    "Biology": ["जीव विज्ञान", "जीवविज्ञान", "உயிரியல்"],
+    "Calculus": ["कलन", "நுண்கணிதம்"],
+    "Organic Chemistry": ["कार्बनिक रसायन", "கரிம வேதியியல்"],
+    "Genetics": ["आनुवंशिकी", "மரபியல்"],
+    "Human Physiology": ["मानव शरीर क्रिया", "மனித உடலியல்"],
+    "Cell Biology": ["कोशिका जीव", "செல் உயிரியல்"],
+    "Thermodynamics": ["ऊष्मागतिकी", "வெப்ப இயக்கவியல்"],
+    "Reasoning": ["तर्कशक्ति", "रीजनिंग", "தர்க்க"],
+    "Quantitative Aptitude": ["मात्रात्मक योग्यता", "अंकगणित", "எண் திறன்"],
+    "English": ["अंग्रेज़ी", "अंग्रेजी", "ஆங்கில"],
+    "General Awareness": ["सामान्य जागरूकता", "பொது விழிப்புணர்வு"],
+    "General Science": ["सामान्य विज्ञान", "பொது அறிவியல்"],
+    "Computer Awareness": ["कंप्यूटर जागरूकता", "கணினி விழிப்புணர்வு"],
+    "Banking Awareness": ["बैंकिंग जागरूकता", "வங்கி விழிப்புணர்வு"],
+    "Computer Science": ["कंप्यूटर विज्ञान", "கணினி அறிவியல்"],
+    "Operating Systems": ["ऑपरेटिंग सिस्टम", "இயக்க முறைமை"],
+    "Data Structures & Algorithms": ["data structures", "डेटा संरचना", "தரவு கட்டமைப்பு"],
+}
+
+
+# Indic keywords this short are whole words only: "आज" (today) must not match
+# "आज़ादी" (freedom) or "आजकल"
+SHORT_INDIC_CHARS = 3
+
+
+def _normalize(text):
+    return unicodedata.normalize("NFC", text).casefold()
+
+
+def _is_word_char(ch):
+    return unicodedata.category(ch)[0] in "LMN"
+
+
+class AhoCorasick:
+    """
+    Multi-pattern substring matcher. Patterns are added with a payload, compiled
+    once by build(), and matched in a single pass over the text.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._built = False
+
+    def add(self, pattern, payload):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), payload))
+        self._built = False
+
+    def build(self):
+        """Computes failure links breadth-first and merges outputs along them"""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._built = True
+
+    def iter_matches(self, text):
+        """Yields (start, end, payload) for every pattern occurrence, overlaps included"""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, payload in out[state]:
+                yield i - length + 1, i + 1, payload
+
+    def __len__(self):
+        return len(self._goto)
+
+
+class Route:
+    """Result of routing one prompt"""
+
+    def __init__(self, intent, groups, exam=None, subject=None):
+        self.intent = intent
+        self.groups = groups
+        self.exam = exam
+        self.subject = subject
+
+    def has(self, *groups):
+        """True if any of the keyword groups matched"""
+        return any(group in self.groups for group in groups)
+
+    def __repr__(self):
+        return f"Route(intent={self.intent!r}, groups={sorted(self.groups)}, exam={self.exam!r}, subject={self.subject!r})"
+
+
+class IntentRouter:
+    """
+    Classifies prompts into app_fn branches and extracts exam and subject.
+
+    Args:
+        keywords: Mapping of group name to {"en": [...], "indic": [...]} keyword lists
+        exams: Canonical exam names, in priority order
+        subjects: Mapping of exam name to its canonical subject names, in priority order
+        exam_synonyms: Extra names per canonical exam
+        subject_synonyms: Extra names per canonical subject
+    """
+
+    def __init__(self, keywords=ROUTING_KEYWORDS, exams=EXAMS, subjects=SUBJECTS,
+                 exam_synonyms=EXAM_SYNONYMS, subject_synonyms=SUBJECT_SYNONYMS):
+        self.exams = list(exams)
+        self.subjects = subjects
+        self._matcher = AhoCorasick()
+        for group, lists in keywords.items():
+            for word in lists.get("en", []):
+                self._matcher.add(_normalize(word), ("group", group, False, False))
+            for word in lists.get("indic", []):
+                word = _normalize(word)
+                self._matcher.add(word, ("group", group, True, len(word) <= SHORT_INDIC_CHARS))
+        for exam in self.exams:
+            for name in [exam] + exam_synonyms.get(exam, []):
+                self._add_name(name, "exam", exam)
+        all_subjects = {s for names in subjects.values() for s in names}
+        for subject in all_subjects:
+            for name in [subject] + subject_synonyms.get(subject, []):
+                self._add_name(name, "subject", subject)
+        self._matcher.build()
+
+    def _add_name(self, name, kind, canonical):
+        # Latin names must end a word ("gate" in "investigate" is not GATE); Indic names
+        # may be followed by case suffixes unless they are short
+        name = _normalize(name)
+        self._matcher.add(name, (kind, canonical, True, name.isascii() or len(name) <= SHORT_INDIC_CHARS))
+
+    def scan(self, text):
+        """
+        One pass over text.
+
+        Returns:
+            (groups, exams, subjects): the matched keyword groups, and the sets of
+            canonical exam and subject names mentioned
+        """
+        text = _normalize(text)
+        groups, exams, subjects = set(), set(), set()
+        for start, end, (kind, value, bounded_start, bounded_end) in self._matcher.iter_matches(text):
+            if bounded_start and start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if bounded_end and end < len(text) and _is_word_char(text[end]):
+                continue
+            if kind == "group":
+                groups.add(value)
+            elif kind == "exam":
+                exams.add(value)
+            else:
+                subjects.add(value)
+        return groups, exams, subjects
+
+    def route(self, tab, prompt):
+        """
+        Picks the app_fn branch for a prompt, with the same precedence app_fn has
+        always used: the tab first, then keywords (culture, math, code), then Exam.
+        """
+        groups, exams, subjects = self.scan(prompt)
+        if tab == "Culture" or "culture" in groups:
+            intent = "culture"
+        elif tab == "Math/Logic" or "math" in groups:
+            intent = "math"
+        elif tab == "Code" or "code" in groups:
+            intent = "code"
+        elif tab == "Exam":
+            intent = "exam"
+        else:
+            intent = "default"
+        exam = next((e for e in self.exams if e in exams), None)
+        subject = None
+        if exam is not None:
+            subject = next((s for s in self.subjects.get(exam, []) if s in subjects), None)
+        return Route(intent, groups, exam, subject)
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """Returns the shared IntentRouter, compiling it on first use"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = IntentRouter()
+    return _router
+
+
+def route_prompt(tab, prompt):
+    """Routes a prompt with the shared router"""
+    return get_router().route(tab, prompt)
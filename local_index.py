@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Local BM25 retrieval over an offline knowledge corpus
+
+The ingest command splits a document collection into passages and writes an
+on-disk inverted index. search_local_knowledge in agent_tools queries it, and the
+augmentation helpers in app_logic use it before any live Wikipedia or web search.
+
+Index file layout (one file, memory-mapped at query time):
+    MAGIC | uint32 meta length | JSON meta (vocabulary, documents, section offsets)
+    | passage lengths (uint32[N]) | passage document ids (uint32[N])
+    | passage text offsets (uint64[N + 1]) | posting lists | UTF-8 passage text
+Each posting list holds (passage id delta, term frequency) pairs as varints.
+
+Tokenization keeps runs of Unicode letters, combining marks and digits
+(categories L, M and N), so Devanagari, Tamil, Bengali and other Indic words stay
+whole with their vowel signs and viramas, after NFC normalization and case folding.
+
+Usage:
+    python local_index.py ingest <file-or-directory> [...] [--path data/knowledge.idx]
+    python local_index.py query "मानसून का महत्व" [-k 5]
+
+Corpus inputs may be .jsonl files (one {"title", "text", "url"} object per line,
+e.g. a converted article dump) or directories of .txt / .md files.
+"""
+import argparse
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter, defaultdict, namedtuple
+
+from config import config
+
+logger = logging.getLogger("bharat_buddy")
+
+MAGIC = b"BBBM25\x01\n"
+_HEADER = struct.Struct("<8sI")
+K1 = 1.2
+B = 0.75
+PASSAGE_CHARS = 1000
+
+LocalHit = namedtuple("LocalHit", ["title", "source", "text", "score"])
+
+
+def _word_pattern():
+    """Regex matching runs of letters, marks and digits anywhere in the Basic Multilingual Plane"""
+    ranges = []
+    start = None
+    for cp in range(0x10000):
+        is_word = unicodedata.category(chr(cp))[0] in "LMN"
+        if is_word and start is None:
+            start = cp
+        elif not is_word and start is not None:
+            ranges.append((start, cp - 1))
+            start = None
+    if start is not None:
+        ranges.append((start, 0xFFFF))
+    body = "".join(
+        re.escape(chr(a)) if a == b else f"{re.escape(chr(a))}-{re.escape(chr(b))}" for a, b in ranges
+    )
+    return re.compile(f"[{body}]+")
+
+
+_WORD_RE = _word_pattern()
+# Zero-width joiners sit inside Indic words and must not split them
+_JOINERS = str.maketrans("", "", "\u200c\u200d")
+
+
+def tokenize(text):
+    """NFC-normalizes, case-folds and splits text into letter/mark/digit runs"""
+    text = unicodedata.normalize("NFC", text).translate(_JOINERS).casefold()
+    return _WORD_RE.findall(text)
+
+
+def split_passages(text, max_chars=PASSAGE_CHARS):
+    """
+    Groups paragraphs into passages of up to max_chars, splitting long ones at
+    sentence ends and sentences that are still too long at spaces
+    """
+    passages = []
+    current = ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        pieces = [paragraph]
+        if len(paragraph) > max_chars:
+            pieces = [chunk for sentence in re.split(r"(?<=[.!?।॥])\s+", paragraph)
+                      for chunk in _split_at_spaces(sentence, max_chars)]
+        for piece in pieces:
+            if current and len(current) + len(piece) + 1 > max_chars:
+                passages.append(current)
+                current = ""
+            current = f"{current} {piece}" if current else piece
+    if current:
+        passages.append(current)
+    return passages
+
+
+def _split_at_spaces(text, max_chars):
+    """Cuts whitespace-collapsed text into chunks of up to max_chars; a longer word is cut mid-word"""
+    chunks = []
+    while len(text) > max_chars:
+        cut = text.rfind(" ", 0, max_chars + 1)
+        if cut <= 0:
+            cut = max_chars
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip()
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+def _encode_varint(value, out):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _decode_postings(data):
+    """Yields (passage id, term frequency) pairs from a delta/varint-encoded posting list"""
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    passage_id = 0
+    for i in range(0, len(values), 2):
+        passage_id += values[i]
+        yield passage_id, values[i + 1]
+
+
+def iter_documents(paths):
+    """Yields (title, source, text) for every document under the given files and directories"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.endswith((".txt", ".md", ".jsonl")):
+                        yield from iter_documents([os.path.join(root, name)])
+        elif path.endswith(".jsonl"):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        doc = json.loads(line)
+                        yield doc.get("title", ""), doc.get("url") or doc.get("source") or path, doc.get("text", "")
+        else:
+            with open(path, encoding="utf-8") as f:
+                yield os.path.splitext(os.path.basename(path))[0], path, f.read()
+
+
+def build_index(documents, path):
+    """
+    Builds the index file from (title, source, text) documents.
+
+    Returns:
+        Dict with document, passage and term counts
+    """
+    docs = []
+    lengths = array("I")
+    doc_ids = array("I")
+    text_offsets = array("Q", [0])
+    texts = bytearray()
+    postings = defaultdict(list)
+
+    for title, source, text in documents:
+        doc_index = len(docs)
+        docs.append([title, source])
+        for passage in split_passages(text):
+            passage_id = len(lengths)
+            tokens = tokenize(f"{title} {passage}")
+            lengths.append(len(tokens))
+            doc_ids.append(doc_index)
+            texts += passage.encode("utf-8")
+            text_offsets.append(len(texts))
+            for term, tf in Counter(tokens).items():
+                postings[term].append((passage_id, tf))
+
+    encoded = bytearray()
+    terms = {}
+    for term in sorted(postings):
+        start = len(encoded)
+        previous = 0
+        for passage_id, tf in postings[term]:
+            _encode_varint(passage_id - previous, encoded)
+            _encode_varint(tf, encoded)
+            previous = passage_id
+        terms[term] = [start, len(encoded) - start, len(postings[term])]
+
+    count = len(lengths)
+    sections = [lengths.tobytes(), doc_ids.tobytes(), text_offsets.tobytes(), bytes(encoded), bytes(texts)]
+    meta = {
+        "passages": count,
+        "avgdl": (sum(lengths) / count) if count else 0.0,
+        "byteorder": sys.byteorder,
+        "sections": [len(s) for s in sections],
+        "docs": docs,
+        "terms": terms,
+    }
+    meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    # Pad with JSON whitespace so the numeric sections start 8-byte aligned
+    meta_bytes += b" " * (-(_HEADER.size + len(meta_bytes)) % 8)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(meta_bytes)))
+        f.write(meta_bytes)
+        for section in sections:
+            f.write(section)
+    os.replace(tmp_path, path)
+    return {"documents": len(docs), "passages": count, "terms": len(terms), "bytes": os.path.getsize(path)}
+
+
+class LocalIndex:
+    """
+    Memory-mapped, read-only BM25 index written by build_index().
+
+    Args:
+        path: Index file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, meta_length = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a local index file")
+        meta = json.loads(self._mmap[_HEADER.size:_HEADER.size + meta_length].decode("utf-8"))
+        if meta["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was built on a {meta['byteorder']}-endian machine")
+        self.count = meta["passages"]
+        self.avgdl = meta["avgdl"] or 1.0
+        self._docs = meta["docs"]
+        self._terms = meta["terms"]
+
+        view = memoryview(self._mmap)
+        offset = _HEADER.size + meta_length
+        sections = []
+        for size in meta["sections"]:
+            sections.append(view[offset:offset + size])
+            offset += size
+        lengths, doc_ids, text_offsets, self._postings, self._texts = sections
+        self._lengths = lengths.cast("I")
+        self._doc_ids = doc_ids.cast("I")
+        self._text_offsets = text_offsets.cast("Q")
+
+    def search(self, query, k=5):
+        """
+        Returns the top-k passages for a query, best first.
+
+        Returns:
+            List of LocalHit(title, source, text, score)
+        """
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            entry = self._terms.get(term)
+            if entry is None:
+                continue
+            start, length, df = entry
+            idf = math.log(1 + (self.count - df + 0.5) / (df + 0.5))
+            for passage_id, tf in _decode_postings(self._postings[start:start + length]):
+                norm = K1 * (1 - B + B * self._lengths[passage_id] / self.avgdl)
+                scores[passage_id] += idf * tf * (K1 + 1) / (tf + norm)
+
+        hits = []
+        for passage_id, score in heapq.nlargest(k, scores.items(), key=lambda item: item[1]):
+            title, source = self._docs[self._doc_ids[passage_id]]
+            text = bytes(self._texts[self._text_offsets[passage_id]:self._text_offsets[passage_id + 1]])
+            hits.append(LocalHit(title, source, text.decode("utf-8"), round(score, 3)))
+        return hits
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_local_index():
+    """Returns the shared LocalIndex, or None if no index has been built"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None and os.path.exists(config.LOCAL_INDEX_PATH):
+                try:
+                    _index = LocalIndex(config.LOCAL_INDEX_PATH)
+                    logger.info(f"Loaded local index {config.LOCAL_INDEX_PATH} with {_index.count} passages")
+                except (OSError, ValueError, KeyError) as e:
+                    logger.error(f"Could not open local index {config.LOCAL_INDEX_PATH}: {e}")
+    return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    ingest = subparsers.add_parser("ingest", help="Build the index from a document collection")
+    ingest.add_argument("inputs", nargs="+")
+    ingest.add_argument("--path", default=config.LOCAL_INDEX_PATH)
+    query = subparsers.add_parser("query", help="Print the top passages for a query")
+    query.add_argument("text")
+    query.add_argument("-k", type=int, default=config.LOCAL_SEARCH_TOP_K)
+    query.add_argument("--path", default=config.LOCAL_INDEX_PATH)
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        start = time.perf_counter()
+        stats = build_index(iter_documents(args.inputs), args.path)
+        print(f"Indexed {stats['documents']} documents into {stats['passages']} passages, "
+              f"{stats['terms']} terms, {stats['bytes']} bytes in {time.perf_counter() - start:.1f}s -> {args.path}")
+        return
+
+    index = LocalIndex(args.path)
+    start = time.perf_counter()
+    hits = index.search(args.text, k=args.k)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    for hit in hits:
+        print(f"[{hit.score}] {hit.title} ({hit.source})\n{hit.text[:300]}\n")
+    print(f"{len(hits)} hits in {elapsed_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
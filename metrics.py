@@ -0,0 +1,392 @@
+"""
+Prometheus-format metrics for Bharat AI Buddy
+
+Counters, gauges and histograms for the hot paths (requests per tab, generation
+latency and token throughput, tool calls, agent steps, scheduler queue depth),
+rendered in the Prometheus text exposition format and served from a local
+/metrics endpoint next to the Gradio app. Everything is in-process and
+dependency-free; metric updates are a lock and a few additions.
+
+Usage:
+    curl http://127.0.0.1:9464/metrics
+"""
+import functools
+import logging
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import config
+
+logger = logging.getLogger("bharat_buddy")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+THROUGHPUT_BUCKETS = (1, 2, 5, 10, 20, 40, 80, 160)
+STEP_BUCKETS = (1, 2, 3, 4, 6, 8, 10, 12)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        (REGISTRY if registry is None else registry).register(self)
+
+    def labels(self, **labels):
+        """Returns the child metric for one combination of label values"""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {sorted(labels)}")
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self):
+        """Yields (suffix, label values, extra label pairs, value)"""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, values, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_label_text(self.labelnames, values, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class _Value:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value):
+        with self._lock:
+            self.value = value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    type_name = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._children[()].inc(amount)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield "_total", values, (), child.value
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, optionally read from a callback at scrape time"""
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self._function = None
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value):
+        self._children[()].set(value)
+
+    def set_function(self, function):
+        """Reads the gauge from function() on every scrape instead of a stored value"""
+        self._function = function
+
+    def _samples(self):
+        if self._function is not None:
+            try:
+                yield "", (), (), self._function()
+            except Exception as e:
+                logger.debug(f"Gauge {self.name} callback failed: {e}")
+            return
+        for values, child in list(self._children.items()):
+            yield "", values, (), child.value
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets"""
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            counts, total, count = child.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield "_bucket", values, (("le", _format_value(bound)),), cumulative
+            yield "_sum", values, (), total
+            yield "_count", values, (), count
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = Counter("bharat_buddy_requests", "Requests handled, by UI tab", ["tab"])
+TIME_TO_FIRST_TOKEN = Histogram(
+    "bharat_buddy_time_to_first_token_seconds", "Time from generation start to the first decoded text")
+GENERATION_DURATION = Histogram(
+    "bharat_buddy_generation_duration_seconds", "Time from generation start to the last decoded text")
+TOKENS_PER_SECOND = Histogram(
+    "bharat_buddy_generation_tokens_per_second", "Output tokens per second of each generation",
+    buckets=THROUGHPUT_BUCKETS)
+PROMPT_TOKENS = Histogram(
+    "bharat_buddy_prompt_tokens", "Prompt tokens per generation", buckets=TOKEN_BUCKETS)
+OUTPUT_TOKENS = Histogram(
+    "bharat_buddy_output_tokens", "Output tokens per generation", buckets=TOKEN_BUCKETS)
+GENERATION_FINISHES = Counter(
+    "bharat_buddy_generation_finishes",
+    "Generations by profile and how they ended (eos, max_tokens, stop_sequence, repetition)",
+    ["profile", "reason"])
+THINK_BUDGET_EXHAUSTED = Counter(
+    "bharat_buddy_think_budget_exhausted",
+    "Think-mode generations whose reasoning hit the budget and were moved on to the answer",
+    ["profile"])
+TOKENS_SAVED = Counter(
+    "bharat_buddy_generation_tokens_saved",
+    "Tokens of the profile's limit left undecoded because an early stop found the answer complete",
+    ["profile"])
+TOOL_CALLS = Counter(
+    "bharat_buddy_tool_calls", "Tool calls by outcome (ok, or error for exceptions and error results)",
+    ["tool", "outcome"])
+TOOL_DURATION = Histogram("bharat_buddy_tool_duration_seconds", "Tool call latency", ["tool"])
+HISTORY_TOKENS = Histogram(
+    "bharat_buddy_history_tokens", "Conversation history tokens added to a prompt", buckets=TOKEN_BUCKETS)
+CONTEXT_TOKENS = Histogram(
+    "bharat_buddy_context_tokens", "Augmentation context tokens added to a prompt after packing", buckets=TOKEN_BUCKETS)
+AGENT_STEPS = Counter("bharat_buddy_agent_steps", "Agent action steps executed", ["agent"])
+AGENT_RUN_STEPS = Histogram(
+    "bharat_buddy_agent_run_steps", "Action steps per agent run", ["agent"], buckets=STEP_BUCKETS)
+SCHEDULER_QUEUE_DEPTH = Gauge(
+    "bharat_buddy_scheduler_queue_depth", "Generation requests waiting to join the batch")
+SCHEDULER_ACTIVE = Gauge(
+    "bharat_buddy_scheduler_active_requests", "Generation requests in the running batch")
+
+
+def observe_generation(metadata):
+    """Records one finished generation from the metadata filled by model_utils"""
+    if "ttft_s" in metadata:
+        TIME_TO_FIRST_TOKEN.observe(metadata["ttft_s"])
+    if "total_s" in metadata:
+        GENERATION_DURATION.observe(metadata["total_s"])
+    if "prompt_tokens" in metadata:
+        PROMPT_TOKENS.observe(metadata["prompt_tokens"])
+    output_tokens = metadata.get("output_tokens")
+    if output_tokens is not None:
+        OUTPUT_TOKENS.observe(output_tokens)
+        # Throughput over the decode phase, after the first token arrived
+        decode_s = metadata.get("total_s", 0) - metadata.get("ttft_s", 0)
+        if output_tokens > 1 and decode_s > 0:
+            TOKENS_PER_SECOND.observe((output_tokens - 1) / decode_s)
+    if "finish_reason" in metadata:
+        GENERATION_FINISHES.labels(profile=metadata.get("profile", "default"), reason=metadata["finish_reason"]).inc()
+    if metadata.get("think_budget_exhausted"):
+        THINK_BUDGET_EXHAUSTED.labels(profile=metadata.get("profile", "default")).inc()
+    if metadata.get("tokens_saved"):
+        TOKENS_SAVED.labels(profile=metadata.get("profile", "default")).inc(metadata["tokens_saved"])
+
+
+def _is_error_result(result):
+    # The tools report most failures as text rather than raising
+    return isinstance(result, str) and result.lstrip().startswith(("Error", "[ERROR]"))
+
+
+def instrument_tool(tool_obj):
+    """
+    Times every call of a smolagents Tool and counts its errors. The instance's
+    forward is wrapped, so direct calls and agent calls are both measured.
+
+    Returns:
+        The same tool, for chaining
+    """
+    if getattr(tool_obj, "_metrics_instrumented", False):
+        return tool_obj
+    forward = tool_obj.forward
+    name = tool_obj.name
+
+    @functools.wraps(forward)
+    def timed_forward(*args, **kwargs):
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            result = forward(*args, **kwargs)
+            if not _is_error_result(result):
+                outcome = "ok"
+            return result
+        finally:
+            _record_tool_call(name, start, outcome)
+
+    tool_obj.forward = timed_forward
+    tool_obj._metrics_instrumented = True
+    return tool_obj
+
+
+def timed_tool(name):
+    """Decorator recording the same tool metrics for a coroutine (the async_tools lookups)"""
+    def decorator(coroutine_function):
+        @functools.wraps(coroutine_function)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = await coroutine_function(*args, **kwargs)
+                if not _is_error_result(result):
+                    outcome = "ok"
+                return result
+            finally:
+                _record_tool_call(name, start, outcome)
+        return wrapper
+    return decorator
+
+
+def _record_tool_call(name, start, outcome):
+    TOOL_DURATION.labels(tool=name).observe(time.perf_counter() - start)
+    TOOL_CALLS.labels(tool=name, outcome=outcome).inc()
+
+
+def agent_step_callback(agent_name):
+    """Returns a smolagents step callback counting the action steps of one agent"""
+    from smolagents import ActionStep
+
+    steps = AGENT_STEPS.labels(agent=agent_name)
+
+    def on_step(step, **kwargs):
+        if isinstance(step, ActionStep):
+            steps.inc()
+
+    return on_step
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"metrics: {format % args}")
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(host=None, port=None):
+    """
+    Serves /metrics from a daemon thread; later calls return the running server.
+
+    Returns:
+        The ThreadingHTTPServer, or None if the port could not be bound
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            host = config.METRICS_HOST if host is None else host
+            port = config.METRICS_PORT if port is None else port
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                logger.error(f"Could not start the metrics endpoint on {host}:{port}: {e}")
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+            logger.info(f"Serving metrics on http://{host}:{_server.server_address[1]}/metrics")
+    return _server
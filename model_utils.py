@@ -1,40 +1,791 @@
-from smolagents import TransformersModel
+from smolagents import ChatMessage, ChatMessageStreamDelta, MessageRole, Model, TokenUsage, TransformersModel
+from threading import Event, Thread, Lock
+from config import config
+from generation_profiles import OPEN_TAG_TOKENS, AnswerStop, ThinkBudget, get_profile
+from prefix_cache import PrefixKVCache
+from metrics import observe_generation, SCHEDULER_QUEUE_DEPTH, SCHEDULER_ACTIVE
+from tracing import set_attributes, trace_engine, traced
+import asyncio
 import logging
+import time
 
-engine = TransformersModel(
-    model_id="meta-llama/Llama-3.2-1B-Instruct",
-    device="cuda",
-    max_new_tokens=5000,
-    do_sample=True,
+GENERATION_KWARGS = {
+    # Ceiling for every generation, agent steps included; generation_profiles sets lower limits per tab
+    "max_new_tokens": config.GENERATION_MAX_NEW_TOKENS,
+    # Deterministic (greedy) decoding makes cached answers reproducible
+    "do_sample": not config.DETERMINISTIC_DECODING,
+}
+
+MODEL_ID = "meta-llama/Llama-3.2-1B-Instruct"
+
+_engine = None
+_engine_lock = Lock()
+
+
+def get_engine():
+    """
+    Returns the shared TransformersModel, loading it on first use.
+    Importing this module no longer loads the model; the app warms it up in the
+    background (see startup.start_warm_up) and any early request simply waits here.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                from startup import startup_report
+                with startup_report.phase(f"load engine ({config.INFERENCE_BACKEND})"):
+                    _engine = create_engine(config.INFERENCE_BACKEND)
+    return _engine
+
+
+def create_engine(backend, model_id=MODEL_ID):
+    """
+    Builds a TransformersModel for the given inference backend.
+
+    Args:
+        backend: "cuda", "cpu" (fp32) or "cpu-int8" (dynamic int8 quantization,
+            cached under config.QUANTIZED_MODEL_DIR)
+        model_id: Hugging Face model ID or local path
+    """
+    logger = logging.getLogger("bharat_buddy")
+    logger.info(f"Creating engine for {model_id} with backend={backend}")
+    if backend == "cpu-int8":
+        from quantization import create_int8_engine
+        return create_int8_engine(model_id, config.QUANTIZED_MODEL_DIR, **GENERATION_KWARGS)
+    if backend == "cpu":
+        return TransformersModel(
+            model_id=model_id,
+            device_map="cpu",
+            torch_dtype="float32",
+            **GENERATION_KWARGS,
+        )
+    if backend == "cuda":
+        return TransformersModel(
+            model_id=model_id,
+            device="cuda",
+            **GENERATION_KWARGS,
+        )
+    raise ValueError(f"Unknown INFERENCE_BACKEND '{backend}' (expected cuda, cpu or cpu-int8)")
+
+
+def is_ready():
+    """True once the engine has been loaded"""
+    return _engine is not None
+
+
+def __getattr__(name):
+    # Keeps `from model_utils import engine` working while loading lazily
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+THINK_START_TAG = "<think>"
+THINK_END_TAG = "</think>"
+EOS_TAG = "</s>"
+
+
+class ThinkStreamParser:
+    """
+    Incrementally splits streamed model output into reasoning and answer text.
+
+    Everything before the first ``</think>`` tag is reasoning, everything after it
+    is the answer. Until the tag shows up, text is routed according to the mode:
+    in "think" mode it is shown as reasoning, otherwise as answer. A trailing
+    fragment that could be the start of the tag is held back so it never flickers
+    into either output.
+    """
+
+    def __init__(self, mode):
+        self.mode = mode
+        self._text = ""
+        self._split_at = None
+
+    def feed(self, chunk):
+        """
+        Add a newly decoded chunk of text.
+
+        Returns:
+            Tuple of (reasoning, answer) as they should currently be displayed
+        """
+        self._text += chunk
+        if self._split_at is None:
+            index = self._text.find(THINK_END_TAG)
+            if index != -1:
+                self._split_at = index
+        return self._current(final=False)
+
+    def finish(self):
+        """
+        Returns the final (reasoning, answer) split once the stream is exhausted.
+        Output without a ``</think>`` tag is treated entirely as the answer.
+        """
+        return self._current(final=True)
+
+    def _current(self, final):
+        if self._split_at is not None:
+            reasoning = self._text[:self._split_at].rstrip("\n")
+            answer = self._text[self._split_at + len(THINK_END_TAG):].lstrip("\n")
+        else:
+            visible = self._text if final else self._text[:len(self._text) - self._pending_tag_length()]
+            if final or self.mode != "think":
+                reasoning, answer = "", visible
+            else:
+                reasoning, answer = visible.rstrip("\n"), ""
+        if final:
+            answer = answer.removesuffix(EOS_TAG)
+        return reasoning, answer
+
+    def _pending_tag_length(self):
+        """Length of the longest suffix of the text that is a prefix of the tag"""
+        for length in range(min(len(THINK_END_TAG) - 1, len(self._text)), 0, -1):
+            if THINK_END_TAG.startswith(self._text[-length:]):
+                return length
+        return 0
+
+
+prefix_cache = PrefixKVCache(
+    max_entries=config.PREFIX_CACHE_MAX_ENTRIES,
+    min_tokens=config.PREFIX_CACHE_MIN_TOKENS,
 )
 
 
-def generate_response(prompt, mode):
+def register_prompt_prefix(text):
+    """
+    Declares a fixed preamble that prompts start with (e.g. a PROMPT_TEMPLATES
+    entry) so its KV state is computed once and reused by every request.
+    """
+    prefix_cache.register(text)
+
+
+_scheduler = None
+_scheduler_lock = Lock()
+
+
+def get_scheduler():
+    """
+    Returns the shared continuous-batching scheduler, creating it on first use.
+    Every generation request in the app goes through this one scheduler.
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                from scheduler import ContinuousBatchScheduler
+                engine = get_engine()
+                _scheduler = ContinuousBatchScheduler(
+                    engine.model,
+                    engine.tokenizer,
+                    max_batch_size=config.SCHEDULER_MAX_BATCH_SIZE,
+                    max_wait_ms=config.SCHEDULER_MAX_WAIT_MS,
+                    max_queue_depth=config.SCHEDULER_MAX_QUEUE_DEPTH,
+                    prefix_cache=prefix_cache if config.ENABLE_PREFIX_CACHE else None,
+                )
+                SCHEDULER_QUEUE_DEPTH.set_function(lambda: _scheduler.stats()["queue_depth"])
+                SCHEDULER_ACTIVE.set_function(lambda: _scheduler.stats()["active"])
+    return _scheduler
+
+
+def _build_messages(prompt):
+    return [{"role": "user", "content": prompt}]
+
+
+def _tokenize_messages(messages, add_generation_prompt=True):
+    return get_engine().tokenizer.apply_chat_template(
+        messages,
+        add_generation_prompt=add_generation_prompt,
+        return_tensors="pt",
+        return_dict=True,
+    )
+
+
+def _cached_prefix_length(prompt, input_ids):
+    """Number of leading prompt tokens whose KV state can come from the prefix cache"""
+    if not config.ENABLE_PREFIX_CACHE:
+        return 0
+    prefix_text = prefix_cache.match(prompt)
+    if prefix_text is None:
+        return 0
+    prefix_ids = _tokenize_messages(_build_messages(prefix_text), add_generation_prompt=False)["input_ids"][0].tolist()
+    shared = prefix_cache.shared_length(prefix_ids, input_ids)
+    logging.getLogger("bharat_buddy").debug(f"Prefix cache covers {shared} of {len(input_ids)} prompt tokens")
+    return shared
+
+
+def _stream_text(prompt, usage=None, **generation_kwargs):
+    """
+    Yields decoded text chunks as soon as they are produced, either from the shared
+    batch scheduler or, with batching disabled, from a dedicated generate() thread.
+    Once the generation finishes, prompt_tokens and output_tokens are set in usage.
+    """
+    if config.ENABLE_CONTINUOUS_BATCHING:
+        yield from _stream_text_batched(prompt, usage, **generation_kwargs)
+    else:
+        yield from _stream_text_direct(prompt, usage, **generation_kwargs)
+
+
+def _think_budget(budget, prompt_ids):
+    """ThinkBudget for a generation, or None without a reasoning cap"""
+    if not budget:
+        return None
+    tokenizer = get_engine().tokenizer
+    decode = lambda ids: tokenizer.decode(ids, skip_special_tokens=False)
+    # Some chat templates open the reasoning block at the end of the prompt
+    prompt_tail = decode(list(prompt_ids[-OPEN_TAG_TOKENS:]))
+    return ThinkBudget(
+        budget,
+        tokenizer.encode(f"\n{THINK_END_TAG}\n\n", add_special_tokens=False),
+        decode,
+        THINK_END_TAG,
+        start_tag=THINK_START_TAG,
+        opened=prompt_tail.rfind(THINK_START_TAG) > prompt_tail.rfind(THINK_END_TAG),
+    )
+
+
+def _submit_batched(prompt, loop=None, **generation_kwargs):
+    input_ids = _tokenize_messages(_build_messages(prompt))["input_ids"][0].tolist()
+    return _submit_ids(input_ids, _cached_prefix_length(prompt, input_ids), loop=loop, **generation_kwargs)
+
+
+def _submit_ids(input_ids, prefix_length=0, loop=None, **generation_kwargs):
+    """Queues an already tokenized prompt on the shared scheduler"""
+    settings = {**GENERATION_KWARGS, **generation_kwargs}
+    generation_config = get_engine().model.generation_config
+    return get_scheduler().submit(
+        input_ids,
+        max_new_tokens=settings["max_new_tokens"],
+        do_sample=settings.get("do_sample", False),
+        temperature=settings.get("temperature", generation_config.temperature or 1.0),
+        top_p=settings.get("top_p", generation_config.top_p or 1.0),
+        prefix_length=prefix_length,
+        loop=loop,
+        think_budget=_think_budget(settings.get("think_budget"), input_ids),
+    )
+
+
+def _stream_text_batched(prompt, usage=None, **generation_kwargs):
+    request = _submit_batched(prompt, **generation_kwargs)
+    try:
+        yield from get_scheduler().stream(request)
+    finally:
+        # Also when the consumer stopped early, so the tokens actually decoded are reported
+        _record_usage(usage, len(request.input_ids), len(request.generated), request.think_budget)
+
+
+def _record_usage(usage, prompt_tokens, output_tokens, think_budget=None):
+    if usage is not None:
+        usage["prompt_tokens"] = prompt_tokens
+        usage["output_tokens"] = output_tokens
+        if think_budget is not None:
+            usage.update(think_budget.report())
+
+
+async def _astream_text(prompt, usage=None, **generation_kwargs):
+    """
+    Async counterpart of _stream_text. Batched requests are awaited straight off the
+    scheduler; the direct generate() path has its own thread and is bridged.
+    """
+    if config.ENABLE_CONTINUOUS_BATCHING:
+        # Loading the engine and tokenizing can block, so they stay off the event loop
+        request = await asyncio.to_thread(
+            _submit_batched, prompt, loop=asyncio.get_running_loop(), **generation_kwargs
+        )
+        try:
+            async for text in get_scheduler().astream(request):
+                yield text
+        finally:
+            _record_usage(usage, len(request.input_ids), len(request.generated), request.think_budget)
+    else:
+        async for text in aiter_in_thread(_stream_text_direct(prompt, usage, **generation_kwargs)):
+            yield text
+
+
+async def aiter_in_thread(iterator):
+    """
+    Drives a blocking iterator on a worker thread and yields its items to the event
+    loop. Closing the async generator closes the iterator at its next item; the
+    worker finishes in the background.
+    """
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue()
+    stop = object()
+    closed = False
+
+    def drive():
+        try:
+            for item in iterator:
+                if closed:
+                    break
+                loop.call_soon_threadsafe(items.put_nowait, (item, None))
+            loop.call_soon_threadsafe(items.put_nowait, (stop, None))
+        except Exception as e:
+            loop.call_soon_threadsafe(items.put_nowait, (stop, e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    loop.run_in_executor(None, drive)
+    try:
+        while True:
+            item, error = await items.get()
+            if error is not None:
+                raise error
+            if item is stop:
+                return
+            yield item
+    finally:
+        closed = True
+
+
+def _stream_text_direct(prompt, usage=None, **generation_kwargs):
+    from transformers import TextIteratorStreamer, DynamicCache
+
+    engine = get_engine()
+    tokenizer = engine.tokenizer
+    inputs = _tokenize_messages(_build_messages(prompt)).to(engine.model.device)
+    prompt_tokens = inputs["input_ids"].shape[1]
+    think_budget = _think_budget(generation_kwargs.pop("think_budget", None), inputs["input_ids"][0].tolist())
+    if think_budget is not None:
+        generation_kwargs["logits_processor"] = _force_tokens(think_budget, prompt_tokens)
+    prefix_length = _cached_prefix_length(prompt, inputs["input_ids"][0].tolist())
+    if prefix_length:
+        # generate() only prefills the tokens the cache does not already cover
+        prefix_ids = inputs["input_ids"][0, :prefix_length].tolist()
+        generation_kwargs = {
+            **generation_kwargs,
+            "past_key_values": DynamicCache.from_legacy_cache(prefix_cache.get(engine.model, prefix_ids)),
+        }
+    # A fresh streamer per call: the engine's own streamer is shared and not safe
+    # for concurrent requests.
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    stopped = Event()
+    outputs = []
+    thread = Thread(
+        target=lambda **kwargs: outputs.append(engine.model.generate(**kwargs)),
+        kwargs={**inputs, "streamer": streamer, "stopping_criteria": _stop_when(stopped),
+                **GENERATION_KWARGS, **generation_kwargs},
+        daemon=True,
+    )
+    thread.start()
+    try:
+        for text in streamer:
+            if text:
+                yield text
+    finally:
+        # A consumer that stops reading (answer complete, client gone) ends generate() at the next token
+        stopped.set()
+        thread.join()
+        if outputs:
+            _record_usage(usage, prompt_tokens, outputs[0].shape[1] - prompt_tokens, think_budget)
+
+
+def _stop_when(event):
+    """StoppingCriteriaList that ends generate() once event is set"""
+    import torch
+    from transformers import StoppingCriteria, StoppingCriteriaList
+
+    class EventStoppingCriteria(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return torch.full((input_ids.shape[0],), event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+    return StoppingCriteriaList([EventStoppingCriteria()])
+
+
+def _force_tokens(think_budget, prompt_tokens):
+    """LogitsProcessorList that lets think_budget force generate()'s next token"""
+    import torch
+    from transformers import LogitsProcessor, LogitsProcessorList
+
+    class ThinkBudgetLogitsProcessor(LogitsProcessor):
+        def __call__(self, input_ids, scores):
+            if input_ids.shape[1] > prompt_tokens:
+                think_budget.observe(int(input_ids[0, -1]))
+            forced = think_budget.next_forced()
+            if forced is not None:
+                scores = torch.full_like(scores, float("-inf"))
+                scores[:, forced] = 0.0
+            return scores
+
+    return LogitsProcessorList([ThinkBudgetLogitsProcessor()])
+
+
+_agent_model = None
+_agent_model_lock = Lock()
+# Agent steps that bypass the scheduler run one at a time (see AgentModel)
+_direct_agent_lock = Lock()
+
+
+class AgentModel(Model):
+    """
+    The smolagents Model the agents run on, so their steps share the engine with chat.
+
+    With continuous batching, each agent step is tokenized with the engine's chat
+    template (tool schemas included) and submitted to the shared scheduler, where it
+    is batched with chat generations and counts against its queue depth. Decoding
+    stops once the output reaches one of the step's stop sequences. With batching
+    off, steps call the engine's own generate()/generate_stream() one at a time,
+    since generate_stream() reads from the engine's single shared streamer.
+
+    Args:
+        engine: The shared TransformersModel
+    """
+
+    def __init__(self, engine):
+        super().__init__(flatten_messages_as_text=engine.flatten_messages_as_text, model_id=engine.model_id,
+                         **engine.kwargs)
+        self.engine = engine
+
+    def _submit(self, messages, stop_sequences, response_format, tools_to_call_from, **kwargs):
+        if response_format is not None:
+            raise ValueError("Transformers does not support structured outputs")
+        args = self.engine._prepare_completion_args(
+            messages=messages, stop_sequences=stop_sequences, tools_to_call_from=tools_to_call_from, **kwargs
+        )
+        return _submit_ids(args["inputs"][0].tolist(), max_new_tokens=args["max_new_tokens"])
+
+    def generate(self, messages, stop_sequences=None, response_format=None, tools_to_call_from=None, **kwargs):
+        if not config.ENABLE_CONTINUOUS_BATCHING:
+            with _direct_agent_lock:
+                return self.engine.generate(messages, stop_sequences=stop_sequences, response_format=response_format,
+                                            tools_to_call_from=tools_to_call_from, **kwargs)
+        request = self._submit(messages, stop_sequences, response_format, tools_to_call_from, **kwargs)
+        content = "".join(_until_stop(request, stop_sequences or []))
+        return ChatMessage(
+            role=MessageRole.ASSISTANT,
+            content=content,
+            raw={"out": content},
+            token_usage=TokenUsage(input_tokens=len(request.input_ids), output_tokens=len(request.generated)),
+        )
+
+    def generate_stream(self, messages, stop_sequences=None, response_format=None, tools_to_call_from=None, **kwargs):
+        if not config.ENABLE_CONTINUOUS_BATCHING:
+            with _direct_agent_lock:
+                yield from self.engine.generate_stream(messages, stop_sequences=stop_sequences,
+                                                       response_format=response_format,
+                                                       tools_to_call_from=tools_to_call_from, **kwargs)
+            return
+        request = self._submit(messages, stop_sequences, response_format, tools_to_call_from, **kwargs)
+        # Like the engine's own stream: prompt tokens on the first delta, one output token per delta
+        input_tokens = len(request.input_ids)
+        for text in _until_stop(request, stop_sequences or []):
+            yield ChatMessageStreamDelta(
+                content=text, tool_calls=None, token_usage=TokenUsage(input_tokens=input_tokens, output_tokens=1)
+            )
+            input_tokens = 0
+
+
+def _until_stop(request, stop_sequences):
+    """
+    Streams a scheduler request's text up to the first stop sequence, then cancels
+    the request. A tail that could be the start of a stop sequence is held back
+    until the next chunk shows whether it is one.
+    """
+    stream = get_scheduler().stream(request)
+    text, sent = "", 0
+    try:
+        for chunk in stream:
+            text += chunk
+            found = [i for i in (text.find(s, sent) for s in stop_sequences) if i != -1]
+            if found:
+                if min(found) > sent:
+                    yield text[sent:min(found)]
+                return
+            end = len(text) - _stop_prefix_length(text, stop_sequences)
+            if end > sent:
+                yield text[sent:end]
+                sent = end
+        if len(text) > sent:
+            yield text[sent:]
+    finally:
+        stream.close()
+
+
+def _stop_prefix_length(text, stop_sequences):
+    """Length of the longest suffix of text that is a prefix of a stop sequence"""
+    longest = max((len(s) for s in stop_sequences), default=1)
+    for length in range(min(longest - 1, len(text)), 0, -1):
+        if any(s.startswith(text[-length:]) for s in stop_sequences):
+            return length
+    return 0
+
+
+def get_agent_model():
+    """
+    Returns the AgentModel shared by every agent, loading the engine on first use.
+    Its generate and generate_stream calls are traced as "engine" spans.
+    """
+    global _agent_model
+    if _agent_model is None:
+        with _agent_model_lock:
+            if _agent_model is None:
+                _agent_model = trace_engine(AgentModel(get_engine()))
+    return _agent_model
+
+
+_response_cache = None
+_response_cache_lock = Lock()
+
+
+def get_response_cache():
+    """Returns the shared response cache, opening its disk tier on first use"""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                from response_cache import ResponseCache
+                _response_cache = ResponseCache(
+                    path=config.RESPONSE_CACHE_PATH,
+                    max_memory_entries=config.RESPONSE_CACHE_MEMORY_ENTRIES,
+                    max_disk_entries=config.RESPONSE_CACHE_DISK_ENTRIES,
+                    ttl_s=config.RESPONSE_CACHE_TTL_S,
+                )
+    return _response_cache
+
+
+def _generation_settings(profile):
+    """Everything besides the prompt and mode that changes what the model would answer"""
+    return {"model_id": MODEL_ID, "backend": config.INFERENCE_BACKEND, **GENERATION_KWARGS,
+            "max_new_tokens": profile.max_new_tokens, "early_stop": config.ENABLE_EARLY_STOP,
+            "stop": profile.stop + profile.second_stop, "max_repeats": profile.max_repeats,
+            "think_budget": profile.think_budget}
+
+
+def stream_response(prompt, mode, metadata=None, use_cache=True, profile=None):
+    """
+    Streams a response for the prompt, splitting reasoning from the answer on the fly.
+    Answers are served from the response cache when possible, and identical prompts
+    that are already being generated are coalesced onto that generation.
+
+    Args:
+        prompt: The full prompt to send to the model
+        mode: "think" or "non-think"
+        metadata: Optional dict that is filled with latency figures for the request
+            (ttft_s, total_s, output_chunks, prompt_tokens, output_tokens), how the
+            generation ended (profile, max_new_tokens, finish_reason, tokens_saved),
+            the reasoning budget in think mode (think_budget, reasoning_tokens,
+            think_budget_exhausted) and the response_cache outcome
+        use_cache: False always generates afresh and leaves the cache untouched,
+            for callers that want a different sample on every call
+        profile: Generation profile name (usually the tab) that sets the token
+            limit and the stop criteria; None uses the default profile
+
+    Yields:
+        Tuples of (reasoning, answer) with the text decoded so far
+    """
     logger = logging.getLogger("bharat_buddy")
-    logger.debug(f"generate_response called with prompt: {prompt[:200]}... mode: {mode}")
+    logger.debug(f"stream_response called with prompt: {prompt[:200]}... mode: {mode}")
+    metadata = metadata if metadata is not None else {}
+    profile = get_profile(profile, mode)
+    if not (config.ENABLE_RESPONSE_CACHE and use_cache):
+        yield from _stream_generation(prompt, mode, metadata, profile)
+        return
+
+    cache = get_response_cache()
+    key = cache.make_key(prompt, mode, _generation_settings(profile))
+    cached = cache.get(key)
+    if cached is not None:
+        metadata["response_cache"] = "hit"
+        logger.info("Response cache hit")
+        yield cached
+        return
+
+    leader, flight = cache.claim(key)
+    if not leader:
+        result = flight.wait(timeout=config.RESPONSE_CACHE_WAIT_S)
+        if result is not None:
+            metadata["response_cache"] = "coalesced"
+            logger.info("Coalesced onto an identical in-flight generation")
+            yield result
+            return
+        # The leader failed or was cancelled; generate independently
+        metadata["response_cache"] = "miss"
+        yield from _stream_generation(prompt, mode, metadata, profile)
+        return
+
+    metadata["response_cache"] = "miss"
+    result, completed = None, False
     try:
-        # Compose chat template for Sarvam-M
-        messages = [{"role": "user", "content": [{"type": "text", "text": prompt}]}]
-        logger.debug(f"Sending messages to engine: {messages}")
-        # smolagents expects messages as a list of dicts with 'role' and 'content' as a list of dicts with 'type' and 'text'
-        output = engine(messages)
-        logger.debug(f"Raw output from engine: {output}")
-        # output can be a list of dicts or a string
-        if isinstance(output, list) and len(output) > 0 and isinstance(output[0], dict) and "content" in output[0]:
-            output_text = output[0]["content"]
-        else:
-            output_text = str(output)
-        logger.debug(f"Output text: {output_text[:500]}")
-        # Parse Sarvam-M output for reasoning and answer
-        if "</think>" in output_text:
-            reasoning_content = output_text.split("</think>")[0].rstrip("\n")
-            content = output_text.split("</think>")[-1].lstrip("\n").rstrip("</s>")
+        for result in _stream_generation(prompt, mode, metadata, profile):
+            yield result
+        completed = True
+    finally:
+        cache.resolve(key, result if completed else None)
+
+
+# Generation metadata copied onto the "generate" span
+_SPAN_FIELDS = ("ttft_s", "total_s", "prompt_tokens", "output_tokens", "finish_reason", "tokens_saved",
+                "reasoning_tokens", "think_budget_exhausted")
+
+
+def _finish(metadata, profile, stop):
+    """Records why a generation ended and, for early stops, the tokens it did not have to decode"""
+    metadata["profile"] = profile.name
+    metadata["max_new_tokens"] = profile.max_new_tokens
+    output_tokens = metadata.get("output_tokens")
+    if stop.reason is not None:
+        metadata["finish_reason"] = stop.reason
+        if output_tokens is not None:
+            metadata["tokens_saved"] = max(0, profile.max_new_tokens - output_tokens)
+    elif output_tokens is not None and output_tokens >= profile.max_new_tokens:
+        metadata["finish_reason"] = "max_tokens"
+    else:
+        metadata["finish_reason"] = "eos"
+    if metadata.get("think_budget_exhausted"):
+        logging.getLogger("bharat_buddy").info(
+            f"Reasoning ({profile.name}) hit its {profile.think_budget}-token budget; answer forced")
+    if metadata["finish_reason"] != "eos":
+        logging.getLogger("bharat_buddy").info(
+            f"Generation ({profile.name}, {profile.mode}) stopped on {metadata['finish_reason']} after "
+            f"{output_tokens} of {profile.max_new_tokens} tokens")
+
+
+def _generation_kwargs(profile):
+    kwargs = {"max_new_tokens": profile.max_new_tokens}
+    if profile.think_budget:
+        kwargs["think_budget"] = profile.think_budget
+    return kwargs
+
+
+@traced("generate", args=("mode",))
+def _stream_generation(prompt, mode, metadata, profile):
+    logger = logging.getLogger("bharat_buddy")
+    parser = ThinkStreamParser(mode)
+    stop = AnswerStop(profile)
+    start = time.perf_counter()
+    chunks = 0
+    stream = _stream_text(prompt, usage=metadata, **_generation_kwargs(profile))
+    try:
+        for chunk in stream:
+            if chunks == 0:
+                metadata["ttft_s"] = time.perf_counter() - start
+                logger.info(f"Time to first token: {metadata['ttft_s']:.3f}s")
+            chunks += 1
+            current = parser.feed(chunk)
+            if config.ENABLE_EARLY_STOP and stop.feed(*current):
+                break
+            yield current
+    finally:
+        # Stops the engine-side generation when decoding ended early
+        stream.close()
+    reasoning, content = stop.trim(*parser.finish())
+    metadata["total_s"] = time.perf_counter() - start
+    metadata["output_chunks"] = chunks
+    _finish(metadata, profile, stop)
+    logger.info(f"Generation finished in {metadata['total_s']:.3f}s ({chunks} chunks)")
+    observe_generation(metadata)
+    set_attributes(**{key: metadata[key] for key in _SPAN_FIELDS if key in metadata})
+    logger.debug(f"Reasoning: {reasoning[:300]}")
+    logger.debug(f"Content: {content[:300]}")
+    yield reasoning, content
+
+
+async def astream_response(prompt, mode, metadata=None, use_cache=True, profile=None):
+    """
+    Async counterpart of stream_response, for the async handlers in app_logic.
+    Waiting on the model or on a coalesced generation suspends the coroutine rather
+    than holding a worker thread.
+
+    Yields:
+        Tuples of (reasoning, answer) with the text decoded so far
+    """
+    logger = logging.getLogger("bharat_buddy")
+    logger.debug(f"astream_response called with prompt: {prompt[:200]}... mode: {mode}")
+    metadata = metadata if metadata is not None else {}
+    profile = get_profile(profile, mode)
+    if not (config.ENABLE_RESPONSE_CACHE and use_cache):
+        async for result in _astream_generation(prompt, mode, metadata, profile):
+            yield result
+        return
+
+    # Opening the cache and its lookups and writes touch SQLite, so they run on a worker thread
+    cache = _response_cache if _response_cache is not None else await asyncio.to_thread(get_response_cache)
+    key = cache.make_key(prompt, mode, _generation_settings(profile))
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        metadata["response_cache"] = "hit"
+        logger.info("Response cache hit")
+        yield cached
+        return
+
+    leader, flight = cache.claim(key)
+    if not leader:
+        result = await flight.wait_async(timeout=config.RESPONSE_CACHE_WAIT_S)
+        if result is not None:
+            metadata["response_cache"] = "coalesced"
+            logger.info("Coalesced onto an identical in-flight generation")
+            yield result
+            return
+        metadata["response_cache"] = "miss"
+        async for result in _astream_generation(prompt, mode, metadata, profile):
+            yield result
+        return
+
+    metadata["response_cache"] = "miss"
+    result, completed = None, False
+    try:
+        async for result in _astream_generation(prompt, mode, metadata, profile):
+            yield result
+        completed = True
+    finally:
+        if completed:
+            await asyncio.to_thread(cache.resolve, key, result)
         else:
-            reasoning_content = ""
-            content = output_text.rstrip("</s>")
-        logger.debug(f"Reasoning: {reasoning_content[:300]}")
-        logger.debug(f"Content: {content[:300]}")
+            # Nothing is stored, so followers are released without touching the disk
+            cache.resolve(key, None)
+
+
+@traced("generate", args=("mode",))
+async def _astream_generation(prompt, mode, metadata, profile):
+    logger = logging.getLogger("bharat_buddy")
+    parser = ThinkStreamParser(mode)
+    stop = AnswerStop(profile)
+    start = time.perf_counter()
+    chunks = 0
+    stream = _astream_text(prompt, usage=metadata, **_generation_kwargs(profile))
+    try:
+        async for chunk in stream:
+            if chunks == 0:
+                metadata["ttft_s"] = time.perf_counter() - start
+                logger.info(f"Time to first token: {metadata['ttft_s']:.3f}s")
+            chunks += 1
+            current = parser.feed(chunk)
+            if config.ENABLE_EARLY_STOP and stop.feed(*current):
+                break
+            yield current
+    finally:
+        await stream.aclose()
+    reasoning, content = stop.trim(*parser.finish())
+    metadata["total_s"] = time.perf_counter() - start
+    metadata["output_chunks"] = chunks
+    _finish(metadata, profile, stop)
+    logger.info(f"Generation finished in {metadata['total_s']:.3f}s ({chunks} chunks)")
+    observe_generation(metadata)
+    set_attributes(**{key: metadata[key] for key in _SPAN_FIELDS if key in metadata})
+    yield reasoning, content
+
+
+def generate_response(prompt, mode, metadata=None, use_cache=True, profile=None):
+    logger = logging.getLogger("bharat_buddy")
+    logger.debug(f"generate_response called with prompt: {prompt[:200]}... mode: {mode}")
+    try:
+        reasoning_content, content = "", ""
+        for reasoning_content, content in stream_response(prompt, mode, metadata, use_cache, profile):
+            pass
         return reasoning_content, content
     except Exception as e:
         logger.error(f"Error in generate_response: {e}", exc_info=True)
         return "", f"[ERROR] {e}"
+
+
+async def agenerate_response(prompt, mode, metadata=None, use_cache=True, profile=None):
+    """Async counterpart of generate_response"""
+    logger = logging.getLogger("bharat_buddy")
+    logger.debug(f"agenerate_response called with prompt: {prompt[:200]}... mode: {mode}")
+    try:
+        reasoning_content, content = "", ""
+        async for reasoning_content, content in astream_response(prompt, mode, metadata, use_cache, profile):
+            pass
+        return reasoning_content, content
+    except Exception as e:
+        logger.error(f"Error in agenerate_response: {e}", exc_info=True)
+        return "", f"[ERROR] {e}"
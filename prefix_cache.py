@@ -0,0 +1,86 @@
+"""
+Reusable KV-cache for fixed prompt prefixes
+
+Every tab prompt starts with one of the long, fixed PROMPT_TEMPLATES preambles.
+The key/value state of each preamble is computed once and shared by every request
+that starts with it, so only the user query and any added context are prefilled.
+"""
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger("bharat_buddy")
+
+
+class PrefixKVCache:
+    """
+    LRU store of KV-caches keyed by the token ids of a prompt prefix.
+
+    Args:
+        max_entries: Maximum number of cached prefixes kept in memory
+        min_tokens: Shared prefixes shorter than this are not worth caching
+    """
+
+    def __init__(self, max_entries=16, min_tokens=32):
+        self.max_entries = max_entries
+        self.min_tokens = min_tokens
+        self._prefixes = []
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def register(self, text):
+        """Declares a fixed text that prompts may start with"""
+        if text and text not in self._prefixes:
+            self._prefixes.append(text)
+            # Longest first so the most specific prefix wins in match()
+            self._prefixes.sort(key=len, reverse=True)
+
+    def match(self, prompt):
+        """Returns the longest registered prefix that the prompt starts with, or None"""
+        for text in self._prefixes:
+            if prompt.startswith(text):
+                return text
+        return None
+
+    def shared_length(self, prefix_ids, input_ids):
+        """
+        Number of leading tokens of input_ids that can be served from the cache.
+        Token boundaries at the end of the prefix may merge differently with the
+        text that follows, so only the common run of ids is reused, and the last
+        prompt token is always left for prefill to produce the next-token logits.
+        """
+        limit = min(len(prefix_ids), len(input_ids) - 1)
+        shared = 0
+        while shared < limit and prefix_ids[shared] == input_ids[shared]:
+            shared += 1
+        return shared if shared >= self.min_tokens else 0
+
+    def get(self, model, prefix_ids):
+        """
+        Returns the legacy (key, value) tuples for the prefix, running the model
+        over it on a miss. The returned tensors must not be modified in place.
+        """
+        import torch
+
+        key = tuple(prefix_ids)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            with torch.inference_mode():
+                outputs = model(input_ids=torch.tensor([list(prefix_ids)], device=model.device), use_cache=True)
+            past = outputs.past_key_values
+            entry = past.to_legacy_cache() if hasattr(past, "to_legacy_cache") else tuple(past)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            logger.info(f"Cached KV state for a {len(prefix_ids)}-token prompt prefix ({len(self._entries)} cached)")
+            return entry
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
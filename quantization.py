@@ -0,0 +1,95 @@
+"""
+CPU int8 inference backend for Bharat AI Buddy
+
+Applies PyTorch dynamic int8 quantization to every Linear layer of the model and
+caches the quantized weights on disk, so later starts skip reading the fp32
+checkpoint. The cache holds a state_dict only: the module structure is rebuilt
+from the model config by quantizing a freshly initialized model, and the cached
+tensors are loaded into it without unpickling any code.
+"""
+import hashlib
+import logging
+import os
+
+logger = logging.getLogger("bharat_buddy")
+
+
+def _cache_path(model_id, cache_dir):
+    """Cache file name, keyed on the model and the library versions that produced it"""
+    import torch
+    import transformers
+    key = f"{model_id}|torch={torch.__version__}|transformers={transformers.__version__}"
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    safe_name = model_id.replace("/", "--")
+    return os.path.join(cache_dir, f"{safe_name}-int8-{digest}.state.pt")
+
+
+def _quantize(model):
+    import torch
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_int8_model(model_id, cache_dir):
+    """
+    Returns a dynamically int8-quantized copy of the model, loading its weights
+    from the on-disk cache when available.
+
+    Args:
+        model_id: Hugging Face model ID or local path
+        cache_dir: Directory holding quantized model files
+
+    Returns:
+        The quantized causal LM, in eval mode on CPU
+    """
+    import torch
+    from transformers import AutoConfig, AutoModelForCausalLM
+
+    path = _cache_path(model_id, cache_dir)
+    if os.path.exists(path):
+        try:
+            logger.info(f"Loading cached int8 weights from {path}")
+            state_dict = torch.load(path, map_location="cpu", weights_only=True)
+            model_config = AutoConfig.from_pretrained(model_id)
+            model = _quantize(AutoModelForCausalLM.from_config(model_config, torch_dtype=torch.float32).eval())
+            model.load_state_dict(state_dict)
+            return model
+        except Exception as e:
+            logger.error(f"Failed to load cached int8 weights ({e}); quantizing again", exc_info=True)
+
+    logger.info(f"Quantizing {model_id} to int8 (dynamic, Linear layers)")
+    quantized = _quantize(AutoModelForCausalLM.from_pretrained(model_id, torch_dtype=torch.float32).eval())
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        torch.save(quantized.state_dict(), tmp_path)
+        os.replace(tmp_path, path)
+        logger.info(f"Cached int8 weights at {path}")
+    except Exception as e:
+        logger.error(f"Could not cache int8 weights: {e}", exc_info=True)
+    return quantized
+
+
+def create_int8_engine(model_id, cache_dir, **kwargs):
+    """
+    Builds a smolagents TransformersModel around the quantized model.
+
+    TransformersModel always loads weights itself, so the wrapper below skips its
+    loader and mirrors the attributes it would set for a text-only model, as of the
+    smolagents version pinned in requirements.txt.
+    """
+    from smolagents import TransformersModel, Model
+    from transformers import AutoTokenizer, TextIteratorStreamer
+
+    class QuantizedTransformersModel(TransformersModel):
+        def __init__(self, model, tokenizer, **model_kwargs):
+            self._is_vlm = False
+            self.model_kwargs = {}
+            self.apply_chat_template_kwargs = {}
+            self.model = model
+            self.tokenizer = tokenizer
+            self.streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+            Model.__init__(self, flatten_messages_as_text=True, model_id=model_id, **model_kwargs)
+
+    model = load_int8_model(model_id, cache_dir)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    return QuantizedTransformersModel(model, tokenizer, **kwargs)
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Pre-generated quiz question pool, per (exam, subject)
+
+Quiz questions are generated and parsed into QuizQuestion records ahead of
+time and held in memory, one deque per (exam, subject), backed by a SQLite file
+(records as JSON) so the pool survives restarts. Serving
+a question is a popleft from the deque; no model call and no disk I/O on the
+request path. When a pool drops below the low-water mark, a background worker
+generates a batch of new questions for it. Rows of served questions are deleted
+by the worker, so a crash can at worst serve a question twice.
+
+Usage:
+    python question_pool.py fill [--exam UPSC] [--subject History] [--path data/quiz_pool.sqlite3]
+    python question_pool.py stats
+"""
+import argparse
+import hashlib
+import itertools
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+from config import config
+from quiz import question_from_json, question_to_json
+from syllabus_store import make_key
+
+logger = logging.getLogger("bharat_buddy")
+
+
+def _fingerprint(question):
+    # Questions with the same stem are duplicates whatever their options
+    return hashlib.sha1(" ".join(question.stem.split()).casefold().encode("utf-8")).hexdigest()
+
+
+class QuestionPool:
+    """
+    In-memory question deques with a SQLite copy and a background refill worker.
+
+    Args:
+        path: SQLite file for the persistent copy, or None for memory only
+        generate: Callable (exam, subject, count) -> list of QuizQuestion
+        low_water: A pool with fewer questions than this is refilled
+        batch_size: Questions generated per refill
+        dedup_window: Recently served questions per pool that new ones are also
+            checked against; pooled questions are always checked
+    """
+
+    def __init__(self, path=None, generate=None, low_water=5, batch_size=10, dedup_window=200):
+        self.low_water = low_water
+        self.batch_size = batch_size
+        self.dedup_window = dedup_window
+        self._generate = generate
+        self._pools = {}
+        self._labels = {}
+        # Fingerprints per pool: of the questions in it, and of the last dedup_window served
+        self._pooled = {}
+        self._served = {}
+        self._consumed = []
+        self._lock = threading.Lock()
+        # Disk writes have their own lock so pop() never waits on SQLite
+        self._db_lock = threading.Lock()
+        self._added = threading.Condition(self._lock)
+        # (priority, order, key): a request waiting on an empty pool goes ahead of priming
+        self._refills = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._pending = set()
+        self._urgent = set()
+        self._worker = None
+        self._db = None
+        if path:
+            try:
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS questions ("
+                    "id INTEGER PRIMARY KEY AUTOINCREMENT, pool TEXT, exam TEXT, subject TEXT, "
+                    "question TEXT, created_at REAL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS questions_pool ON questions(pool)")
+                self._db.commit()
+                self._load()
+            except sqlite3.Error as e:
+                logger.error(f"Quiz pool disk copy disabled: {e}", exc_info=True)
+                self._db = None
+
+    def _load(self):
+        rows = self._db.execute("SELECT id, pool, exam, subject, question FROM questions ORDER BY id").fetchall()
+        for row_id, key, exam, subject, text in rows:
+            try:
+                question = question_from_json(text)
+            except (ValueError, TypeError, KeyError):
+                logger.warning(f"Skipping unreadable quiz pool row {row_id}")
+                continue
+            self._pools.setdefault(key, deque()).append((row_id, question))
+            self._labels.setdefault(key, (exam, subject))
+            self._pooled.setdefault(key, set()).add(_fingerprint(question))
+        if rows:
+            logger.info(f"Loaded {len(rows)} quiz questions for {len(self._pools)} exam/subject pools")
+
+    def pop(self, exam, subject, timeout=0):
+        """
+        Takes the next question for exam and subject, and schedules a refill when
+        the pool runs low.
+
+        Args:
+            exam: Exam name
+            subject: Subject name
+            timeout: Seconds to wait for a refill if the pool is empty
+
+        Returns:
+            QuizQuestion, or None if none was ready
+        """
+        key = make_key(exam, subject)
+        with self._lock:
+            self._labels.setdefault(key, (exam, subject))
+            pool = self._pools.setdefault(key, deque())
+            if not pool:
+                # Someone is asking for this pool, so it is filled before any priming
+                self._request_refill(key, urgent=True)
+                if timeout > 0:
+                    # Stops waiting early if the refill ends without adding anything
+                    self._added.wait_for(lambda: pool or key not in self._pending, timeout)
+            item = pool.popleft() if pool else None
+            if item is not None:
+                self._mark_served(key, item[1])
+                if item[0] is not None:
+                    self._consumed.append(item[0])
+            if len(pool) < self.low_water:
+                self._request_refill(key)
+        return item[1] if item is not None else None
+
+    def _mark_served(self, key, question):
+        # Called with the lock held
+        fingerprint = _fingerprint(question)
+        self._pooled.get(key, set()).discard(fingerprint)
+        served = self._served.setdefault(key, OrderedDict())
+        served[fingerprint] = None
+        served.move_to_end(fingerprint)
+        while len(served) > self.dedup_window:
+            served.popitem(last=False)
+
+    def size(self, exam, subject):
+        with self._lock:
+            return len(self._pools.get(make_key(exam, subject), ()))
+
+    def stats(self):
+        """Returns {(exam, subject): ready questions}"""
+        with self._lock:
+            return {self._labels[key]: len(pool) for key, pool in self._pools.items()}
+
+    def request_refill(self, exam, subject):
+        """Queues a background refill for exam and subject if it is below the low-water mark"""
+        key = make_key(exam, subject)
+        with self._lock:
+            self._labels.setdefault(key, (exam, subject))
+            if len(self._pools.get(key, ())) < self.low_water:
+                self._request_refill(key)
+
+    def _request_refill(self, key, urgent=False):
+        # Called with the lock held. An urgent request for a key already queued behind
+        # others is queued again at the front; the worker skips the stale entry.
+        if self._generate is None or key in self._urgent or (key in self._pending and not urgent):
+            return
+        self._pending.add(key)
+        if urgent:
+            self._urgent.add(key)
+        self._refills.put((0 if urgent else 1, next(self._order), key))
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="quiz-pool-refill", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            _, _, key = self._refills.get()
+            if key is None:
+                return
+            with self._lock:
+                if key not in self._pending:
+                    continue
+            try:
+                self.refill(*self._labels[key])
+            except Exception as e:
+                logger.error(f"Quiz pool refill failed for {self._labels[key]}: {e}", exc_info=True)
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                    self._urgent.discard(key)
+                    self._added.notify_all()
+
+    def refill(self, exam, subject, count=None):
+        """
+        Generates a batch of questions for exam and subject and adds the new ones.
+
+        Returns:
+            Number of questions added (duplicates of pooled or recently served
+            questions are dropped)
+        """
+        key = make_key(exam, subject)
+        start = time.perf_counter()
+        questions = self._generate(exam, subject, count or self.batch_size)
+        self._flush_consumed()
+        added = []
+        with self._lock:
+            self._labels.setdefault(key, (exam, subject))
+            pooled = self._pooled.setdefault(key, set())
+            served = self._served.get(key, ())
+            for question in questions:
+                fingerprint = _fingerprint(question)
+                if fingerprint not in pooled and fingerprint not in served:
+                    pooled.add(fingerprint)
+                    added.append(question)
+        rows = self._save(key, exam, subject, added)
+        with self._lock:
+            self._pools.setdefault(key, deque()).extend(zip(rows, added))
+            self._added.notify_all()
+        logger.info(f"Quiz pool {exam}/{subject}: added {len(added)} of {len(questions)} questions "
+                    f"in {time.perf_counter() - start:.1f}s")
+        return len(added)
+
+    def _save(self, key, exam, subject, questions):
+        if self._db is None or not questions:
+            return [None] * len(questions)
+        try:
+            now = time.time()
+            with self._db_lock:
+                ids = []
+                for question in questions:
+                    cursor = self._db.execute(
+                        "INSERT INTO questions (pool, exam, subject, question, created_at) VALUES (?, ?, ?, ?, ?)",
+                        (key, exam, subject, question_to_json(question), now),
+                    )
+                    ids.append(cursor.lastrowid)
+                self._db.commit()
+            return ids
+        except sqlite3.Error as e:
+            logger.error(f"Quiz pool write failed: {e}", exc_info=True)
+            return [None] * len(questions)
+
+    def _flush_consumed(self):
+        with self._lock:
+            consumed, self._consumed = self._consumed, []
+        if self._db is None or not consumed:
+            return
+        try:
+            with self._db_lock:
+                self._db.executemany("DELETE FROM questions WHERE id = ?", [(row_id,) for row_id in consumed])
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Quiz pool delete failed: {e}", exc_info=True)
+
+    def close(self):
+        """Stops the worker and writes outstanding deletions"""
+        if self._worker is not None:
+            self._refills.put((2, next(self._order), None))
+            self._worker.join()
+            self._worker = None
+        self._flush_consumed()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_question_pool():
+    """Returns the shared QuestionPool, loading its disk copy on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from quiz import generate_questions
+                _pool = QuestionPool(
+                    path=config.QUIZ_POOL_PATH,
+                    generate=generate_questions,
+                    low_water=config.QUIZ_POOL_LOW_WATER,
+                    batch_size=config.QUIZ_POOL_BATCH_SIZE,
+                )
+    return _pool
+
+
+def prime_pools():
+    """Queues a background refill for every EXAMS x SUBJECTS pool below the low-water mark"""
+    from constants import EXAMS, SUBJECTS
+
+    pool = get_question_pool()
+    for exam in EXAMS:
+        for subject in SUBJECTS.get(exam, []):
+            pool.request_refill(exam, subject)
+
+
+def main():
+    from constants import EXAMS, SUBJECTS
+    from quiz import generate_questions
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["fill", "stats"])
+    parser.add_argument("--path", default=config.QUIZ_POOL_PATH)
+    parser.add_argument("--exam", help="Limit fill to this exam")
+    parser.add_argument("--subject", help="Limit fill to this subject")
+    parser.add_argument("--count", type=int, default=config.QUIZ_POOL_BATCH_SIZE, help="Questions per pool")
+    args = parser.parse_args()
+
+    pool = QuestionPool(args.path, generate=generate_questions, batch_size=args.count)
+    if args.command == "fill":
+        pairs = [(exam, subject) for exam in EXAMS for subject in SUBJECTS.get(exam, [])
+                 if (not args.exam or make_key(exam) == make_key(args.exam))
+                 and (not args.subject or make_key(exam, subject) == make_key(exam, args.subject))]
+        if not pairs and args.exam and args.subject:
+            pairs = [(args.exam, args.subject)]
+        for exam, subject in pairs:
+            added = pool.refill(exam, subject)
+            print(f"{exam} / {subject}: +{added}, {pool.size(exam, subject)} ready")
+    else:
+        for (exam, subject), ready in sorted(pool.stats().items()):
+            print(f"{exam} / {subject}: {ready} ready")
+    pool.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,278 @@
-from model_utils import generate_response
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from constants import EXAMS, SUBJECTS
+from config import config
+import json
 import logging
+import re
+import threading
+import time
 
-quiz_state = {}
+POOL_EMPTY_MESSAGE = "Quiz questions for {exam} {subject} are being prepared. Please try again in a moment."
+
+# A parsed multiple-choice question; options is a tuple of (key, text) pairs and
+# answer is the key of the correct option
+QuizQuestion = namedtuple("QuizQuestion", ["stem", "options", "answer", "explanation"])
+
+_OPTION_RE = re.compile(r"^[\(\[]?([A-Da-d])[\)\]\.:]\s*(.+)$")
+_ANSWER_RE = re.compile(r"^(?:correct\s+)?(?:answer|ans)\s*(?:is)?\s*[:\-]\s*(.*)$", re.IGNORECASE)
+_EXPLANATION_RE = re.compile(r"^(?:explanation|reason|solution)\s*[:\-]\s*(.*)$", re.IGNORECASE)
+_STEM_PREFIX_RE = re.compile(r"^(?:q(?:uestion)?\s*\d*\s*[:.)\-]\s*)", re.IGNORECASE)
+_HEADING_RE = re.compile(r"^(?:options|choices)\s*:?$", re.IGNORECASE)
+_KEY_RE = re.compile(r"^[\(\[]?([A-Da-d])(?:[\)\]\.:]|\s|$)")
+
+
+def _clean_line(line):
+    # Drop markdown emphasis and heading/list markers the model likes to add
+    return re.sub(r"[*_#`]+", "", line).strip().lstrip("-• ").strip()
+
+
+def _answer_key(text, options):
+    """Resolves an answer given as a key ("b", "(B)", "B) 1857") or as option text to an option key"""
+    text = _clean_line(text)
+    folded = " ".join(text.split()).casefold().rstrip(".")
+    for key, option in options:
+        if folded and " ".join(option.split()).casefold().rstrip(".") == folded:
+            return key
+    match = _KEY_RE.match(text)
+    if match and match.group(1).upper() in {key for key, _ in options}:
+        return match.group(1).upper()
+    return None
+
+
+def parse_quiz_question(text):
+    """
+    Parses model output of the form "Q: ...\\nA) ...\\nB) ...\\nC) ...\\nD) ...\\nAnswer: ...",
+    optionally followed by "Explanation: ...". Tolerates markdown, "Question 1:" stems,
+    "(A)"/"A."/"a:" option markers and answers given as a key or as the option text.
+
+    Returns:
+        QuizQuestion, or None if the text has no stem, fewer than two options or no
+        recognisable correct answer
+    """
+    stem, options, answer, explanation = [], [], None, []
+    section = "stem"
+    for raw in (text or "").splitlines():
+        line = _clean_line(raw)
+        if not line or _HEADING_RE.match(line):
+            continue
+        answer_match = _ANSWER_RE.match(line)
+        explanation_match = _EXPLANATION_RE.match(line)
+        option_match = _OPTION_RE.match(line)
+        if answer_match:
+            answer, section = answer_match.group(1), "answer"
+        elif explanation_match:
+            explanation.append(explanation_match.group(1))
+            section = "explanation"
+        elif option_match and section in ("stem", "options"):
+            options.append([option_match.group(1).upper(), option_match.group(2).strip()])
+            section = "options"
+        elif section == "stem":
+            stem.append(_STEM_PREFIX_RE.sub("", line))
+        elif section == "options":
+            options[-1][1] += " " + line
+        else:
+            # Text after the answer line explains it
+            explanation.append(line)
+
+    options = tuple((key, option) for key, option in options)
+    if not stem or len(options) < 2 or len({key for key, _ in options}) != len(options) or answer is None:
+        return None
+    key = _answer_key(answer, options)
+    if key is None:
+        return None
+    # "Answer: B) 1857, because ..." carries its explanation after the option
+    remainder = _clean_line(answer)
+    match = _KEY_RE.match(remainder)
+    if match and match.group(1).upper() == key:
+        remainder = remainder[match.end():].strip()
+    option_text = dict(options)[key]
+    if remainder.casefold().startswith(option_text.casefold()):
+        remainder = remainder[len(option_text):]
+    remainder = remainder.lstrip(" .,;:-")
+    if remainder and not explanation:
+        explanation.append(remainder)
+    return QuizQuestion(" ".join(stem).strip(), options, key, " ".join(explanation).strip())
+
+
+def format_quiz_question(question):
+    """Renders a question for display, without its answer"""
+    return "\n".join([question.stem] + [f"{key}) {text}" for key, text in question.options])
+
+
+def question_to_json(question):
+    return json.dumps(question._asdict(), ensure_ascii=False, separators=(",", ":"))
+
+
+def question_from_json(text):
+    record = json.loads(text)
+    record["options"] = tuple((key, option) for key, option in record["options"])
+    return QuizQuestion(**record)
+
+
+class QuizSession:
+    """Quiz progress of one UI session"""
+    __slots__ = ("exam", "subject", "question", "asked", "correct")
+
+    def __init__(self, exam, subject):
+        self.exam = exam
+        self.subject = subject
+        self.question = None
+        self.asked = 0
+        self.correct = 0
+
+
+class QuizSessionStore:
+    """
+    Quiz sessions keyed by session id, with a size cap and idle-TTL eviction.
+    Entries are kept in least-recently-used order, so lookups, inserts and
+    evictions are all O(1) (amortized for expiry).
+
+    Args:
+        max_sessions: Sessions kept; the least recently used is evicted beyond this
+        idle_ttl_s: Seconds a session may go unused before it is dropped
+        clock: Time source, overridable for tests
+    """
+
+    def __init__(self, max_sessions=10000, idle_ttl_s=1800, clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.idle_ttl_s = idle_ttl_s
+        self._clock = clock
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def get(self, session_id):
+        """Returns the session and marks it used, or None if it is unknown or expired"""
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            self._sessions[session_id] = (entry[0], now)
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def start(self, session_id, exam, subject):
+        """Replaces any existing session state with a fresh QuizSession"""
+        session = QuizSession(exam, subject)
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            self._sessions[session_id] = (session, now)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+        return session
+
+    def remove(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _expire(self, now):
+        # Called with the lock held; the oldest entries are first
+        while self._sessions:
+            session_id, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used <= self.idle_ttl_s:
+                break
+            del self._sessions[session_id]
+            self.evicted += 1
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+quiz_state = QuizSessionStore(max_sessions=config.QUIZ_MAX_SESSIONS, idle_ttl_s=config.QUIZ_SESSION_TTL_S)
 
 def generate_quiz_question(exam, subject):
+    """
+    Serves the next pre-generated question for exam and subject from the question pool.
+    The model only runs in the pool's background refills, never on this path.
+
+    Returns:
+        QuizQuestion, or None if the pool is still empty
+    """
+    from question_pool import get_question_pool
+
     logger = logging.getLogger("bharat_buddy")
     logger.info(f"generate_quiz_question called with exam={exam}, subject={subject}")
-    prompt = f"Generate a {subject} question for {exam} exam. Provide 4 options and the correct answer."
-    _, answer = generate_response(prompt, "think")
-    # Expecting answer in format: Q: ...\nA) ...\nB) ...\nC) ...\nD) ...\nAnswer: ...
-    return answer
+    question = get_question_pool().pop(exam, subject, timeout=config.QUIZ_POOL_WAIT_S)
+    if question is None:
+        logger.info(f"Quiz pool empty for {exam}/{subject}; refill queued")
+    return question
+
+def generate_questions(exam, subject, count):
+    """
+    Generates count quiz questions for the question pool and parses them. With continuous
+    batching the calls run concurrently so the scheduler decodes them in one batch.
+
+    Returns:
+        List of QuizQuestion; failed or unparseable generations are left out
+    """
+    from model_utils import generate_response
+
+    logger = logging.getLogger("bharat_buddy")
+    logger.info(f"generate_questions called with exam={exam}, subject={subject}, count={count}")
+
+    def generate_one(number):
+        prompt = (f"Generate {subject} question number {number} for the {exam} exam. "
+                  f"Provide 4 options and the correct answer.\n"
+                  f"Format:\nQ: <question>\nA) ...\nB) ...\nC) ...\nD) ...\nAnswer: <letter>\nExplanation: <one sentence>")
+        # Bypass the response cache: every call should sample a new question
+        _, answer = generate_response(prompt, "think", use_cache=False, profile="Quiz")
+        return parse_quiz_question(answer)
+
+    workers = min(count, config.SCHEDULER_MAX_BATCH_SIZE) if config.ENABLE_CONTINUOUS_BATCHING else 1
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="quiz-generate") as executor:
+        questions = [q for q in executor.map(generate_one, range(1, count + 1)) if q is not None]
+    if len(questions) < count:
+        logger.warning(f"Dropped {count - len(questions)} of {count} generated {exam}/{subject} questions that did not parse")
+    return questions
+
+def start_quiz(session_id, exam, subject):
+    """
+    Starts (or restarts) a quiz for the session and serves its first question.
+
+    Returns:
+        Question text for display, or a notice if no question is ready yet
+    """
+    session = quiz_state.start(session_id, exam, subject)
+    return _next_question(session)
+
+def submit_quiz_answer(session_id, user_answer):
+    """
+    Checks the answer to the session's current question and serves the next one.
+
+    Returns:
+        Tuple of (feedback, next question text)
+    """
+    session = quiz_state.get(session_id)
+    if session is None or session.question is None:
+        return "No quiz in progress. Start a quiz first.", ""
+    question = session.question
+    correct = check_quiz_answer(user_answer, question)
+    session.correct += int(correct)
+    verdict = "✅ Correct!" if correct else f"❌ Incorrect. The answer is {question.answer}) {dict(question.options)[question.answer]}."
+    feedback = f"{verdict} Score: {session.correct}/{session.asked}"
+    if question.explanation:
+        feedback += f"\n{question.explanation}"
+    return feedback, _next_question(session)
+
+def _next_question(session):
+    session.question = generate_quiz_question(session.exam, session.subject)
+    if session.question is None:
+        return POOL_EMPTY_MESSAGE.format(exam=session.exam, subject=session.subject)
+    session.asked += 1
+    return format_quiz_question(session.question)
 
-def check_quiz_answer(user_answer, correct_answer):
+def check_quiz_answer(user_answer, question):
+    """
+    Returns True if user_answer picks the correct option of question. The answer may be
+    the option key in any common form ("b", "(B)", "B) 1857") or the option text.
+    """
     logger = logging.getLogger("bharat_buddy")
-    logger.info(f"check_quiz_answer called with user_answer={user_answer}, correct_answer={correct_answer}")
-    return user_answer.strip().lower() == correct_answer.strip().lower()
+    logger.info(f"check_quiz_answer called with user_answer={user_answer}, correct_answer={question.answer}")
+    return _answer_key(user_answer or "", question.options) == question.answer
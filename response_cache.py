@@ -0,0 +1,219 @@
+"""
+Response cache for generate_response / stream_response
+
+Answers are keyed on the normalized prompt, the mode and the generation settings.
+Lookups go through an in-memory LRU tier first and a persistent SQLite tier second;
+both honour a TTL. Identical prompts that arrive while the first one is still being
+generated wait for that generation instead of starting their own (single-flight).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger("bharat_buddy")
+
+
+def normalize_prompt(prompt):
+    """
+    Unicode-normalizes and trims the prompt so trivially different encodings share
+    a key. Case, indentation and line breaks are kept: they carry meaning in code
+    and in terms like "pH".
+    """
+    return unicodedata.normalize("NFC", prompt).strip()
+
+
+class _Flight:
+    """An in-progress generation that other identical requests can wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def wait(self, timeout=None):
+        """Returns the leader's result, or None if it failed, was cancelled or timed out"""
+        self.event.wait(timeout)
+        return self.value
+
+    async def wait_async(self, timeout=None):
+        """Like wait(), but suspends the calling coroutine instead of blocking a thread"""
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: done.done() or done.set_result(None))
+
+        with self._lock:
+            if not self.event.is_set():
+                self._callbacks.append(wake)
+        if self.event.is_set():
+            return self.value
+        try:
+            await asyncio.wait_for(done, timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.value
+
+    def set(self, value):
+        self.value = value
+        with self._lock:
+            self.event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except RuntimeError:
+                # The waiter's event loop has closed
+                pass
+
+
+class ResponseCache:
+    """
+    Two-tier (memory LRU + SQLite) cache of (reasoning, answer) tuples.
+
+    Args:
+        path: SQLite file for the persistent tier, or None for memory only
+        max_memory_entries: Size of the in-memory LRU tier
+        max_disk_entries: Rows kept in the SQLite tier; oldest are evicted first
+        ttl_s: Seconds an entry stays valid in either tier
+        clock: Time source, overridable for tests
+    """
+
+    def __init__(self, path=None, max_memory_entries=256, max_disk_entries=5000, ttl_s=86400, clock=time.time):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._memory = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        self._db = None
+        if path:
+            try:
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, reasoning TEXT, answer TEXT, created_at REAL, expires_at REAL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses(created_at)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Response cache disk tier disabled: {e}", exc_info=True)
+                self._db = None
+
+    @staticmethod
+    def make_key(prompt, mode, settings):
+        payload = json.dumps(
+            {"prompt": normalize_prompt(prompt), "mode": mode, "settings": settings},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Returns the cached (reasoning, answer) tuple or None"""
+        now = self._clock()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits["memory"] += 1
+                    return value
+                del self._memory[key]
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT reasoning, answer, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if row[2] > now:
+                        value = (row[0], row[1])
+                        self._remember(key, value, row[2])
+                        self.hits["disk"] += 1
+                        return value
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        now = self._clock()
+        expires_at = now + self.ttl_s
+        with self._lock:
+            self._remember(key, value, expires_at)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                        (key, value[0], value[1], now, expires_at),
+                    )
+                    self._puts += 1
+                    if self._puts % 100 == 0:
+                        self._purge_disk(now)
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to persist cached response: {e}")
+
+    def claim(self, key):
+        """
+        Registers interest in generating the value for a key.
+
+        Returns:
+            (True, flight) if the caller should generate and then call resolve(),
+            (False, flight) if another caller is already generating it
+        """
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None:
+                return False, flight
+            flight = _Flight()
+            self._inflight[key] = flight
+            return True, flight
+
+    def resolve(self, key, value):
+        """Publishes the leader's result (None on failure) and caches it"""
+        if value is not None:
+            self.put(key, value)
+        with self._lock:
+            flight = self._inflight.pop(key, None)
+        if flight is not None:
+            flight.set(value)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_hits": self.hits["memory"],
+                "disk_hits": self.hits["disk"],
+                "misses": self.misses,
+                "in_flight": len(self._inflight),
+            }
+
+    def _remember(self, key, value, expires_at):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _purge_disk(self, now):
+        self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        self._db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
@@ -0,0 +1,377 @@
+"""
+Continuous-batching request scheduler for Bharat AI Buddy
+
+All generation requests from the app (chat tabs, exam prep, regional queries and
+quizzes) are funnelled into one scheduler that owns the model. Requests wait in a
+bounded queue, join the running batch at the next decode step, and leave it as soon
+as they finish, so concurrent users share every forward pass instead of queueing
+behind each other.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+import torch
+from transformers import DynamicCache
+
+logger = logging.getLogger("bharat_buddy")
+
+_DONE = object()
+
+
+class SchedulerQueueFullError(RuntimeError):
+    """Raised when a request is submitted while the wait queue is at capacity"""
+
+
+class GenerationRequest:
+    """
+    A single sequence tracked by the scheduler.
+
+    The consumer reads decoded text from ``output_queue``; the scheduler thread owns
+    every other field once the request has been submitted. Requests submitted with
+    an event loop get an asyncio.Queue instead, fed through call_soon_threadsafe, so
+    an async consumer awaits tokens without holding a thread. A think_budget
+    (generation_profiles.ThinkBudget) may override sampled tokens to close the
+    reasoning once it runs over budget.
+    """
+
+    def __init__(self, input_ids, max_new_tokens, do_sample=True, temperature=1.0, top_p=1.0, prefix_length=0,
+                 loop=None, think_budget=None):
+        self.input_ids = list(input_ids)
+        self.prefix_length = prefix_length
+        self.max_new_tokens = max_new_tokens
+        self.do_sample = do_sample
+        self.temperature = temperature
+        self.top_p = top_p
+        self.loop = loop
+        self.think_budget = think_budget
+        self.output_queue = asyncio.Queue() if loop is not None else queue.Queue()
+        self.generated = []
+        self.cancelled = False
+        self.finish_reason = None
+        self.submitted_at = time.perf_counter()
+        self.started_at = None
+        # Incremental detokenization state
+        self._token_cache = []
+        self._printed_len = 0
+
+    def put(self, item):
+        """Hands a text chunk, an exception or _DONE to the consumer from the scheduler thread"""
+        if self.loop is None:
+            self.output_queue.put(item)
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.output_queue.put_nowait, item)
+        except RuntimeError:
+            # The consumer's event loop is gone; nobody is reading any more
+            self.cancelled = True
+
+    @property
+    def length(self):
+        """Number of tokens currently held in the KV cache for this sequence"""
+        return len(self.input_ids) + len(self.generated) - 1
+
+
+class ContinuousBatchScheduler:
+    """
+    Iteration-level scheduler that decodes many sequences in one batch.
+
+    The batch keeps a single left-padded KV cache. New sequences are prefilled on
+    their own and spliced into the batch cache; finished sequences are dropped from
+    it and any padding columns that are no longer needed are trimmed.
+
+    Args:
+        model: A causal LM from transformers
+        tokenizer: The matching tokenizer, used for incremental detokenization
+        max_batch_size: Maximum number of sequences decoded together
+        max_wait_ms: How long an idle scheduler waits for more requests to arrive
+            before starting a new batch
+        max_queue_depth: Maximum number of requests waiting to join the batch
+        prefix_cache: Optional PrefixKVCache; requests submitted with a
+            prefix_length only prefill the tokens after the cached prefix
+    """
+
+    def __init__(self, model, tokenizer, max_batch_size=8, max_wait_ms=20, max_queue_depth=64, prefix_cache=None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.prefix_cache = prefix_cache
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.max_queue_depth = max_queue_depth
+        self._pending = queue.Queue(maxsize=max_queue_depth)
+        self._active = []
+        self._cache = None
+        self._mask = None
+        self._stop_event = threading.Event()
+        eos = model.generation_config.eos_token_id if model.generation_config is not None else None
+        if eos is None:
+            eos = tokenizer.eos_token_id
+        self._eos_ids = set(eos if isinstance(eos, (list, tuple)) else [eos])
+        self._thread = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"ContinuousBatchScheduler started (max_batch_size={max_batch_size}, "
+            f"max_wait_ms={max_wait_ms}, max_queue_depth={max_queue_depth})"
+        )
+
+    # Public API
+
+    def submit(self, input_ids, max_new_tokens, loop=None, **sampling):
+        """
+        Queue a tokenized prompt for generation.
+
+        Args:
+            loop: Event loop of an async consumer that will read the request
+                with astream() instead of stream()
+
+        Raises:
+            SchedulerQueueFullError: If the wait queue is full
+        """
+        request = GenerationRequest(input_ids, max_new_tokens, loop=loop, **sampling)
+        try:
+            self._pending.put_nowait(request)
+        except queue.Full:
+            raise SchedulerQueueFullError(
+                f"Generation queue is full ({self.max_queue_depth} requests waiting)"
+            )
+        return request
+
+    def stream(self, request):
+        """
+        Yields decoded text chunks for a submitted request until it finishes.
+        Closing the generator early cancels the request at the next decode step.
+        """
+        try:
+            while True:
+                item = request.output_queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            request.cancelled = True
+
+    async def astream(self, request):
+        """
+        Async counterpart of stream() for requests submitted with a loop. Closing or
+        cancelling the consumer cancels the request at the next decode step.
+        """
+        try:
+            while True:
+                item = await request.output_queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            request.cancelled = True
+
+    def stats(self):
+        """Returns current queue depth and batch occupancy"""
+        return {
+            "queue_depth": self._pending.qsize(),
+            "active": len(self._active),
+            "max_batch_size": self.max_batch_size,
+        }
+
+    def shutdown(self):
+        self._stop_event.set()
+        self._thread.join(timeout=5)
+
+    # Scheduler loop
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self._admit()
+                if not self._active:
+                    continue
+                with torch.inference_mode():
+                    self._decode_step()
+            except Exception as e:
+                logger.error(f"Error in batch scheduler step: {e}", exc_info=True)
+                for request in self._active:
+                    request.put(e)
+                    request.put(_DONE)
+                self._active, self._cache, self._mask = [], None, None
+
+    def _admit(self):
+        """Moves waiting requests into the running batch"""
+        free = self.max_batch_size - len(self._active)
+        if free <= 0:
+            return
+        admitted = []
+        if not self._active:
+            # Idle: block for the first request, then give others a short window to join
+            try:
+                admitted.append(self._pending.get(timeout=0.1))
+            except queue.Empty:
+                return
+            deadline = time.perf_counter() + self.max_wait_s
+            while len(admitted) < free:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    admitted.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+        else:
+            while len(admitted) < free:
+                try:
+                    admitted.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+        for request in admitted:
+            if request.cancelled:
+                continue
+            try:
+                with torch.inference_mode():
+                    self._prefill(request)
+            except Exception as e:
+                logger.error(f"Error prefilling request: {e}", exc_info=True)
+                request.put(e)
+                request.put(_DONE)
+
+    def _prefill(self, request):
+        request.started_at = time.perf_counter()
+        if self.prefix_cache is not None and request.prefix_length:
+            prefix_ids = request.input_ids[:request.prefix_length]
+            past = DynamicCache.from_legacy_cache(self.prefix_cache.get(self.model, prefix_ids))
+            input_ids = torch.tensor([request.input_ids[request.prefix_length:]], device=self.model.device)
+            outputs = self.model(input_ids=input_ids, past_key_values=past, use_cache=True)
+        else:
+            input_ids = torch.tensor([request.input_ids], device=self.model.device)
+            outputs = self.model(input_ids=input_ids, use_cache=True)
+        cache = _to_legacy(outputs.past_key_values)
+        mask = torch.ones((1, len(request.input_ids)), dtype=torch.long, device=self.model.device)
+        self._join(request, cache, mask)
+        self._emit(request, self._sample(request, outputs.logits[0, -1]))
+        self._retire()
+
+    def _decode_step(self):
+        device = self.model.device
+        last_tokens = torch.tensor([[r.generated[-1]] for r in self._active], device=device)
+        positions = torch.tensor([[r.length] for r in self._active], device=device)
+        mask = torch.cat([self._mask, torch.ones((len(self._active), 1), dtype=self._mask.dtype, device=device)], dim=1)
+        outputs = self.model(
+            input_ids=last_tokens,
+            attention_mask=mask,
+            position_ids=positions,
+            past_key_values=DynamicCache.from_legacy_cache(self._cache),
+            use_cache=True,
+        )
+        self._cache = _to_legacy(outputs.past_key_values)
+        self._mask = mask
+        for row, request in enumerate(self._active):
+            self._emit(request, self._sample(request, outputs.logits[row, -1]))
+        self._retire()
+
+    # Batch bookkeeping
+
+    def _join(self, request, cache, mask):
+        """Splices a prefilled sequence into the left-padded batch cache"""
+        if self._cache is None:
+            self._cache, self._mask = cache, mask
+        else:
+            width = max(self._mask.shape[1], mask.shape[1])
+            self._cache = tuple(
+                (
+                    torch.cat([_left_pad(bk, width), _left_pad(k, width)], dim=0),
+                    torch.cat([_left_pad(bv, width), _left_pad(v, width)], dim=0),
+                )
+                for (bk, bv), (k, v) in zip(self._cache, cache)
+            )
+            self._mask = torch.cat([_left_pad(self._mask, width), _left_pad(mask, width)], dim=0)
+        self._active.append(request)
+
+    def _retire(self):
+        """Drops finished sequences from the batch and trims unused padding"""
+        keep = [i for i, r in enumerate(self._active) if r.finish_reason is None]
+        if len(keep) == len(self._active):
+            return
+        if not keep:
+            self._active, self._cache, self._mask = [], None, None
+            return
+        index = torch.tensor(keep, device=self._mask.device)
+        self._active = [self._active[i] for i in keep]
+        mask = self._mask.index_select(0, index)
+        start = int((mask.sum(dim=0) > 0).nonzero()[0])
+        self._mask = mask[:, start:]
+        self._cache = tuple(
+            (k.index_select(0, index)[:, :, start:], v.index_select(0, index)[:, :, start:])
+            for k, v in self._cache
+        )
+
+    # Token handling
+
+    def _sample(self, request, logits):
+        if not request.do_sample:
+            return int(torch.argmax(logits))
+        probs = torch.softmax(logits.float() / max(request.temperature, 1e-5), dim=-1)
+        if request.top_p < 1.0:
+            sorted_probs, sorted_ids = torch.sort(probs, descending=True)
+            cumulative = torch.cumsum(sorted_probs, dim=-1)
+            sorted_probs[cumulative - sorted_probs > request.top_p] = 0.0
+            return int(sorted_ids[torch.multinomial(sorted_probs, 1)])
+        return int(torch.multinomial(probs, 1))
+
+    def _emit(self, request, token_id):
+        if request.cancelled:
+            request.finish_reason = "cancelled"
+            request.put(_DONE)
+            return
+        if request.think_budget is not None:
+            # Forced tokens replace the sampled one; the next step is conditioned on them
+            forced = request.think_budget.next_forced()
+            if forced is not None:
+                token_id = forced
+            request.think_budget.observe(token_id)
+        request.generated.append(token_id)
+        if token_id in self._eos_ids:
+            request.finish_reason = "eos"
+        else:
+            text = self._detokenize(request, token_id)
+            if text:
+                request.put(text)
+            if len(request.generated) >= request.max_new_tokens:
+                request.finish_reason = "length"
+        if request.finish_reason is not None:
+            tail = self.tokenizer.decode(request._token_cache, skip_special_tokens=True)[request._printed_len:]
+            if tail:
+                request.put(tail)
+            request.put(_DONE)
+
+    def _detokenize(self, request, token_id):
+        """Returns newly printable text, holding back incomplete multi-byte characters"""
+        request._token_cache.append(token_id)
+        text = self.tokenizer.decode(request._token_cache, skip_special_tokens=True)
+        if text.endswith("\ufffd"):
+            return ""
+        printable = text[request._printed_len:]
+        if text.endswith("\n"):
+            request._token_cache, request._printed_len = [], 0
+        else:
+            request._printed_len = len(text)
+        return printable
+
+
+def _to_legacy(past_key_values):
+    if hasattr(past_key_values, "to_legacy_cache"):
+        return past_key_values.to_legacy_cache()
+    return tuple(past_key_values)
+
+
+def _left_pad(tensor, width):
+    """Left-pads the sequence dimension (last for masks, third for K/V) with zeros"""
+    dim = 1 if tensor.dim() == 2 else 2
+    missing = width - tensor.shape[dim]
+    if missing <= 0:
+        return tensor
+    shape = list(tensor.shape)
+    shape[dim] = missing
+    return torch.cat([tensor.new_zeros(shape), tensor], dim=dim)
@@ -0,0 +1,126 @@
+"""
+Startup timing and background warm-up for Bharat AI Buddy
+
+The model and agents are built lazily. ``start_warm_up`` builds them on a background
+thread right after the UI starts so the first user does not pay the load cost, and
+``startup_report`` records how long every import and construction phase took so
+replica cold-start time can be tracked.
+
+Run ``python startup.py`` to perform a full synchronous cold start and print the report.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("bharat_buddy")
+
+
+class StartupReport:
+    """Collects wall-clock timings of named startup phases"""
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._phases = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """Times the enclosed block and records it under the given name"""
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self._phases.append({
+                    "phase": name,
+                    "start_s": start - self._origin,
+                    "duration_s": duration,
+                    "thread": threading.current_thread().name,
+                    "ok": error is None,
+                })
+            logger.info(f"Startup phase '{name}' took {duration:.3f}s" + ("" if error is None else f" (failed: {error})"))
+
+    def as_dict(self):
+        with self._lock:
+            return list(self._phases)
+
+    def summary(self):
+        """Returns a human-readable table of all recorded phases"""
+        phases = self.as_dict()
+        if not phases:
+            return "No startup phases recorded."
+        width = max(len(p["phase"]) for p in phases)
+        lines = [f"{'Phase'.ljust(width)}  {'Start':>8}  {'Duration':>9}  Thread"]
+        for p in phases:
+            status = "" if p["ok"] else "  FAILED"
+            lines.append(
+                f"{p['phase'].ljust(width)}  {p['start_s']:>7.3f}s  {p['duration_s']:>8.3f}s  {p['thread']}{status}"
+            )
+        total = max(p["start_s"] + p["duration_s"] for p in phases)
+        lines.append(f"Total elapsed since process start: {total:.3f}s")
+        return "\n".join(lines)
+
+
+# Global report shared by all modules
+startup_report = StartupReport()
+
+_warm_up_thread = None
+_warm_up_error = None
+
+
+def start_warm_up():
+    """Builds the engine, the generation scheduler and all agents on a background thread"""
+    global _warm_up_thread
+    if _warm_up_thread is not None:
+        return _warm_up_thread
+    _warm_up_thread = threading.Thread(target=_warm_up, name="warm-up", daemon=True)
+    _warm_up_thread.start()
+    return _warm_up_thread
+
+
+def _warm_up():
+    global _warm_up_error
+    try:
+        with startup_report.phase("warm-up (total)"):
+            import model_utils
+            import app_logic
+            from config import config
+
+            model_utils.get_engine()
+            if config.ENABLE_CONTINUOUS_BATCHING:
+                with startup_report.phase("create scheduler"):
+                    model_utils.get_scheduler()
+            app_logic.build_all_agents()
+            with startup_report.phase("load quiz pool"):
+                from question_pool import get_question_pool, prime_pools
+                get_question_pool()
+                if config.QUIZ_POOL_PRIME_ON_START:
+                    prime_pools()
+        logger.info("Warm-up complete:\n" + startup_report.summary())
+    except Exception as e:
+        _warm_up_error = e
+        logger.error(f"Warm-up failed: {e}", exc_info=True)
+
+
+def readiness_message():
+    """Short status line for the UI"""
+    import model_utils
+    if model_utils.is_ready():
+        return "🟢 Model ready"
+    if _warm_up_error is not None:
+        return f"🔴 Model failed to load: {_warm_up_error}"
+    return "🟡 Model is warming up — the first answer may take a little longer"
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    with startup_report.phase("import ui"):
+        import ui  # noqa: F401
+    _warm_up()
+    print(startup_report.summary())
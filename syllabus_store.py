@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Prebuilt offline syllabus store for every EXAMS x SUBJECTS pair
+
+check_exam_syllabus serves from a compact file built ahead of time instead of
+scraping Wikipedia and web search on every call. Live scraping runs in the
+build and refresh commands below, and at request time only while no store file
+has been built (or for missing entries with SYLLABUS_LIVE_FALLBACK).
+
+File layout (little-endian):
+    MAGIC (8 bytes) | index length (uint32) | JSON index | UTF-8 JSON records
+The index maps "exam|subject" keys to (offset, length) pairs into the record area.
+The file is memory-mapped, so a lookup reads only the bytes of its own record.
+
+Usage:
+    python syllabus_store.py build [--path data/syllabus.bin]
+    python syllabus_store.py refresh --exam UPSC [--subject History]
+    python syllabus_store.py show --exam JEE [--subject Physics]
+"""
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+from config import config
+
+logger = logging.getLogger("bharat_buddy")
+
+MAGIC = b"BBSYL01\n"
+_HEADER = struct.Struct("<8sI")
+
+
+def make_key(exam, subject=None):
+    """Case- and whitespace-insensitive key for an exam and optional subject"""
+    return f"{' '.join(exam.split()).casefold()}|{' '.join((subject or '').split()).casefold()}"
+
+
+def write_store(path, records):
+    """
+    Writes records to path atomically.
+
+    Args:
+        path: Destination file
+        records: Mapping of make_key() keys to JSON-serializable records
+    """
+    blobs = []
+    index = {}
+    offset = 0
+    for key in sorted(records):
+        blob = json.dumps(records[key], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        index[key] = [offset, len(blob)]
+        blobs.append(blob)
+        offset += len(blob)
+    index_bytes = json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(index_bytes)))
+        f.write(index_bytes)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, path)
+
+
+class SyllabusStore:
+    """
+    Read-only, memory-mapped view of a syllabus file. The file is reopened when a
+    refresh job replaces it, checked at most every reload_check_s seconds.
+
+    Args:
+        path: Store file written by write_store()
+        reload_check_s: Minimum seconds between checks for a newer file
+    """
+
+    def __init__(self, path, reload_check_s=30):
+        self.path = path
+        self.reload_check_s = reload_check_s
+        self._lock = threading.Lock()
+        self._mmap = None
+        self._index = {}
+        self._data_start = 0
+        self._mtime = None
+        self._next_check = 0.0
+        self._reported_missing = False
+        self._open()
+
+    def _open(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            if self._mtime is not None:
+                logger.warning(f"Syllabus store {self.path} disappeared; keeping the loaded copy")
+            elif not self._reported_missing:
+                self._reported_missing = True
+                logger.warning(f"No syllabus store at {self.path}; syllabus lookups scrape live until "
+                               f"'python syllabus_store.py build' writes one")
+            return
+        if stat.st_mtime == self._mtime:
+            return
+        mapped = None
+        try:
+            with open(self.path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, index_length = _HEADER.unpack_from(mapped, 0)
+            if magic != MAGIC:
+                raise ValueError("not a syllabus store file")
+            index = json.loads(mapped[_HEADER.size:_HEADER.size + index_length].decode("utf-8"))
+        except (OSError, ValueError, struct.error) as e:
+            if mapped is not None:
+                mapped.close()
+            logger.error(f"Could not open syllabus store {self.path}: {e}")
+            return
+        old = self._mmap
+        self._mmap, self._index = mapped, index
+        self._data_start = _HEADER.size + index_length
+        self._mtime = stat.st_mtime
+        if old is not None:
+            old.close()
+        logger.info(f"Loaded syllabus store {self.path} with {len(index)} entries")
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.reload_check_s
+            self._open()
+
+    @property
+    def loaded(self):
+        """True once a store file has been opened"""
+        return self._mmap is not None
+
+    def scrapes_live(self):
+        """
+        True if a lookup that found nothing should fall back to the live scrape: with
+        SYLLABUS_LIVE_FALLBACK, and always while no store file has been opened, so
+        syllabus augmentation keeps working before the first build.
+        """
+        return config.SYLLABUS_LIVE_FALLBACK or not self.loaded
+
+    def lookup(self, exam, subject=None):
+        """Returns the stored record for the exam and subject, or None"""
+        with self._lock:
+            self._maybe_reload()
+            entry = self._index.get(make_key(exam, subject))
+            if entry is None:
+                return None
+            start = self._data_start + entry[0]
+            blob = self._mmap[start:start + entry[1]]
+        return json.loads(blob.decode("utf-8"))
+
+    def records(self):
+        """Returns every stored record keyed by make_key()"""
+        with self._lock:
+            return {
+                key: json.loads(self._mmap[self._data_start + o:self._data_start + o + n].decode("utf-8"))
+                for key, (o, n) in self._index.items()
+            }
+
+    def __len__(self):
+        return len(self._index)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_syllabus_store():
+    """Returns the shared SyllabusStore, opening it on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SyllabusStore(config.SYLLABUS_STORE_PATH)
+    return _store
+
+
+def scrape_records(pairs):
+    """Runs the live syllabus scrape for each (exam, subject) pair; subject may be None"""
+    from agent_tools import scrape_exam_syllabus
+
+    records = {}
+    for exam, subject in pairs:
+        start = time.perf_counter()
+        content, source = scrape_exam_syllabus(exam, subject)
+        records[make_key(exam, subject)] = {
+            "exam": exam,
+            "subject": subject,
+            "content": content,
+            "source": source,
+            "built_at": int(time.time()),
+        }
+        print(f"{exam} / {subject or '-'}: {len(content)} sections in {time.perf_counter() - start:.1f}s")
+    return records
+
+
+def all_pairs():
+    """Every exam on its own plus every EXAMS x SUBJECTS pair"""
+    from constants import EXAMS, SUBJECTS
+
+    pairs = []
+    for exam in EXAMS:
+        pairs.append((exam, None))
+        pairs.extend((exam, subject) for subject in SUBJECTS.get(exam, []))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["build", "refresh", "show"])
+    parser.add_argument("--path", default=config.SYLLABUS_STORE_PATH)
+    parser.add_argument("--exam", help="Limit refresh/show to this exam")
+    parser.add_argument("--subject", help="Limit refresh/show to this subject")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        if not args.exam:
+            parser.error("show needs --exam")
+        print(json.dumps(SyllabusStore(args.path).lookup(args.exam, args.subject), ensure_ascii=False, indent=2))
+        return
+
+    if args.command == "build":
+        records = scrape_records(all_pairs())
+    else:
+        if not args.exam:
+            parser.error("refresh needs --exam")
+        records = SyllabusStore(args.path).records() if os.path.exists(args.path) else {}
+        pairs = [(e, s) for e, s in all_pairs() if make_key(e) == make_key(args.exam)
+                 and (args.subject is None or make_key(e, s) == make_key(args.exam, args.subject))]
+        records.update(scrape_records(pairs or [(args.exam, args.subject)]))
+
+    write_store(args.path, records)
+    print(f"Wrote {len(records)} entries to {args.path} ({os.path.getsize(args.path)} bytes)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,13 +20,14 @@ logger.info("test_app.py loaded.")
 def test_app_fn_basic():
     logger.info("Running test_app_fn_basic")
     for tab in EXAMPLES.keys():
-        resp = app_fn(tab, "Test prompt", "think", True)
-        assert isinstance(resp, str) and len(resp) > 0
+        reasoning, answer = list(app_fn(tab, "Test prompt", "think", True))[-1]
+        assert isinstance(reasoning, str)
+        assert isinstance(answer, str) and len(answer) > 0
 
 def test_app_fn_empty():
     logger.info("Running test_app_fn_empty")
-    resp = app_fn("Math", "", "think", True)
-    assert isinstance(resp, str)
+    reasoning, answer = list(app_fn("Math", "", "think", True))[-1]
+    assert isinstance(answer, str)
 
 def test_exam_qa():
     logger.info("Running test_exam_qa")
@@ -0,0 +1,98 @@
+"""
+Tests for app_fn's error handling around the streamed answer and the budget
+reported by the Exam and Regional handlers
+"""
+import asyncio
+import sys
+import os
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import app_logic
+
+
+def _collect(agen):
+    async def drain():
+        return [item async for item in agen]
+    return asyncio.run(drain())
+
+
+class TestAppFnFallback(unittest.TestCase):
+    def setUp(self):
+        self.streams = []
+        patcher = patch.object(app_logic, "route_prompt", return_value=SimpleNamespace(intent="math"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fake_stream(self, fail_after):
+        async def stream(prompt, mode, metadata=None, profile=None):
+            self.streams.append(prompt)
+            for i, word in enumerate(["Partial", "Partial answer"]):
+                if i == fail_after:
+                    raise RuntimeError("engine died")
+                yield "", word
+        return stream
+
+    def test_error_after_partial_answer_is_appended(self):
+        async def augment(prompt, full_prompt, route):
+            return full_prompt, None
+
+        with patch.dict(app_logic._BRANCHES, {"math": augment}), \
+             patch.object(app_logic, "_astream_answer", self.fake_stream(fail_after=1)):
+            results = _collect(app_logic.app_fn_async("Math/Logic", "2+2?", "non-think"))
+        self.assertEqual(len(self.streams), 1)
+        self.assertEqual(results[0], ("", "Partial"))
+        self.assertTrue(results[-1][1].startswith("Partial\n\nSorry, I encountered an error"))
+
+    def test_error_before_any_output_regenerates_without_augmentation(self):
+        async def augment(prompt, full_prompt, route):
+            raise RuntimeError("tool failed")
+
+        with patch.dict(app_logic._BRANCHES, {"math": augment}), \
+             patch.object(app_logic, "_astream_answer", self.fake_stream(fail_after=None)):
+            results = _collect(app_logic.app_fn_async("Math/Logic", "2+2?", "non-think"))
+        self.assertEqual(len(self.streams), 1)
+        self.assertEqual(results[-1], ("", "Partial answer"))
+
+    def test_closing_the_stream_does_not_emit_an_error(self):
+        async def augment(prompt, full_prompt, route):
+            return full_prompt, None
+
+        with patch.dict(app_logic._BRANCHES, {"math": augment}), \
+             patch.object(app_logic, "_astream_answer", self.fake_stream(fail_after=None)):
+            stream = app_logic.app_fn("Math/Logic", "2+2?", "non-think")
+            self.assertEqual(next(stream), ("", "Partial"))
+            stream.close()
+        self.assertEqual(len(self.streams), 1)
+
+
+class TestBudgetReport(unittest.TestCase):
+    def setUp(self):
+        async def generate(prompt, mode, metadata=None, use_cache=True, profile=None):
+            return "", "answer"
+
+        for target, value in [("agenerate_response", generate), ("local_knowledge_context", lambda query: "")]:
+            patcher = patch.object(app_logic, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # No augmentation time at all, so every lookup is dropped
+        patcher = patch.object(app_logic.config, "REQUEST_BUDGET_S", 0.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_exam_qa_reports_dropped_stages(self):
+        metadata = {}
+        asyncio.run(app_logic.exam_qa_async("JEE", "Physics", "Explain Newton's laws", metadata=metadata))
+        self.assertEqual([d["stage"] for d in metadata["dropped_stages"]], ["Wikipedia lookup"])
+
+    def test_regional_query_reports_dropped_stages(self):
+        metadata = {}
+        asyncio.run(app_logic.generate_regional_query_async("South", "Kerala", "Cuisine", metadata=metadata))
+        self.assertEqual([d["stage"] for d in metadata["dropped_stages"]], ["Wikipedia lookup", "web search"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Tests for running the async pipeline from sync callers
+"""
+import asyncio
+import sys
+import os
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import async_runner
+import deadline
+from deadline import request_deadline
+
+
+class TestAsyncRunner(unittest.TestCase):
+    def test_run_returns_the_result_and_raises_errors(self):
+        async def double(x):
+            await asyncio.sleep(0)
+            return 2 * x
+
+        async def fail():
+            raise ValueError("boom")
+
+        self.assertEqual(async_runner.run(double(21)), 42)
+        with self.assertRaises(ValueError):
+            async_runner.run(fail())
+
+    def test_iterate_yields_every_item_then_raises(self):
+        async def numbers():
+            for i in range(3):
+                yield i
+            raise ValueError("boom")
+
+        seen = []
+        with self.assertRaises(ValueError):
+            for item in async_runner.iterate(numbers()):
+                seen.append(item)
+        self.assertEqual(seen, [0, 1, 2])
+
+    def test_caller_context_reaches_the_loop(self):
+        async def budget():
+            return deadline.current()
+
+        with request_deadline() as budget_here:
+            self.assertIs(async_runner.run(budget()), budget_here)
+
+    def test_closing_the_stream_closes_the_generator(self):
+        closed = asyncio.Event()
+        produced = []
+
+        async def endless():
+            try:
+                i = 0
+                while True:
+                    produced.append(i)
+                    yield i
+                    i += 1
+            finally:
+                closed.set()
+
+        stream = async_runner.iterate(endless())
+        self.assertEqual([next(stream), next(stream)], [0, 1])
+        stream.close()
+        async_runner.run(asyncio.wait_for(closed.wait(), 5))
+        # The generator runs at most _MAX_AHEAD items ahead of the consumer
+        self.assertLessEqual(len(produced), async_runner._MAX_AHEAD + 1)
+
+    def test_refuses_to_block_a_running_loop(self):
+        async def inside():
+            async def noop():
+                return None
+            async_runner.run(noop())
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(inside())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Tests for the async web search lookup
+"""
+import asyncio
+import sys
+import os
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import requests
+
+import async_tools
+from http_client import FetchResult
+
+RESULT_PAGE = (
+    "<table><tr><td><a class='result-link'>Diwali</a></td></tr>"
+    "<tr><td class='result-snippet'>Festival of lights</td></tr>"
+    "<tr><td><span class='link-text'>en.wikipedia.org/wiki/Diwali</span></td></tr></table>"
+)
+
+
+class FakeClient:
+    def __init__(self, status_code, body):
+        self.result = FetchResult(async_tools._DUCKDUCKGO_LITE_URL, status_code, body.encode(), "utf-8", "text/html")
+
+    async def get(self, url, **kwargs):
+        return self.result
+
+
+class TestWebSearch(unittest.TestCase):
+    def search(self, status_code, body):
+        with patch("async_tools.get_async_http_client", return_value=FakeClient(status_code, body)):
+            return asyncio.run(async_tools.web_search("Diwali"))
+
+    def test_result_page_is_parsed(self):
+        results = self.search(200, RESULT_PAGE)
+        self.assertIn("[Diwali](https://en.wikipedia.org/wiki/Diwali)", results)
+        self.assertIn("Festival of lights", results)
+
+    def test_rate_limit_page_is_an_error_not_an_empty_result(self):
+        with self.assertRaises(requests.exceptions.HTTPError) as raised:
+            self.search(202, "<html>Please complete the challenge</html>")
+        self.assertIn("202", str(raised.exception))
+
+    def test_missing_parser_fails_clearly(self):
+        with patch.object(async_tools._get_search_tool().__class__, "_create_duckduckgo_parser", None):
+            with self.assertRaises(RuntimeError):
+                async_tools._duckduckgo_results(RESULT_PAGE)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Tests for the token-aware context packer
+"""
+import sys
+import os
+from unittest import mock
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import config
+from context_packer import pack_context, split_sentences, tab_budget
+
+
+def words(text):
+    return len(text.split())
+
+
+def test_split_sentences_handles_danda_and_line_breaks():
+    text = "दिवाली रोशनी का त्योहार है। यह कार्तिक में आता है॥ Lamps are lit.\n- Syllabus item one\n- Item two"
+    assert split_sentences(text) == [
+        ("दिवाली रोशनी का त्योहार है।", False),
+        ("यह कार्तिक में आता है॥", False),
+        ("Lamps are lit.", True),
+        ("- Syllabus item one", True),
+        ("- Item two", True),
+    ]
+
+
+def test_near_duplicates_across_sources_are_dropped():
+    wiki = "Onam is the harvest festival of Kerala. It is celebrated in the month of Chingam."
+    web = "Onam is the harvest festival of Kerala! The boat races draw large crowds."
+    packed = pack_context("Onam festival", [("Wikipedia", wiki), ("Web", web)], "Culture",
+                          budget=100, count_tokens=words)
+    assert packed.count("Onam is the harvest festival of Kerala") == 1
+    assert "Chingam" in packed and "boat races" in packed
+
+
+def test_budget_keeps_the_most_relevant_sentences_in_source_order():
+    text = ("The state has many rivers. Pongal is a harvest festival of Tamil Nadu. "
+            "Tea grows in the hills. Pongal lasts four days in January.")
+    packed = pack_context("When is Pongal celebrated", [("Facts", text)], "Culture",
+                          budget=18, count_tokens=words)
+    assert packed == "\n\nFacts:\nPongal is a harvest festival of Tamil Nadu. Pongal lasts four days in January."
+
+
+def test_labels_and_line_structure_are_kept():
+    syllabus = "Paper I:\nIndian history\nGeography of India"
+    packed = pack_context("history", [("Syllabus", syllabus), ("Empty", "")], "Exam", budget=100, count_tokens=words)
+    assert packed == "\n\nSyllabus:\nPaper I:\nIndian history\nGeography of India"
+
+
+def test_disabled_packing_passes_sections_through():
+    with mock.patch.object(config, "ENABLE_CONTEXT_PACKING", False):
+        assert pack_context("q", [("A", "one. one.")], "Culture", budget=1) == "\n\nA:\none. one."
+    assert pack_context("q", [], "Culture") == ""
+
+
+def test_tab_budget_overrides():
+    with mock.patch.object(config, "CONTEXT_TAB_BUDGETS", "Regional=640, Exam Q&A=700"), \
+            mock.patch.object(config, "CONTEXT_TOKEN_BUDGET", 512):
+        assert tab_budget("Exam Q&A") == 700
+        assert tab_budget("Culture") == 512
@@ -0,0 +1,103 @@
+"""
+Tests for the per-request latency budget and its propagation
+"""
+import asyncio
+import sys
+import os
+import threading
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import async_tools
+import deadline
+from agent_tools import _fan_out
+from deadline import Deadline, request_deadline
+
+
+class TestDeadline(unittest.TestCase):
+    """Budget arithmetic with a controllable clock"""
+
+    def setUp(self):
+        self.now = [100.0]
+        self.budget = Deadline(30, reserve_s=10, clock=lambda: self.now[0])
+
+    def test_reserve_is_kept_for_generation(self):
+        self.now[0] += 5
+        self.assertEqual(self.budget.remaining(), 25)
+        self.assertEqual(self.budget.augmentation_remaining(), 15)
+        self.assertEqual(self.budget.cap(8), 8)
+        self.assertEqual(self.budget.cap(60), 15)
+
+    def test_stage_that_does_not_fit_is_recorded(self):
+        self.assertTrue(self.budget.allows("web search", 5))
+        self.now[0] += 21
+        self.assertFalse(self.budget.allows("web search", 5))
+        self.assertEqual(self.budget.cap(8), 0.0)
+        summary = self.budget.summary()
+        self.assertEqual(summary["elapsed_s"], 21)
+        self.assertEqual([d["stage"] for d in summary["dropped_stages"]], ["web search"])
+
+    def test_helpers_are_no_ops_outside_a_request(self):
+        self.assertIsNone(deadline.current())
+        self.assertTrue(deadline.allows("anything", 1e9))
+        self.assertEqual(deadline.cap(8), 8)
+
+
+class TestPropagation(unittest.TestCase):
+    """The deadline reaches worker threads and asyncio.to_thread"""
+
+    def test_bind_carries_the_deadline_into_a_thread(self):
+        seen = []
+        with request_deadline(30, 10) as budget:
+            worker = threading.Thread(target=deadline.bind(lambda: seen.append(deadline.current())))
+        worker.start()
+        worker.join()
+        self.assertIs(seen[0], budget)
+        self.assertIsNone(deadline.current())
+
+    def test_to_thread_sees_the_deadline(self):
+        async def main():
+            with request_deadline(30, 10) as budget:
+                return budget, await asyncio.to_thread(deadline.current)
+
+        budget, seen = asyncio.run(main())
+        self.assertIs(seen, budget)
+
+
+class TestBudgetedFanOut(unittest.TestCase):
+    """Fan-out sources are skipped once the augmentation budget is spent"""
+
+    def test_sources_skipped_when_budget_spent(self):
+        calls = []
+        with request_deadline(10, 10) as budget:
+            results = _fan_out({"Wikipedia": (lambda: calls.append("wiki") or "W", 5)})
+        self.assertEqual(results, {})
+        self.assertEqual(calls, [])
+        self.assertEqual(budget.dropped[0]["stage"], "Wikipedia lookup")
+
+    def test_deadlines_capped_to_remaining_budget(self):
+        async def slow():
+            await asyncio.sleep(1)
+            return "late"
+
+        async def main():
+            with request_deadline(10.1, 10) as budget:
+                results = await async_tools._fan_out({"web search": (slow(), 5)})
+            return results, budget
+
+        results, budget = asyncio.run(main())
+        self.assertEqual(results, {})
+        self.assertIn("cut short", budget.dropped[0]["reason"])
+
+    @patch("deadline.config")
+    def test_request_deadline_uses_config_defaults(self, mock_config):
+        mock_config.REQUEST_BUDGET_S = 12
+        mock_config.GENERATION_RESERVE_S = 4
+        with request_deadline() as budget:
+            self.assertEqual((budget.budget_s, budget.reserve_s), (12, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
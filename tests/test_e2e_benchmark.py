@@ -0,0 +1,49 @@
+"""
+Tests for the offline end-to-end benchmark's stand-ins and baseline comparison
+"""
+import sys
+import os
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+
+import e2e_benchmark
+
+
+class TestCompare(unittest.TestCase):
+    def setUp(self):
+        self.baseline = {"scenarios": {"exam/qa": {
+            "p50_ms": 10.0, "p95_ms": 20.0, "peak_kb": 100.0,
+            "stages": {"generate": {"p50_ms": 5.0}},
+        }}}
+
+    def result(self, p50=10.0, p95=20.0, peak=100.0, generate=5.0):
+        return {"exam/qa": {"p50_ms": p50, "p95_ms": p95, "peak_kb": peak,
+                            "stages": {"generate": {"p50_ms": generate}}}}
+
+    def test_within_tolerance_passes(self):
+        self.assertEqual(e2e_benchmark.compare(self.result(p50=12.0, generate=6.0), self.baseline, 0.25), [])
+
+    def test_regressions_are_reported(self):
+        regressions = e2e_benchmark.compare(self.result(p50=14.0, peak=400.0, generate=9.0), self.baseline, 0.25)
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(any("stage 'generate'" in line for line in regressions))
+
+    def test_small_absolute_changes_are_ignored(self):
+        baseline = {"scenarios": {"exam/qa": {"p50_ms": 0.2, "p95_ms": 0.3, "peak_kb": 10.0, "stages": {}}}}
+        self.assertEqual(e2e_benchmark.compare(self.result(p50=0.5, p95=0.6, peak=40.0), baseline, 0.25), [])
+
+
+class TestOfflineRun(unittest.TestCase):
+    def test_every_scenario_runs_offline(self):
+        results = e2e_benchmark.run_benchmark(repeat=1, warmup=0)
+        self.assertIn("app_fn/Culture", results)
+        self.assertIn("regional", results)
+        for name, row in results.items():
+            self.assertGreater(row["requests"], 0, name)
+        self.assertIn("generate", results["exam/qa"]["stages"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""
+Tests for the per-tab generation profiles and answer-complete stopping
+"""
+import sys
+import os
+from unittest import mock
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config import config
+from generation_profiles import AnswerStop, ThinkBudget, get_profile
+import model_utils
+
+
+def feed_all(stop, pieces, mode="non-think"):
+    parser = model_utils.ThinkStreamParser(mode)
+    for piece in pieces:
+        if stop.feed(*parser.feed(piece)):
+            break
+    return stop.trim(*parser.finish())
+
+
+def test_profiles_differ_by_tab_and_mode_and_can_be_overridden():
+    assert get_profile("Math/Logic", "non-think").max_new_tokens < get_profile("Math/Logic", "think").max_new_tokens
+    assert get_profile(None, "think") == get_profile("Unknown tab", "think")._replace(name="default")
+    with mock.patch.object(config, "GENERATION_TOKEN_LIMITS", "Syllabus=300,Math/Logic:think=900"), \
+            mock.patch.object(config, "GENERATION_MAX_NEW_TOKENS", 800):
+        assert get_profile("Syllabus", "think").max_new_tokens == 300
+        # The engine-wide ceiling still applies
+        assert get_profile("Math/Logic", "think").max_new_tokens == 800
+
+
+def test_stop_sequence_ends_the_answer_before_the_next_turn():
+    stop = AnswerStop(get_profile("Culture", "non-think"))
+    answer = feed_all(stop, ["Onam is the harvest ", "festival of Kerala.\nUs", "er: What about Vishu?", " More text"])
+    assert (stop.reason, answer) == ("stop_sequence", ("", "Onam is the harvest festival of Kerala."))
+
+
+def test_quiz_stops_at_the_second_question_only():
+    question = "Here is one:\nQ: Capital of India?\nA) Delhi\nB) Agra\nAnswer: A\n"
+    stop = AnswerStop(get_profile("Quiz", "non-think"))
+    assert feed_all(stop, [question, "Explanation: Delhi is the capital.\n", "Q: Capital of Kerala?\n"]) == \
+        ("", question + "Explanation: Delhi is the capital.")
+    assert AnswerStop(get_profile("Quiz", "non-think")).feed("", question) is False
+
+
+def test_repeated_lines_stop_decoding_in_reasoning_and_answer():
+    loop = "The answer depends on the monsoon season.\n"
+    with mock.patch.object(config, "THINK_TOKEN_BUDGET", 0):
+        stop = AnswerStop(get_profile("Exam", "think"))
+    reasoning, answer = feed_all(stop, ["Let me think.\n"] + [loop] * 6, mode="think")
+    assert stop.reason == "repetition"
+    # Output without </think> is all answer; it keeps the allowed repeats
+    assert answer == "Let me think.\n" + (loop * 2).rstrip() and reasoning == ""
+    assert AnswerStop(get_profile("Code", "non-think")).feed("", "    return total + value\n" * 10) is False
+    # A think budget bounds looping reasoning instead, so the answer still comes
+    assert AnswerStop(get_profile("Exam", "think")).feed(loop * 6, "") is False
+
+
+def test_think_budget_leaves_room_for_the_answer():
+    with mock.patch.object(config, "THINK_TOKEN_BUDGET", 1024):
+        assert get_profile("Regional", "think").think_budget == 1024
+        assert get_profile("Quiz", "think").think_budget == get_profile("Quiz", "think").max_new_tokens // 2
+        assert get_profile("Regional", "non-think").think_budget is None
+    with mock.patch.object(config, "THINK_TOKEN_BUDGET", 0):
+        assert get_profile("Regional", "think").think_budget is None
+
+
+def _decode_letters(ids):
+    return "".join(chr(97 + i) for i in ids)
+
+
+def _run_budget(budget, sampled_tokens):
+    emitted = []
+    for sampled in sampled_tokens:
+        forced = budget.next_forced()
+        emitted.append(sampled if forced is None else forced)
+        budget.observe(emitted[-1])
+    return emitted
+
+
+def test_think_budget_counts_reasoning_until_the_model_closes_it():
+    budget = ThinkBudget(5, [8, 9], _decode_letters, "cd", opened=True)
+    # "cd" closed the reasoning after 4 tokens, so nothing was forced
+    assert _run_budget(budget, [0, 1, 2, 3, 4, 5]) == [0, 1, 2, 3, 4, 5]
+    assert budget.report() == {"think_budget": 5, "reasoning_tokens": 4, "think_budget_exhausted": False}
+
+
+def test_think_budget_starts_counting_at_the_opening_tag():
+    budget = ThinkBudget(3, [25, 25], _decode_letters, "zz", start_tag="xy")
+    # Reasoning opens with "xy" after a leading token; its 3 tokens are followed by the forced "zz"
+    assert _run_budget(budget, [0, 23, 24, 5, 6, 7, 8, 9, 10]) == [0, 23, 24, 5, 6, 7, 25, 25, 10]
+    assert budget.report() == {"think_budget": 3, "reasoning_tokens": 3, "think_budget_exhausted": True}
+
+
+def test_think_budget_never_cuts_output_without_a_reasoning_block():
+    # A model that answers straight away (no opening tag) must not get the closing tag forced mid-answer
+    budget = ThinkBudget(3, [25, 25], _decode_letters, "zz", start_tag="xy")
+    answer = list(range(20))
+    assert _run_budget(budget, answer) == answer
+    assert budget.report() == {"think_budget": 3, "reasoning_tokens": 0, "think_budget_exhausted": False}
+
+
+def test_stream_response_stops_early_and_reports_saved_tokens():
+    calls = {}
+
+    def looping_stream(prompt, usage=None, **generation_kwargs):
+        calls.update(generation_kwargs, produced=0)
+        try:
+            while True:
+                calls["produced"] += 1
+                yield "This line keeps coming back again.\n"
+        finally:
+            usage["output_tokens"] = calls["produced"] * 8
+
+    metadata = {}
+    with mock.patch.object(model_utils, "_stream_text", looping_stream):
+        reasoning, answer = model_utils.generate_response("q", "non-think", metadata, use_cache=False, profile="Study Tips")
+    assert calls["max_new_tokens"] == get_profile("Study Tips", "non-think").max_new_tokens
+    assert answer == "This line keeps coming back again.\nThis line keeps coming back again."
+    assert metadata["finish_reason"] == "repetition" and metadata["profile"] == "Study Tips"
+    assert metadata["tokens_saved"] == metadata["max_new_tokens"] - 24
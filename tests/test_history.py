@@ -0,0 +1,105 @@
+"""
+Tests for the token-budgeted conversation history
+"""
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from history import HistoryStore, truncate_to_tokens, with_history
+
+
+def words(text):
+    return len(text.split())
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+class RecordingSummarizer:
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, summary, turns, max_tokens):
+        self.release.wait(5)
+        self.calls.append((summary, [t.user for t in turns]))
+        return " ".join(filter(None, [summary, *[f"about {t.user}" for t in turns]]))
+
+
+def test_context_stays_within_budget_and_reports_usage():
+    store = HistoryStore(token_budget=20, max_turns=10, summary_tokens=5, count_tokens=words)
+    assert store.context("s|Culture") == ("", {"history_tokens": 0, "history_budget": 20,
+                                               "history_turns": 0, "summary_tokens": 0})
+    store.record("s|Culture", "what is onam", "a harvest festival of kerala")
+    text, usage = store.context("s|Culture")
+    assert text.startswith("Earlier in this conversation:\nUser: what is onam\nAssistant: a harvest")
+    assert usage["history_tokens"] == 10 and usage["history_turns"] == 1
+    assert with_history(text, "when is it").endswith("\n\nCurrent question: when is it")
+    assert store.context("s|Code")[0] == ""
+
+
+def test_older_turns_fold_incrementally_into_the_summary():
+    summarize = RecordingSummarizer()
+    store = HistoryStore(token_budget=30, max_turns=2, summary_tokens=10, summarize=summarize, count_tokens=words)
+    for topic in ["onam", "pongal", "bihu"]:
+        store.record("s", topic, "a festival")
+    wait_until(lambda: len(summarize.calls) == 1 and store.context("s")[1]["summary_tokens"])
+    # A fourth turn only sends the newly folded turn with the previous summary
+    store.record("s", "lohri", "a festival")
+    wait_until(lambda: len(summarize.calls) == 2 and store.context("s")[1]["history_turns"] == 2)
+    assert summarize.calls == [("", ["onam"]), ("about onam", ["pongal"])]
+    text, usage = store.context("s")
+    assert "Summary of the earlier conversation: about onam about pongal" in text
+    assert "User: bihu" in text and "User: lohri" in text and "User: onam" not in text
+    assert usage["history_tokens"] <= 30
+
+
+def test_turns_recorded_during_a_fold_are_kept_and_budget_holds_meanwhile():
+    summarize = RecordingSummarizer()
+    summarize.release.clear()
+    store = HistoryStore(token_budget=12, max_turns=5, summary_tokens=4, summarize=summarize, count_tokens=words)
+    store.record("s", "one", "first answer here")
+    store.record("s", "two", "second answer here")
+    store.record("s", "three", "third answer here")
+    # Folding is blocked, but the rendered history still fits the budget
+    assert store.context("s")[1]["history_tokens"] <= 12
+    summarize.release.set()
+    store.record("s", "four", "fourth answer here")
+    wait_until(lambda: store.context("s")[1]["summary_tokens"] > 0 and not store._conversations["s"][0].folding)
+    text, usage = store.context("s")
+    assert "User: four" in text and usage["history_tokens"] <= 12
+    assert [user for _, users in summarize.calls for user in users][:2] == ["one", "two"]
+
+
+def test_failing_summarizer_falls_back_to_extractive_summary():
+    def broken(summary, turns, max_tokens):
+        raise RuntimeError("model unavailable")
+
+    store = HistoryStore(token_budget=40, max_turns=1, summary_tokens=12, summarize=broken, count_tokens=words)
+    store.record("s", "Who built the Taj Mahal?", "Shah Jahan built it. It took 22 years.")
+    store.record("s", "Where is it?", "In Agra.")
+    wait_until(lambda: store.context("s")[1]["summary_tokens"] > 0)
+    assert "Asked: Who built the Taj Mahal? Answered: Shah Jahan built it." in store.context("s")[0]
+
+
+def test_sessions_are_capped_and_expire():
+    now = [0.0]
+    store = HistoryStore(max_sessions=2, idle_ttl_s=60, count_tokens=words, clock=lambda: now[0])
+    for key in ("a", "b", "c"):
+        store.record(key, "q", "a")
+    assert len(store) == 2 and store.context("a")[0] == ""
+    now[0] = 61
+    assert store.context("c")[0] == "" and len(store) == 0
+
+
+def test_truncate_keeps_the_most_recent_words():
+    assert truncate_to_tokens("one two three four five", 2, words) == "four five"
+    assert truncate_to_tokens("short", 2, words) == "short"
@@ -0,0 +1,111 @@
+"""
+Tests for the pooled async HTTP client and its conditional GETs
+"""
+import asyncio
+import sys
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import requests
+from http_client import AsyncHttpClient, UnsupportedContentTypeError, _ValidatorCache
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    body = b"<html><body>Namaste</body></html>"
+    connections = set()
+    conditional_hits = 0
+
+    def do_GET(self):
+        type(self).connections.add(self.client_address)
+        if self.path == "/missing":
+            self._send(404, b"not found")
+        elif self.path == "/large":
+            self._send(200, b"x" * 200000)
+        elif self.path == "/doc.pdf":
+            self._send(200, b"%PDF-1.4", content_type="application/pdf")
+        elif self.headers.get("If-None-Match") == '"v1"':
+            type(self).conditional_hits += 1
+            self.send_response(304)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            self._send(200, self.body, etag='"v1"')
+
+    def _send(self, status, body, etag=None, content_type="text/html; charset=utf-8"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestAsyncHttpClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        _Handler.connections = set()
+        _Handler.conditional_hits = 0
+
+    def _run(self, *calls, **client_kwargs):
+        async def main():
+            client = AsyncHttpClient(**client_kwargs)
+            try:
+                return [await client.get(*args, **kwargs) for args, kwargs in calls], client
+            finally:
+                await client.aclose()
+        return asyncio.run(main())
+
+    def test_repeat_visit_is_revalidated_over_one_connection(self):
+        (first, second), client = self._run(((f"{self.base}/page",), {}), ((f"{self.base}/page",), {}))
+        self.assertFalse(first.from_cache)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(second.text, first.text)
+        self.assertEqual(_Handler.conditional_hits, 1)
+        self.assertEqual(len(_Handler.connections), 1)
+        self.assertEqual(client.revalidated, 1)
+
+    def test_http_errors_raise(self):
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self._run(((f"{self.base}/missing",), {}))
+
+    def test_validator_cache_is_bounded(self):
+        validators = _ValidatorCache(len(_Handler.body) + 1)
+        (_, _, again), _ = self._run(((f"{self.base}/a",), {}), ((f"{self.base}/b",), {}), ((f"{self.base}/a",), {}),
+                                     validators=validators)
+        self.assertFalse(again.from_cache)
+
+    def test_body_is_capped_while_streaming(self):
+        (result,), _ = self._run(((f"{self.base}/large",), {"max_bytes": 1000}))
+        self.assertEqual(len(result.content), 1000)
+        self.assertTrue(result.truncated)
+
+    def test_unaccepted_content_type_is_rejected(self):
+        with self.assertRaises(UnsupportedContentTypeError):
+            self._run(((f"{self.base}/doc.pdf",), {"accept_types": ("text/html",)}))
+
+    def test_connection_errors_map_to_requests_exceptions(self):
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self._run((("http://127.0.0.1:9/",), {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Tests for the single-pass intent router
+"""
+import sys
+import os
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from intent_router import AhoCorasick, route_prompt
+
+
+class TestAhoCorasick(unittest.TestCase):
+    def test_overlapping_matches(self):
+        matcher = AhoCorasick()
+        for word in ["he", "she", "his", "hers"]:
+            matcher.add(word, word)
+        self.assertEqual(sorted(m[2] for m in matcher.iter_matches("ushers")), ["he", "hers", "she"])
+
+
+class TestRoutePrompt(unittest.TestCase):
+    def test_tab_takes_precedence(self):
+        self.assertEqual(route_prompt("Code", "Write a poem").intent, "code")
+        self.assertEqual(route_prompt("Exam", "Hello").intent, "exam")
+        self.assertEqual(route_prompt("Default", "Hello").intent, "default")
+
+    def test_english_keywords_keep_substring_behaviour(self):
+        route = route_prompt("Default", "What are the latest Diwali festivals?")
+        self.assertEqual(route.intent, "culture")
+        self.assertTrue(route.has("recent"))
+
+    def test_indic_keywords_route(self):
+        self.assertEqual(route_prompt("Default", "दिवाली त्योहारों का इतिहास").intent, "culture")
+        self.assertEqual(route_prompt("Default", "இந்த சமன்பாடு தீர்வு காண").intent, "math")
+        self.assertTrue(route_prompt("Default", "इस समीकरण को हल करें").has("compute"))
+
+    def test_exam_and_subject_extraction(self):
+        route = route_prompt("Exam", "Generate a mock question for JEE Physics")
+        self.assertEqual((route.exam, route.subject), ("JEE", "Physics"))
+        self.assertTrue(route.has("generate") and route.has("question"))
+        route = route_prompt("Exam", "नीट में जीव विज्ञान की किताबें")
+        self.assertEqual((route.exam, route.subject), ("NEET", "Biology"))
+        self.assertTrue(route.has("materials"))
+
+    def test_latin_names_need_word_boundaries(self):
+        self.assertIsNone(route_prompt("Exam", "How do I investigate this?").exam)
+        self.assertEqual(route_prompt("Exam", "Bank PO reasoning tips").subject, "Reasoning")
+
+    def test_short_indic_keywords_are_whole_words(self):
+        route = route_prompt("Regional", "भारत की आज़ादी का इतिहास बताइए")
+        self.assertEqual(sorted(route.groups), ["culture"])
+        self.assertFalse(route_prompt("Default", "आजकल लोग क्या पढ़ते हैं").has("recent"))
+        self.assertTrue(route_prompt("Default", "आज की खबरें").has("recent"))
+
+    def test_everyday_words_are_not_exam_names(self):
+        self.assertIsNone(route_prompt("Exam", "घर का गेट किस रंग का है").exam)
+        self.assertEqual(route_prompt("Exam", "गेट परीक्षा का पाठ्यक्रम").exam, "GATE")
+
+    def test_subject_must_belong_to_exam(self):
+        self.assertIsNone(route_prompt("Exam", "UPSC Physics").subject)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for the offline BM25 index
+"""
+import sys
+import os
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from local_index import LocalIndex, build_index, tokenize, split_passages, _decode_postings, _encode_varint
+
+DOCUMENTS = [
+    ("Onam", "https://example.org/onam",
+     "Onam is the harvest festival of Kerala.\n\nThe Vallam Kali snake boat race is held during Onam."),
+    ("Pongal", "https://example.org/pongal", "Pongal is a harvest festival celebrated in Tamil Nadu."),
+    ("दीपावली", "https://example.org/diwali", "दीपावली रोशनी का त्योहार है। इस दिन दीये जलाए जाते हैं।"),
+    ("மெரினா", "https://example.org/marina", "மெரினா கடற்கரை சென்னையில் உள்ளது."),
+]
+
+
+class TestTokenize(unittest.TestCase):
+    def test_indic_words_keep_their_marks(self):
+        self.assertEqual(tokenize("दीपावली, रोशनी!"), ["दीपावली", "रोशनी"])
+        self.assertEqual(tokenize("தமிழ்நாடு"), ["தமிழ்நாடு"])
+
+    def test_case_and_punctuation(self):
+        self.assertEqual(tokenize("Onam-2024: KERALA's"), ["onam", "2024", "kerala", "s"])
+
+    def test_varint_postings_round_trip(self):
+        encoded = bytearray()
+        previous = 0
+        for passage_id, tf in [(3, 1), (200, 7), (70000, 2)]:
+            _encode_varint(passage_id - previous, encoded)
+            _encode_varint(tf, encoded)
+            previous = passage_id
+        self.assertEqual(list(_decode_postings(bytes(encoded))), [(3, 1), (200, 7), (70000, 2)])
+
+    def test_long_paragraphs_split_at_sentences(self):
+        passages = split_passages("एक वाक्य। " * 300, max_chars=200)
+        self.assertTrue(all(len(p) <= 200 for p in passages))
+        self.assertTrue(all(p.endswith("।") for p in passages))
+
+    def test_unpunctuated_text_is_split_not_truncated(self):
+        words = " ".join(f"शब्द{i}" for i in range(1500))
+        passages = split_passages(words, max_chars=200)
+        self.assertTrue(all(len(p) <= 200 for p in passages))
+        self.assertEqual(" ".join(passages), words)
+        self.assertEqual("".join(split_passages("x" * 5000, max_chars=2000)), "x" * 5000)
+
+
+class TestLocalIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(cls.tmp.name, "knowledge.idx")
+        build_index(DOCUMENTS, path)
+        cls.index = LocalIndex(path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_best_passage_ranks_first(self):
+        hits = self.index.search("snake boat race in Kerala", k=2)
+        self.assertEqual(hits[0].title, "Onam")
+        self.assertIn("Vallam Kali", hits[0].text)
+        self.assertEqual(hits[0].source, "https://example.org/onam")
+
+    def test_indic_queries(self):
+        self.assertEqual(self.index.search("दीपावली त्योहार")[0].title, "दीपावली")
+        self.assertEqual(self.index.search("சென்னையில்")[0].title, "மெரினா")
+
+    def test_unknown_terms_return_nothing(self):
+        self.assertEqual(self.index.search("quantum chromodynamics"), [])
+
+    def test_query_takes_milliseconds(self):
+        start = time.perf_counter()
+        for _ in range(100):
+            self.index.search("harvest festival")
+        self.assertLess((time.perf_counter() - start) / 100, 0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
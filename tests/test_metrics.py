@@ -0,0 +1,103 @@
+"""
+Tests for the Prometheus-format metrics and the /metrics endpoint
+"""
+import asyncio
+import sys
+import os
+import unittest
+import urllib.request
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from smolagents import tool
+
+import metrics
+from metrics import Counter, Gauge, Histogram, Registry
+
+
+class TestExposition(unittest.TestCase):
+    """Rendering in the Prometheus text format"""
+
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_with_labels(self):
+        requests = Counter("test_requests", "Requests", ["tab"], registry=self.registry)
+        requests.labels(tab="Code").inc()
+        requests.labels(tab="Code").inc(2)
+        requests.labels(tab='Exam "Q&A"').inc()
+        text = self.registry.render()
+        self.assertIn("# TYPE test_requests counter", text)
+        self.assertIn('test_requests_total{tab="Code"} 3', text)
+        self.assertIn('test_requests_total{tab="Exam \\"Q&A\\""} 1', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        latency = Histogram("test_latency_seconds", "Latency", buckets=(0.1, 1), registry=self.registry)
+        for value in (0.05, 0.5, 5):
+            latency.observe(value)
+        text = self.registry.render()
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{le="1"} 2', text)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn("test_latency_seconds_count 3", text)
+        self.assertIn("test_latency_seconds_sum 5.55", text)
+
+    def test_gauge_callback_and_label_validation(self):
+        depth = Gauge("test_queue_depth", "Depth", registry=self.registry)
+        depth.set_function(lambda: 7)
+        self.assertIn("test_queue_depth 7", self.registry.render())
+        with self.assertRaises(ValueError):
+            Counter("test_other", "Other", ["tab"], registry=self.registry).labels(agent="x")
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Tool and generation hooks record into the shared registry"""
+
+    def test_tool_calls_and_errors_are_counted(self):
+        @tool
+        def flaky_lookup(query: str) -> str:
+            """
+            Test tool.
+
+            Args:
+                query: Anything; "fail" returns an error message
+            """
+            return "Error: upstream down" if query == "fail" else "ok"
+
+        metrics.instrument_tool(flaky_lookup)
+        metrics.instrument_tool(flaky_lookup)
+        flaky_lookup("a")
+        flaky_lookup("fail")
+        calls = metrics.TOOL_CALLS
+        self.assertEqual(calls.labels(tool="flaky_lookup", outcome="ok").value, 1)
+        self.assertEqual(calls.labels(tool="flaky_lookup", outcome="error").value, 1)
+        self.assertEqual(metrics.TOOL_DURATION.labels(tool="flaky_lookup").count, 2)
+
+    def test_async_tool_exceptions_count_as_errors(self):
+        @metrics.timed_tool("test_async_lookup")
+        async def lookup():
+            raise RuntimeError("timeout")
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(lookup())
+        self.assertEqual(metrics.TOOL_CALLS.labels(tool="test_async_lookup", outcome="error").value, 1)
+
+    def test_observe_generation_throughput(self):
+        child = metrics.TOKENS_PER_SECOND._children[()]
+        count, total = child.count, child.sum
+        metrics.observe_generation({"ttft_s": 0.5, "total_s": 2.5, "prompt_tokens": 40, "output_tokens": 41})
+        self.assertEqual(child.count, count + 1)
+        self.assertAlmostEqual(child.sum - total, 20.0)
+
+
+class TestEndpoint(unittest.TestCase):
+    def test_metrics_endpoint_serves_registry(self):
+        server = metrics.start_metrics_server("127.0.0.1", 0)
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            self.assertTrue(response.headers["Content-Type"].startswith("text/plain; version=0.0.4"))
+            self.assertIn("# TYPE bharat_buddy_requests counter", response.read().decode("utf-8"))
+
+
+if __name__ == '__main__':
+    unittest.main()
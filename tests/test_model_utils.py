@@ -0,0 +1,170 @@
+"""
+Unit tests for the streaming helpers in model_utils
+"""
+import asyncio
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from model_utils import ThinkStreamParser, aiter_in_thread
+
+
+def _feed_all(parser, chunks):
+    current = ("", "")
+    for chunk in chunks:
+        current = parser.feed(chunk)
+    return current
+
+
+def test_think_parser_splits_on_tag_across_chunks():
+    parser = ThinkStreamParser("think")
+    reasoning, answer = _feed_all(parser, ["Let me add ", "the numbers.</th", "ink>\n", "801"])
+    assert reasoning == "Let me add the numbers."
+    assert answer == "801"
+    assert parser.finish() == ("Let me add the numbers.", "801")
+
+
+def test_think_parser_holds_back_partial_tag():
+    parser = ThinkStreamParser("think")
+    reasoning, answer = parser.feed("step one</thi")
+    assert reasoning == "step one"
+    assert answer == ""
+
+
+def test_think_parser_without_tag_is_answer():
+    parser = ThinkStreamParser("think")
+    reasoning, _ = parser.feed("just an answer")
+    assert reasoning == "just an answer"
+    assert parser.finish() == ("", "just an answer")
+
+
+def test_non_think_parser_streams_into_answer():
+    parser = ThinkStreamParser("non-think")
+    assert parser.feed("Namaste") == ("", "Namaste")
+    assert parser.feed("!</s>") == ("", "Namaste!</s>")
+    assert parser.finish() == ("", "Namaste!")
+
+
+def test_importing_app_logic_does_not_load_engine():
+    import model_utils
+    import app_logic  # noqa: F401
+    assert not model_utils.is_ready()
+    assert app_logic._agents == {}
+
+
+def test_aiter_in_thread_bridges_a_blocking_iterator():
+    def blocking():
+        yield "a"
+        yield "b"
+        raise ValueError("boom")
+
+    async def consume():
+        items = []
+        try:
+            async for item in aiter_in_thread(blocking()):
+                items.append(item)
+        except ValueError as e:
+            items.append(str(e))
+        return items
+
+    assert asyncio.run(consume()) == ["a", "b", "boom"]
+
+
+class _FakeScheduler:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    def stream(self, request):
+        try:
+            for chunk in self.chunks:
+                request.generated.append(chunk)
+                yield chunk
+        finally:
+            self.closed = True
+
+
+def _fake_engine(**methods):
+    from types import SimpleNamespace
+    import torch
+    prepare = lambda **kwargs: {"inputs": torch.tensor([[1, 2, 3]]), "max_new_tokens": 64}
+    return SimpleNamespace(flatten_messages_as_text=True, model_id="tiny", kwargs={"max_new_tokens": 64},
+                           _prepare_completion_args=prepare, **methods)
+
+
+def test_agent_steps_go_through_the_scheduler_and_stop_at_stop_sequences():
+    from types import SimpleNamespace
+    from unittest import mock
+    import pytest
+    pytest.importorskip("torch")
+    import model_utils
+
+    scheduler = _FakeScheduler(["Thought: add\nCalling", " tools:", " more", " text"])
+    submitted = []
+
+    def submit(input_ids, **kwargs):
+        submitted.append(input_ids)
+        return SimpleNamespace(input_ids=input_ids, generated=[])
+
+    model = model_utils.AgentModel(_fake_engine())
+    with mock.patch.object(model_utils.config, "ENABLE_CONTINUOUS_BATCHING", True), \
+         mock.patch.object(model_utils, "get_scheduler", return_value=scheduler), \
+         mock.patch.object(model_utils, "_submit_ids", side_effect=submit):
+        message = model.generate([], stop_sequences=["Calling tools:"])
+        deltas = list(model.generate_stream([], stop_sequences=["Calling tools:"]))
+
+    assert submitted == [[1, 2, 3], [1, 2, 3]]
+    assert message.content == "Thought: add\n"
+    assert message.token_usage.input_tokens == 3
+    assert scheduler.closed
+    # "Calling" is held back until the next chunk shows it starts the stop sequence
+    assert [delta.content for delta in deltas] == ["Thought: add\n"]
+
+
+def test_agent_steps_without_batching_run_one_at_a_time():
+    from unittest import mock
+    import pytest
+    pytest.importorskip("torch")
+    import model_utils
+
+    held = []
+    engine = _fake_engine(generate=lambda messages, **kwargs: held.append(model_utils._direct_agent_lock.locked()))
+    with mock.patch.object(model_utils.config, "ENABLE_CONTINUOUS_BATCHING", False):
+        model_utils.AgentModel(engine).generate([])
+    assert held == [True]
+
+
+def test_async_response_cache_lookups_and_writes_stay_off_the_event_loop():
+    import threading
+    from unittest import mock
+    import model_utils
+    from response_cache import ResponseCache
+
+    threads = []
+
+    class RecordingCache(ResponseCache):
+        def get(self, key):
+            threads.append(threading.current_thread())
+            return super().get(key)
+
+        def put(self, key, value):
+            threads.append(threading.current_thread())
+            super().put(key, value)
+
+    async def generation(prompt, mode, metadata, profile):
+        yield "", "Namaste"
+
+    async def consume():
+        loop_thread = threading.current_thread()
+        first = [item async for item in model_utils.astream_response("hi", "non-think")]
+        second = [item async for item in model_utils.astream_response("hi", "non-think")]
+        return loop_thread, first, second
+
+    with mock.patch.object(model_utils.config, "ENABLE_RESPONSE_CACHE", True), \
+         mock.patch.object(model_utils, "_response_cache", RecordingCache()), \
+         mock.patch.object(model_utils, "_astream_generation", generation):
+        loop_thread, first, second = asyncio.run(consume())
+
+    assert first == second == [("", "Namaste")]
+    # get (miss), put, get (hit)
+    assert len(threads) == 3 and loop_thread not in threads
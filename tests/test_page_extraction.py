@@ -0,0 +1,56 @@
+"""
+Tests for main-content extraction and output bounds in visit_webpage
+"""
+import sys
+import os
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent_tools import _extract_main_content, _truncate_text
+
+PAGE = """
+<html><head><title>Onam</title><script>var tracking = 1;</script><style>p {}</style></head>
+<body>
+  <header><a href="/">Home</a> | <a href="/news">News</a></header>
+  <nav><ul><li>Menu item</li></ul></nav>
+  <div class="cookie-banner">We use cookies</div>
+  <div id="content">
+    <p>Onam is the harvest festival of Kerala, celebrated in the month of Chingam.</p>
+    <p>The festival features the Vallam Kali boat race and the Onasadya feast.</p>
+  </div>
+  <div class="sidebar"><p>Related: Pongal</p></div>
+  <footer>Copyright</footer>
+</body></html>
+"""
+
+
+class TestExtractMainContent(unittest.TestCase):
+    def test_boilerplate_is_dropped(self):
+        content = _extract_main_content(PAGE)
+        self.assertIn("harvest festival of Kerala", content)
+        self.assertIn("Vallam Kali", content)
+        for noise in ["tracking", "Menu item", "cookies", "Related: Pongal", "Copyright", "News"]:
+            self.assertNotIn(noise, content)
+
+    def test_main_element_is_preferred(self):
+        html = "<body><div><p>Teaser text here</p></div><main><h1>Article</h1><p>Body</p></main></body>"
+        content = _extract_main_content(html)
+        self.assertIn("Article", content)
+        self.assertNotIn("Teaser", content)
+
+
+class TestTruncateText(unittest.TestCase):
+    def test_short_text_is_unchanged(self):
+        self.assertEqual(_truncate_text("Namaste", 100), "Namaste")
+
+    def test_long_text_is_cut_at_a_boundary(self):
+        text = "First paragraph is here.\n\n" + "word " * 100
+        result = _truncate_text(text, 60)
+        self.assertTrue(result.startswith("First paragraph is here."))
+        self.assertTrue(result.endswith("[Content truncated]"))
+        self.assertLessEqual(len(result), 60 + len("\n\n[Content truncated]"))
+
+
+if __name__ == '__main__':
+    unittest.main()
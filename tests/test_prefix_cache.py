@@ -0,0 +1,57 @@
+"""
+Tests for the prompt-prefix KV-cache
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from prefix_cache import PrefixKVCache
+
+
+def test_match_prefers_longest_registered_prefix():
+    cache = PrefixKVCache()
+    cache.register("You are Bharat AI Buddy")
+    cache.register("You are Bharat AI Buddy, an educational consultant")
+    assert cache.match("You are Bharat AI Buddy, an educational consultant. Q: UPSC?") == \
+        "You are Bharat AI Buddy, an educational consultant"
+    assert cache.match("Something else") is None
+
+
+def test_shared_length_stops_at_first_differing_token_and_keeps_last_token():
+    cache = PrefixKVCache(min_tokens=2)
+    assert cache.shared_length([1, 2, 3, 9], [1, 2, 3, 4, 5]) == 3
+    assert cache.shared_length([1, 2, 3], [1, 2, 3]) == 2
+    assert cache.shared_length([1, 9], [1, 2, 3]) == 0
+
+
+def test_scheduler_output_is_unchanged_with_cached_prefix():
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    from scheduler import ContinuousBatchScheduler
+
+    class CharTokenizer:
+        eos_token_id = 63
+
+        def decode(self, ids, skip_special_tokens=True):
+            return "".join(chr(65 + (i % 26)) for i in ids if i != 63)
+
+    torch.manual_seed(0)
+    model = transformers.LlamaForCausalLM(transformers.LlamaConfig(
+        vocab_size=64, hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+        num_attention_heads=4, num_key_value_heads=2, eos_token_id=63,
+    )).eval().double()
+    cache = PrefixKVCache(min_tokens=1)
+    prefix = [5, 9, 12, 30, 31, 2, 7]
+    prompts = [prefix + [1, 2, 3], prefix + [40]]
+
+    plain = ContinuousBatchScheduler(model, CharTokenizer(), max_wait_ms=1)
+    cached = ContinuousBatchScheduler(model, CharTokenizer(), max_wait_ms=1, prefix_cache=cache)
+    for prompt in prompts:
+        expected = "".join(plain.stream(plain.submit(prompt, 10, do_sample=False)))
+        actual = "".join(cached.stream(cached.submit(prompt, 10, do_sample=False, prefix_length=len(prefix))))
+        assert actual == expected
+    plain.shutdown()
+    cached.shutdown()
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1}
@@ -0,0 +1,42 @@
+"""
+Tests for the int8 weight cache using a tiny randomly initialised model
+"""
+import sys
+import os
+from unittest import mock
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from quantization import _cache_path, load_int8_model
+
+
+@pytest.fixture
+def tiny_checkpoint(tmp_path):
+    torch.manual_seed(0)
+    model_config = transformers.LlamaConfig(
+        vocab_size=64, hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+        num_attention_heads=4, num_key_value_heads=2, tie_word_embeddings=True,
+    )
+    path = str(tmp_path / "tiny-llama")
+    transformers.LlamaForCausalLM(model_config).save_pretrained(path)
+    return path
+
+
+def test_cached_weights_rebuild_the_same_quantized_model(tiny_checkpoint, tmp_path):
+    cache_dir = str(tmp_path / "int8")
+    quantized = load_int8_model(tiny_checkpoint, cache_dir)
+    cache_file = _cache_path(tiny_checkpoint, cache_dir)
+    # Only tensors are cached, so the file loads without unpickling any code
+    assert isinstance(torch.load(cache_file, weights_only=True), dict)
+
+    # A cache hit never reads the fp32 checkpoint
+    with mock.patch.object(transformers.AutoModelForCausalLM, "from_pretrained", side_effect=AssertionError):
+        reloaded = load_int8_model(tiny_checkpoint, cache_dir)
+    input_ids = torch.tensor([[1, 2, 3, 4]])
+    with torch.inference_mode():
+        assert torch.equal(quantized(input_ids).logits, reloaded(input_ids).logits)
+    assert isinstance(reloaded.model.layers[0].mlp.up_proj, torch.ao.nn.quantized.dynamic.Linear)
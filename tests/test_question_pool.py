@@ -0,0 +1,108 @@
+"""
+Tests for the pre-generated quiz question pool
+"""
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from question_pool import QuestionPool
+from syllabus_store import make_key
+from quiz import QuizQuestion
+
+
+def question(text):
+    return QuizQuestion(text, (("A", "yes"), ("B", "no")), "A", "")
+
+
+class FakeGenerator:
+    """Numbered questions; the first question of every batch repeats the previous batch's last"""
+
+    def __init__(self):
+        self.calls = []
+        self.counter = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, exam, subject, count):
+        self.release.wait(5)
+        self.calls.append((exam, subject, count))
+        start = max(self.counter - 1, 0)
+        self.counter = start + count
+        return [question(f"{exam} {subject} Q{i}") for i in range(start, start + count)]
+
+
+def test_pop_serves_fifo_and_refills_below_low_water(tmp_path):
+    generate = FakeGenerator()
+    pool = QuestionPool(str(tmp_path / "pool.sqlite3"), generate=generate, low_water=2, batch_size=3)
+    assert pool.refill("UPSC", "History") == 3
+    assert pool.pop("upsc", " history ") == question("UPSC History Q0")
+    assert pool.pop("UPSC", "History") == question("UPSC History Q1")
+    # One left, below the low-water mark: the worker refills, dropping the duplicate Q2
+    assert pool.pop("UPSC", "History", timeout=0) == question("UPSC History Q2")
+    assert pool.pop("UPSC", "History", timeout=5) == question("UPSC History Q3")
+    pool.close()
+    assert len(generate.calls) >= 2
+
+
+def test_empty_pool_returns_none_without_blocking():
+    generate = FakeGenerator()
+    generate.release.clear()
+    pool = QuestionPool(generate=generate, low_water=1, batch_size=2)
+    assert pool.pop("JEE", "Physics") is None
+    generate.release.set()
+    assert pool.pop("JEE", "Physics", timeout=5) == question("JEE Physics Q0")
+    pool.close()
+
+
+def test_unserved_questions_survive_a_restart(tmp_path):
+    path = str(tmp_path / "pool.sqlite3")
+    pool = QuestionPool(path, generate=FakeGenerator(), low_water=0, batch_size=3)
+    pool.refill("NEET", "Biology")
+    assert pool.pop("NEET", "Biology") == question("NEET Biology Q0")
+    pool.close()
+
+    reopened = QuestionPool(path, low_water=0)
+    assert reopened.stats() == {("NEET", "Biology"): 2}
+    assert reopened.pop("NEET", "Biology") == question("NEET Biology Q1")
+    reopened.close()
+
+
+def test_waiting_request_goes_ahead_of_queued_priming():
+    generate = FakeGenerator()
+    generate.release.clear()
+    pool = QuestionPool(generate=generate, low_water=1, batch_size=1)
+    for subject in ["History", "Geography", "Politics", "Economics"]:
+        pool.request_refill("UPSC", subject)
+    threading.Timer(0.2, generate.release.set).start()
+    assert pool.pop("JEE", "Physics", timeout=5) is not None
+    pool.close()
+    order = [subject for _, subject, _ in generate.calls]
+    assert order.index("Physics") <= 1
+    assert {"History", "Geography", "Politics", "Economics"} <= set(order)
+
+
+def test_requested_pool_is_filled_before_priming_without_waiting():
+    generate = FakeGenerator()
+    generate.release.clear()
+    pool = QuestionPool(generate=generate, low_water=1, batch_size=1)
+    for subject in ["History", "Geography", "Politics"]:
+        pool.request_refill("UPSC", subject)
+    assert pool.pop("JEE", "Physics") is None
+    generate.release.set()
+    pool.close()
+    order = [subject for _, subject, _ in generate.calls]
+    assert order.index("Physics") <= 1
+
+
+def test_dedup_memory_is_bounded_by_the_pool_and_window():
+    pool = QuestionPool(generate=FakeGenerator(), low_water=0, batch_size=3, dedup_window=2)
+    key = make_key("SSC", "English")
+    for _ in range(5):
+        pool.refill("SSC", "English")
+        while pool.pop("SSC", "English") is not None:
+            pass
+    assert len(pool._pooled[key]) == 0
+    assert len(pool._served[key]) == 2
+    # The batch repeats the question served last, which is still in the window
+    assert pool.refill("SSC", "English") == 2
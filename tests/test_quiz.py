@@ -0,0 +1,80 @@
+"""
+Tests for quiz question parsing, answer checking and the session store
+"""
+import sys
+import os
+from unittest.mock import patch
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import question_pool
+import quiz
+from quiz import QuizSessionStore, check_quiz_answer, parse_quiz_question
+
+
+MARKDOWN_QUESTION = """**Question 1:** Which city is the capital of India?
+
+**Options:**
+(A) Mumbai
+(B) Kolkata
+(C) Chennai
+(D) New Delhi
+
+**Correct Answer:** (D) New Delhi, the capital since 1931."""
+
+
+def test_parses_plain_and_markdown_formats():
+    plain = parse_quiz_question("Q: When did the revolt begin?\nA) 1847\nB) 1857\nC) 1867\nD) 1877\nAnswer: B\n"
+                                "Explanation: It began at Meerut in May 1857.")
+    assert plain.stem == "When did the revolt begin?"
+    assert plain.options[1] == ("B", "1857")
+    assert (plain.answer, plain.explanation) == ("B", "It began at Meerut in May 1857.")
+
+    markdown = parse_quiz_question(MARKDOWN_QUESTION)
+    assert markdown.stem == "Which city is the capital of India?"
+    assert [key for key, _ in markdown.options] == ["A", "B", "C", "D"]
+    assert (markdown.answer, markdown.explanation) == ("D", "the capital since 1931.")
+
+
+def test_answer_given_as_option_text_and_rejects():
+    question = parse_quiz_question("Question: Speed of sound in air?\na. 3x10^8 m/s\nb. 343 m/s\nAnswer: 343 m/s")
+    assert question.answer == "B"
+    assert parse_quiz_question("Explain photosynthesis.\nAnswer: A") is None
+    assert parse_quiz_question("Q: Pick one\nA) x\nB) y\nAnswer: E") is None
+
+
+def test_check_answer_accepts_keys_and_option_text():
+    question = parse_quiz_question(MARKDOWN_QUESTION)
+    for answer in ("d", " (D) ", "D) New Delhi", "new delhi"):
+        assert check_quiz_answer(answer, question), answer
+    for answer in ("A", "Delhi", ""):
+        assert not check_quiz_answer(answer, question), answer
+
+
+def test_session_store_caps_size_and_expires_idle_sessions():
+    now = [1000.0]
+    store = QuizSessionStore(max_sessions=2, idle_ttl_s=60, clock=lambda: now[0])
+    store.start("a", "UPSC", "History")
+    store.start("b", "JEE", "Physics")
+    assert store.get("a").exam == "UPSC"
+    store.start("c", "NEET", "Biology")
+    # "b" was the least recently used
+    assert store.get("b") is None and len(store) == 2
+
+    now[0] += 30
+    assert store.get("c") is not None
+    now[0] += 45
+    assert store.get("a") is None
+    assert store.get("c").subject == "Biology"
+    assert store.evicted == 2
+
+
+def test_quiz_flow_scores_answers():
+    pool = question_pool.QuestionPool(generate=lambda exam, subject, count: [parse_quiz_question(MARKDOWN_QUESTION)],
+                                      low_water=0)
+    pool.refill("UPSC", "Geography")
+    with patch.object(question_pool, "_pool", pool), patch.object(quiz, "quiz_state", QuizSessionStore()):
+        assert quiz.start_quiz("s1", "UPSC", "Geography").endswith("D) New Delhi")
+        feedback, follow_up = quiz.submit_quiz_answer("s1", "d")
+        assert feedback.startswith("✅ Correct! Score: 1/1")
+        assert follow_up == quiz.POOL_EMPTY_MESSAGE.format(exam="UPSC", subject="Geography")
+        assert quiz.submit_quiz_answer("other", "a")[0].startswith("No quiz in progress")
@@ -0,0 +1,94 @@
+"""
+Tests for the two-tier response cache
+"""
+import asyncio
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from response_cache import ResponseCache, normalize_prompt
+
+
+def test_key_ignores_surrounding_whitespace_but_not_mode_or_settings():
+    settings = {"max_new_tokens": 5000, "do_sample": False}
+    key = ResponseCache.make_key("Why is Diwali celebrated?", "think", settings)
+    assert key == ResponseCache.make_key(" Why is Diwali celebrated?\n", "think", settings)
+    assert key != ResponseCache.make_key("Why is Diwali celebrated?", "non-think", settings)
+    assert key != ResponseCache.make_key("Why is Diwali celebrated?", "think", {**settings, "do_sample": True})
+    # Decomposed and composed forms of the same text share a key
+    assert normalize_prompt("दुर्गा पूजा\n") == "दुर्गा पूजा"
+    assert normalize_prompt("Pe\u0301rez") == "P\u00e9rez"
+
+
+def test_case_and_layout_are_part_of_the_key():
+    settings = {"max_new_tokens": 5000, "do_sample": False}
+    indented = "def f(x):\n    if x:\n        return X\n    return x"
+    flattened = "def f(x): if x: return X return x"
+    assert ResponseCache.make_key(indented, "think", settings) != ResponseCache.make_key(flattened, "think", settings)
+    assert ResponseCache.make_key("What is pH?", "think", settings) != ResponseCache.make_key("what is PH?", "think", settings)
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResponseCache(max_memory_entries=2)
+    cache.put("a", ("", "A"))
+    cache.put("b", ("", "B"))
+    assert cache.get("a") == ("", "A")
+    cache.put("c", ("", "C"))
+    assert cache.get("b") is None
+    assert cache.get("a") == ("", "A")
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    now = [1000.0]
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite3"), ttl_s=60, clock=lambda: now[0])
+    cache.put("k", ("why", "because"))
+    now[0] += 59
+    assert cache.get("k") == ("why", "because")
+    now[0] += 2
+    assert cache.get("k") is None
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    ResponseCache(path=path).put("k", ("", "Chandrayaan-3 is a lunar mission"))
+    reopened = ResponseCache(path=path)
+    assert reopened.get("k") == ("", "Chandrayaan-3 is a lunar mission")
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_identical_in_flight_requests_are_coalesced():
+    cache = ResponseCache()
+    leader, flight = cache.claim("k")
+    follower, same_flight = cache.claim("k")
+    assert leader and not follower and same_flight is flight
+
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(same_flight.wait(timeout=5)))
+    waiter.start()
+    cache.resolve("k", ("", "answer"))
+    waiter.join()
+    assert results == [("", "answer")]
+    assert cache.get("k") == ("", "answer")
+    assert cache.claim("k")[0] is True
+
+
+def test_failed_leader_releases_followers_without_caching():
+    cache = ResponseCache()
+    _, flight = cache.claim("k")
+    cache.resolve("k", None)
+    assert flight.wait(timeout=1) is None
+    assert cache.get("k") is None
+
+
+def test_async_follower_is_woken_by_resolve_from_another_thread():
+    cache = ResponseCache()
+    _, flight = cache.claim("k")
+
+    async def follow():
+        threading.Timer(0.05, cache.resolve, args=("k", ("", "answer"))).start()
+        return await flight.wait_async(timeout=5)
+
+    assert asyncio.run(follow()) == ("", "answer")
+    # A flight that is already resolved returns at once
+    assert asyncio.run(flight.wait_async(timeout=5)) == ("", "answer")
@@ -0,0 +1,114 @@
+"""
+Tests for the continuous-batching scheduler using a tiny randomly initialised model
+"""
+import asyncio
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from scheduler import ContinuousBatchScheduler, SchedulerQueueFullError
+
+EOS_ID = 63
+
+
+class CharTokenizer:
+    """Maps token ids to letters so decoded streams are easy to compare"""
+    eos_token_id = EOS_ID
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(chr(65 + (i % 26)) for i in ids if i != EOS_ID)
+
+
+@pytest.fixture(scope="module")
+def tiny_model():
+    torch.manual_seed(0)
+    model_config = transformers.LlamaConfig(
+        vocab_size=64, hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+        num_attention_heads=4, num_key_value_heads=2, eos_token_id=EOS_ID, bos_token_id=0,
+    )
+    return transformers.LlamaForCausalLM(model_config).eval().double()
+
+
+def test_concurrent_requests_match_sequential_greedy_decoding(tiny_model):
+    scheduler = ContinuousBatchScheduler(tiny_model, CharTokenizer(), max_batch_size=3, max_wait_ms=5)
+    prompts = [[1, 2, 3, 4, 5], [7, 8], [9, 10, 11, 12, 13, 14, 15, 16], [3, 3], [5, 6, 7]]
+    lengths = [12, 20, 7, 15, 9]
+    results = {}
+
+    def run(i):
+        request = scheduler.submit(prompts[i], lengths[i], do_sample=False)
+        results[i] = "".join(scheduler.stream(request))
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(prompts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    scheduler.shutdown()
+
+    for i, prompt in enumerate(prompts):
+        expected = tiny_model.generate(
+            torch.tensor([prompt]), max_new_tokens=lengths[i], do_sample=False,
+            eos_token_id=EOS_ID, pad_token_id=0,
+        )
+        assert results[i] == CharTokenizer().decode(expected[0, len(prompt):].tolist())
+
+
+def test_submit_rejects_when_queue_is_full(tiny_model):
+    scheduler = ContinuousBatchScheduler(tiny_model, CharTokenizer(), max_batch_size=1, max_queue_depth=1)
+    scheduler.shutdown()
+    scheduler.submit([1, 2], 4)
+    with pytest.raises(SchedulerQueueFullError):
+        scheduler.submit([1, 2], 4)
+
+
+def test_async_stream_matches_sync_stream(tiny_model):
+    scheduler = ContinuousBatchScheduler(tiny_model, CharTokenizer(), max_batch_size=4, max_wait_ms=5)
+    prompts = [[1, 2, 3], [4, 5, 6, 7]]
+
+    async def consume(prompt):
+        request = scheduler.submit(prompt, 10, do_sample=False, loop=asyncio.get_running_loop())
+        return "".join([text async for text in scheduler.astream(request)])
+
+    async def main():
+        return await asyncio.gather(*(consume(p) for p in prompts))
+
+    async_results = asyncio.run(main())
+    sync_results = ["".join(scheduler.stream(scheduler.submit(p, 10, do_sample=False))) for p in prompts]
+    scheduler.shutdown()
+    assert async_results == sync_results
+
+
+def test_think_budget_forces_the_end_tag_and_conditions_the_answer_on_it(tiny_model):
+    from generation_profiles import ThinkBudget
+    from model_utils import _force_tokens
+
+    tokenizer = CharTokenizer()
+    # "XY" stands in for </think>; the tiny model never writes it on its own here. The
+    # reasoning block is open from the prompt on, as with templates that end in <think>
+    end_ids = [23, 24]
+    prompt = [1, 2, 3, 4, 5]
+    scheduler = ContinuousBatchScheduler(tiny_model, tokenizer, max_batch_size=2, max_wait_ms=5)
+    budget = ThinkBudget(4, end_ids, tokenizer.decode, "XY", opened=True)
+    request = scheduler.submit(prompt, 12, do_sample=False, think_budget=budget)
+    text = "".join(scheduler.stream(request))
+    scheduler.shutdown()
+
+    reasoning = tiny_model.generate(torch.tensor([prompt]), max_new_tokens=4, do_sample=False,
+                                    eos_token_id=EOS_ID, pad_token_id=0)[0].tolist()
+    answer = tiny_model.generate(torch.tensor([reasoning + end_ids]), max_new_tokens=6, do_sample=False,
+                                 eos_token_id=EOS_ID, pad_token_id=0)[0, len(reasoning) + 2:].tolist()
+    assert text == tokenizer.decode(reasoning[len(prompt):] + end_ids + answer)
+    assert budget.report() == {"think_budget": 4, "reasoning_tokens": 4, "think_budget_exhausted": True}
+
+    # generate() with the logits processor of the direct path forces the same tokens
+    direct_budget = ThinkBudget(4, end_ids, tokenizer.decode, "XY", opened=True)
+    direct = tiny_model.generate(torch.tensor([prompt]), max_new_tokens=12, do_sample=False, eos_token_id=EOS_ID,
+                                 pad_token_id=0, logits_processor=_force_tokens(direct_budget, len(prompt)))
+    assert tokenizer.decode(direct[0, len(prompt):].tolist()) == text
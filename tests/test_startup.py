@@ -0,0 +1,31 @@
+"""
+Tests for the startup timing report
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from startup import StartupReport
+
+
+def test_phases_are_recorded_in_order():
+    report = StartupReport()
+    with report.phase("import ui"):
+        pass
+    with report.phase("load engine"):
+        pass
+    phases = report.as_dict()
+    assert [p["phase"] for p in phases] == ["import ui", "load engine"]
+    assert all(p["ok"] and p["duration_s"] >= 0 for p in phases)
+    assert "load engine" in report.summary()
+
+
+def test_failed_phase_is_marked_and_reraised():
+    report = StartupReport()
+    with pytest.raises(RuntimeError):
+        with report.phase("load engine"):
+            raise RuntimeError("no GPU")
+    assert report.as_dict()[0]["ok"] is False
+    assert "FAILED" in report.summary()
@@ -0,0 +1,90 @@
+"""
+Tests for the prebuilt offline syllabus store
+"""
+import sys
+import os
+import mmap
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from syllabus_store import SyllabusStore, write_store, make_key
+
+
+def _record(exam, subject, content):
+    return {"exam": exam, "subject": subject, "content": content, "source": "Wikipedia: https://w", "built_at": 0}
+
+
+class TestSyllabusStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "syllabus.bin")
+        write_store(self.path, {
+            make_key("UPSC"): _record("UPSC", None, ["Main sections of UPSC syllabus:", "- Prelims\n- Mains"]),
+            make_key("Bank PO", "Reasoning"): _record("Bank PO", "Reasoning", ["Key topics: सिलोजिज़्म"]),
+        })
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lookup_is_case_and_space_insensitive(self):
+        store = SyllabusStore(self.path)
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.lookup("bank  po", "REASONING")["content"], ["Key topics: सिलोजिज़्म"])
+        self.assertEqual(store.lookup("UPSC")["content"][0], "Main sections of UPSC syllabus:")
+        self.assertIsNone(store.lookup("UPSC", "History"))
+
+    def test_missing_file_serves_nothing(self):
+        store = SyllabusStore(os.path.join(self.tmp.name, "absent.bin"))
+        self.assertIsNone(store.lookup("UPSC"))
+
+    def test_bad_file_is_unmapped(self):
+        bad_path = os.path.join(self.tmp.name, "bad.bin")
+        with open(bad_path, "wb") as f:
+            f.write(b"NOTASTORE" * 4)
+        mappings = []
+        real_mmap = mmap.mmap
+
+        def recording_mmap(*args, **kwargs):
+            mappings.append(real_mmap(*args, **kwargs))
+            return mappings[-1]
+
+        with patch("syllabus_store.mmap.mmap", side_effect=recording_mmap):
+            store = SyllabusStore(bad_path)
+        self.assertFalse(store.loaded)
+        self.assertEqual(len(mappings), 1)
+        self.assertTrue(mappings[0].closed)
+
+    def test_refreshed_file_is_picked_up(self):
+        store = SyllabusStore(self.path, reload_check_s=0)
+        records = store.records()
+        records[make_key("UPSC", "History")] = _record("UPSC", "History", ["Ancient, Medieval, Modern"])
+        write_store(self.path, records)
+        os.utime(self.path, (1, 1))
+        self.assertEqual(store.lookup("UPSC", "History")["content"], ["Ancient, Medieval, Modern"])
+
+    def test_check_exam_syllabus_serves_from_store_without_scraping(self):
+        import agent_tools
+        with patch("agent_tools.get_syllabus_store", return_value=SyllabusStore(self.path)), \
+             patch("agent_tools.scrape_exam_syllabus") as scrape:
+            result = agent_tools.check_exam_syllabus("UPSC")
+            missing = agent_tools.check_exam_syllabus("GATE")
+        scrape.assert_not_called()
+        self.assertIn("- Prelims\n- Mains", result)
+        self.assertIn("Source: Wikipedia: https://w", result)
+        self.assertIn("couldn't be retrieved", missing)
+
+    def test_check_exam_syllabus_scrapes_live_without_a_store(self):
+        import agent_tools
+        absent = SyllabusStore(os.path.join(self.tmp.name, "absent.bin"))
+        with patch("agent_tools.get_syllabus_store", return_value=absent), \
+             patch("agent_tools.scrape_exam_syllabus", return_value=(["GATE sections"], "web")) as scrape:
+            result = agent_tools.check_exam_syllabus("GATE")
+        scrape.assert_called_once_with("GATE", None)
+        self.assertIn("GATE sections", result)
+
+
+if __name__ == '__main__':
+    unittest.main()
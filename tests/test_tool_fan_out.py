@@ -0,0 +1,89 @@
+"""
+Tests for the concurrent Wikipedia / web search fan-out in the context-gathering tools
+"""
+import asyncio
+import sys
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import agent_tools
+import async_tools
+from agent_tools import _fan_out
+
+
+class TestFanOut(unittest.TestCase):
+    """Tests for the deadline-bounded fan-out helper"""
+
+    def test_sources_run_concurrently(self):
+        start = time.monotonic()
+        results = _fan_out({
+            "a": (lambda: time.sleep(0.3) or "A", 5),
+            "b": (lambda: time.sleep(0.3) or "B", 5),
+        })
+        self.assertEqual(results, {"a": "A", "b": "B"})
+        self.assertLess(time.monotonic() - start, 0.55)
+
+    def test_late_and_failing_sources_are_skipped(self):
+        def fail():
+            raise RuntimeError("network down")
+
+        start = time.monotonic()
+        results = _fan_out({
+            "fast": (lambda: "ok", 5),
+            "slow": (lambda: time.sleep(1) or "late", 0.1),
+            "broken": (fail, 5),
+        })
+        self.assertEqual(results, {"fast": "ok"})
+        self.assertLess(time.monotonic() - start, 0.8)
+
+
+class TestAsyncFanOut(unittest.TestCase):
+    """Tests for the coroutine fan-out used by async_tools"""
+
+    def test_late_and_failing_sources_are_skipped(self):
+        async def value(delay, result):
+            await asyncio.sleep(delay)
+            return result
+
+        async def fail():
+            raise RuntimeError("network down")
+
+        async def main():
+            start = time.monotonic()
+            results = await async_tools._fan_out({
+                "a": (value(0.2, "A"), 5),
+                "b": (value(0.2, "B"), 5),
+                "slow": (value(1, "late"), 0.1),
+                "broken": (fail(), 5),
+            })
+            return results, time.monotonic() - start
+
+        results, elapsed = asyncio.run(main())
+        self.assertEqual(results, {"a": "A", "b": "B"})
+        self.assertLess(elapsed, 0.5)
+
+
+class TestSyllabusFanOut(unittest.TestCase):
+    """The live syllabus scrape merges both sources and keeps Wikipedia as the preferred source"""
+
+    @patch("agent_tools._syllabus_from_web", return_value=(["Exam pattern: two papers"], "Web search results"))
+    @patch("agent_tools._syllabus_from_wikipedia", return_value=(["Main sections of JEE syllabus:"], "Wikipedia: https://w/JEE"))
+    def test_wikipedia_source_wins(self, mock_wiki, mock_web):
+        content, source = agent_tools.scrape_exam_syllabus("JEE")
+        self.assertEqual(content, ["Main sections of JEE syllabus:", "Exam pattern: two papers"])
+        self.assertEqual(source, "Wikipedia: https://w/JEE")
+
+    @patch("agent_tools._syllabus_from_web", return_value=(["Exam pattern: two papers"], "Web search results"))
+    @patch("agent_tools._syllabus_from_wikipedia", side_effect=RuntimeError("timeout"))
+    def test_web_source_used_when_wikipedia_fails(self, mock_wiki, mock_web):
+        content, source = agent_tools.scrape_exam_syllabus("JEE")
+        self.assertEqual(content, ["Exam pattern: two papers"])
+        self.assertEqual(source, "Web search results")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Tests for span tracing, the JSONL export and the summary report
+"""
+import asyncio
+import json
+import logging
+import sys
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tracing
+from deadline import bind
+from tracing import traced, span
+
+
+class TestSpans(unittest.TestCase):
+    """Nesting through the context variable, for every kind of traced function"""
+
+    def setUp(self):
+        self.records = []
+        patcher = patch("tracing._export", side_effect=self.records.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def by_name(self):
+        return {record["name"]: record for record in self.records}
+
+    def test_generator_spans_nest_without_leaking(self):
+        @traced("inner")
+        def inner():
+            with span("lookup", source="wiki"):
+                pass
+            yield "a"
+
+        @traced("handler", args=("tab",))
+        def handler(tab, prompt):
+            yield from inner()
+            yield "b"
+
+        stream = handler("Culture", "hi")
+        self.assertEqual(next(stream), "a")
+        # Between chunks the caller's context has no current span
+        self.assertIsNone(tracing.current_span())
+        self.assertEqual(list(stream), ["b"])
+
+        spans = self.by_name()
+        self.assertEqual(spans["handler"]["attributes"], {"tab": "Culture"})
+        self.assertIsNone(spans["handler"]["parent_id"])
+        self.assertEqual(spans["inner"]["parent_id"], spans["handler"]["span_id"])
+        self.assertEqual(spans["lookup"]["parent_id"], spans["inner"]["span_id"])
+        self.assertEqual(len({record["trace_id"] for record in self.records}), 1)
+
+    def test_async_and_threaded_children(self):
+        @traced("tool a")
+        async def tool_a():
+            await asyncio.sleep(0)
+
+        @traced("tool b")
+        def tool_b():
+            pass
+
+        @traced("handler")
+        async def handler():
+            await tool_a()
+            await asyncio.to_thread(tool_b)
+            worker = threading.Thread(target=bind(tool_b))
+            worker.start()
+            worker.join()
+
+        asyncio.run(handler())
+        root = next(r for r in self.records if r["name"] == "handler")
+        children = [r for r in self.records if r["parent_id"] == root["span_id"]]
+        self.assertEqual(sorted(r["name"] for r in children), ["tool a", "tool b", "tool b"])
+
+    def test_errors_are_recorded(self):
+        @traced("broken")
+        def broken():
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            broken()
+        self.assertEqual(self.records[0]["status"], "error")
+        self.assertIn("boom", self.records[0]["attributes"]["error"])
+
+
+class TestExportAndSummary(unittest.TestCase):
+    def test_rotated_files_feed_the_summary(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "traces.jsonl")
+            root = {"trace_id": "t1", "span_id": "r", "parent_id": None, "name": "app_fn", "start": 0.0,
+                    "end": 5.0, "duration_ms": 5000.0, "status": "ok", "attributes": {"tab": "Culture"}}
+            tool = {"trace_id": "t1", "span_id": "t", "parent_id": "r", "name": "tool explain_cultural_concept",
+                    "start": 0.1, "end": 1.0, "duration_ms": 900.0, "status": "ok", "attributes": {}}
+            generate = {"trace_id": "t1", "span_id": "g", "parent_id": "r", "name": "generate",
+                        "start": 1.0, "end": 4.9, "duration_ms": 3900.0, "status": "ok", "attributes": {}}
+            with open(f"{path}.1", "w") as f:
+                f.write(json.dumps(tool) + "\n")
+            with open(path, "w") as f:
+                f.write(json.dumps(generate) + "\n" + json.dumps(root) + "\n")
+
+            spans = tracing.load_spans(path)
+            self.assertEqual(len(spans), 3)
+            root_span, children = tracing.build_traces(spans)["t1"]
+            path_names = [record["name"] for record, _ in tracing.critical_path(root_span, children)]
+            self.assertEqual(path_names, ["app_fn", "generate"])
+
+            report = tracing.summarize(spans, top=3)
+            self.assertIn("== Culture: 1 traces", report)
+            self.assertIn("tool explain_cultural_concept", report)
+
+    def test_exporter_writes_jsonl(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out", "traces.jsonl")
+            exporter = tracing._exporter
+            trace_logger = logging.getLogger("bharat_buddy.trace")
+            handlers = list(trace_logger.handlers)
+            trace_logger.handlers.clear()
+            with patch.object(tracing.config, "TRACE_FILE", path), patch.object(tracing.config, "ENABLE_TRACING", True):
+                tracing._exporter = None
+                try:
+                    with span("unit", tab="Code"):
+                        pass
+                finally:
+                    for handler in trace_logger.handlers:
+                        handler.close()
+                    trace_logger.handlers[:] = handlers
+                    tracing._exporter = exporter
+            with open(path) as f:
+                record = json.loads(f.readline())
+            self.assertEqual((record["name"], record["attributes"]["tab"]), ("unit", "Code"))
+
+
+if __name__ == '__main__':
+    unittest.main()
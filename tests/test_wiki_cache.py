@@ -0,0 +1,149 @@
+"""
+Tests for the shared Wikipedia cache
+"""
+import asyncio
+import sys
+import os
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import wikipedia
+import wiki_cache
+from wiki_cache import WikiStore
+
+
+class TestWikiStore(unittest.TestCase):
+    """Tests for expiry and size-bounded eviction"""
+
+    def test_entries_expire_per_ttl(self):
+        now = [1000.0]
+        store = WikiStore(":memory:", clock=lambda: now[0])
+        store.put("search", "en:5:Diwali", ["Diwali"], ttl_s=10)
+        store.put("summary", "en:Diwali", "Festival of lights", ttl_s=100)
+        now[0] += 50
+        self.assertIsNone(store.get("search", "en:5:Diwali"))
+        self.assertEqual(store.get("summary", "en:Diwali"), "Festival of lights")
+        self.assertEqual(store.stats()["hits"], {"summary": 1})
+        self.assertEqual(store.stats()["misses"], {"search": 1})
+
+    def test_least_recently_used_entries_are_evicted_over_budget(self):
+        now = [1000.0]
+        store = WikiStore(":memory:", max_bytes=40, clock=lambda: now[0])
+        store.put("content", "a", "x" * 15, ttl_s=100)
+        now[0] += 1
+        store.put("content", "b", "y" * 15, ttl_s=100)
+        now[0] += 1
+        store.get("content", "a")
+        now[0] += 1
+        store.put("content", "c", "z" * 15, ttl_s=100)
+        self.assertIsNotNone(store.get("content", "a"))
+        self.assertIsNone(store.get("content", "b"))
+        self.assertLessEqual(store.stats()["bytes"], 40)
+
+
+class TestCachedLookups(unittest.TestCase):
+    """Tests that repeated lookups are served without calling Wikipedia"""
+
+    def setUp(self):
+        self._previous_store = wiki_cache._store
+        wiki_cache._store = WikiStore(":memory:")
+
+    def tearDown(self):
+        wiki_cache._store = self._previous_store
+
+    @patch("wiki_cache.wikipedia.search")
+    def test_search_is_cached(self, mock_search):
+        mock_search.return_value = ["UPSC Civil Services Examination"]
+        self.assertEqual(wiki_cache.search("UPSC syllabus", results=2), ["UPSC Civil Services Examination"])
+        self.assertEqual(wiki_cache.search("UPSC syllabus", results=2), ["UPSC Civil Services Examination"])
+        mock_search.assert_called_once_with("UPSC syllabus", results=2)
+
+    @patch("wiki_cache.wikipedia.page")
+    def test_page_fields_are_cached(self, mock_page):
+        live = MagicMock()
+        live.title = "Diwali"
+        live.url = "https://en.wikipedia.org/wiki/Diwali"
+        live.summary = "Diwali is the festival of lights."
+        mock_page.return_value = live
+
+        first = wiki_cache.page("Diwali")
+        self.assertEqual(first.summary, "Diwali is the festival of lights.")
+        second = wiki_cache.page("Diwali")
+        self.assertEqual(second.url, "https://en.wikipedia.org/wiki/Diwali")
+        self.assertEqual(second.summary, "Diwali is the festival of lights.")
+        mock_page.assert_called_once_with("Diwali", auto_suggest=False)
+
+    @patch("wiki_cache.wikipedia.page")
+    def test_disambiguation_is_cached_and_reraised(self, mock_page):
+        mock_page.side_effect = wikipedia.DisambiguationError("Bonalu", ["Bonalu (festival)", "Bonalu (film)"])
+        for _ in range(2):
+            with self.assertRaises(wikipedia.DisambiguationError) as raised:
+                wiki_cache.page("Bonalu")
+            self.assertEqual(raised.exception.options[0], "Bonalu (festival)")
+        self.assertEqual(mock_page.call_count, 1)
+
+    @patch("wiki_cache.wikipedia.page")
+    def test_async_lookups_share_the_sync_entries(self, mock_page):
+        calls = []
+
+        async def fake_api(lang, params):
+            calls.append(params)
+            if "list" in params:
+                return {"query": {"search": [{"title": "Diwali"}]}}
+            if params.get("prop") == "info|pageprops":
+                return {"query": {"pages": {"1": {"title": "Diwali", "fullurl": "https://en.wikipedia.org/wiki/Diwali"}}}}
+            return {"query": {"pages": {"1": {"extract": "Diwali is the festival of lights."}}}}
+
+        async def lookup():
+            titles = await wiki_cache.asearch("Diwali", results=3)
+            page = await wiki_cache.apage(titles[0])
+            return titles, page.url, await page.asummary()
+
+        with patch("wiki_cache._api", fake_api):
+            self.assertEqual(asyncio.run(lookup()), (["Diwali"], "https://en.wikipedia.org/wiki/Diwali",
+                                                     "Diwali is the festival of lights."))
+            asyncio.run(lookup())
+        self.assertEqual(len(calls), 3)
+        # The sync API is served from what the async one stored
+        self.assertEqual(wiki_cache.search("Diwali", results=3), ["Diwali"])
+        self.assertEqual(wiki_cache.page("Diwali").summary, "Diwali is the festival of lights.")
+        mock_page.assert_not_called()
+
+    def test_async_disambiguation_raises_with_options(self):
+        async def fake_api(lang, params):
+            if params.get("prop") == "links":
+                return {"query": {"pages": {"1": {"links": [{"title": "Bonalu (festival)"}]}}}}
+            return {"query": {"pages": {"1": {"title": "Bonalu", "pageprops": {"disambiguation": ""}}}}}
+
+        with patch("wiki_cache._api", fake_api):
+            with self.assertRaises(wikipedia.DisambiguationError) as raised:
+                asyncio.run(wiki_cache.apage("Bonalu"))
+        self.assertEqual(raised.exception.options, ["Bonalu (festival)"])
+
+    def test_async_lookups_keep_sqlite_off_the_event_loop(self):
+        store = wiki_cache.get_store()
+        threads = []
+        get = store.get
+
+        def recording_get(kind, key):
+            threads.append(threading.get_ident())
+            return get(kind, key)
+
+        async def fake_api(lang, params):
+            return {"query": {"search": [{"title": "Onam"}]}}
+
+        async def lookup():
+            return threading.get_ident(), await wiki_cache.asearch("Onam")
+
+        with patch("wiki_cache._api", fake_api), patch.object(store, "get", recording_get):
+            loop_thread, titles = asyncio.run(lookup())
+        self.assertEqual(titles, ["Onam"])
+        self.assertTrue(threads)
+        self.assertNotIn(loop_thread, threads)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Lightweight span tracing for Bharat AI Buddy
+
+Spans carry a trace ID, their parent's span ID, wall-clock start and end times and
+free-form attributes. They nest through a context variable, so app_logic entry
+points, agent runs and steps, tool calls and engine calls link up without passing
+anything around; agent_tools._fan_out and asyncio.to_thread carry the context into
+worker threads. Finished spans are appended to a size-rotated JSONL file.
+
+Generators are traced by making the span current only while the generator body
+runs (each next()), never across a yield, so streaming handlers nest correctly
+whichever thread resumes them.
+
+Usage:
+    python tracing.py summary [--file logs/traces.jsonl] [--top 10] [--tab Culture]
+"""
+import argparse
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+from config import config
+
+logger = logging.getLogger("bharat_buddy")
+
+_current = contextvars.ContextVar("current_span", default=None)
+_exporter = None
+
+
+class Span:
+    """
+    One timed operation.
+
+    Args:
+        name: Operation name, e.g. "app_fn" or "tool search_wikipedia"
+        parent: Enclosing Span, or None to start a new trace
+        attributes: Initial attributes
+    """
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        self.end_time = None
+        self.status = "ok"
+
+    def set(self, **attributes):
+        """Adds or overwrites attributes"""
+        self.attributes.update(attributes)
+
+    def fail(self, error):
+        self.status = "error"
+        self.attributes["error"] = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        """Finishes the span and exports it; later calls do nothing"""
+        if self.end_time is not None:
+            return
+        self.end_time = self.start + (time.perf_counter() - self._start_perf)
+        _export(self.to_dict())
+
+    def to_dict(self):
+        end = self.end_time if self.end_time is not None else time.time()
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "end": round(end, 6),
+            "duration_ms": round((end - self.start) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+def _get_exporter():
+    global _exporter
+    if _exporter is None:
+        exporter = logging.getLogger("bharat_buddy.trace")
+        exporter.propagate = False
+        exporter.setLevel(logging.INFO)
+        if not exporter.handlers:
+            directory = os.path.dirname(config.TRACE_FILE)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # RotatingFileHandler serializes writes and rotates at TRACE_MAX_BYTES
+            handler = RotatingFileHandler(
+                config.TRACE_FILE, maxBytes=config.TRACE_MAX_BYTES,
+                backupCount=config.TRACE_BACKUP_COUNT, encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            exporter.addHandler(handler)
+        _exporter = exporter
+    return _exporter
+
+
+def _export(record):
+    if not config.ENABLE_TRACING:
+        return
+    try:
+        _get_exporter().info(json.dumps(record, ensure_ascii=False, default=str))
+    except Exception as e:
+        logger.debug(f"Could not export span {record['name']}: {e}")
+
+
+def current_span():
+    """The span of the operation being run, or None"""
+    return _current.get()
+
+
+def set_attributes(**attributes):
+    """Adds attributes to the current span, if there is one"""
+    span = _current.get()
+    if span is not None:
+        span.set(**attributes)
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Runs the block in a child span of the current one. Do not yield from a
+    generator inside the block; use traced() on the generator function instead.
+    """
+    current = Span(name, _current.get(), attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.fail(e)
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+
+def record_span(name, start, end, **attributes):
+    """Exports an already finished operation (epoch start and end) as a child of the current span"""
+    finished = Span(name, _current.get(), attributes)
+    finished.start = start
+    finished.end_time = end
+    _export(finished.to_dict())
+
+
+def _iter_in_span(current, iterator):
+    try:
+        while True:
+            token = _current.set(current)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            except BaseException as e:
+                current.fail(e)
+                raise
+            finally:
+                _current.reset(token)
+            yield item
+    finally:
+        token = _current.set(current)
+        try:
+            iterator.close()
+        finally:
+            _current.reset(token)
+            current.end()
+
+
+async def _aiter_in_span(current, iterator):
+    try:
+        while True:
+            token = _current.set(current)
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            except BaseException as e:
+                current.fail(e)
+                raise
+            finally:
+                _current.reset(token)
+            yield item
+    finally:
+        token = _current.set(current)
+        try:
+            await iterator.aclose()
+        finally:
+            _current.reset(token)
+            current.end()
+
+
+def traced(name, args=(), **attributes):
+    """
+    Decorator running every call of a function, generator, coroutine or async
+    generator in its own span. The wrapper keeps the wrapped function's kind, so
+    callers such as Gradio still see a generator or coroutine.
+
+    Args:
+        name: Span name
+        args: Names of call arguments to record as span attributes
+        attributes: Static span attributes
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        def start(call_args, call_kwargs):
+            values = dict(attributes)
+            if args:
+                bound = signature.bind_partial(*call_args, **call_kwargs).arguments
+                values.update({arg: bound[arg] for arg in args if arg in bound})
+            return Span(name, _current.get(), values)
+
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*call_args, **call_kwargs):
+                async for item in _aiter_in_span(start(call_args, call_kwargs), fn(*call_args, **call_kwargs)):
+                    yield item
+        elif inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def wrapper(*call_args, **call_kwargs):
+                yield from _iter_in_span(start(call_args, call_kwargs), fn(*call_args, **call_kwargs))
+        elif inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*call_args, **call_kwargs):
+                current = start(call_args, call_kwargs)
+                token = _current.set(current)
+                try:
+                    return await fn(*call_args, **call_kwargs)
+                except BaseException as e:
+                    current.fail(e)
+                    raise
+                finally:
+                    _current.reset(token)
+                    current.end()
+        else:
+            @functools.wraps(fn)
+            def wrapper(*call_args, **call_kwargs):
+                current = start(call_args, call_kwargs)
+                token = _current.set(current)
+                try:
+                    return fn(*call_args, **call_kwargs)
+                except BaseException as e:
+                    current.fail(e)
+                    raise
+                finally:
+                    _current.reset(token)
+                    current.end()
+        return wrapper
+    return decorator
+
+
+def trace_tool(tool_obj):
+    """
+    Runs every call of a smolagents Tool in a "tool <name>" span by wrapping the
+    instance's forward, so direct and agent calls are both traced.
+
+    Returns:
+        The same tool, for chaining
+    """
+    if not getattr(tool_obj, "_traced", False):
+        tool_obj.forward = traced(f"tool {tool_obj.name}", tool=tool_obj.name)(tool_obj.forward)
+        tool_obj._traced = True
+    return tool_obj
+
+
+def trace_engine(engine):
+    """Runs the agent model's generate and generate_stream calls in "engine" spans"""
+    if not getattr(engine, "_traced", False):
+        engine.generate = traced("engine generate")(engine.generate)
+        engine.generate_stream = traced("engine generate_stream")(engine.generate_stream)
+        engine._traced = True
+    return engine
+
+
+def agent_step_callback(agent_name):
+    """Returns a smolagents step callback exporting each action step as a span"""
+    from smolagents import ActionStep
+
+    def on_step(step, **kwargs):
+        if not isinstance(step, ActionStep) or step.timing is None:
+            return
+        end = step.timing.end_time or time.time()
+        attributes = {"agent": agent_name, "step": step.step_number}
+        if step.tool_calls:
+            attributes["tool_calls"] = [call.name for call in step.tool_calls]
+        if step.error is not None:
+            attributes["error"] = str(step.error)
+        record_span("agent step", step.timing.start_time, end, **attributes)
+
+    return on_step
+
+
+# Summary CLI
+
+def load_spans(path):
+    """Reads spans from path and its rotated backups (path.1, path.2, ...), oldest first"""
+    files = [path]
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        files.append(f"{path}.{index}")
+        index += 1
+    spans = []
+    for file in reversed(files):
+        if not os.path.exists(file):
+            continue
+        with open(file, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue
+    return spans
+
+
+def build_traces(spans):
+    """
+    Groups spans into traces.
+
+    Returns:
+        Dict of trace ID to (root span, {span ID: [child spans]})
+    """
+    by_trace = defaultdict(list)
+    for record in spans:
+        by_trace[record["trace_id"]].append(record)
+    traces = {}
+    for trace_id, records in by_trace.items():
+        ids = {record["span_id"] for record in records}
+        children = defaultdict(list)
+        roots = []
+        for record in records:
+            if record["parent_id"] in ids:
+                children[record["parent_id"]].append(record)
+            else:
+                roots.append(record)
+        root = max(roots, key=lambda record: record["duration_ms"])
+        traces[trace_id] = (root, children)
+    return traces
+
+
+def critical_path(root, children):
+    """
+    Follows, from the root, the child that finished last at every level: the chain
+    of spans the request's end time waited on.
+
+    Returns:
+        List of (span, self time in ms) from the root down
+    """
+    path = []
+    node = root
+    while node is not None:
+        kids = children.get(node["span_id"], [])
+        last = max(kids, key=lambda record: record["end"]) if kids else None
+        self_ms = node["duration_ms"] - (last["duration_ms"] if last else 0)
+        path.append((node, max(0.0, self_ms)))
+        node = last
+    return path
+
+
+def _span_label(record):
+    attributes = record.get("attributes", {})
+    extra = [f"{key}={attributes[key]}" for key in ("agent", "step", "tool", "mode") if key in attributes]
+    return record["name"] + (f" ({', '.join(str(e) for e in extra)})" if extra else "")
+
+
+def summarize(spans, top=10, tab=None):
+    """Renders the per-tab critical path and slowest spans report"""
+    traces = build_traces(spans)
+    by_tab = defaultdict(list)
+    for trace_id, (root, children) in traces.items():
+        by_tab[root.get("attributes", {}).get("tab", "(no tab)")].append((root, children))
+    lines = []
+    for tab_name in sorted(by_tab, key=str):
+        if tab is not None and tab_name != tab:
+            continue
+        entries = by_tab[tab_name]
+        durations = [root["duration_ms"] for root, _ in entries]
+        lines.append(
+            f"== {tab_name}: {len(entries)} traces, p50 {statistics.median(durations) / 1000:.2f}s, "
+            f"max {max(durations) / 1000:.2f}s"
+        )
+        on_path = defaultdict(float)
+        for root, children in entries:
+            for record, self_ms in critical_path(root, children):
+                on_path[record["name"]] += self_ms
+        total = sum(on_path.values()) or 1.0
+        lines.append("Critical-path time by span:")
+        for name, ms in sorted(on_path.items(), key=lambda item: -item[1])[:top]:
+            lines.append(f"  {ms / total:6.1%}  {ms / 1000:8.2f}s  {name}")
+        root, children = max(entries, key=lambda entry: entry[0]["duration_ms"])
+        lines.append(f"Critical path of the slowest trace {root['trace_id']}:")
+        for depth, (record, self_ms) in enumerate(critical_path(root, children)):
+            lines.append(f"  {record['duration_ms'] / 1000:8.2f}s  (self {self_ms / 1000:.2f}s)  {'  ' * depth}{_span_label(record)}")
+        lines.append(f"Top {top} slowest spans:")
+        all_spans = [record for root, children in entries for record in [root] + [c for kids in children.values() for c in kids]]
+        for record in sorted(all_spans, key=lambda record: -record["duration_ms"])[:top]:
+            status = "" if record.get("status") == "ok" else f"  [{record.get('status')}]"
+            lines.append(f"  {record['duration_ms'] / 1000:8.2f}s  {_span_label(record)}  trace={record['trace_id']}{status}")
+        lines.append("")
+    return "\n".join(lines) if lines else "No traces found."
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    summary = subparsers.add_parser("summary", help="Critical path and slowest spans per tab")
+    summary.add_argument("--file", default=config.TRACE_FILE)
+    summary.add_argument("--top", type=int, default=10)
+    summary.add_argument("--tab", default=None)
+    args = parser.parse_args()
+
+    spans = load_spans(args.file)
+    if not spans:
+        print(f"No spans in {args.file}")
+        sys.exit(1)
+    print(summarize(spans, top=args.top, tab=args.tab))
+
+
+if __name__ == "__main__":
+    main()
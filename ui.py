@@ -5,14 +5,95 @@ UI construction and Gradio wiring for Bharat AI Buddy
 import gradio as gr
 from constants import EXAMPLES
 from app_logic import (
-    app_fn, get_syllabus_info, get_study_tips, exam_qa as exam_qa_fn
+    app_fn, get_syllabus_info, get_study_tips, exam_qa_stream,
+    app_fn_async, get_syllabus_info_async, get_study_tips_async, exam_qa_stream_async
 )
 from config import config
+from startup import readiness_message
 import logging
+import re
+
+
+def chat_api_name(tab_name):
+    """API name of a tab's chat endpoint, e.g. Math/Logic -> chat_math_logic"""
+    return "chat_" + re.sub(r"\W+", "_", tab_name.lower()).strip("_")
+
+
+def queue_concurrency_limit(concurrency_limit=None):
+    """
+    Resolves the concurrent runs per event. 0 (the default) means unbounded for the
+    async handlers, which hold no thread while they wait on tools or the model, and
+    SCHEDULER_MAX_BATCH_SIZE for the sync handlers, one thread each.
+
+    Args:
+        concurrency_limit: Limit to resolve; defaults to config.GRADIO_CONCURRENCY_LIMIT
+
+    Returns:
+        The limit, or None for unbounded
+    """
+    concurrency_limit = config.GRADIO_CONCURRENCY_LIMIT if concurrency_limit is None else concurrency_limit
+    if concurrency_limit > 0:
+        return concurrency_limit
+    return None if config.ENABLE_ASYNC_HANDLERS else max(1, config.SCHEDULER_MAX_BATCH_SIZE)
+
+
+def configure_queue(demo, concurrency_limit=None, max_size=None):
+    """
+    Enables Gradio's request queue (needed by the streaming handlers) with the
+    configured per-event concurrency and queue bound.
+
+    Args:
+        demo: Blocks app from build_ui()
+        concurrency_limit: Concurrent runs per event, see queue_concurrency_limit()
+        max_size: Waiting requests before new ones are rejected; 0 or None is unbounded
+
+    Returns:
+        The queued Blocks app, ready to launch
+    """
+    concurrency_limit = queue_concurrency_limit(concurrency_limit)
+    max_size = (config.GRADIO_MAX_QUEUE_SIZE if max_size is None else max_size) or None
+    try:
+        return demo.queue(default_concurrency_limit=concurrency_limit, max_size=max_size)
+    except TypeError:
+        # Gradio 3.x names the same setting concurrency_count and needs a number
+        return demo.queue(concurrency_count=concurrency_limit or config.GRADIO_MAX_THREADS, max_size=max_size)
+
+
+def _session_id(request):
+    return getattr(request, "session_hash", None)
+
+
+# Gradio fills the gr.Request parameter with the browser session, which keys the
+# conversation history. Its position in the signature matters, so no *args.
+
+def chat_with_session(tab, prompt, mode, use_agents, request: gr.Request):
+    yield from app_fn(tab, prompt, mode, use_agents, session_id=_session_id(request))
+
+
+async def chat_with_session_async(tab, prompt, mode, use_agents, request: gr.Request):
+    async for result in app_fn_async(tab, prompt, mode, use_agents, session_id=_session_id(request)):
+        yield result
+
+
+def exam_qa_with_session(exam, subject, question, request: gr.Request):
+    yield from exam_qa_stream(exam, subject, question, session_id=_session_id(request))
+
+
+async def exam_qa_with_session_async(exam, subject, question, request: gr.Request):
+    async for answer in exam_qa_stream_async(exam, subject, question, session_id=_session_id(request)):
+        yield answer
+
 
 def build_ui():
     logger = logging.getLogger("bharat_buddy")
     logger.info("Building Gradio UI...")
+    # Async handlers wait on tools and the model without holding a worker thread each
+    if config.ENABLE_ASYNC_HANDLERS:
+        chat_handler, qa_handler = chat_with_session_async, exam_qa_with_session_async
+        syllabus_handler, tips_handler = get_syllabus_info_async, get_study_tips_async
+    else:
+        chat_handler, qa_handler = chat_with_session, exam_qa_with_session
+        syllabus_handler, tips_handler = get_syllabus_info, get_study_tips
     with gr.Blocks(theme=gr.themes.Soft(primary_hue="orange", secondary_hue="green")) as demo:
         logger.info("Created main Blocks container.")
         gr.HTML("""
@@ -32,6 +113,8 @@ def build_ui():
         </div>
         """)
         logger.info("Added logo and title section.")
+        # Model readiness, refreshed while the background warm-up runs
+        gr.Markdown(readiness_message, every=5, elem_id="readiness-status")
         with gr.Row():
             mode = gr.Radio(["think", "non-think"], value="think", label="Mode", elem_id="mode-select")
             use_agents = gr.Checkbox(value=True, label="Use AI Agents", info="Enables specialized AI agents for advanced capabilities")
@@ -60,10 +143,13 @@ def build_ui():
                                 elem_id=f"example-dropdown-{tab_name}"
                             )
                             example_dropdown.change(lambda ex: gr.update(value=ex if ex else "", interactive=True), inputs=example_dropdown, outputs=prompt)
-                    output = gr.Textbox(label="Response", lines=8, elem_id=f"output-{tab_name}")
+                    reasoning_output = gr.Textbox(label="🧠 Reasoning", lines=4, elem_id=f"reasoning-{tab_name}")
+                    output = gr.Textbox(label="✅ Answer", lines=8, elem_id=f"output-{tab_name}")
                     submit = gr.Button("Submit", elem_id=f"submit-{tab_name}", scale=2)
-                    submit.click(app_fn, inputs=[tab_state, prompt, mode, use_agents], outputs=output)
-                    logger.info(f"Configured {tab_name} tab with prompt, output, and submit button.")
+                    # The chat handler is a generator: reasoning and answer stream into their boxes as tokens decode
+                    submit.click(chat_handler, inputs=[tab_state, prompt, mode, use_agents], outputs=[reasoning_output, output],
+                                 api_name=chat_api_name(tab_name))
+                    logger.info(f"Configured {tab_name} tab with prompt, reasoning/answer outputs, and submit button.")
             # Add Exam Prep Buddy tab only once, outside the loop
             with gr.Tab("🏆 Exam Prep Buddy"):
                 with gr.Tabs() as exam_tabs:
@@ -83,10 +169,10 @@ def build_ui():
                             qa_prompt = gr.Textbox(label="Ask about exam preparation", lines=2, elem_id="qa-prompt")
                         qa_submit = gr.Button("Get Answer", elem_id="qa-submit-btn")
                         qa_output = gr.Textbox(label="Answer", lines=8, elem_id="qa-output")
-                        qa_submit.click(lambda exam, subject, prompt: exam_qa_fn(exam, subject, prompt), inputs=[exam_qa, subject_qa, qa_prompt], outputs=qa_output)
+                        qa_submit.click(qa_handler, inputs=[exam_qa, subject_qa, qa_prompt], outputs=qa_output, api_name="exam_qa")
                         logger.info("Configured Exam Q&A tab with exam and subject selectors, prompt, and answer output.")
-                get_syllabus_btn.click(get_syllabus_info, inputs=[exam_syllabus, subject_syllabus], outputs=syllabus_output)
-                get_tips_btn.click(get_study_tips, inputs=[exam_syllabus, subject_syllabus], outputs=syllabus_output)
+                get_syllabus_btn.click(syllabus_handler, inputs=[exam_syllabus, subject_syllabus], outputs=syllabus_output, api_name="syllabus")
+                get_tips_btn.click(tips_handler, inputs=[exam_syllabus, subject_syllabus], outputs=syllabus_output, api_name="study_tips")
                 logger.info("Configured syllabus buttons with click events.")
                     
             gr.HTML("""
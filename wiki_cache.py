@@ -0,0 +1,353 @@
+"""
+Shared persistent cache for Wikipedia lookups used by agent_tools
+
+Search results, page resolutions (title and URL), summaries and full page content
+are stored in a local SQLite file with a per-entry TTL and a total size bound;
+least recently used entries are evicted first. Misses that end in a
+DisambiguationError or PageError are cached too, so repeated lookups of the same
+ambiguous or missing title never leave the box either.
+
+The module-level ``search`` and ``page`` functions mirror ``wikipedia.search`` and
+``wikipedia.page(..., auto_suggest=False)`` and raise the same exceptions.
+``asearch`` and ``apage`` are their non-blocking counterparts for the async request
+pipeline: they call the MediaWiki API through the shared AsyncHttpClient and read
+and write the same store entries, on a worker thread since SQLite calls block.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import wikipedia
+
+from config import config
+
+logger = logging.getLogger("bharat_buddy")
+
+
+class _LanguageGate:
+    """
+    The wikipedia package keeps the API language in a global. Calls for the current
+    language run concurrently; switching language waits for them to drain first.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._lang = None
+        self._active = 0
+
+    @contextmanager
+    def use(self, lang):
+        with self._condition:
+            while self._lang != lang and self._active:
+                self._condition.wait()
+            if self._lang != lang:
+                wikipedia.set_lang(lang)
+                self._lang = lang
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+
+_language_gate = _LanguageGate()
+
+
+class WikiStore:
+    """
+    SQLite key/value store with per-entry expiry, LRU eviction by total size and
+    hit/miss counters per entry kind.
+
+    Args:
+        path: SQLite file, or ":memory:"
+        max_bytes: Upper bound on the total size of stored values
+        clock: Time source, overridable for tests
+    """
+
+    def __init__(self, path, max_bytes=200 * 1024 * 1024, clock=time.time):
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+        directory = os.path.dirname(path) if path != ":memory:" else ""
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "kind TEXT, key TEXT, value TEXT, size INTEGER, expires_at REAL, last_access REAL, "
+            "PRIMARY KEY (kind, key))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_access ON entries(last_access)")
+        self._db.commit()
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, kind, key):
+        """Returns the stored JSON value, or None if absent or expired"""
+        now = self._clock()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, size, expires_at FROM entries WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            if row is not None and row[2] <= now:
+                self._db.execute("DELETE FROM entries WHERE kind = ? AND key = ?", (kind, key))
+                self._total_bytes -= row[1]
+                self._db.commit()
+                row = None
+            if row is None:
+                self.misses[kind] = self.misses.get(kind, 0) + 1
+                return None
+            self._db.execute(
+                "UPDATE entries SET last_access = ? WHERE kind = ? AND key = ?", (now, kind, key)
+            )
+            self._db.commit()
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+        return json.loads(row[0])
+
+    def put(self, kind, key, value, ttl_s):
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        now = self._clock()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM entries WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+            if old is not None:
+                self._total_bytes -= old[0]
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, key, data, size, now + ttl_s, now),
+            )
+            self._total_bytes += size
+            self._evict(now)
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            return {"entries": count, "bytes": self._total_bytes, "hits": dict(self.hits), "misses": dict(self.misses)}
+
+    def _evict(self, now):
+        """Drops expired entries, then least recently used ones until under max_bytes"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        self._db.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        while self._total_bytes > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT kind, key, size FROM entries ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            for kind, key, size in rows:
+                self._db.execute("DELETE FROM entries WHERE kind = ? AND key = ?", (kind, key))
+                self._total_bytes -= size
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Returns the shared WikiStore, opening it on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = WikiStore(config.WIKI_CACHE_PATH, max_bytes=config.WIKI_CACHE_MAX_BYTES)
+    return _store
+
+
+async def _aget(kind, key):
+    """WikiStore.get without blocking the event loop (opening the store and SQLite reads block)"""
+    return await asyncio.to_thread(lambda: get_store().get(kind, key))
+
+
+async def _aput(kind, key, value, ttl_s):
+    """WikiStore.put without blocking the event loop"""
+    await asyncio.to_thread(lambda: get_store().put(kind, key, value, ttl_s))
+
+
+def _raise_cached_error(error):
+    if error["type"] == "disambiguation":
+        raise wikipedia.DisambiguationError(error["title"], error["options"])
+    raise wikipedia.PageError(None, error["title"])
+
+
+class CachedPage:
+    """
+    Stand-in for wikipedia.WikipediaPage exposing title, url, summary and content.
+    Summary and content are fetched lazily and cached separately.
+    """
+
+    def __init__(self, title, url, lang, live_page=None):
+        self.title = title
+        self.url = url
+        self.lang = lang
+        self._live_page = live_page
+
+    def _live(self):
+        if self._live_page is None:
+            with _language_gate.use(self.lang):
+                self._live_page = wikipedia.page(self.title, auto_suggest=False)
+        return self._live_page
+
+    def _field(self, name):
+        store = get_store()
+        key = f"{self.lang}:{self.title}"
+        cached = store.get(name, key)
+        if cached is not None:
+            return cached
+        value = self._live_field(name)
+        store.put(name, key, value, config.WIKI_CACHE_TTL_S)
+        return value
+
+    def _live_field(self, name):
+        live = self._live()
+        with _language_gate.use(self.lang):
+            return getattr(live, name)
+
+    @property
+    def summary(self):
+        return self._field("summary")
+
+    @property
+    def content(self):
+        return self._field("content")
+
+    async def _afield(self, name):
+        key = f"{self.lang}:{self.title}"
+        cached = await _aget(name, key)
+        if cached is not None:
+            return cached
+        if self._live_page is not None:
+            # Already fetched by the sync API; reading it may still hit the network
+            value = await asyncio.to_thread(self._live_field, name)
+        else:
+            params = {"prop": "extracts", "explaintext": "", "titles": self.title}
+            if name == "summary":
+                params["exintro"] = ""
+            data = await _api(self.lang, params)
+            value = next(iter(data["query"]["pages"].values())).get("extract", "")
+        await _aput(name, key, value, config.WIKI_CACHE_TTL_S)
+        return value
+
+    async def asummary(self):
+        """Non-blocking summary"""
+        return await self._afield("summary")
+
+    async def acontent(self):
+        """Non-blocking full plain-text content, with == Section == headings"""
+        return await self._afield("content")
+
+
+def search(query, results=5, lang="en"):
+    """Cached equivalent of wikipedia.search(query, results=results) in the given language"""
+    store = get_store()
+    key = f"{lang}:{results}:{query}"
+    cached = store.get("search", key)
+    if cached is not None:
+        return cached
+    with _language_gate.use(lang):
+        found = wikipedia.search(query, results=results)
+    store.put("search", key, list(found), config.WIKI_SEARCH_TTL_S)
+    return found
+
+
+def page(title, lang="en"):
+    """
+    Cached equivalent of wikipedia.page(title, auto_suggest=False).
+
+    Raises:
+        wikipedia.DisambiguationError, wikipedia.PageError: As the live call would,
+            including when the failure itself was cached
+    """
+    store = get_store()
+    key = f"{lang}:{title}"
+    cached = store.get("page", key)
+    if cached is not None:
+        if "error" in cached:
+            _raise_cached_error(cached["error"])
+        return CachedPage(cached["title"], cached["url"], lang)
+    try:
+        with _language_gate.use(lang):
+            live = wikipedia.page(title, auto_suggest=False)
+    except wikipedia.DisambiguationError as e:
+        store.put("page", key, {"error": {"type": "disambiguation", "title": title, "options": list(e.options)}},
+                  config.WIKI_CACHE_TTL_S)
+        raise
+    except wikipedia.PageError:
+        store.put("page", key, {"error": {"type": "missing", "title": title}}, config.WIKI_CACHE_TTL_S)
+        raise
+    store.put("page", key, {"title": live.title, "url": live.url}, config.WIKI_CACHE_TTL_S)
+    return CachedPage(live.title, live.url, lang, live_page=live)
+
+
+_API_URL = "https://{lang}.wikipedia.org/w/api.php"
+_USER_AGENT = "BharatAIBuddy/1.0 (wiki_cache)"
+
+
+async def _api(lang, params):
+    from http_client import get_async_http_client
+
+    response = await get_async_http_client().get(
+        _API_URL.format(lang=lang),
+        params={"action": "query", "format": "json", **params},
+        headers={"User-Agent": _USER_AGENT},
+    )
+    return json.loads(response.text)
+
+
+async def asearch(query, results=5, lang="en"):
+    """Non-blocking search(); shares its cache entries"""
+    key = f"{lang}:{results}:{query}"
+    cached = await _aget("search", key)
+    if cached is not None:
+        return cached
+    data = await _api(lang, {"list": "search", "srprop": "", "srlimit": results, "srsearch": query})
+    found = [item["title"] for item in data["query"]["search"]]
+    await _aput("search", key, found, config.WIKI_SEARCH_TTL_S)
+    return found
+
+
+async def apage(title, lang="en"):
+    """
+    Non-blocking page(); shares its cache entries, redirects are followed.
+
+    Raises:
+        wikipedia.DisambiguationError, wikipedia.PageError: As page() would
+    """
+    key = f"{lang}:{title}"
+    cached = await _aget("page", key)
+    if cached is not None:
+        if "error" in cached:
+            _raise_cached_error(cached["error"])
+        return CachedPage(cached["title"], cached["url"], lang)
+    data = await _api(lang, {
+        "prop": "info|pageprops", "inprop": "url", "ppprop": "disambiguation", "redirects": "", "titles": title,
+    })
+    info = next(iter(data["query"]["pages"].values()))
+    if "missing" in info or "invalid" in info:
+        error = {"type": "missing", "title": title}
+    elif "disambiguation" in info.get("pageprops", {}):
+        links = await _api(lang, {"prop": "links", "plnamespace": 0, "pllimit": "max", "titles": info["title"]})
+        options = [link["title"] for link in next(iter(links["query"]["pages"].values())).get("links", [])]
+        error = {"type": "disambiguation", "title": title, "options": options}
+    else:
+        await _aput("page", key, {"title": info["title"], "url": info["fullurl"]}, config.WIKI_CACHE_TTL_S)
+        return CachedPage(info["title"], info["fullurl"], lang)
+    await _aput("page", key, {"error": error}, config.WIKI_CACHE_TTL_S)
+    _raise_cached_error(error)
+
+
+def stats():
+    """Entry count, stored bytes and hit/miss counters per kind"""
+    return get_store().stats()